@@ -1,32 +1,49 @@
-import yfinance as yf
 import pandas as pd
 import numpy as np
-import talib
-from datetime import datetime, timedelta
+from datetime import datetime
+from core.bar_store import bar_store
+from core.lazy_module import LazyModule
+from core.resampler import resample, align
+from core.indicator_engine import indicator_engine, EMA, ATR, ADX
+from core.lookback import lookback, bars_needed
+
+# Only the vectorized backtest path needs TA-Lib
+talib = LazyModule('talib')
+
+# Indicators read by generate_signal (60m bars)
+INDICATORS = [EMA(20), EMA(50), ATR(14), ADX(14)]
+
+# Bars needed: the indicators' warm-up or generate_signal's length check
+LOOKBACK = {'60m': bars_needed(INDICATORS, minimum=100)}
+
+# Months with positive seasonality per symbol
+SEASONAL_MONTHS = {
+    'GC=F': [1, 9, 10],  # Gold
+    'CL=F': [2, 3, 7]    # Crude Oil
+}
+
+def required_series(symbol):
+    """Series read by generate_signal, as (yfinance symbol, interval, period)"""
+    return [(symbol, '60m', lookback.period('commodity', LOOKBACK))]
 
 def generate_signal(symbol):
     """Generate trading signals for commodities using trend and seasonality analysis"""
     try:
-        # Get data - longer period for commodities
-        end_date = datetime.now()
-        start_date = end_date - timedelta(days=180)
-        data = yf.download(symbol, start=start_date, end=end_date, interval='60m')
+        # Get data - as many bars as LOOKBACK asks for
+        data = bar_store.get_buffer(symbol, interval='60m', period=required_series(symbol)[0][2])
         
         if len(data) < 100:
             return "HOLD (Insufficient Data)"
         
-        # Calculate technical indicators
-        data['EMA_20'] = talib.EMA(data['Close'], timeperiod=20)
-        data['EMA_50'] = talib.EMA(data['Close'], timeperiod=50)
-        data['ATR'] = talib.ATR(data['High'], data['Low'], data['Close'], timeperiod=14)
-        data['ADX'] = talib.ADX(data['High'], data['Low'], data['Close'], timeperiod=14)
+        # Calculate technical indicators (only bars new since the last cycle)
+        ind = indicator_engine.update(symbol, '60m', data, INDICATORS)
         
         # Get latest values
-        last_close = data['Close'].iloc[-1]
-        ema20 = data['EMA_20'].iloc[-1]
-        ema50 = data['EMA_50'].iloc[-1]
-        atr = data['ATR'].iloc[-1]
-        adx = data['ADX'].iloc[-1]
+        last_close = float(data.close[-1])
+        ema20 = ind['EMA_20'][-1]
+        ema50 = ind['EMA_50'][-1]
+        atr = ind['ATR'][-1]
+        adx = ind['ADX'][-1]
         
         # Volatility analysis
         volatility = atr / last_close
@@ -37,12 +54,7 @@ def generate_signal(symbol):
         
         # Seasonality factor (simulated)
         month = datetime.now().month
-        if symbol == 'GC=F':  # Gold
-            seasonality = "POSITIVE" if month in [1, 9, 10] else "NEUTRAL"
-        elif symbol == 'CL=F':  # Crude Oil
-            seasonality = "POSITIVE" if month in [2, 3, 7] else "NEUTRAL"
-        else:
-            seasonality = "NEUTRAL"
+        seasonality = "POSITIVE" if month in SEASONAL_MONTHS.get(symbol, []) else "NEUTRAL"
         
         # AI Decision Matrix
         if trend == "BULLISH":
@@ -67,3 +79,58 @@ def generate_signal(symbol):
             
     except Exception as e:
         return f"HOLD (Error: {str(e)})"
+
+def signal_series(bars, interval, symbol):
+    """
+    Vectorized generate_signal over a whole history, for backtesting
+
+    Indicators come from the last closed 60m bar at each base bar; prices are
+    compared using the base bar's close and seasonality uses its month.
+
+    Args:
+        bars (pd.DataFrame): OHLCV bars at 60m or finer, UTC index, oldest first
+        interval (str): Interval of `bars`
+        symbol (str): Instrument symbol
+
+    Returns:
+        pd.DataFrame: direction (1 buy, -1 sell, 0 hold), strong, and the signed
+            votes of each rule, indexed like `bars`
+    """
+    data = resample(bars, '60m', session='commodity')
+    high, low, close = (data[column].to_numpy(dtype=float) for column in ('High', 'Low', 'Close'))
+    ind = align(pd.DataFrame({
+        'EMA_20': talib.EMA(close, timeperiod=20),
+        'EMA_50': talib.EMA(close, timeperiod=50),
+        'ATR': talib.ATR(high, low, close, timeperiod=14),
+        'ADX': talib.ADX(high, low, close, timeperiod=14),
+        'bars': np.arange(1, len(data) + 1)
+    }, index=data.index), '60m', bars.index, interval)
+    last_close = bars['Close'].to_numpy(dtype=float)
+    ema20, adx = ind['EMA_20'].to_numpy(), ind['ADX'].to_numpy()
+
+    volatility = ind['ATR'].to_numpy() / last_close
+    bullish = ind['EMA_20'].to_numpy() > ind['EMA_50'].to_numpy()
+    strong_trend = adx > 25
+    positive = bars.index.month.isin(SEASONAL_MONTHS.get(symbol, []))
+
+    # Same decision tree as generate_signal, first matching branch wins
+    strong_buy = bullish & strong_trend & (volatility > 0.01) & positive
+    trend_buy = bullish & ~strong_buy & (last_close > ema20) & (adx > 20)
+    strong_sell = ~bullish & strong_trend & (volatility > 0.01) & ~positive
+    trend_sell = ~bullish & ~strong_sell & (last_close < ema20) & (adx > 20)
+    undecided = ~(strong_buy | trend_buy | strong_sell | trend_sell) & (volatility > 0.015)
+    reversion_buy = undecided & (last_close < ema20 * 0.98)
+    reversion_sell = undecided & ~reversion_buy & (last_close > ema20 * 1.02)
+
+    rules = pd.DataFrame({
+        'strong_trend': np.select([strong_buy, strong_sell], [1, -1], 0),
+        'trend': np.select([trend_buy, trend_sell], [1, -1], 0),
+        'mean_reversion': np.select([reversion_buy, reversion_sell], [1, -1], 0)
+    }, index=bars.index)
+
+    ready = ind['bars'].to_numpy() >= 100
+    result = pd.DataFrame({
+        'direction': np.where(ready, rules.sum(axis=1), 0),
+        'strong': ready & (strong_buy | strong_sell)
+    }, index=bars.index)
+    return result.join(rules)
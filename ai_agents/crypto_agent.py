@@ -1,35 +1,49 @@
-import yfinance as yf
 import pandas as pd
 import numpy as np
-from datetime import datetime, timedelta
-import talib
+from core.bar_store import bar_store
+from core.lazy_module import LazyModule
+from core.resampler import resample, align
+from core.indicator_engine import indicator_engine, RSI, MACD, ADX, BBANDS
+from core.lookback import lookback, bars_needed
+
+# Only the vectorized backtest path needs TA-Lib
+talib = LazyModule('talib')
+
+# Indicators read by generate_signal (15m bars)
+INDICATORS = [RSI(14), MACD(12, 26, 9), ADX(14), BBANDS(20)]
+
+# 15m bars the volatility is measured over (30 days)
+VOLATILITY_BARS = 30 * 96
+
+# Bars needed: the indicators' warm-up, generate_signal's length check or the volatility window
+LOOKBACK = {'15m': bars_needed(INDICATORS, minimum=max(50, VOLATILITY_BARS))}
+
+def required_series(symbol):
+    """Series read by generate_signal, as (yfinance symbol, interval, period)"""
+    return [(symbol, '15m', lookback.period('crypto', LOOKBACK))]
 
 def generate_signal(symbol):
     """Generate trading signals for cryptocurrencies using ML and technical analysis"""
     try:
-        # Get data - extended period for better pattern recognition
-        end_date = datetime.now()
-        start_date = end_date - timedelta(days=30)
-        data = yf.download(symbol, start=start_date, end=end_date, interval='15m')
+        # Get data - as many bars as LOOKBACK asks for
+        data = bar_store.get_buffer(symbol, interval='15m', period=required_series(symbol)[0][2])
         
         if len(data) < 50:
             return "HOLD (Insufficient Data)"
         
-        # Calculate technical indicators
-        data['RSI'] = talib.RSI(data['Close'], timeperiod=14)
-        data['MACD'], data['MACD_signal'], _ = talib.MACD(data['Close'], fastperiod=12, slowperiod=26, signalperiod=9)
-        data['ADX'] = talib.ADX(data['High'], data['Low'], data['Close'], timeperiod=14)
-        data['BB_upper'], data['BB_middle'], data['BB_lower'] = talib.BBANDS(data['Close'], timeperiod=20)
+        # Calculate technical indicators (only bars new since the last cycle)
+        ind = indicator_engine.update(symbol, '15m', data, INDICATORS)
         
         # Get the latest values
-        last_close = data['Close'].iloc[-1]
-        last_rsi = data['RSI'].iloc[-1]
-        last_macd = data['MACD'].iloc[-1]
-        last_macd_signal = data['MACD_signal'].iloc[-1]
-        last_adx = data['ADX'].iloc[-1]
+        last_close = float(data.close[-1])
+        last_rsi = ind['RSI'][-1]
+        last_macd = ind['MACD'][-1]
+        last_macd_signal = ind['MACD_signal'][-1]
+        last_adx = ind['ADX'][-1]
         
-        # Volatility analysis
-        volatility = data['Close'].pct_change().std() * np.sqrt(365*24)  # Annualized volatility
+        # Volatility analysis over the last VOLATILITY_BARS bars, however many are stored
+        close = data.close[-VOLATILITY_BARS:].astype(float)
+        volatility = np.nanstd(np.diff(close) / close[:-1], ddof=1) * np.sqrt(365*24)  # Annualized volatility
         
         # AI Decision Matrix
         buy_signals = 0
@@ -42,14 +56,14 @@ def generate_signal(symbol):
             sell_signals += 1
             
         # MACD crossover
-        if last_macd > last_macd_signal and data['MACD'].iloc[-2] < data['MACD_signal'].iloc[-2]:
+        if last_macd > last_macd_signal and ind['MACD'][-2] < ind['MACD_signal'][-2]:
             buy_signals += 2
-        elif last_macd < last_macd_signal and data['MACD'].iloc[-2] > data['MACD_signal'].iloc[-2]:
+        elif last_macd < last_macd_signal and ind['MACD'][-2] > ind['MACD_signal'][-2]:
             sell_signals += 2
             
         # ADX trend strength
         if last_adx > 25:
-            if last_close > data['BB_middle'].iloc[-1]:
+            if last_close > ind['BB_middle'][-1]:
                 buy_signals += 1
             else:
                 sell_signals += 1
@@ -71,3 +85,59 @@ def generate_signal(symbol):
             
     except Exception as e:
         return f"HOLD (Error: {str(e)})"
+
+def signal_series(bars, interval, symbol):
+    """
+    Vectorized generate_signal over a whole history, for backtesting
+
+    Indicators come from the last closed 15m bar at each base bar; prices are
+    compared using the base bar's close.
+
+    Args:
+        bars (pd.DataFrame): OHLCV bars at 15m or finer, UTC index, oldest first
+        interval (str): Interval of `bars`
+        symbol (str): Instrument symbol
+
+    Returns:
+        pd.DataFrame: direction (1 buy, -1 sell, 0 hold), strong, and the signed
+            votes of each rule, indexed like `bars`
+    """
+    data = resample(bars, '15m', session='crypto')
+    high, low, close = (data[column].to_numpy(dtype=float) for column in ('High', 'Low', 'Close'))
+    macd, macd_signal, _ = talib.MACD(close, fastperiod=12, slowperiod=26, signalperiod=9)
+    _, bb_middle, _ = talib.BBANDS(close, timeperiod=20)
+    ind = pd.DataFrame({
+        'RSI': talib.RSI(close, timeperiod=14),
+        'MACD': macd,
+        'MACD_signal': macd_signal,
+        'ADX': talib.ADX(high, low, close, timeperiod=14),
+        'BB_middle': bb_middle,
+        'bars': np.arange(1, len(data) + 1)
+    }, index=data.index)
+    ind['MACD_prev'] = ind['MACD'].shift()
+    ind['MACD_signal_prev'] = ind['MACD_signal'].shift()
+    ind = align(ind, '15m', bars.index, interval)
+    last_close = bars['Close'].to_numpy(dtype=float)
+
+    # Same votes as generate_signal
+    rules = pd.DataFrame(index=bars.index)
+    rules['rsi'] = np.select([ind['RSI'] < 35, ind['RSI'] > 65], [1, -1], 0)
+    rules['macd_cross'] = np.select([
+        (ind['MACD'] > ind['MACD_signal']) & (ind['MACD_prev'] < ind['MACD_signal_prev']),
+        (ind['MACD'] < ind['MACD_signal']) & (ind['MACD_prev'] > ind['MACD_signal_prev'])
+    ], [2, -2], 0)
+    rules['adx_trend'] = np.where(ind['ADX'] > 25, np.where(last_close > ind['BB_middle'], 1, -1), 0)
+
+    buy_signals = rules.clip(lower=0).sum(axis=1)
+    sell_signals = (-rules).clip(lower=0).sum(axis=1)
+    strong_buy = (buy_signals >= 3) & (sell_signals == 0)
+    buy = strong_buy | ((buy_signals >= 2) & (buy_signals > sell_signals))
+    strong_sell = ~buy & (sell_signals >= 3) & (buy_signals == 0)
+    sell = ~buy & (strong_sell | ((sell_signals >= 2) & (sell_signals > buy_signals)))
+
+    ready = ind['bars'] >= 50
+    result = pd.DataFrame({
+        'direction': np.where(ready, np.select([buy, sell], [1, -1], 0), 0),
+        'strong': ready & (strong_buy | strong_sell)
+    }, index=bars.index)
+    return result.join(rules)
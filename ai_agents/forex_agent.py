@@ -1,9 +1,29 @@
-import yfinance as yf
 import pandas as pd
 import numpy as np
-import talib
-from datetime import datetime, timedelta
+from datetime import datetime
 import pytz
+from core.bar_store import bar_store
+from core.lazy_module import LazyModule
+from core.resampler import resample, resample_buffer, align
+from core.indicator_engine import indicator_engine, EMA, RSI, MACD, STOCH
+from core.lookback import lookback, bars_needed
+
+# Only the vectorized backtest path needs TA-Lib
+talib = LazyModule('talib')
+
+# Indicators read by generate_signal, per timeframe
+INDICATORS_4H = [EMA(20), EMA(50), RSI(14)]
+INDICATORS_1H = [MACD(12, 26, 9), STOCH(5, 3, 3)]
+
+# Bars needed per timeframe: the indicators' warm-up or generate_signal's length check
+LOOKBACK = {
+    '4h': bars_needed(INDICATORS_4H, minimum=50),
+    '60m': bars_needed(INDICATORS_1H, minimum=24)
+}
+
+def required_series(symbol):
+    """Series read by generate_signal, as (yfinance symbol, interval, period)"""
+    return [(f"{symbol}=X", '60m', lookback.period('forex', LOOKBACK))]
 
 def generate_signal(symbol):
     """Generate trading signals for forex pairs using sentiment and technical analysis"""
@@ -28,31 +48,26 @@ def generate_signal(symbol):
                 current_session = session
                 break
         
-        # Get data - multiple timeframes
-        data_4h = yf.download(yf_symbol, period='30d', interval='60m')
-        data_1h = yf.download(yf_symbol, period='7d', interval='60m')
+        # Get data - 4H bars are built from the hourly series on FX session boundaries
+        data_1h = bar_store.get_buffer(yf_symbol, interval='60m', period=required_series(symbol)[0][2])
+        data_4h = resample_buffer(data_1h, '4h', session='forex')
         
         if len(data_4h) < 50 or len(data_1h) < 24:
             return "HOLD (Insufficient Data)"
         
-        # Calculate technical indicators (4H)
-        data_4h['EMA_20'] = talib.EMA(data_4h['Close'], timeperiod=20)
-        data_4h['EMA_50'] = talib.EMA(data_4h['Close'], timeperiod=50)
-        data_4h['RSI'] = talib.RSI(data_4h['Close'], timeperiod=14)
-        
-        # Calculate technical indicators (1H)
-        data_1h['MACD'], data_1h['MACD_signal'], _ = talib.MACD(data_1h['Close'], fastperiod=12, slowperiod=26, signalperiod=9)
-        data_1h['Stoch_%K'], data_1h['Stoch_%D'] = talib.STOCH(data_1h['High'], data_1h['Low'], data_1h['Close'])
+        # Calculate technical indicators (only bars new since the last cycle)
+        ind_4h = indicator_engine.update(yf_symbol, '4h', data_4h, INDICATORS_4H)
+        ind_1h = indicator_engine.update(yf_symbol, '60m', data_1h, INDICATORS_1H)
         
         # Get latest values
-        last_close = data_1h['Close'].iloc[-1]
-        ema20_4h = data_4h['EMA_20'].iloc[-1]
-        ema50_4h = data_4h['EMA_50'].iloc[-1]
-        rsi_4h = data_4h['RSI'].iloc[-1]
-        macd_1h = data_1h['MACD'].iloc[-1]
-        macd_signal_1h = data_1h['MACD_signal'].iloc[-1]
-        stoch_k_1h = data_1h['Stoch_%K'].iloc[-1]
-        stoch_d_1h = data_1h['Stoch_%D'].iloc[-1]
+        last_close = float(data_1h.close[-1])
+        ema20_4h = ind_4h['EMA_20'][-1]
+        ema50_4h = ind_4h['EMA_50'][-1]
+        rsi_4h = ind_4h['RSI'][-1]
+        macd_1h = ind_1h['MACD'][-1]
+        macd_signal_1h = ind_1h['MACD_signal'][-1]
+        stoch_k_1h = ind_1h['Stoch_%K'][-1]
+        stoch_d_1h = ind_1h['Stoch_%D'][-1]
         
         # Trend analysis
         trend = "BULLISH" if ema20_4h > ema50_4h else "BEARISH"
@@ -75,15 +90,15 @@ def generate_signal(symbol):
             sell_signals += 1
             
         # MACD crossover
-        if macd_1h > macd_signal_1h and data_1h['MACD'].iloc[-2] < data_1h['MACD_signal'].iloc[-2]:
+        if macd_1h > macd_signal_1h and ind_1h['MACD'][-2] < ind_1h['MACD_signal'][-2]:
             buy_signals += 1
-        elif macd_1h < macd_signal_1h and data_1h['MACD'].iloc[-2] > data_1h['MACD_signal'].iloc[-2]:
+        elif macd_1h < macd_signal_1h and ind_1h['MACD'][-2] > ind_1h['MACD_signal'][-2]:
             sell_signals += 1
             
         # Stochastic crossover
-        if stoch_k_1h > stoch_d_1h and data_1h['Stoch_%K'].iloc[-2] < data_1h['Stoch_%D'].iloc[-2]:
+        if stoch_k_1h > stoch_d_1h and ind_1h['Stoch_%K'][-2] < ind_1h['Stoch_%D'][-2]:
             buy_signals += 1
-        elif stoch_k_1h < stoch_d_1h and data_1h['Stoch_%K'].iloc[-2] > data_1h['Stoch_%D'].iloc[-2]:
+        elif stoch_k_1h < stoch_d_1h and ind_1h['Stoch_%K'][-2] > ind_1h['Stoch_%D'][-2]:
             sell_signals += 1
         
         # Session strength
@@ -110,3 +125,68 @@ def generate_signal(symbol):
             
     except Exception as e:
         return f"HOLD (Error: {str(e)})"
+
+def signal_series(bars, interval, symbol):
+    """
+    Vectorized generate_signal over a whole history, for backtesting
+
+    Indicators come from the last closed 4H and 1H bars at each base bar.
+
+    Args:
+        bars (pd.DataFrame): OHLCV bars at 60m or finer, UTC index, oldest first
+        interval (str): Interval of `bars`
+        symbol (str): Currency pair
+
+    Returns:
+        pd.DataFrame: direction (1 buy, -1 sell, 0 hold), strong, and the signed
+            votes of each rule, indexed like `bars`
+    """
+    data_1h = resample(bars, '60m', session='forex')
+    data_4h = resample(bars, '4h', session='forex')
+
+    close_4h = data_4h['Close'].to_numpy(dtype=float)
+    ind_4h = pd.DataFrame({
+        'EMA_20': talib.EMA(close_4h, timeperiod=20),
+        'EMA_50': talib.EMA(close_4h, timeperiod=50),
+        'RSI': talib.RSI(close_4h, timeperiod=14),
+        'bars_4h': np.arange(1, len(data_4h) + 1)
+    }, index=data_4h.index)
+
+    high, low, close = (data_1h[column].to_numpy(dtype=float) for column in ('High', 'Low', 'Close'))
+    macd, macd_signal, _ = talib.MACD(close, fastperiod=12, slowperiod=26, signalperiod=9)
+    stoch_k, stoch_d = talib.STOCH(high, low, close)
+    index_1h = data_1h.index
+    ind_1h = pd.DataFrame({
+        'macd_cross': _crossovers(pd.Series(macd, index=index_1h), pd.Series(macd_signal, index=index_1h)),
+        'stoch_cross': _crossovers(pd.Series(stoch_k, index=index_1h), pd.Series(stoch_d, index=index_1h)),
+        'bars_1h': np.arange(1, len(data_1h) + 1)
+    }, index=index_1h)
+
+    ind = align(ind_4h, '4h', bars.index, interval).join(align(ind_1h, '60m', bars.index, interval))
+
+    # Same votes as generate_signal
+    rules = pd.DataFrame(index=bars.index)
+    rules['trend'] = np.where(ind['EMA_20'] > ind['EMA_50'], 1, -1)
+    rules['rsi'] = np.select([ind['RSI'] < 40, ind['RSI'] > 70], [1, -1], 0)
+    rules['macd_cross'] = ind['macd_cross'].fillna(0).astype(int)
+    rules['stoch_cross'] = ind['stoch_cross'].fillna(0).astype(int)
+
+    buy_signals = rules.clip(lower=0).sum(axis=1)
+    sell_signals = (-rules).clip(lower=0).sum(axis=1)
+    buy = buy_signals >= 3
+    sell = ~buy & (sell_signals >= 3)
+
+    ready = (ind['bars_4h'] >= 50) & (ind['bars_1h'] >= 24)
+    result = pd.DataFrame({
+        'direction': np.where(ready, np.select([buy, sell], [1, -1], 0), 0),
+        'strong': ready & (((buy_signals >= 4) & buy) | ((sell_signals >= 4) & sell))
+    }, index=bars.index)
+    return result.join(rules)
+
+def _crossovers(fast, slow):
+    """+1 where `fast` crosses above `slow` on this bar, -1 where it crosses below"""
+    fast_prev, slow_prev = fast.shift(), slow.shift()
+    return pd.Series(np.select([
+        (fast > slow) & (fast_prev < slow_prev),
+        (fast < slow) & (fast_prev > slow_prev)
+    ], [1, -1], 0), index=fast.index)
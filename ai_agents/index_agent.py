@@ -1,38 +1,52 @@
-import yfinance as yf
 import pandas as pd
 import numpy as np
-import talib
-from datetime import datetime, timedelta
+from core.bar_store import bar_store
+from core.lazy_module import LazyModule
+from core.resampler import resample, resample_buffer, align
+from core.indicator_engine import indicator_engine, SMA, RSI, MACD, STOCH
+from core.lookback import lookback, bars_needed
+
+# Only the vectorized backtest path needs TA-Lib
+talib = LazyModule('talib')
+
+# Indicators read by generate_signal, per interval
+INDICATORS_DAILY = [SMA(100), SMA(200), RSI(14)]
+INDICATORS_4H = [MACD(12, 26, 9), STOCH(5, 3, 3)]
+
+# Bars needed per timeframe: the indicators' warm-up or generate_signal's length check
+LOOKBACK = {
+    '1d': bars_needed(INDICATORS_DAILY, minimum=200),
+    '4h': bars_needed(INDICATORS_4H, minimum=100)
+}
+
+def required_series(symbol):
+    """Series read by generate_signal, as (yfinance symbol, interval, period)"""
+    return [(symbol, '60m', lookback.period('index', LOOKBACK))]
 
 def generate_signal(symbol):
     """Generate trading signals for market indices using macro and technical analysis"""
     try:
-        # Get data - multiple timeframes
-        end_date = datetime.now()
-        data_daily = yf.download(symbol, start=end_date - timedelta(days=365), end=end_date)
-        data_4h = yf.download(symbol, period='60d', interval='60m')
+        # Get data - daily and 4H bars are built from the hourly series on session boundaries
+        data_hourly = bar_store.get_buffer(symbol, interval='60m', period=required_series(symbol)[0][2])
+        data_daily = resample_buffer(data_hourly, '1d', session='index')
+        data_4h = resample_buffer(data_hourly, '4h', session='index')
         
         if len(data_daily) < 200 or len(data_4h) < 100:
             return "HOLD (Insufficient Data)"
         
-        # Calculate technical indicators (Daily)
-        data_daily['SMA_100'] = talib.SMA(data_daily['Close'], timeperiod=100)
-        data_daily['SMA_200'] = talib.SMA(data_daily['Close'], timeperiod=200)
-        data_daily['RSI'] = talib.RSI(data_daily['Close'], timeperiod=14)
-        
-        # Calculate technical indicators (4H)
-        data_4h['MACD'], data_4h['MACD_signal'], _ = talib.MACD(data_4h['Close'], fastperiod=12, slowperiod=26, signalperiod=9)
-        data_4h['Stoch_%K'], data_4h['Stoch_%D'] = talib.STOCH(data_4h['High'], data_4h['Low'], data_4h['Close'])
+        # Calculate technical indicators (only bars new since the last cycle)
+        daily = indicator_engine.update(symbol, '1d', data_daily, INDICATORS_DAILY)
+        ind_4h = indicator_engine.update(symbol, '4h', data_4h, INDICATORS_4H)
         
         # Get latest values
-        last_close = data_4h['Close'].iloc[-1]
-        sma100 = data_daily['SMA_100'].iloc[-1]
-        sma200 = data_daily['SMA_200'].iloc[-1]
-        rsi = data_daily['RSI'].iloc[-1]
-        macd = data_4h['MACD'].iloc[-1]
-        macd_signal = data_4h['MACD_signal'].iloc[-1]
-        stoch_k = data_4h['Stoch_%K'].iloc[-1]
-        stoch_d = data_4h['Stoch_%D'].iloc[-1]
+        last_close = float(data_4h.close[-1])
+        sma100 = daily['SMA_100'][-1]
+        sma200 = daily['SMA_200'][-1]
+        rsi = daily['RSI'][-1]
+        macd = ind_4h['MACD'][-1]
+        macd_signal = ind_4h['MACD_signal'][-1]
+        stoch_k = ind_4h['Stoch_%K'][-1]
+        stoch_d = ind_4h['Stoch_%D'][-1]
         
         # Trend analysis
         major_trend = "BULL" if last_close > sma200 else "BEAR"
@@ -52,15 +66,15 @@ def generate_signal(symbol):
             sell_signals += 1
             
         # MACD crossover
-        if macd > macd_signal and data_4h['MACD'].iloc[-2] < data_4h['MACD_signal'].iloc[-2]:
+        if macd > macd_signal and ind_4h['MACD'][-2] < ind_4h['MACD_signal'][-2]:
             buy_signals += 1
-        elif macd < macd_signal and data_4h['MACD'].iloc[-2] > data_4h['MACD_signal'].iloc[-2]:
+        elif macd < macd_signal and ind_4h['MACD'][-2] > ind_4h['MACD_signal'][-2]:
             sell_signals += 1
             
         # Stochastic crossover
-        if stoch_k > stoch_d and data_4h['Stoch_%K'].iloc[-2] < data_4h['Stoch_%D'].iloc[-2]:
+        if stoch_k > stoch_d and ind_4h['Stoch_%K'][-2] < ind_4h['Stoch_%D'][-2]:
             buy_signals += 1
-        elif stoch_k < stoch_d and data_4h['Stoch_%K'].iloc[-2] > data_4h['Stoch_%D'].iloc[-2]:
+        elif stoch_k < stoch_d and ind_4h['Stoch_%K'][-2] > ind_4h['Stoch_%D'][-2]:
             sell_signals += 1
             
         # RSI analysis
@@ -87,3 +101,70 @@ def generate_signal(symbol):
                 
     except Exception as e:
         return f"HOLD (Error: {str(e)})"
+
+def signal_series(bars, interval, symbol):
+    """
+    Vectorized generate_signal over a whole history, for backtesting
+
+    Indicators come from the last closed daily and 4H bars at each base bar;
+    prices are compared using the base bar's close.
+
+    Args:
+        bars (pd.DataFrame): OHLCV bars at 60m or finer, UTC index, oldest first
+        interval (str): Interval of `bars`
+        symbol (str): Index symbol
+
+    Returns:
+        pd.DataFrame: direction (1 buy, -1 sell, 0 hold), strong, and the signed
+            votes of each rule, indexed like `bars`
+    """
+    data_daily = resample(bars, '1d', session='index')
+    data_4h = resample(bars, '4h', session='index')
+
+    close_daily = data_daily['Close'].to_numpy(dtype=float)
+    daily = pd.DataFrame({
+        'SMA_200': talib.SMA(close_daily, timeperiod=200),
+        'RSI': talib.RSI(close_daily, timeperiod=14),
+        'bars_daily': np.arange(1, len(data_daily) + 1)
+    }, index=data_daily.index)
+
+    high, low, close = (data_4h[column].to_numpy(dtype=float) for column in ('High', 'Low', 'Close'))
+    macd, macd_signal, _ = talib.MACD(close, fastperiod=12, slowperiod=26, signalperiod=9)
+    stoch_k, stoch_d = talib.STOCH(high, low, close)
+    index_4h = data_4h.index
+    ind_4h = pd.DataFrame({
+        'macd_cross': _crossovers(pd.Series(macd, index=index_4h), pd.Series(macd_signal, index=index_4h)),
+        'stoch_cross': _crossovers(pd.Series(stoch_k, index=index_4h), pd.Series(stoch_d, index=index_4h)),
+        'bars_4h': np.arange(1, len(data_4h) + 1)
+    }, index=index_4h)
+
+    ind = align(daily, '1d', bars.index, interval).join(align(ind_4h, '4h', bars.index, interval))
+    bull = bars['Close'].to_numpy(dtype=float) > ind['SMA_200'].to_numpy()
+
+    # Same votes as generate_signal
+    rules = pd.DataFrame(index=bars.index)
+    rules['major_trend'] = np.where(bull, 1, -1)
+    rules['macd_cross'] = ind['macd_cross'].fillna(0).astype(int)
+    rules['stoch_cross'] = ind['stoch_cross'].fillna(0).astype(int)
+    rules['rsi'] = np.select([ind['RSI'] < 40, ind['RSI'] > 70], [1, -1], 0)
+
+    # Only trade with the major trend
+    buy_signals = rules.clip(lower=0).sum(axis=1)
+    sell_signals = (-rules).clip(lower=0).sum(axis=1)
+    buy = bull & (buy_signals >= 2)
+    sell = ~bull & (sell_signals >= 2)
+
+    ready = (ind['bars_daily'] >= 200) & (ind['bars_4h'] >= 100)
+    result = pd.DataFrame({
+        'direction': np.where(ready, np.select([buy, sell], [1, -1], 0), 0),
+        'strong': ready & ((bull & (buy_signals >= 3)) | (~bull & (sell_signals >= 3)))
+    }, index=bars.index)
+    return result.join(rules)
+
+def _crossovers(fast, slow):
+    """+1 where `fast` crosses above `slow` on this bar, -1 where it crosses below"""
+    fast_prev, slow_prev = fast.shift(), slow.shift()
+    return pd.Series(np.select([
+        (fast > slow) & (fast_prev < slow_prev),
+        (fast < slow) & (fast_prev > slow_prev)
+    ], [1, -1], 0), index=fast.index)
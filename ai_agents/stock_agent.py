@@ -1,38 +1,51 @@
-import yfinance as yf
 import pandas as pd
 import numpy as np
-import talib
-from datetime import datetime, timedelta
+from core.bar_store import bar_store
+from core.lazy_module import LazyModule
+from core.resampler import resample, resample_buffer, align
+from core.indicator_engine import indicator_engine, SMA, RSI, MACD, STOCH
+from core.lookback import lookback, bars_needed
+
+# Only the vectorized backtest path needs TA-Lib
+talib = LazyModule('talib')
+
+# Indicators read by generate_signal, per interval
+INDICATORS_DAILY = [SMA(50), SMA(200), RSI(14)]
+INDICATORS_HOURLY = [MACD(12, 26, 9), STOCH(5, 3, 3)]
+
+# Bars needed per timeframe: the indicators' warm-up or generate_signal's length check
+LOOKBACK = {
+    '1d': bars_needed(INDICATORS_DAILY, minimum=100),
+    '60m': bars_needed(INDICATORS_HOURLY, minimum=100)
+}
+
+def required_series(symbol):
+    """Series read by generate_signal, as (yfinance symbol, interval, period)"""
+    return [(symbol, '60m', lookback.period('stock', LOOKBACK))]
 
 def generate_signal(symbol):
     """Generate trading signals for stocks using fundamental and technical analysis"""
     try:
-        # Get data - different timeframes for better analysis
-        end_date = datetime.now()
-        data_daily = yf.download(symbol, start=end_date - timedelta(days=365), end=end_date)
-        data_hourly = yf.download(symbol, period='60d', interval='60m')
+        # Get data - daily bars are built from the hourly series, one session each
+        data_hourly = bar_store.get_buffer(symbol, interval='60m', period=required_series(symbol)[0][2])
+        data_daily = resample_buffer(data_hourly, '1d', session='stock')
         
         if len(data_daily) < 100 or len(data_hourly) < 100:
             return "HOLD (Insufficient Data)"
         
-        # Calculate technical indicators (Daily)
-        data_daily['SMA_50'] = talib.SMA(data_daily['Close'], timeperiod=50)
-        data_daily['SMA_200'] = talib.SMA(data_daily['Close'], timeperiod=200)
-        data_daily['RSI'] = talib.RSI(data_daily['Close'], timeperiod=14)
-        
-        # Calculate technical indicators (Hourly)
-        data_hourly['MACD'], data_hourly['MACD_signal'], _ = talib.MACD(data_hourly['Close'], fastperiod=12, slowperiod=26, signalperiod=9)
-        data_hourly['Stoch_%K'], data_hourly['Stoch_%D'] = talib.STOCH(data_hourly['High'], data_hourly['Low'], data_hourly['Close'])
+        # Calculate technical indicators (only bars new since the last cycle)
+        daily = indicator_engine.update(symbol, '1d', data_daily, INDICATORS_DAILY)
+        hourly = indicator_engine.update(symbol, '60m', data_hourly, INDICATORS_HOURLY)
         
         # Get latest values
-        last_close = data_hourly['Close'].iloc[-1]
-        sma50 = data_daily['SMA_50'].iloc[-1]
-        sma200 = data_daily['SMA_200'].iloc[-1]
-        last_rsi = data_daily['RSI'].iloc[-1]
-        last_macd = data_hourly['MACD'].iloc[-1]
-        last_macd_signal = data_hourly['MACD_signal'].iloc[-1]
-        last_stoch_k = data_hourly['Stoch_%K'].iloc[-1]
-        last_stoch_d = data_hourly['Stoch_%D'].iloc[-1]
+        last_close = float(data_hourly.close[-1])
+        sma50 = daily['SMA_50'][-1]
+        sma200 = daily['SMA_200'][-1]
+        last_rsi = daily['RSI'][-1]
+        last_macd = hourly['MACD'][-1]
+        last_macd_signal = hourly['MACD_signal'][-1]
+        last_stoch_k = hourly['Stoch_%K'][-1]
+        last_stoch_d = hourly['Stoch_%D'][-1]
         
         # Sentiment analysis (simulated)
         trend_strength = "BULLISH" if sma50 > sma200 else "BEARISH"
@@ -42,9 +55,9 @@ def generate_signal(symbol):
         sell_signals = 0
         
         # Golden/Death Cross
-        if data_daily['SMA_50'].iloc[-1] > data_daily['SMA_50'].iloc[-5] and data_daily['SMA_50'].iloc[-1] > data_daily['SMA_200'].iloc[-1]:
+        if daily['SMA_50'][-1] > daily['SMA_50'][-5] and daily['SMA_50'][-1] > daily['SMA_200'][-1]:
             buy_signals += 2
-        elif data_daily['SMA_50'].iloc[-1] < data_daily['SMA_50'].iloc[-5] and data_daily['SMA_50'].iloc[-1] < data_daily['SMA_200'].iloc[-1]:
+        elif daily['SMA_50'][-1] < daily['SMA_50'][-5] and daily['SMA_50'][-1] < daily['SMA_200'][-1]:
             sell_signals += 2
             
         # RSI analysis
@@ -54,20 +67,20 @@ def generate_signal(symbol):
             sell_signals += 1
             
         # MACD crossover
-        if last_macd > last_macd_signal and data_hourly['MACD'].iloc[-2] < data_hourly['MACD_signal'].iloc[-2]:
+        if last_macd > last_macd_signal and hourly['MACD'][-2] < hourly['MACD_signal'][-2]:
             buy_signals += 1
-        elif last_macd < last_macd_signal and data_hourly['MACD'].iloc[-2] > data_hourly['MACD_signal'].iloc[-2]:
+        elif last_macd < last_macd_signal and hourly['MACD'][-2] > hourly['MACD_signal'][-2]:
             sell_signals += 1
             
         # Stochastic crossover
-        if last_stoch_k > last_stoch_d and data_hourly['Stoch_%K'].iloc[-2] < data_hourly['Stoch_%D'].iloc[-2]:
+        if last_stoch_k > last_stoch_d and hourly['Stoch_%K'][-2] < hourly['Stoch_%D'][-2]:
             buy_signals += 1
-        elif last_stoch_k < last_stoch_d and data_hourly['Stoch_%K'].iloc[-2] > data_hourly['Stoch_%D'].iloc[-2]:
+        elif last_stoch_k < last_stoch_d and hourly['Stoch_%K'][-2] > hourly['Stoch_%D'][-2]:
             sell_signals += 1
         
         # Volume analysis
-        volume_avg = data_daily['Volume'].mean()
-        last_volume = data_daily['Volume'].iloc[-1]
+        volume_avg = data_daily.volume.mean(dtype=float)
+        last_volume = float(data_daily.volume[-1])
         volume_conf = " (High Volume)" if last_volume > volume_avg * 1.5 else ""
         
         # Generate final signal
@@ -84,3 +97,74 @@ def generate_signal(symbol):
             
     except Exception as e:
         return f"HOLD (Error: {str(e)})"
+
+def signal_series(bars, interval, symbol):
+    """
+    Vectorized generate_signal over a whole history, for backtesting
+
+    Indicators come from the last closed daily and hourly bars at each base bar.
+
+    Args:
+        bars (pd.DataFrame): OHLCV bars at 60m or finer, UTC index, oldest first
+        interval (str): Interval of `bars`
+        symbol (str): Stock symbol
+
+    Returns:
+        pd.DataFrame: direction (1 buy, -1 sell, 0 hold), strong, and the signed
+            votes of each rule, indexed like `bars`
+    """
+    data_hourly = resample(bars, '60m', session='stock')
+    data_daily = resample(bars, '1d', session='stock')
+
+    close_daily = data_daily['Close'].to_numpy(dtype=float)
+    sma50 = pd.Series(talib.SMA(close_daily, timeperiod=50), index=data_daily.index)
+    sma200 = talib.SMA(close_daily, timeperiod=200)
+    daily = pd.DataFrame({
+        'golden_cross': np.select([
+            (sma50 > sma50.shift(4)) & (sma50 > sma200),
+            (sma50 < sma50.shift(4)) & (sma50 < sma200)
+        ], [2, -2], 0),
+        'RSI': talib.RSI(close_daily, timeperiod=14),
+        'bars_daily': np.arange(1, len(data_daily) + 1)
+    }, index=data_daily.index)
+
+    high, low, close = (data_hourly[column].to_numpy(dtype=float) for column in ('High', 'Low', 'Close'))
+    macd, macd_signal, _ = talib.MACD(close, fastperiod=12, slowperiod=26, signalperiod=9)
+    stoch_k, stoch_d = talib.STOCH(high, low, close)
+    index_hourly = data_hourly.index
+    hourly = pd.DataFrame({
+        'macd_cross': _crossovers(pd.Series(macd, index=index_hourly), pd.Series(macd_signal, index=index_hourly)),
+        'stoch_cross': _crossovers(pd.Series(stoch_k, index=index_hourly), pd.Series(stoch_d, index=index_hourly)),
+        'bars_hourly': np.arange(1, len(data_hourly) + 1)
+    }, index=index_hourly)
+
+    ind = align(daily, '1d', bars.index, interval).join(align(hourly, '60m', bars.index, interval))
+
+    # Same votes as generate_signal
+    rules = pd.DataFrame(index=bars.index)
+    rules['golden_cross'] = ind['golden_cross'].fillna(0).astype(int)
+    rules['rsi'] = np.select([ind['RSI'] < 40, ind['RSI'] > 70], [1, -1], 0)
+    rules['macd_cross'] = ind['macd_cross'].fillna(0).astype(int)
+    rules['stoch_cross'] = ind['stoch_cross'].fillna(0).astype(int)
+
+    buy_signals = rules.clip(lower=0).sum(axis=1)
+    sell_signals = (-rules).clip(lower=0).sum(axis=1)
+    strong_buy = buy_signals >= 4
+    buy = strong_buy | ((buy_signals >= 2) & (buy_signals > sell_signals))
+    strong_sell = ~buy & (sell_signals >= 4)
+    sell = ~buy & (strong_sell | ((sell_signals >= 2) & (sell_signals > buy_signals)))
+
+    ready = (ind['bars_daily'] >= 100) & (ind['bars_hourly'] >= 100)
+    result = pd.DataFrame({
+        'direction': np.where(ready, np.select([buy, sell], [1, -1], 0), 0),
+        'strong': ready & (strong_buy | strong_sell)
+    }, index=bars.index)
+    return result.join(rules)
+
+def _crossovers(fast, slow):
+    """+1 where `fast` crosses above `slow` on this bar, -1 where it crosses below"""
+    fast_prev, slow_prev = fast.shift(), slow.shift()
+    return pd.Series(np.select([
+        (fast > slow) & (fast_prev < slow_prev),
+        (fast < slow) & (fast_prev > slow_prev)
+    ], [1, -1], 0), index=fast.index)
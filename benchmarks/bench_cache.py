@@ -0,0 +1,130 @@
+"""
+Compare the CSV and columnar bar cache backends.
+
+For 1, 6 and 24 months of 1m and 15m bars this writes both formats, then loads
+each one in a fresh interpreter and reports load time, time to scan the close
+column and the resident memory added by the load.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_cache [--months 1 6 24] [--intervals 1m 15m] [--output results.json]
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+from core.bar_cache import CsvBarCache, ColumnarBarCache
+
+BACKENDS = {
+    'csv': CsvBarCache,
+    'columnar': ColumnarBarCache
+}
+
+INTERVAL_MINUTES = {
+    '1m': 1,
+    '15m': 15
+}
+
+
+def synthetic_bars(months, interval, seed=0):
+    """Random-walk OHLCV bars covering `months` of continuous trading"""
+    minutes = INTERVAL_MINUTES[interval]
+    periods = months * 30 * 24 * 60 // minutes
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.0005, periods)))
+    spread = np.abs(rng.normal(0, 0.0003, periods)) * close
+    index = pd.date_range(end='2024-01-01', periods=periods, freq=f'{minutes}min', tz='UTC', name='Date')
+    return pd.DataFrame({
+        'open': np.roll(close, 1),
+        'high': close + spread,
+        'low': close - spread,
+        'close': close,
+        'volume': rng.integers(100, 10000, periods).astype(float)
+    }, index=index)
+
+
+def current_rss():
+    """Resident set size of this process in bytes (Linux), else peak RSS"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def measure_load(backend, cache_dir, key):
+    """Load one series and report timings; runs in a child interpreter"""
+    cache = BACKENDS[backend](cache_dir)
+    rss_before = current_rss()
+
+    start = time.perf_counter()
+    data = cache.load(key)
+    load_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    data['close'].mean()
+    scan_time = time.perf_counter() - start
+
+    return {
+        'rows': len(data),
+        'load_s': load_time,
+        'scan_s': scan_time,
+        'rss_mb': (current_rss() - rss_before) / 2 ** 20
+    }
+
+
+def run_case(backend, cache_dir, key):
+    output = subprocess.run(
+        [sys.executable, '-m', 'benchmarks.bench_cache', '--load', backend, cache_dir, key],
+        check=True, capture_output=True, text=True
+    ).stdout
+    return json.loads(output)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--months', type=int, nargs='+', default=[1, 6, 24])
+    parser.add_argument('--intervals', nargs='+', default=['1m', '15m'], choices=sorted(INTERVAL_MINUTES))
+    parser.add_argument('--output', help="Write results as JSON to this file")
+    parser.add_argument('--load', nargs=3, metavar=('BACKEND', 'CACHE_DIR', 'KEY'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.load:
+        print(json.dumps(measure_load(*args.load)))
+        return
+
+    cache_dir = tempfile.mkdtemp(prefix='bench_cache_')
+    results = []
+    try:
+        for interval in args.intervals:
+            for months in args.months:
+                data = synthetic_bars(months, interval)
+                key = f"BENCH_{months}mo_{interval}"
+                for backend, cache_class in BACKENDS.items():
+                    start = time.perf_counter()
+                    cache_class(cache_dir).store(key, data)
+                    store_time = time.perf_counter() - start
+
+                    result = run_case(backend, cache_dir, key)
+                    result.update({'backend': backend, 'interval': interval, 'months': months,
+                                   'store_s': store_time})
+                    results.append(result)
+                    print(f"{interval:>4} {months:>3}mo {backend:>9}: {result['rows']:>8} rows  "
+                          f"store {store_time:8.3f}s  load {result['load_s']:8.4f}s  "
+                          f"scan {result['scan_s']:8.4f}s  rss +{result['rss_mb']:7.1f} MB")
+    finally:
+        shutil.rmtree(cache_dir)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""
+Provider request benchmark: bare requests.get versus the pooled HttpClient.
+
+Serves large responses from a local replay server (Alpha Vantage
+TIME_SERIES_INTRADAY outputsize=full and Twelve Data time_series with 5000
+bars) and fetches each one --requests times two ways:
+
+    bare    requests.get per call (a new connection each time, no timeout) and
+            the pandas parse DataFetcher used before: DataFrame.from_dict /
+            DataFrame(values) then apply(pd.to_numeric)
+    pooled  HttpClient (keep-alive, gzip) and provider_json's NumPy parse
+
+and reports the median wall time per request, split into transfer and
+parse, and the CPU time per request. --latency adds a server-side delay
+to every request, as a stand-in for a distant provider. The replay server
+runs in a child process, so the CPU column is the client's alone.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_http [--requests 20] [--latency 0] [--output results.json]
+"""
+import argparse
+import json
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import pandas as pd
+import requests
+from core.http_client import HttpClient
+from core.provider_json import parse_alpha_vantage, parse_twelvedata
+
+ALPHA_VANTAGE_COLUMNS = {'1. open': 'open', '2. high': 'high', '3. low': 'low', '4. close': 'close',
+                         '5. volume': 'volume'}
+
+
+def pandas_alpha_vantage(data):
+    """The Alpha Vantage parse DataFetcher used before provider_json"""
+    df = pd.DataFrame.from_dict(data['Time Series (5min)'], orient='index')
+    df.index = pd.to_datetime(df.index).tz_localize(data['Meta Data']['6. Time Zone'])
+    return df.rename(columns=ALPHA_VANTAGE_COLUMNS).apply(pd.to_numeric).sort_index()
+
+
+def pandas_twelvedata(data):
+    """The Twelve Data parse DataFetcher used before provider_json"""
+    df = pd.DataFrame(data['values'])
+    df['datetime'] = pd.to_datetime(df['datetime'])
+    return df.set_index('datetime').apply(pd.to_numeric).sort_index()
+
+
+def numpy_alpha_vantage(data):
+    return parse_alpha_vantage(data['Time Series (5min)'], data['Meta Data']['6. Time Zone'])
+
+
+def numpy_twelvedata(data):
+    return parse_twelvedata(data['values'])
+
+
+CASES = {
+    'alpha_vantage': ('/query', {'function': 'TIME_SERIES_INTRADAY', 'symbol': 'IBM', 'interval': '5min',
+                                 'outputsize': 'full'}, pandas_alpha_vantage, numpy_alpha_vantage),
+    'twelvedata': ('/time_series', {'symbol': 'EUR/USD', 'interval': '5min', 'outputsize': '5000'},
+                   pandas_twelvedata, numpy_twelvedata)
+}
+
+
+def start_replay_server(latency):
+    """Replay server in a child process; returns (process, base URL)"""
+    with socket.socket() as probe:
+        probe.bind(('127.0.0.1', 0))
+        port = probe.getsockname()[1]
+    process = subprocess.Popen([sys.executable, '-m', 'benchmarks.replay_server', '--port', str(port),
+                                '--latency', str(latency)], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + 30
+    while True:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+            return process, f"http://127.0.0.1:{port}"
+        except OSError:
+            if time.monotonic() > deadline or process.poll() is not None:
+                process.kill()
+                raise RuntimeError("Replay server did not start")
+            time.sleep(0.1)
+
+
+def run_case(get, parse, url, params, count):
+    """Median transfer and parse seconds and mean CPU seconds per request"""
+    transfers, parses = [], []
+    cpu_start = time.process_time()
+    for _ in range(count):
+        start = time.perf_counter()
+        response = get(url, params)
+        response.raise_for_status()
+        data = response.json()
+        middle = time.perf_counter()
+        rows = len(parse(data))
+        transfers.append(middle - start)
+        parses.append(time.perf_counter() - middle)
+    return {
+        'rows': rows,
+        'bytes': int(response.headers.get('Content-Length', len(response.content))),
+        'transfer_s': statistics.median(transfers),
+        'parse_s': statistics.median(parses),
+        'cpu_s': (time.process_time() - cpu_start) / count
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=20, help="Requests per case and client")
+    parser.add_argument('--latency', type=float, default=0, help="Server-side delay per request in ms")
+    parser.add_argument('--output', help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    server, url = start_replay_server(args.latency)
+    client = HttpClient()
+    clients = {
+        'bare': lambda url, params: requests.get(url, params=params),
+        'pooled': client.get
+    }
+    results = []
+    try:
+        for provider, (path, params, pandas_parse, numpy_parse) in CASES.items():
+            for name, parse in (('bare', pandas_parse), ('pooled', numpy_parse)):
+                result = run_case(clients[name], parse, url + path, params, args.requests)
+                result.update({'provider': provider, 'client': name})
+                results.append(result)
+                print(f"{provider:>13} {name:>6}: {result['rows']:>6} bars {result['bytes'] / 1024:8.1f} KiB  "
+                      f"transfer {result['transfer_s'] * 1000:7.2f}ms  parse {result['parse_s'] * 1000:7.2f}ms  "
+                      f"cpu {result['cpu_s'] * 1000:7.2f}ms")
+    finally:
+        client.close()
+        server.terminate()
+        server.wait()
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
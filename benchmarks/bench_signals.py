@@ -0,0 +1,412 @@
+"""
+Offline benchmarks for the signal pipeline.
+
+Every provider call is answered from deterministic fixtures, so results only
+depend on the code and the machine:
+
+    agent       generate_signal latency per agent, cold (empty indicator
+                state) and warm (state already up to date)
+    cache       bar cache store and load time per agent series and backend
+    indicators  TA-Lib full recompute vs indicator engine warm-up and one-bar
+                update
+    cycle       SignalGenerator.generate_signals over N assets, cold (empty
+                bar store and indicator state) and warm (next cycle); with
+                --processes above 1 the agents run in that many shard workers
+
+Fixtures are synthetic random walks shaped like each market's trading hours,
+or recorded series from a DataFetcher cache directory (--recorded).
+
+Usage (from the repository root):
+    python -m benchmarks.bench_signals [--assets 10 100 1000] [--only agent cycle]
+        [--recorded data_cache] [--output results.json] [--compare baseline.json]
+        [--processes 4]
+"""
+import argparse
+import configparser
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import zlib
+from unittest.mock import patch
+import numpy as np
+import pandas as pd
+from core.lazy_module import LazyModule
+from core import data_fetcher as data_fetcher_module
+from core.bar_cache import get_bar_cache
+from core.bar_store import bar_store, period_to_days
+from core.data_fetcher import DataFetcher
+from core.backtester import cached_keys, load_bars
+from core.indicator_engine import indicator_engine, IndicatorEngine, SMA, EMA, RSI, MACD, BBANDS, ATR, ADX, STOCH
+from core.signal_generator import SignalGenerator, AGENTS, agent_for
+
+BENCHMARKS = ['agent', 'cache', 'indicators', 'cycle']
+
+# Only the indicator benchmark uses TA-Lib; bench_startup imports this module for its fixtures
+talib = LazyModule('talib')
+
+# Fixtures end here so every run sees identical bars
+FIXTURE_END = pd.Timestamp('2024-06-03 20:00', tz='UTC')
+
+# Indicator set timed by the indicator benchmark
+INDICATORS = [RSI(14), MACD(12, 26, 9), BBANDS(20, 2.0), ATR(14), ADX(14), STOCH(5, 3, 3), EMA(50), SMA(200)]
+
+# Limits high enough that the rate limiter never waits
+UNLIMITED = {
+    'yfinance_per_minute': '1000000000',
+    'yfinance_burst': '1000000000',
+    'yfinance_concurrency': '1000'
+}
+
+
+def trading_hours(index, asset_type, intraday=True):
+    """Mask of the bars a market actually prints (24/7, weekdays, or the US cash session)"""
+    if asset_type == 'crypto':
+        return np.ones(len(index), dtype=bool)
+    weekday = index.weekday < 5
+    if intraday and asset_type in ('stock', 'index'):
+        return weekday & (index.hour >= 13) & (index.hour < 20)
+    return weekday
+
+
+def synthetic_bars(asset_type, interval, period, seed=0):
+    """Random-walk OHLCV bars covering `period`, only during the market's trading hours"""
+    minutes = {'1m': 1, '5m': 5, '15m': 15, '30m': 30, '60m': 60, '1h': 60, '1d': 1440}[interval]
+    periods = period_to_days(period) * 1440 // minutes
+    index = pd.date_range(end=FIXTURE_END, periods=periods, freq=f'{minutes}min', name='Date')
+    index = index[trading_hours(index, asset_type, intraday=minutes < 1440)]
+
+    rng = np.random.default_rng(seed)
+    count = len(index)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.002, count)))
+    spread = np.abs(rng.normal(0, 0.001, count)) * close
+    open_ = np.concatenate([close[:1], close[:-1]])
+    return pd.DataFrame({
+        'Close': close,
+        'High': np.maximum(open_, close) + spread,
+        'Low': np.minimum(open_, close) - spread,
+        'Open': open_,
+        'Volume': rng.integers(100, 10000, count).astype(float)
+    }, index=index)
+
+
+class Fixtures:
+    """
+    Bars served in place of yf.download
+
+    Each asset type's series is built once and shared by every benchmark asset
+    of that type; recorded series are used when the cache directory has one
+    for the same symbol and interval.
+    """
+
+    def __init__(self, recorded_dir=None):
+        self.recorded = {}
+        if recorded_dir:
+            for key in cached_keys(recorded_dir):
+                symbol, _, interval = key.rsplit('_', 2)
+                self.recorded.setdefault((symbol, interval), (recorded_dir, key))
+        self.symbols = {}
+        self._bars = {}
+        self._responses = {}
+
+    def register(self, provider_symbol, asset_type, base_symbol, interval, period):
+        """Serve `provider_symbol` with the fixture of its base symbol"""
+        key = (base_symbol, interval, period)
+        if key not in self._bars:
+            source = self.recorded.get((base_symbol, interval))
+            if source:
+                bars = load_bars(source[1], source[0])[['Open', 'High', 'Low', 'Close', 'Volume']]
+            else:
+                bars = synthetic_bars(asset_type, interval, period, seed=zlib.crc32(base_symbol.encode()))
+            self._bars[key] = bars
+        self.symbols[(provider_symbol, interval, period)] = key
+
+    def bars(self, symbol, interval, period):
+        return self._bars[self.symbols[(symbol, interval, period)]]
+
+    def prepare(self, groups):
+        """Build the multi-ticker responses for (interval, period) -> symbols ahead of timing"""
+        for (interval, period), symbols in groups.items():
+            self._response(symbols, interval, period)
+
+    def download(self, tickers, period='1mo', interval='1d', group_by='column', progress=True, **kwargs):
+        """Drop-in for yf.download"""
+        if isinstance(tickers, str):
+            return self.bars(tickers, interval, period).copy()
+        return self._response(tickers, interval, period)
+
+    def _response(self, symbols, interval, period):
+        key = (tuple(symbols), interval, period)
+        if key not in self._responses:
+            self._responses[key] = pd.concat(
+                {symbol: self.bars(symbol, interval, period) for symbol in symbols}, axis=1)
+        return self._responses[key]
+
+
+def benchmark_assets(count):
+    """`count` assets cycling through config/asset_list.json, each with a distinct symbol"""
+    with open('config/asset_list.json') as f:
+        base = [asset for asset in json.load(f) if asset['type'] in AGENTS]
+    assets = []
+    for i in range(count):
+        asset = dict(base[i % len(base)])
+        copy = i // len(base)
+        if copy:
+            asset['base_symbol'] = asset['symbol']
+            asset['symbol'] = f"{asset['symbol']}{copy}"
+            asset['name'] = f"{asset['name']} #{copy}"
+        assets.append(asset)
+    return assets
+
+
+def one_per_type():
+    """The first listed asset of each type"""
+    assets = {}
+    for asset in benchmark_assets(len(AGENTS) * 10):
+        assets.setdefault(asset['type'], asset)
+    return list(assets.values())
+
+
+def register_assets(fixtures, assets):
+    """Register every series the assets' agents read; returns the prefetch groups"""
+    groups = {}
+    for asset in assets:
+        agent = agent_for(asset['type'])
+        base = agent.required_series(asset.get('base_symbol', asset['symbol']))
+        for (symbol, interval, period), (base_symbol, _, _) in zip(agent.required_series(asset['symbol']), base):
+            fixtures.register(symbol, asset['type'], base_symbol, interval, period)
+            groups.setdefault((interval, period), []).append(symbol)
+    return groups
+
+
+def measure(func, repeat, setup=None):
+    """Run `func` `repeat` times (after `setup`, untimed) and summarize the durations"""
+    times = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return {'runs': repeat, 'median_s': statistics.median(times), 'min_s': min(times)}
+
+
+def bench_agents(fixtures, repeat):
+    results = []
+    for asset in one_per_type():
+        agent = agent_for(asset['type'])
+        register_assets(fixtures, [asset])
+        for symbol, interval, period in agent.required_series(asset['symbol']):
+            bar_store.put(symbol, interval, fixtures.bars(symbol, interval, period), period_to_days(period))
+
+        signal = lambda: agent.generate_signal(asset['symbol'])
+        results.append({'benchmark': 'agent', 'case': f"{asset['type']}_cold",
+                        **measure(signal, repeat, setup=indicator_engine.reset)})
+        signal()
+        results.append({'benchmark': 'agent', 'case': f"{asset['type']}_warm", **measure(signal, repeat * 5)})
+    bar_store.clear()
+    indicator_engine.reset()
+    return results
+
+
+def bench_cache(fixtures, repeat):
+    results = []
+    seen = set()
+    cache_dir = tempfile.mkdtemp(prefix='bench_signals_')
+    try:
+        for asset in one_per_type():
+            register_assets(fixtures, [asset])
+            symbol, interval, period = agent_for(asset['type']).required_series(asset['symbol'])[0]
+            if (interval, period) in seen:
+                continue
+            seen.add((interval, period))
+            data = fixtures.bars(symbol, interval, period).rename(columns=str.lower)
+            key = f"{symbol}_{period}_{interval}"
+            for backend in ('columnar', 'csv'):
+                case = f"{interval}_{period}_{backend}"
+                cache = get_bar_cache(backend, cache_dir)
+                results.append({'benchmark': 'cache', 'case': f"{case}_store", 'rows': len(data),
+                                **measure(lambda: cache.store(key, data), repeat)})
+                results.append({'benchmark': 'cache', 'case': f"{case}_load", 'rows': len(data),
+                                **measure(lambda: cache.load(key), repeat)})
+    finally:
+        shutil.rmtree(cache_dir)
+    return results
+
+
+def bench_indicators(repeat):
+    results = []
+    bars = synthetic_bars('forex', '60m', '365d')
+    high, low, close = (bars[column].to_numpy() for column in ('High', 'Low', 'Close'))
+
+    def full_talib():
+        talib.RSI(close, timeperiod=14)
+        talib.MACD(close, fastperiod=12, slowperiod=26, signalperiod=9)
+        talib.BBANDS(close, timeperiod=20)
+        talib.ATR(high, low, close, timeperiod=14)
+        talib.ADX(high, low, close, timeperiod=14)
+        talib.STOCH(high, low, close)
+        talib.EMA(close, timeperiod=50)
+        talib.SMA(close, timeperiod=200)
+
+    engine = IndicatorEngine()
+    results.append({'benchmark': 'indicators', 'case': 'talib_full', 'rows': len(bars),
+                    **measure(full_talib, repeat)})
+    results.append({'benchmark': 'indicators', 'case': 'engine_warmup', 'rows': len(bars),
+                    **measure(lambda: engine.update('BENCH', '60m', bars, INDICATORS), repeat,
+                              setup=engine.reset)})
+
+    def warm_all_but_last():
+        engine.reset()
+        engine.update('BENCH', '60m', bars.iloc[:-1], INDICATORS)
+
+    results.append({'benchmark': 'indicators', 'case': 'engine_one_bar', 'rows': len(bars),
+                    **measure(lambda: engine.update('BENCH', '60m', bars, INDICATORS), repeat,
+                              setup=warm_all_but_last)})
+    return results
+
+
+def bench_cycles(fixtures, sizes, repeat, workers, processes=1):
+    results = []
+    config = configparser.ConfigParser()
+    config['Settings'] = {'workers': str(workers), 'processes': str(processes)}
+    config['Providers'] = UNLIMITED
+    # Every asset is evaluated whatever the time of day the bench runs at
+    config['Schedule'] = {'market_hours': 'false'}
+    # Cold cycles start from an empty disk cache too
+    cache_dir = tempfile.mkdtemp(prefix='bench_signals_')
+    fetcher = DataFetcher()
+    fetcher.cache = get_bar_cache('columnar', cache_dir)
+    bar_store.use_fetcher(fetcher)
+    for size in sizes:
+        assets = benchmark_assets(size)
+        fixtures.prepare(register_assets(fixtures, assets))
+
+        config['Settings']['assets_per_cycle'] = str(size)
+        generator = SignalGenerator(config)
+        generator.assets = assets
+
+        def cold_start():
+            bar_store.clear()
+            shutil.rmtree(cache_dir)
+            os.makedirs(cache_dir)
+            indicator_engine.reset()
+            if generator._shards is not None:
+                generator._shards.reset()
+
+        if processes > 1:
+            # Worker start-up is paid once per run, not per cycle
+            generator.generate_signals()
+        cold = measure(generator.generate_signals, repeat, setup=cold_start)
+        warm = measure(generator.generate_signals, repeat)
+        generator.close()
+        for case, timing in (('cold', cold), ('warm', warm)):
+            results.append({'benchmark': 'cycle', 'case': case, 'assets': size, 'workers': workers,
+                            'processes': processes, 'assets_per_s': size / timing['median_s'], **timing})
+    bar_store.clear()
+    bar_store.use_fetcher(None)
+    shutil.rmtree(cache_dir)
+    indicator_engine.reset()
+    return results
+
+
+def environment():
+    """What the numbers were measured on"""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'],
+                                capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = ''
+    return {
+        'commit': commit,
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'machine': platform.machine(),
+        'cpus': os.cpu_count(),
+        'timestamp': pd.Timestamp.now(tz='UTC').isoformat()
+    }
+
+
+def result_key(result):
+    return (result['benchmark'], result['case'], result.get('assets'), result.get('processes', 1))
+
+
+def compare(results, baseline_path, tolerance):
+    """
+    Print the change against a saved run; returns the results that regressed
+
+    Fastest runs are compared, as they are the least affected by other load
+    on the machine.
+    """
+    with open(baseline_path) as f:
+        baseline = {result_key(result): result for result in json.load(f)['results']}
+
+    regressions = []
+    print(f"\nCompared with {baseline_path} (tolerance {tolerance:.0%}):")
+    for result in results:
+        previous = baseline.get(result_key(result))
+        if previous is None:
+            continue
+        ratio = result['min_s'] / previous['min_s']
+        flag = 'REGRESSION' if ratio > 1 + tolerance else ''
+        if flag:
+            regressions.append(result)
+        print(f"{format_name(result):<40} {previous['min_s'] * 1000:10.2f}ms -> "
+              f"{result['min_s'] * 1000:10.2f}ms  x{ratio:5.2f} {flag}")
+    return regressions
+
+
+def format_name(result):
+    name = f"{result['benchmark']}/{result['case']}"
+    if result.get('processes', 1) > 1:
+        name += f"/{result['processes']}p"
+    return f"{name}@{result['assets']}" if 'assets' in result else name
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--only', nargs='+', choices=BENCHMARKS, default=BENCHMARKS)
+    parser.add_argument('--assets', type=int, nargs='+', default=[10, 100, 1000])
+    parser.add_argument('--repeat', type=int, default=3, help="Timed runs per case (more for warm agent calls)")
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--processes', type=int, default=1, help="Shard worker processes for the cycle benchmark")
+    parser.add_argument('--recorded', help="DataFetcher cache directory to take recorded series from")
+    parser.add_argument('--output', help="Write results as JSON to this file")
+    parser.add_argument('--compare', help="Earlier --output file to compare against")
+    parser.add_argument('--tolerance', type=float, default=0.2, help="Slowdown reported as a regression")
+    args = parser.parse_args()
+
+    fixtures = Fixtures(args.recorded)
+    results = []
+    with patch.object(data_fetcher_module.yf, 'download', fixtures.download):
+        for name in args.only:
+            if name == 'agent':
+                cases = bench_agents(fixtures, args.repeat)
+            elif name == 'cache':
+                cases = bench_cache(fixtures, args.repeat)
+            elif name == 'indicators':
+                cases = bench_indicators(args.repeat)
+            else:
+                cases = bench_cycles(fixtures, args.assets, args.repeat, args.workers, args.processes)
+            for result in cases:
+                extra = f"  {result['assets_per_s']:9.1f} assets/s" if 'assets_per_s' in result else ''
+                print(f"{format_name(result):<40} median {result['median_s'] * 1000:10.2f}ms  "
+                      f"min {result['min_s'] * 1000:10.2f}ms{extra}")
+            results.extend(cases)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'environment': environment(), 'results': results}, f, indent=2)
+
+    if args.compare and compare(results, args.compare, args.tolerance):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+"""
+Cold-start benchmark: how long until the first signal cycle has run.
+
+Each run starts a fresh interpreter that imports the app the way main.py
+does, builds the SignalGenerator and evaluates every listed asset once with
+an empty bar store and indicator state. Provider calls are answered with
+synthetic bars; the time spent producing them is reported separately and
+left out of the totals, so the numbers measure the app rather than the
+network. Phases:
+
+    interpreter  process spawn until the first line runs
+    imports      importing main.py and everything it pulls in
+    setup        SignalGenerator construction and the schedule cadences
+    first_cycle  generate_signals() over the asset list, excluding provider time
+    total        spawn until the first cycle is done
+
+Usage (from the repository root):
+    python -m benchmarks.bench_startup [--repeat 5] [--target 1.0] [--output results.json]
+
+Exits with status 1 when the median total is over --target seconds.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PHASES = ['interpreter', 'imports', 'setup', 'first_cycle', 'total']
+
+# Modules whose import time matters; reported when a run ends up loading them
+HEAVY_MODULES = ['yfinance', 'talib', 'requests', 'telegram', 'pytz', 'ai_agents.forex_agent',
+                 'ai_agents.crypto_agent', 'ai_agents.stock_agent', 'ai_agents.commodity_agent',
+                 'ai_agents.index_agent', 'core.data_fetcher']
+
+CHILD = """
+import time, sys, json
+started = time.time()
+import main
+imported = time.time()
+
+import configparser, shutil, tempfile
+from core import data_fetcher as data_fetcher_module
+from core.bar_cache import get_bar_cache
+from core.bar_store import bar_store
+from core.signal_generator import SignalGenerator
+from benchmarks.bench_startup import ColdProvider, HEAVY_MODULES
+provider = ColdProvider()
+data_fetcher_module.yf = provider
+
+config = configparser.ConfigParser()
+config['Settings'] = {'workers': '4', 'assets_per_cycle': '1000'}
+config['Schedule'] = {'market_hours': 'false'}
+config['Providers'] = {'yfinance_per_minute': '1000000', 'yfinance_burst': '1000000'}
+setup_start = time.time()
+# An empty disk cache, so every series is downloaded
+cache_dir = tempfile.mkdtemp(prefix='bench_startup_')
+fetcher = data_fetcher_module.DataFetcher()
+fetcher.cache = get_bar_cache('columnar', cache_dir)
+bar_store.use_fetcher(fetcher)
+generator = SignalGenerator(config)
+generator.cadences()
+cycle_start = time.time()
+signals = generator.generate_signals()
+done = time.time()
+shutil.rmtree(cache_dir)
+
+print(json.dumps({
+    'started': started,
+    'imports': imported - started,
+    'setup': cycle_start - setup_start,
+    'first_cycle': done - cycle_start - provider.seconds,
+    'provider': provider.seconds,
+    'done': done - provider.seconds,
+    'signals': len(signals),
+    'loaded': [name for name in HEAVY_MODULES if name in sys.modules]
+}))
+"""
+
+
+class ColdProvider:
+    """yf.download stand-in that generates each requested series on the spot"""
+
+    def __init__(self):
+        self.seconds = 0.0
+
+    def download(self, tickers, period='1mo', interval='1d', group_by='column', progress=True, **kwargs):
+        start = time.perf_counter()
+        # Imported here so the child's import phase only measures the app
+        import pandas as pd
+        if isinstance(tickers, str):
+            data = self._bars(tickers, interval, period)
+        else:
+            data = pd.concat({symbol: self._bars(symbol, interval, period) for symbol in tickers}, axis=1)
+        self.seconds += time.perf_counter() - start
+        return data
+
+    def _bars(self, symbol, interval, period):
+        import zlib
+        from benchmarks.bench_signals import synthetic_bars
+        from core.resampler import session_for
+        return synthetic_bars(session_for(symbol), interval, period, seed=zlib.crc32(symbol.encode()))
+
+
+def run_once():
+    """One cold start; returns the phase timings in seconds"""
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    spawned = time.time()
+    output = subprocess.run([sys.executable, '-c', CHILD], cwd=ROOT, env=env,
+                            capture_output=True, text=True, check=True).stdout
+    child = json.loads(output.splitlines()[-1])
+    return {
+        'interpreter': child['started'] - spawned,
+        'imports': child['imports'],
+        'setup': child['setup'],
+        'first_cycle': child['first_cycle'],
+        'total': child['done'] - spawned,
+        'signals': child['signals'],
+        'loaded': child['loaded']
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=5, help="Cold starts to run")
+    parser.add_argument('--target', type=float, default=1.0, help="Seconds allowed to the end of the first cycle")
+    parser.add_argument('--output', help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    runs = [run_once() for _ in range(args.repeat)]
+    results = []
+    for phase in PHASES:
+        times = [run[phase] for run in runs]
+        results.append({'benchmark': 'startup', 'case': phase, 'runs': len(times),
+                        'median_s': statistics.median(times), 'min_s': min(times)})
+        print(f"startup/{phase:<12} median {results[-1]['median_s'] * 1000:8.1f}ms  "
+              f"min {results[-1]['min_s'] * 1000:8.1f}ms")
+    print(f"Signals in the first cycle: {runs[-1]['signals']}")
+    print(f"Modules loaded by then: {', '.join(runs[-1]['loaded']) or 'none of the heavy ones'}")
+
+    if args.output:
+        from benchmarks.bench_signals import environment
+        with open(args.output, 'w') as f:
+            json.dump({'environment': environment(), 'results': results}, f, indent=2)
+
+    median_total = results[-1]['median_s']
+    if median_total > args.target:
+        print(f"Median start to first cycle {median_total:.2f}s is over the {args.target:.2f}s target")
+        sys.exit(1)
+    print(f"Median start to first cycle {median_total:.2f}s is within the {args.target:.2f}s target")
+
+
+if __name__ == "__main__":
+    main()
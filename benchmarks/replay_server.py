@@ -0,0 +1,398 @@
+"""
+Local stand-in for the market data providers, replaying recorded bars.
+
+Serves the three endpoints DataFetcher talks to, with the same response
+shapes:
+
+    /query                      Alpha Vantage TIME_SERIES_INTRADAY / TIME_SERIES_DAILY
+    /time_series                Twelve Data time_series
+    /v8/finance/chart/<symbol>  Yahoo chart, as used by yfinance
+
+Bars come from a DataFetcher cache directory when it holds the symbol and
+interval, otherwise from a synthetic random walk. Latency, server errors and
+quota errors can be injected to soak-test concurrency, caching and failover
+without touching the real providers. GET /stats returns request counts.
+
+Point DataFetcher at it in config.ini:
+
+    [Providers]
+    yfinance_url = http://127.0.0.1:8765
+    alpha_vantage_url = http://127.0.0.1:8765
+    twelvedata_url = http://127.0.0.1:8765
+
+Usage (from the repository root):
+    python -m benchmarks.replay_server [--port 8765] [--cache-dir data_cache] [--shift-to-now]
+        [--latency 50] [--jitter 20] [--error-rate 0.01] [--quota-rate 0.05] [--per-minute 60]
+"""
+import argparse
+import collections
+import gzip
+import json
+import logging
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+import numpy as np
+import pandas as pd
+from core.bar_store import INTERVAL_SECONDS, period_to_days
+from core.backtester import cached_keys, load_bars
+from core.resampler import session_for
+from benchmarks.bench_signals import synthetic_bars
+
+logger = logging.getLogger(__name__)
+
+# Provider interval names -> yfinance interval names
+ALPHA_VANTAGE_INTERVALS = {'1min': '1m', '5min': '5m', '15min': '15m', '30min': '30m', '60min': '60m'}
+TWELVEDATA_INTERVALS = {'1min': '1m', '5min': '5m', '15min': '15m', '30min': '30m', '60min': '60m',
+                        '1h': '60m', '1day': '1d'}
+
+# Responses smaller than this are sent uncompressed
+GZIP_MIN_BYTES = 1024
+
+# Column order the response builders read
+COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+# History generated for symbols with no recorded series
+SYNTHETIC_PERIODS = {'1m': '30d', '5m': '60d', '15m': '60d', '30m': '60d', '60m': '730d', '1h': '730d',
+                     '1d': '3650d'}
+
+# Quota responses in each provider's own shape
+ALPHA_VANTAGE_QUOTA = {
+    'Note': "Thank you for using Alpha Vantage! Our standard API call frequency is 5 calls per minute "
+            "and 25 calls per day."
+}
+TWELVEDATA_QUOTA = {
+    'code': 429,
+    'message': "You have run out of API credits for the current minute.",
+    'status': 'error'
+}
+
+
+class ReplayData:
+    """
+    Bars served per (symbol, interval)
+
+    Recorded series are looked up by the symbol as requested; with
+    shift_to_now every series is moved forward so its last bar is the most
+    recent one that could have opened, which keeps incremental refreshes busy.
+    """
+
+    def __init__(self, cache_dir=None, shift_to_now=False):
+        self.shift_to_now = shift_to_now
+        self.recorded = {}
+        if cache_dir:
+            for key in cached_keys(cache_dir):
+                symbol, _, interval = key.rsplit('_', 2)
+                self.recorded.setdefault((symbol, interval), (cache_dir, key))
+        self._bars = {}
+        self._lock = threading.Lock()
+
+    def bars(self, symbol, interval):
+        """OHLCV bars with a UTC index, oldest first"""
+        with self._lock:
+            data = self._bars.get((symbol, interval))
+            if data is None:
+                data = self._bars[(symbol, interval)] = self._load(symbol, interval)
+        if self.shift_to_now and not data.empty:
+            latest = pd.Timestamp.now(tz='UTC').floor(f'{INTERVAL_SECONDS[interval]}s')
+            data = data.set_axis(data.index + (latest - data.index[-1]), axis=0)
+        return data
+
+    def _load(self, symbol, interval):
+        source = self.recorded.get((symbol, interval))
+        if source:
+            data = load_bars(source[1], source[0])
+        elif interval in SYNTHETIC_PERIODS:
+            data = synthetic_bars(session_for(symbol), interval, SYNTHETIC_PERIODS[interval],
+                                  seed=sum(map(ord, symbol)))
+        else:
+            raise ValueError(f"Unsupported interval: {interval}")
+        return data[COLUMNS]
+
+
+class Faults:
+    """
+    Injected latency and failures
+
+    Each request waits latency +/- jitter, then fails with a server error at
+    error_rate, or with the provider's quota response at quota_rate or once
+    a provider has served per_minute requests in the last minute.
+    """
+
+    def __init__(self, latency=0.0, jitter=0.0, error_rate=0.0, quota_rate=0.0, per_minute=0, seed=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.quota_rate = quota_rate
+        self.per_minute = per_minute
+        self._random = random.Random(seed)
+        self._recent = collections.defaultdict(collections.deque)
+        self._lock = threading.Lock()
+
+    def outcome(self, provider):
+        """Sleep for the injected latency and return 'ok', 'error' or 'quota'"""
+        with self._lock:
+            delay = max(0.0, self.latency + self._random.uniform(-self.jitter, self.jitter))
+            draw = self._random.random()
+            recent = self._recent[provider]
+            now = time.monotonic()
+            while recent and now - recent[0] >= 60:
+                recent.popleft()
+            over_quota = self.per_minute and len(recent) >= self.per_minute
+            if not over_quota:
+                recent.append(now)
+
+        if delay:
+            time.sleep(delay / 1000)
+        if draw < self.error_rate:
+            return 'error'
+        if over_quota or draw < self.error_rate + self.quota_rate:
+            return 'quota'
+        return 'ok'
+
+
+def alpha_vantage_response(data, params):
+    """TIME_SERIES_INTRADAY / TIME_SERIES_DAILY payload for `data`"""
+    function = params.get('function')
+    if function == 'TIME_SERIES_INTRADAY':
+        key = f"Time Series ({params.get('interval')})"
+        fmt = '%Y-%m-%d %H:%M:%S'
+    else:
+        key = 'Time Series (Daily)'
+        fmt = '%Y-%m-%d'
+    if params.get('outputsize', 'compact') == 'compact':
+        data = data.iloc[-100:]
+
+    # Timestamps are exchange-local, named in the metadata
+    local = data.index.tz_convert('US/Eastern')
+    series = {
+        timestamp: {
+            '1. open': f"{row[0]:.4f}",
+            '2. high': f"{row[1]:.4f}",
+            '3. low': f"{row[2]:.4f}",
+            '4. close': f"{row[3]:.4f}",
+            '5. volume': str(int(row[4]))
+        }
+        for timestamp, row in zip(local.strftime(fmt)[::-1], data.to_numpy()[::-1])
+    }
+    meta = {
+        '1. Information': f"{'Intraday' if function == 'TIME_SERIES_INTRADAY' else 'Daily'} Prices",
+        '2. Symbol': params.get('symbol'),
+        '3. Last Refreshed': local[-1].strftime(fmt) if len(local) else '',
+        '6. Time Zone': 'US/Eastern'
+    }
+    return {'Meta Data': meta, key: series}
+
+
+def twelvedata_response(data, params, interval):
+    """time_series payload for `data`, newest bar first"""
+    timezone = params.get('timezone', 'UTC')
+    if params.get('start_date'):
+        start = pd.Timestamp(params['start_date']).tz_localize(timezone)
+        data = data[data.index >= start]
+    outputsize = params.get('outputsize', '30')
+    if outputsize != 'max':
+        data = data.iloc[-min(int(outputsize), 5000):]
+
+    fmt = '%Y-%m-%d' if interval == '1d' else '%Y-%m-%d %H:%M:%S'
+    local = data.index.tz_convert(timezone)
+    values = [
+        {
+            'datetime': timestamp,
+            'open': f"{row[0]:.5f}",
+            'high': f"{row[1]:.5f}",
+            'low': f"{row[2]:.5f}",
+            'close': f"{row[3]:.5f}",
+            'volume': str(int(row[4]))
+        }
+        for timestamp, row in zip(local.strftime(fmt)[::-1], data.to_numpy()[::-1])
+    ]
+    meta = {'symbol': params.get('symbol'), 'interval': params.get('interval'), 'exchange_timezone': timezone}
+    return {'meta': meta, 'values': values, 'status': 'ok'}
+
+
+def yahoo_chart_response(data, symbol, params, interval):
+    """v8/finance/chart payload for `data`"""
+    if 'period1' in params:
+        start = pd.Timestamp(int(params['period1']), unit='s', tz='UTC')
+        end = pd.Timestamp(int(params.get('period2', time.time())), unit='s', tz='UTC')
+        data = data[(data.index >= start) & (data.index <= end)]
+    elif len(data):
+        cutoff = data.index[-1] - pd.Timedelta(days=period_to_days(params.get('range', '1mo')))
+        data = data[data.index > cutoff]
+
+    values = data.to_numpy()
+    timezone = 'America/New_York' if session_for(symbol) in ('stock', 'index') else 'UTC'
+    return {
+        'chart': {
+            'result': [{
+                'meta': {
+                    'symbol': symbol,
+                    'currency': 'USD',
+                    'exchangeTimezoneName': timezone,
+                    'dataGranularity': interval,
+                    'regularMarketPrice': float(values[-1, 3]) if len(values) else None
+                },
+                'timestamp': (data.index.as_unit('s').asi8).tolist(),
+                'indicators': {
+                    'quote': [{
+                        'open': values[:, 0].tolist(),
+                        'high': values[:, 1].tolist(),
+                        'low': values[:, 2].tolist(),
+                        'close': values[:, 3].tolist(),
+                        'volume': values[:, 4].astype(np.int64).tolist()
+                    }]
+                }
+            }],
+            'error': None
+        }
+    }
+
+
+class ReplayHandler(BaseHTTPRequestHandler):
+    """Routes provider requests; the server carries `data`, `faults` and `stats`"""
+
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        try:
+            if url.path == '/stats':
+                self._send(200, self.server.snapshot())
+            elif url.path == '/query':
+                self._serve('alpha_vantage', lambda: self._alpha_vantage(params))
+            elif url.path == '/time_series':
+                self._serve('twelvedata', lambda: self._twelvedata(params))
+            elif url.path.startswith('/v8/finance/chart/'):
+                symbol = url.path.rsplit('/', 1)[-1]
+                self._serve('yfinance', lambda: self._yahoo_chart(symbol, params))
+            else:
+                self._send(404, {'error': f"Unknown endpoint: {url.path}"})
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def _serve(self, provider, respond):
+        outcome = self.server.faults.outcome(provider)
+        self.server.count(provider, outcome)
+        if outcome == 'error':
+            self._send(500, {'error': 'Injected server error'})
+        elif outcome == 'quota':
+            if provider == 'alpha_vantage':
+                self._send(200, ALPHA_VANTAGE_QUOTA)
+            elif provider == 'twelvedata':
+                self._send(200, TWELVEDATA_QUOTA)
+            else:
+                self._send(429, 'Too Many Requests')
+        else:
+            try:
+                self._send(200, respond())
+            except (KeyError, ValueError) as e:
+                self._send(400, {'error': str(e)})
+
+    def _alpha_vantage(self, params):
+        if params.get('function') == 'TIME_SERIES_DAILY':
+            interval = '1d'
+        elif params.get('function') == 'TIME_SERIES_INTRADAY':
+            interval = ALPHA_VANTAGE_INTERVALS.get(params.get('interval'))
+            if interval is None:
+                return {'Error Message': f"Invalid API call: interval {params.get('interval')}"}
+        else:
+            return {'Error Message': f"Invalid API call: function {params.get('function')}"}
+        return alpha_vantage_response(self.server.data.bars(params['symbol'], interval), params)
+
+    def _twelvedata(self, params):
+        interval = TWELVEDATA_INTERVALS.get(params.get('interval'))
+        if interval is None:
+            return {'code': 400, 'message': f"Invalid interval: {params.get('interval')}", 'status': 'error'}
+        return twelvedata_response(self.server.data.bars(params['symbol'], interval), params, interval)
+
+    def _yahoo_chart(self, symbol, params):
+        interval = params.get('interval', '1d')
+        return yahoo_chart_response(self.server.data.bars(symbol, interval), symbol, params, interval)
+
+    def _send(self, status, body):
+        payload = (body if isinstance(body, str) else json.dumps(body)).encode()
+        # Compressed like the real providers when the client accepts it
+        compressed = len(payload) > GZIP_MIN_BYTES and 'gzip' in self.headers.get('Accept-Encoding', '')
+        if compressed:
+            payload = gzip.compress(payload, compresslevel=5)
+        self.send_response(status)
+        self.send_header('Content-Type', 'text/plain' if isinstance(body, str) else 'application/json')
+        if compressed:
+            self.send_header('Content-Encoding', 'gzip')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        logger.debug(format % args)
+
+
+class ReplayServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, data, faults=None):
+        super().__init__(address, ReplayHandler)
+        self.data = data
+        self.faults = faults or Faults()
+        self.stats = collections.Counter()
+        self._stats_lock = threading.Lock()
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def count(self, provider, outcome):
+        with self._stats_lock:
+            self.stats[(provider, outcome)] += 1
+
+    def snapshot(self):
+        """Requests served so far, as provider -> outcome -> count"""
+        with self._stats_lock:
+            stats = {}
+            for (provider, outcome), count in self.stats.items():
+                stats.setdefault(provider, {})[outcome] = count
+        return stats
+
+
+def start_server(data, faults=None, host='127.0.0.1', port=0):
+    """Start a replay server on a background thread; port 0 picks a free port"""
+    server = ReplayServer((host, port), data, faults)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--cache-dir', help="DataFetcher cache directory with recorded series")
+    parser.add_argument('--shift-to-now', action='store_true', help="Move every series to end at the current bar")
+    parser.add_argument('--latency', type=float, default=0.0, help="Milliseconds added to each request")
+    parser.add_argument('--jitter', type=float, default=0.0, help="Random +/- milliseconds on the latency")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Fraction of requests answered with HTTP 500")
+    parser.add_argument('--quota-rate', type=float, default=0.0, help="Fraction answered with a quota error")
+    parser.add_argument('--per-minute', type=int, default=0, help="Quota per provider per minute (0 = none)")
+    parser.add_argument('--seed', type=int, help="Seed for the injected faults")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    data = ReplayData(args.cache_dir, shift_to_now=args.shift_to_now)
+    faults = Faults(args.latency, args.jitter, args.error_rate, args.quota_rate, args.per_minute, args.seed)
+    server = ReplayServer((args.host, args.port), data, faults)
+    print(f"Replaying market data on {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(json.dumps(server.snapshot(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,244 @@
+import argparse
+import importlib
+import json
+import logging
+import os
+import time
+import numpy as np
+import pandas as pd
+from .bar_store import INTERVAL_SECONDS
+from .bar_cache import get_bar_cache, INDEX_FILE
+from .resampler import session_for
+
+logger = logging.getLogger(__name__)
+
+# PocketOption-style fixed expiries, in minutes
+EXPIRIES = (1, 5, 15, 60)
+
+# Fraction of the stake paid on a winning trade
+DEFAULT_PAYOUT = 0.8
+
+
+def load_agent(asset_type):
+    """Agent module for an asset type (forex, crypto, stock, commodity, index)"""
+    return importlib.import_module(f'ai_agents.{asset_type}_agent')
+
+
+def infer_interval(index):
+    """Name of the bar interval that most bars in `index` are spaced by"""
+    if len(index) < 2:
+        raise ValueError("Need at least two bars to infer the interval")
+    spacing = pd.Series(np.diff(index.as_unit('ns').asi8)).mode().iloc[0] / 1e9
+    for name, seconds in INTERVAL_SECONDS.items():
+        if seconds == spacing:
+            return name
+    raise ValueError(f"Unsupported bar spacing: {spacing:.0f}s")
+
+
+def load_bars(key, cache_dir='data_cache', backend='columnar'):
+    """
+    Load a recorded series from the DataFetcher cache
+
+    Args:
+        key (str): Cache key, e.g. EURUSD_7d_1m
+        cache_dir (str): Cache directory
+        backend (str): Cache backend (columnar, csv)
+
+    Returns:
+        pd.DataFrame: OHLCV bars with Open/High/Low/Close/Volume columns and a UTC index
+    """
+    data = get_bar_cache(backend, cache_dir).load(key)
+    if data.empty:
+        raise ValueError(f"No cached bars for {key} in {cache_dir}")
+    data = data.rename(columns=str.title)
+    index = pd.to_datetime(data.index, utc=True)
+    return data.set_axis(index, axis=0).sort_index()
+
+
+def cached_keys(cache_dir='data_cache'):
+    """Every series key stored in a cache directory, for either backend"""
+    keys = set()
+    for name in os.listdir(cache_dir):
+        path = os.path.join(cache_dir, name)
+        if name.endswith('.csv'):
+            keys.add(name[:-4])
+        elif os.path.exists(os.path.join(path, INDEX_FILE)):
+            keys.add(name)
+    return sorted(keys)
+
+
+class BacktestResult:
+    """Scored signals of one agent on one series"""
+
+    def __init__(self, asset_type, symbol, interval, signals, trades):
+        self.asset_type = asset_type
+        self.symbol = symbol
+        self.interval = interval
+        self.signals = signals
+        self.trades = trades
+
+    def summary(self, payout=DEFAULT_PAYOUT):
+        """
+        Signal counts and outcomes per expiry
+
+        Win rate is over trades that did not tie (ties are refunded);
+        expectancy is the mean return per unit staked at `payout`.
+        """
+        rows = []
+        for expiry, trades in self.trades.items():
+            outcome = trades['outcome']
+            wins, losses = int((outcome > 0).sum()), int((outcome < 0).sum())
+            decided = wins + losses
+            win_rate = wins / decided if decided else np.nan
+            rows.append({
+                'asset': self.asset_type,
+                'symbol': self.symbol,
+                'expiry': expiry,
+                'signals': len(trades),
+                'buys': int((trades['direction'] > 0).sum()),
+                'sells': int((trades['direction'] < 0).sum()),
+                'strong': int(trades['strong'].sum()),
+                'wins': wins,
+                'losses': losses,
+                'ties': len(trades) - decided,
+                'win_rate': win_rate,
+                'strong_win_rate': _win_rate(outcome[trades['strong']]),
+                'expectancy': win_rate * payout - (1 - win_rate) if decided else np.nan
+            })
+        return pd.DataFrame(rows)
+
+    def rule_contributions(self):
+        """
+        How each rule relates to outcomes, per expiry
+
+        A rule "fired" on a trade when it voted in the trade's direction. The
+        contribution is the win rate with the rule fired minus without it.
+        """
+        rows = []
+        rules = [column for column in self.signals.columns if column not in ('direction', 'strong')]
+        for expiry, trades in self.trades.items():
+            for rule in rules:
+                fired = np.sign(trades[rule]) == trades['direction']
+                with_rule = _win_rate(trades['outcome'][fired])
+                without_rule = _win_rate(trades['outcome'][~fired])
+                rows.append({
+                    'asset': self.asset_type,
+                    'symbol': self.symbol,
+                    'expiry': expiry,
+                    'rule': rule,
+                    'fired': int(fired.sum()),
+                    'win_rate_fired': with_rule,
+                    'win_rate_not_fired': without_rule,
+                    'contribution': with_rule - without_rule
+                })
+        return pd.DataFrame(rows)
+
+
+def backtest(bars, asset_type, symbol, interval=None, expiries=EXPIRIES, every=None):
+    """
+    Run an agent's rules over a whole history and score every signal
+
+    Each bar's signal is entered at that bar's close and settled at the close
+    of the last bar at or before close + expiry. Trades whose expiry lies past
+    the end of the data, or that are shorter than one bar, are not scored.
+
+    Args:
+        bars (pd.DataFrame): OHLCV bars with a UTC index, oldest first
+        asset_type (str): Agent to run (forex, crypto, stock, commodity, index)
+        symbol (str): Instrument symbol, passed to the agent
+        interval (str): Bar interval (inferred from the index when omitted)
+        expiries (iterable): Expiries in minutes
+        every (int): Only take signals on bars closing on a multiple of this
+            many minutes, like a live loop running at that cadence
+
+    Returns:
+        BacktestResult
+    """
+    interval = interval or infer_interval(bars.index)
+    signals = load_agent(asset_type).signal_series(bars, interval, symbol)
+
+    bar_ns = INTERVAL_SECONDS[interval] * 10**9
+    opens = bars.index.as_unit('ns').asi8
+    close = bars['Close'].to_numpy(dtype=float)
+    direction = signals['direction'].to_numpy()
+    entries = direction != 0
+    if every:
+        entries &= (opens + bar_ns) % (every * 60 * 10**9) == 0
+    entries = np.flatnonzero(entries)
+
+    trades = {}
+    for expiry in expiries:
+        expiry_ns = expiry * 60 * 10**9
+        if expiry_ns < bar_ns:
+            logger.warning(f"Skipping {expiry}m expiry: shorter than one {interval} bar")
+            continue
+        # Settle on the bar closing at entry + expiry, or the last quote before it
+        exit_open = opens[entries] + expiry_ns
+        exits = np.searchsorted(opens, exit_open, side='right') - 1
+        settled = (exit_open <= opens[-1]) & (exits > entries)
+        entry, exit = entries[settled], exits[settled]
+
+        trade_signals = signals.iloc[entry]
+        trades[expiry] = trade_signals.assign(
+            entry_price=close[entry],
+            exit_price=close[exit],
+            outcome=np.sign((close[exit] - close[entry]) * direction[entry]).astype(int)
+        )
+
+    return BacktestResult(asset_type, symbol, interval, signals, trades)
+
+
+def _win_rate(outcome):
+    decided = outcome[outcome != 0]
+    return float((decided > 0).mean()) if len(decided) else np.nan
+
+
+def main(argv=None):
+    """Backtest cached series from the command line and print the results"""
+    parser = argparse.ArgumentParser(description="Backtest the agent rules on cached bars")
+    parser.add_argument('series', nargs='*',
+                        help="Cache keys, optionally as type:key (default: every cached series)")
+    parser.add_argument('--cache-dir', default='data_cache')
+    parser.add_argument('--backend', default='columnar', choices=['columnar', 'csv'])
+    parser.add_argument('--expiries', default=','.join(map(str, EXPIRIES)), help="Minutes, comma separated")
+    parser.add_argument('--every', type=int, help="Signal cadence in minutes")
+    parser.add_argument('--payout', type=float, default=DEFAULT_PAYOUT)
+    parser.add_argument('--rules', action='store_true', help="Also print per-rule contributions")
+    parser.add_argument('--output', help="Write the summary as JSON to this file")
+    args = parser.parse_args(argv)
+
+    expiries = [int(expiry) for expiry in args.expiries.split(',')]
+    summaries, contributions = [], []
+    start = time.time()
+    for series in args.series or cached_keys(args.cache_dir):
+        asset_type, _, key = series.rpartition(':')
+        symbol = key.rsplit('_', 2)[0]
+        asset_type = asset_type or session_for(symbol)
+        try:
+            bars = load_bars(key, args.cache_dir, args.backend)
+            result = backtest(bars, asset_type, symbol, expiries=expiries, every=args.every)
+        except Exception as e:
+            logger.error(f"Backtest of {series} failed: {str(e)}")
+            continue
+        summaries.append(result.summary(args.payout))
+        contributions.append(result.rule_contributions())
+
+    if not summaries:
+        print("No series backtested")
+        return
+
+    summary = pd.concat(summaries, ignore_index=True)
+    with pd.option_context('display.width', 200, 'display.max_columns', None):
+        print(summary.to_string(index=False, float_format='{:.3f}'.format))
+        if args.rules:
+            print()
+            print(pd.concat(contributions, ignore_index=True).to_string(index=False, float_format='{:.3f}'.format))
+    print(f"\nBacktested {len(summaries)} series in {time.time() - start:.2f}s")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(json.loads(summary.to_json(orient='records')), f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,214 @@
+import numpy as np
+import pandas as pd
+
+# Column names of the OHLCV fields, as yfinance spells them
+FIELDS = ('Open', 'High', 'Low', 'Close', 'Volume')
+
+
+class BarBuffer:
+    """
+    Fixed-capacity OHLCV bars of one (symbol, interval) series.
+
+    Opening times are int64 nanoseconds since the epoch (UTC, or wall clock
+    for series that came without a timezone); prices and volume are `dtype`,
+    float32 by default, a little over half the size of a float64 frame.
+    The arrays are allocated once. Appending to a full buffer shifts the
+    oldest bars out in place, so memory stays flat however long the app
+    runs, and the bars stay contiguous, so time, open, high, low, close and
+    volume are read-only views, oldest first, that cost no copy. A view is
+    only valid until the next write to its buffer.
+    """
+
+    __slots__ = ('capacity', 'tz', '_size', '_time', '_open', '_high', '_low', '_close', '_volume')
+
+    def __init__(self, capacity, dtype=np.float32, tz=None):
+        self.capacity = int(capacity)
+        self.tz = tz
+        self._size = 0
+        self._time = np.zeros(self.capacity, dtype=np.int64)
+        self._open = np.zeros(self.capacity, dtype=dtype)
+        self._high = np.zeros(self.capacity, dtype=dtype)
+        self._low = np.zeros(self.capacity, dtype=dtype)
+        self._close = np.zeros(self.capacity, dtype=dtype)
+        self._volume = np.zeros(self.capacity, dtype=dtype)
+
+    @classmethod
+    def from_frame(cls, frame, capacity=None, dtype=np.float32):
+        """
+        Buffer holding the bars of an OHLCV frame
+
+        Args:
+            frame (pd.DataFrame): Bars, oldest first, with Open/High/Low/Close/Volume
+                or open/high/low/close/volume columns
+            capacity (int): Bars the buffer can hold (default: exactly the frame's)
+            dtype: Price and volume dtype
+
+        Returns:
+            BarBuffer: The newest `capacity` bars of the frame
+        """
+        buffer = cls(len(frame) if capacity is None else capacity, dtype, _timezone(frame.index))
+        buffer.extend_frame(frame)
+        return buffer
+
+    @classmethod
+    def wrap(cls, time, open, high, low, close, volume, tz=None):
+        """Full buffer over existing arrays (e.g. in shared memory), without copying them"""
+        buffer = cls.__new__(cls)
+        buffer.capacity = buffer._size = len(time)
+        buffer.tz = tz
+        buffer._time, buffer._open, buffer._high = time, open, high
+        buffer._low, buffer._close, buffer._volume = low, close, volume
+        return buffer
+
+    def __len__(self):
+        return self._size
+
+    def __repr__(self):
+        return f"<BarBuffer {self._size}/{self.capacity} bars {self.dtype}>"
+
+    @property
+    def empty(self):
+        return self._size == 0
+
+    @property
+    def dtype(self):
+        return self._close.dtype
+
+    @property
+    def writeable(self):
+        """False for a buffer wrapped around read-only arrays"""
+        return self._time.flags.writeable
+
+    @property
+    def nbytes(self):
+        """Memory held by the arrays, whether or not they are full"""
+        return sum(array.nbytes for array in self._arrays())
+
+    @property
+    def time(self):
+        return self._view(self._time)
+
+    @property
+    def open(self):
+        return self._view(self._open)
+
+    @property
+    def high(self):
+        return self._view(self._high)
+
+    @property
+    def low(self):
+        return self._view(self._low)
+
+    @property
+    def close(self):
+        return self._view(self._close)
+
+    @property
+    def volume(self):
+        return self._view(self._volume)
+
+    def extend(self, times, opens, highs, lows, closes, volumes):
+        """
+        Add bars, oldest first
+
+        A bar with the same opening time as the newest stored one replaces it
+        (a forming bar that has moved on); bars older than that are already
+        stored and skipped. When the buffer is full the oldest bars make room.
+
+        Args:
+            times (np.ndarray): Opening times in int64 nanoseconds, increasing
+            opens, highs, lows, closes, volumes (np.ndarray): Values per bar
+
+        Returns:
+            int: Number of bars appended (not counting a replaced last bar)
+        """
+        times = np.asarray(times, dtype=np.int64)
+        columns = (opens, highs, lows, closes, volumes)
+        start = 0
+        if self._size:
+            last = self._time[self._size - 1]
+            start = int(np.searchsorted(times, last, side='left'))
+            if start < len(times) and times[start] == last:
+                for array, values in zip(self._arrays()[1:], columns):
+                    array[self._size - 1] = values[start]
+                start += 1
+
+        count = len(times) - start
+        if count <= 0 or self.capacity == 0:
+            return 0
+        if count >= self.capacity:
+            # Only the newest `capacity` bars fit
+            start = len(times) - self.capacity
+            self._size = 0
+        overflow = self._size + len(times) - start - self.capacity
+        if overflow > 0:
+            kept = self._size - overflow
+            for array in self._arrays():
+                array[:kept] = array[overflow:self._size]
+            self._size = kept
+
+        end = self._size + len(times) - start
+        self._time[self._size:end] = times[start:]
+        for array, values in zip(self._arrays()[1:], columns):
+            array[self._size:end] = values[start:]
+        self._size = end
+        return count
+
+    def extend_frame(self, frame):
+        """extend() with the bars of an OHLCV frame"""
+        if frame.empty:
+            return 0
+        return self.extend(_nanoseconds(frame.index), *(_column(frame, name) for name in FIELDS))
+
+    def tail(self, days):
+        """Index of the first bar opening within `days` days of the newest one"""
+        if not self._size:
+            return 0
+        cutoff = self._time[self._size - 1] - int(days * 86400 * 1e9)
+        return int(np.searchsorted(self.time, cutoff, side='right'))
+
+    def to_frame(self, days=None):
+        """
+        Copy of the bars as a float64 OHLCV frame
+
+        Args:
+            days (float): Only the bars opening within this many days of the newest one
+
+        Returns:
+            pd.DataFrame: Open/High/Low/Close/Volume columns on the opening times,
+                in the timezone of the frame the bars came from
+        """
+        start = 0 if days is None else self.tail(days)
+        index = pd.DatetimeIndex(self.time[start:].astype('datetime64[ns]'))
+        if self.tz is not None:
+            index = index.tz_localize('UTC').tz_convert(self.tz)
+        return pd.DataFrame({name: array[start:self._size].astype(float)
+                             for name, array in zip(FIELDS, self._arrays()[1:])}, index=index)
+
+    def clear(self):
+        self._size = 0
+
+    def _arrays(self):
+        return (self._time, self._open, self._high, self._low, self._close, self._volume)
+
+    def _view(self, array):
+        view = array[:self._size]
+        view.flags.writeable = False
+        return view
+
+
+def _timezone(index):
+    return str(index.tz) if isinstance(index, pd.DatetimeIndex) and index.tz is not None else None
+
+
+def _nanoseconds(index):
+    """Opening times of a frame as int64 nanoseconds"""
+    return pd.DatetimeIndex(index).as_unit('ns').asi8
+
+
+def _column(frame, name):
+    column = name if name in frame.columns else name.lower()
+    if column not in frame.columns:
+        return np.zeros(len(frame))
+    return frame[column].to_numpy(dtype=float)
@@ -0,0 +1,237 @@
+import numpy as np
+import pandas as pd
+import os
+import shutil
+import logging
+
+logger = logging.getLogger(__name__)
+
+# File suffix for each supported column dtype
+DTYPE_SUFFIXES = {
+    'i8': np.dtype('<i8'),
+    'f8': np.dtype('<f8')
+}
+
+# Name of the column file holding UTC timestamps (int64 nanoseconds)
+INDEX_FILE = 'Date.i8'
+
+
+class CsvBarCache:
+    """Original cache format: one CSV file per (symbol, period, interval)"""
+
+    suffix = '.csv'
+
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+
+    def path(self, key):
+        return os.path.join(self.cache_dir, key + self.suffix)
+
+    def load(self, key):
+        """Load a cached series, returning an empty frame when missing or unreadable"""
+        path = self.path(key)
+        if not os.path.exists(path):
+            return pd.DataFrame()
+        try:
+            return pd.read_csv(path, parse_dates=True, index_col='Date')
+        except Exception as e:
+            logger.warning(f"Error reading cache file {path}: {str(e)}")
+            return pd.DataFrame()
+
+    def store(self, key, data):
+        """Replace the cached series"""
+        data.to_csv(self.path(key))
+
+    def append(self, key, data, max_rows=None):
+        """Add new bars, replacing stored bars at or after the first new timestamp"""
+        if data.empty:
+            return
+        stored = self.load(key)
+        if not stored.empty:
+            stored.index = pd.to_datetime(stored.index, utc=True)
+            data = pd.concat([stored[stored.index < data.index[0]], data])
+        if max_rows is not None:
+            data = data.iloc[-max_rows:]
+        self.store(key, data)
+
+
+class ColumnarBarCache:
+    """
+    Binary cache with one fixed-dtype file per column.
+
+    Each series lives in a directory holding `Date.i8` (UTC nanoseconds) and one
+    `<column>.f8` file per price column. Loads open the files with np.memmap, so
+    the returned columns share memory with the page cache instead of being
+    parsed. New bars past the end of the files are written in place, so
+    files only ever grow while mapped. Stored bars are never overwritten, as
+    frames loaded earlier (and shared by single-flight) still map them: a
+    file whose last bars are replaced, such as a bar that was still forming,
+    is copied up to them and swapped for the original. A series is rewritten
+    whole just when it grows past twice its retained size or its columns
+    change.
+    """
+
+    suffix = ''
+
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+
+    def path(self, key):
+        return os.path.join(self.cache_dir, key)
+
+    def load(self, key):
+        """Load a cached series as a DataFrame backed by read-only memmaps"""
+        columns = self.load_columns(key)
+        if columns is None:
+            return pd.DataFrame()
+        timestamps = columns.pop('Date')
+        index = pd.DatetimeIndex(timestamps.view('M8[ns]'), copy=False).tz_localize('UTC')
+        index.name = 'Date'
+        return pd.DataFrame(columns, index=index, copy=False)
+
+    def load_columns(self, key):
+        """
+        Memory-map the column files of a cached series
+
+        Returns:
+            dict: Column name -> read-only array ('Date' holds int64 UTC
+                nanoseconds), or None when the series is not cached
+        """
+        path = self.path(key)
+        if not os.path.isdir(path):
+            if not self._migrate(key):
+                return None
+
+        files = self._column_files(path)
+        if INDEX_FILE not in files:
+            return None
+
+        # A write interrupted between files leaves columns of different lengths
+        rows = min(os.path.getsize(os.path.join(path, f)) // DTYPE_SUFFIXES[f.rsplit('.', 1)[1]].itemsize
+                   for f in files)
+        if rows == 0:
+            return None
+
+        columns = {}
+        for filename in files:
+            name, suffix = filename.rsplit('.', 1)
+            columns[name] = np.memmap(os.path.join(path, filename), dtype=DTYPE_SUFFIXES[suffix],
+                                      mode='r', shape=(rows,))
+        return columns
+
+    def store(self, key, data):
+        """Replace the cached series"""
+        path = self.path(key)
+        staging = path + '.tmp'
+        shutil.rmtree(staging, ignore_errors=True)
+        os.makedirs(staging)
+        self._write(staging, data, rows_kept=0)
+
+        # Swap directories so frames still mapping the old files stay valid
+        if os.path.isdir(path):
+            retired = path + '.old'
+            shutil.rmtree(retired, ignore_errors=True)
+            os.replace(path, retired)
+            shutil.rmtree(retired, ignore_errors=True)
+        os.replace(staging, path)
+
+    def append(self, key, data, max_rows=None):
+        """Add new bars, replacing stored bars at or after the first new timestamp"""
+        if data.empty:
+            return
+        path = self.path(key)
+        columns = self.load_columns(key)
+        if columns is None:
+            self.store(key, data)
+            return
+
+        timestamps = columns['Date']
+        rows_stored = len(timestamps)
+        first_new = self._timestamps(data.index)[0]
+        rows_kept = int(np.searchsorted(timestamps, first_new, side='left'))
+        stored_columns = set(columns) - {'Date'}
+        new_columns = set(data.select_dtypes(include='number').columns)
+        del columns, timestamps
+
+        total = rows_kept + len(data)
+        rewrite = stored_columns != new_columns or total < rows_stored
+        if rewrite or (max_rows is not None and total > 2 * max_rows):
+            stored = self.load(key)
+            merged = pd.concat([stored.iloc[:rows_kept], data])
+            if max_rows is not None:
+                merged = merged.iloc[-max_rows:]
+            self.store(key, merged)
+            return
+
+        self._write(path, data, rows_kept=rows_kept)
+
+    def _write(self, path, data, rows_kept):
+        """Write `data` into every column file starting at row `rows_kept`, never over stored rows"""
+        numeric = data.select_dtypes(include='number')
+        arrays = {INDEX_FILE: self._timestamps(data.index)}
+        for column in numeric.columns:
+            arrays[f"{column}.f8"] = numeric[column].to_numpy(dtype='<f8')
+
+        # Timestamps go last so a partial write never exposes unpriced bars
+        for filename in sorted(arrays, key=lambda f: f == INDEX_FILE):
+            array = arrays[filename]
+            file_path = os.path.join(path, filename)
+            offset = rows_kept * array.dtype.itemsize
+            if os.path.exists(file_path) and os.path.getsize(file_path) > offset:
+                staging = file_path + '.tmp'
+                with open(file_path, 'rb') as stored, open(staging, 'wb') as f:
+                    f.write(stored.read(offset))
+                    f.write(np.ascontiguousarray(array).tobytes())
+                os.replace(staging, file_path)
+                continue
+            with open(file_path, 'r+b' if os.path.exists(file_path) else 'wb') as f:
+                f.seek(offset)
+                f.write(np.ascontiguousarray(array).tobytes())
+
+    def _column_files(self, path):
+        return sorted(f for f in os.listdir(path)
+                      if '.' in f and f.rsplit('.', 1)[1] in DTYPE_SUFFIXES)
+
+    def _timestamps(self, index):
+        return pd.to_datetime(index, utc=True).as_unit('ns').asi8.astype('<i8')
+
+    def _migrate(self, key):
+        """Convert a legacy CSV cache file for `key`, if one exists"""
+        csv_cache = CsvBarCache(self.cache_dir)
+        if not os.path.exists(csv_cache.path(key)):
+            return False
+        data = csv_cache.load(key)
+        if data.empty:
+            return False
+        self.store(key, data)
+        os.remove(csv_cache.path(key))
+        logger.info(f"Migrated CSV cache to columnar format: {key}")
+        return True
+
+
+def get_bar_cache(backend, cache_dir):
+    """Create the cache backend named in the [Cache] backend setting"""
+    if backend == 'columnar':
+        return ColumnarBarCache(cache_dir)
+    elif backend == 'csv':
+        return CsvBarCache(cache_dir)
+    raise ValueError(f"Invalid cache backend: {backend}")
+
+
+def migrate_csv_cache(cache_dir):
+    """
+    Convert every legacy CSV file in a cache directory to the columnar format
+
+    Returns:
+        int: Number of series migrated
+    """
+    cache = ColumnarBarCache(cache_dir)
+    migrated = 0
+    for filename in sorted(os.listdir(cache_dir)):
+        if filename.endswith(CsvBarCache.suffix) and cache._migrate(filename[:-len(CsvBarCache.suffix)]):
+            migrated += 1
+    return migrated
+
+
+if __name__ == "__main__":
+    print(f"Migrated {migrate_csv_cache('data_cache')} cached series to columnar format")
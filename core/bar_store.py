@@ -0,0 +1,322 @@
+import numpy as np
+import pandas as pd
+import time
+import threading
+import logging
+from .metrics import metrics
+from .bar_buffer import BarBuffer
+from .single_flight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+# Length of one bar in seconds for every interval the agents request
+INTERVAL_SECONDS = {
+    '1m': 60,
+    '2m': 120,
+    '5m': 300,
+    '15m': 900,
+    '30m': 1800,
+    '60m': 3600,
+    '90m': 5400,
+    '1h': 3600,
+    '4h': 14400,
+    '1d': 86400,
+    '5d': 432000,
+    '1wk': 604800,
+    '1mo': 2592000,
+    '3mo': 7776000
+}
+
+# Calendar days covered by the named periods yfinance understands
+PERIOD_DAYS = {
+    'ytd': 366,
+    'max': 36500
+}
+
+
+def period_to_days(period):
+    """Convert a yfinance period string (7d, 1mo, 2y, ...) to calendar days"""
+    if period in PERIOD_DAYS:
+        return PERIOD_DAYS[period]
+    if period.endswith('mo'):
+        return int(period[:-2]) * 30
+    if period.endswith('d'):
+        return int(period[:-1])
+    if period.endswith('wk'):
+        return int(period[:-2]) * 7
+    if period.endswith('y'):
+        return int(period[:-1]) * 365
+    raise ValueError(f"Invalid period: {period}")
+
+
+def split_batch(data, symbols):
+    """
+    Split a multi-ticker yf.download result into one frame per symbol
+
+    Args:
+        data (pd.DataFrame): yf.download output for `symbols`
+        symbols (list): Symbols that were requested
+
+    Returns:
+        dict: Symbol -> OHLCV frame, leaving out symbols with no data
+    """
+    frames = {}
+    if data is None or data.empty:
+        return frames
+
+    if not isinstance(data.columns, pd.MultiIndex):
+        if len(symbols) == 1:
+            frames[symbols[0]] = data.dropna(how='all')
+        return frames
+
+    # group_by='ticker' puts symbols on level 0, the default on level 1
+    level = 0 if set(symbols) & set(data.columns.get_level_values(0)) else 1
+    available = set(data.columns.get_level_values(level))
+    for symbol in symbols:
+        if symbol not in available:
+            continue
+        # Rows only exist for other symbols' sessions (e.g. crypto weekends)
+        frame = data.xs(symbol, axis=1, level=level).dropna(how='all')
+        if not frame.empty:
+            frames[symbol] = frame
+    return frames
+
+
+class BarStore:
+    """
+    In-memory OHLCV store shared by all agents.
+
+    Series are keyed by (symbol, interval). A stored series stays fresh for one
+    bar interval (capped at max_ttl) and answers any request for the same or a
+    shorter period, so a cycle downloads each distinct series at most once.
+    Each series lives in a BarBuffer as long as its first download; refreshes
+    are merged into it in place, pushing out as many old bars as they add,
+    so the store does not grow however long the app runs. Series it does not
+    hold are fetched through a DataFetcher (get_historical_batch), so they
+    come from its disk cache when they can and only new bars are downloaded
+    otherwise, within its provider rate limits and concurrency caps.
+    """
+
+    def __init__(self, max_ttl=3600, dtype=np.float32, fetcher=None):
+        self.max_ttl = max_ttl
+        self.dtype = np.dtype(dtype)
+        self._series = {}
+        self._lock = threading.Lock()
+        self._fetcher = fetcher
+        # Concurrent misses for the same series share one download
+        self._misses = SingleFlight('bar_store')
+        self.hit_count = 0
+
+    @property
+    def fetcher(self):
+        """DataFetcher the series are fetched through (the shared one unless use_fetcher() set another)"""
+        if self._fetcher is None:
+            from .data_fetcher import get_data_fetcher
+            self._fetcher = get_data_fetcher()
+        return self._fetcher
+
+    def ttl_for(self, interval):
+        """Seconds a series of the given interval stays fresh"""
+        return min(INTERVAL_SECONDS.get(interval, 60), self.max_ttl)
+
+    def get_bars(self, symbol, interval='60m', period='30d'):
+        """
+        Get OHLCV bars for a symbol, downloading only when needed
+
+        Args:
+            symbol (str): yfinance symbol
+            interval (str): Bar interval (1m, 15m, 60m, 1d, ...)
+            period (str): Lookback period (7d, 30d, 1y, ...)
+
+        Returns:
+            pd.DataFrame: Copy of the bars with Open/High/Low/Close/Volume columns
+        """
+        return self.get_buffer(symbol, interval, period).to_frame(period_to_days(period))
+
+    def get_buffer(self, symbol, interval='60m', period='30d'):
+        """
+        get_bars() without the DataFrame: the stored buffer itself
+
+        The buffer holds as many bars as the download of the longest period
+        asked for so far. It is shared: its views are read-only and only valid
+        until the series is next refreshed (by this call or a prefetch()).
+
+        Returns:
+            BarBuffer: The series' bars, empty if the provider had none
+        """
+        days = period_to_days(period)
+        bars = self._lookup(symbol, interval, days)
+        if bars is not None:
+            metrics.inc('cache_requests_total', layer='bar_store', result='hit')
+            return bars
+
+        metrics.inc('cache_requests_total', layer='bar_store', result='miss')
+        return self._misses.do((symbol, interval, period), self._fill, symbol, interval, period)
+
+    def prefetch(self, series, executor=None):
+        """
+        Download many series with one multi-ticker request per (interval, period)
+
+        Args:
+            series (list): (symbol, interval, period) tuples; each (symbol,
+                interval) is fetched once with its longest period, and series
+                that are already fresh are skipped
+            executor: Optional executor to run the group requests in parallel
+
+        Returns:
+            int: Number of provider requests issued
+        """
+        longest = {}
+        for symbol, interval, period in series:
+            current = longest.get((symbol, interval))
+            if current is None or period_to_days(period) > period_to_days(current):
+                longest[(symbol, interval)] = period
+
+        groups = {}
+        for (symbol, interval), period in longest.items():
+            if not self.is_fresh(symbol, interval, period_to_days(period)):
+                groups.setdefault((interval, period), []).append(symbol)
+
+        if executor is None:
+            for (interval, period), symbols in groups.items():
+                self._fetch_group(symbols, interval, period)
+        else:
+            futures = [executor.submit(self._fetch_group, symbols, interval, period)
+                       for (interval, period), symbols in groups.items()]
+            for future in futures:
+                future.result()
+        return len(groups)
+
+    def put(self, symbol, interval, data, days):
+        """
+        Store a freshly downloaded series covering the last `days` days
+
+        A download that overlaps the stored bars is merged into their buffer;
+        one that covers a longer period or leaves a gap replaces it.
+        """
+        if data is None or data.empty:
+            return
+        with self._lock:
+            entry = self._series.get((symbol, interval))
+            bars = entry['bars'] if entry is not None else None
+            if bars is None or entry['days'] < days or bars.dtype != self.dtype or not bars.writeable or \
+                    pd.DatetimeIndex(data.index[:1]).as_unit('ns').asi8[0] > bars.time[-1]:
+                bars = BarBuffer.from_frame(data, dtype=self.dtype)
+            else:
+                bars.extend_frame(data)
+                days = entry['days']
+            self._series[(symbol, interval)] = {
+                'bars': bars,
+                'days': days,
+                'fetched_at': time.time()
+            }
+
+    def close_at(self, symbol, interval, at=None):
+        """
+        Close of the stored bar open at Unix time `at`, without downloading
+
+        Args:
+            symbol (str): yfinance symbol
+            interval (str): Bar interval
+            at (float): Unix time (default: the newest bar, which may still be forming)
+
+        Returns:
+            float: The close, or None if the series is not stored, starts after
+                `at` or that bar had not closed when the series was fetched
+        """
+        with self._lock:
+            entry = self._series.get((symbol, interval))
+            if entry is None or entry['bars'].empty:
+                return None
+            bars = entry['bars']
+            if at is None:
+                return float(bars.close[-1])
+            times = bars.time
+            position = int(np.searchsorted(times, int(at * 1e9), side='right')) - 1
+            if position < 0:
+                return None
+            closed_by = times[position] + INTERVAL_SECONDS.get(interval, 60) * 10**9
+            if position == len(times) - 1 and closed_by > entry['fetched_at'] * 1e9:
+                return None
+            return float(bars.close[position])
+
+    def is_fresh(self, symbol, interval, days):
+        """Check whether a stored series covers `days` and is within its TTL"""
+        with self._lock:
+            entry = self._series.get((symbol, interval))
+        return self._entry_fresh(entry, interval, days)
+
+    def export(self, keys):
+        """
+        Stored series for other processes (see shard_pool.publish)
+
+        Args:
+            keys (iterable): (symbol, interval) pairs
+
+        Returns:
+            dict: (symbol, interval) -> (BarBuffer, days, fetched_at) for the stored ones
+        """
+        with self._lock:
+            return {key: (entry['bars'], entry['days'], entry['fetched_at'])
+                    for key in keys for entry in [self._series.get(key)] if entry is not None}
+
+    def install(self, symbol, interval, bars, days, fetched_at):
+        """Store a series fetched elsewhere, as of its original fetch time"""
+        with self._lock:
+            self._series[(symbol, interval)] = {'bars': bars, 'days': days, 'fetched_at': fetched_at}
+
+    def use_dtype(self, dtype):
+        """Store prices and volume as `dtype` (float32 or float64) from the next download on"""
+        self.dtype = np.dtype(dtype)
+
+    def use_fetcher(self, fetcher):
+        """Fetch series through `fetcher` from now on"""
+        self._fetcher = fetcher
+
+    def clear(self):
+        """Drop every stored series"""
+        with self._lock:
+            self._series.clear()
+
+    def _entry_fresh(self, entry, interval, days):
+        if entry is None or entry['days'] < days:
+            return False
+        return time.time() - entry['fetched_at'] < self.ttl_for(interval)
+
+    def _lookup(self, symbol, interval, days):
+        with self._lock:
+            entry = self._series.get((symbol, interval))
+        if not self._entry_fresh(entry, interval, days):
+            return None
+        self.hit_count += 1
+        logger.debug(f"Bar store hit: {symbol} {interval}")
+        return entry['bars']
+
+    def _fill(self, symbol, interval, period):
+        """Download a missing series and store it, unless a call that just finished already did"""
+        days = period_to_days(period)
+        with self._lock:
+            entry = self._series.get((symbol, interval))
+        if not self._entry_fresh(entry, interval, days):
+            data = self.fetcher.get_historical_batch([symbol], period, interval).get(symbol)
+            self.put(symbol, interval, data, days)
+            with self._lock:
+                entry = self._series.get((symbol, interval))
+        return entry['bars'] if entry is not None else BarBuffer(0, self.dtype)
+
+    def _fetch_group(self, symbols, interval, period):
+        """Fetch several symbols together and store each one separately"""
+        try:
+            frames = self.fetcher.get_historical_batch(symbols, period, interval)
+        except Exception as e:
+            # Agents fall back to fetching their own series
+            logger.warning(f"Batch download failed for {symbols}: {str(e)}")
+            return
+
+        days = period_to_days(period)
+        for symbol, frame in frames.items():
+            self.put(symbol, interval, frame, days)
+
+
+# Shared instance used by every agent
+bar_store = BarStore()
@@ -0,0 +1,511 @@
+import json
+import os
+import socket
+import socketserver
+import threading
+import time
+import uuid
+import logging
+from collections import deque
+from .metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Port a tcp coordinator serves its queues on (Redis' own default is 6379)
+DEFAULT_PORT = 6390
+
+# Seconds a blocking pop waits before its caller checks deadlines and stop requests
+POLL_SECONDS = 0.5
+
+
+class MemoryBroker:
+    """
+    In-process message queues with the LPUSH/BRPOP semantics of Redis.
+
+    Backs BrokerServer, and stands in for a broker when the coordinator and
+    its workers share a process. Queues are created on first push.
+    """
+
+    def __init__(self):
+        self._queues = {}
+        self._condition = threading.Condition()
+
+    def push(self, queue, message, first=False):
+        """Append a message to a queue, or put it next in line if `first`"""
+        with self._condition:
+            messages = self._queues.setdefault(queue, deque())
+            if first:
+                messages.append(message)
+            else:
+                messages.appendleft(message)
+            self._condition.notify_all()
+
+    def pop(self, queue, timeout=0):
+        """
+        Oldest message of a queue
+
+        Args:
+            queue (str): Queue name
+            timeout (float): Seconds to wait for one (0 = don't wait, None = forever)
+
+        Returns:
+            The message, or None if none came in time
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            while True:
+                messages = self._queues.get(queue)
+                if messages:
+                    return messages.pop()
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return None
+                self._condition.wait(remaining)
+
+    def length(self, queue):
+        with self._condition:
+            return len(self._queues.get(queue, ()))
+
+    def delete(self, queue):
+        with self._condition:
+            return 1 if self._queues.pop(queue, None) is not None else 0
+
+    def close(self):
+        pass
+
+
+class RedisBroker:
+    """
+    Client for a Redis-compatible broker: Redis itself, or the BrokerServer
+    a tcp coordinator runs.
+
+    Speaks just enough RESP for the list commands the cluster needs, so no
+    Redis package is required. Each thread gets its own connection, so a
+    worker's heartbeat never waits behind its blocking pop. Messages are
+    str; a lost connection raises ConnectionError and is reopened by the
+    next command.
+    """
+
+    def __init__(self, host='127.0.0.1', port=DEFAULT_PORT, timeout=10):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self._local = threading.local()
+        self._connections = []
+        self._lock = threading.Lock()
+
+    def push(self, queue, message, first=False):
+        """Append a message to a queue, or put it next in line if `first`"""
+        self._command('RPUSH' if first else 'LPUSH', queue, message)
+
+    def pop(self, queue, timeout=0):
+        """Oldest message of a queue, waiting up to `timeout` seconds (0 = don't wait); None if none came"""
+        if not timeout:
+            reply = self._command('RPOP', queue)
+        else:
+            # BRPOP answers [queue, message], or null once the timeout passes
+            reply = self._command('BRPOP', queue, f"{timeout:g}", wait=timeout)
+            reply = reply[1] if reply else None
+        return None if reply is None else reply.decode()
+
+    def length(self, queue):
+        return self._command('LLEN', queue)
+
+    def delete(self, queue):
+        return self._command('DEL', queue)
+
+    def close(self):
+        """Close every thread's connection"""
+        with self._lock:
+            for connection in self._connections:
+                connection[0].close()
+            self._connections.clear()
+        self._local = threading.local()
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+            connection = self._local.connection = (sock, sock.makefile('rb'))
+            with self._lock:
+                self._connections.append(connection)
+        return connection
+
+    def _command(self, *args, wait=0):
+        sock, reader = self._connection()
+        try:
+            sock.settimeout(self.timeout + wait)
+            sock.sendall(_encode_command(args))
+            return _read_reply(reader)
+        except (OSError, ValueError) as e:
+            self._drop(sock)
+            raise ConnectionError(f"Broker {self.host}:{self.port}: {str(e)}") from e
+
+    def _drop(self, sock):
+        sock.close()
+        with self._lock:
+            self._connections = [connection for connection in self._connections if connection[0] is not sock]
+        self._local.connection = None
+
+
+class BrokerError(ValueError):
+    """Error reply from the broker"""
+
+
+def _encode_command(args):
+    parts = [b'*%d\r\n' % len(args)]
+    for arg in args:
+        data = arg if isinstance(arg, bytes) else str(arg).encode()
+        parts.append(b'$%d\r\n%s\r\n' % (len(data), data))
+    return b''.join(parts)
+
+
+def _encode_reply(reply):
+    if reply is None:
+        return b'$-1\r\n'
+    if isinstance(reply, BrokerError):
+        return f"-ERR {str(reply)}\r\n".encode()
+    if isinstance(reply, str):
+        return f"+{reply}\r\n".encode()
+    if isinstance(reply, int):
+        return b':%d\r\n' % reply
+    if isinstance(reply, bytes):
+        return b'$%d\r\n%s\r\n' % (len(reply), reply)
+    return b'*%d\r\n' % len(reply) + b''.join(_encode_reply(item) for item in reply)
+
+
+def _read_reply(reader):
+    """One RESP value: str, int, bytes, list or None; error replies raise BrokerError"""
+    line = reader.readline()
+    if not line.endswith(b'\r\n'):
+        raise ConnectionError("connection closed")
+    kind, body = line[:1], line[1:-2]
+    if kind == b'+':
+        return body.decode()
+    if kind == b'-':
+        raise BrokerError(body.decode())
+    if kind == b':':
+        return int(body)
+    if kind == b'$':
+        size = int(body)
+        return None if size < 0 else reader.read(size + 2)[:-2]
+    if kind == b'*':
+        size = int(body)
+        return None if size < 0 else [_read_reply(reader) for _ in range(size)]
+    raise ValueError(f"unexpected reply {line!r}")
+
+
+class BrokerServer(socketserver.ThreadingTCPServer):
+    """
+    Redis-compatible stand-in serving a MemoryBroker over TCP.
+
+    Understands PING, LPUSH, RPUSH, RPOP, BRPOP (one queue), LLEN and DEL,
+    which is all RedisBroker sends, so workers reach a tcp coordinator and a
+    real Redis the same way.
+    """
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host='127.0.0.1', port=DEFAULT_PORT, broker=None):
+        super().__init__((host, port), _BrokerHandler)
+        self.broker = broker or MemoryBroker()
+        self.thread = None
+
+    @property
+    def address(self):
+        return self.server_address[:2]
+
+    def start(self):
+        """Serve from a daemon thread"""
+        self.thread = threading.Thread(target=self.serve_forever, name='cluster-broker', daemon=True)
+        self.thread.start()
+        logger.info(f"Serving cluster queues at {self.address[0]}:{self.address[1]}")
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+class _BrokerHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        while True:
+            try:
+                command = _read_reply(self.rfile)
+            except (OSError, ValueError):
+                return
+            try:
+                reply = self._execute(command)
+            except (IndexError, TypeError, ValueError) as e:
+                reply = BrokerError(str(e))
+            try:
+                self.wfile.write(_encode_reply(reply))
+            except OSError:
+                return
+
+    def _execute(self, command):
+        if not isinstance(command, list) or not command:
+            raise BrokerError("expected a command array")
+        # Messages are kept as str, the way a coordinator sharing the broker pushes them
+        name, *args = [arg.decode() for arg in command]
+        name = name.upper()
+        broker = self.server.broker
+        if name == 'PING':
+            return 'PONG'
+        if name in ('LPUSH', 'RPUSH'):
+            for message in args[1:]:
+                broker.push(args[0], message, first=name == 'RPUSH')
+            return broker.length(args[0])
+        if name == 'RPOP':
+            message = broker.pop(args[0])
+            return None if message is None else message.encode()
+        if name == 'BRPOP':
+            # A zero timeout blocks until a message arrives, as in Redis
+            message = broker.pop(args[0], float(args[-1]) or None)
+            return None if message is None else [args[0].encode(), message.encode()]
+        if name == 'LLEN':
+            return broker.length(args[0])
+        if name == 'DEL':
+            return sum(broker.delete(queue) for queue in args)
+        raise BrokerError(f"unknown command '{name}'")
+
+
+class Coordinator:
+    """
+    Hands out evaluation leases to ClusterWorkers and gathers their signals.
+
+    Every asset of a cycle becomes a lease on (asset, interval), pushed onto
+    the shared task queue. The worker that pops it claims it and renews it
+    every heartbeat while its agent runs. A claimed lease that goes
+    `lease_seconds` without renewal (its worker died or hung) is put back at
+    the head of the queue for another worker, up to `max_attempts` times.
+    The clock starts when a lease is offered: one still unclaimed after
+    `lease_seconds` once the task queue has drained was popped by a worker
+    that died before claiming it, and is offered again the same way.
+    Answers are keyed by lease: a second answer to the same lease, a late
+    one from a worker that was given up on, or one left over from an earlier
+    cycle is dropped, so every asset yields exactly one signal and Telegram
+    never sees duplicates. Leases nobody has answered `timeout` seconds
+    into the cycle are reported as HOLD (Error).
+    """
+
+    def __init__(self, broker, prefix='signalgen', lease_seconds=30, max_attempts=3, timeout=300, server=None):
+        self.broker = broker
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.timeout = timeout
+        self.server = server
+        self.name = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+        self.tasks = f"{prefix}:tasks"
+        self.results = f"{prefix}:results:{self.name}"
+        self._cycle = 0
+
+    def evaluate(self, assets, intervals):
+        """
+        Run each asset's agent on whichever worker takes its lease
+
+        Args:
+            assets (list): Asset dicts (name, symbol, type)
+            intervals (dict): Symbol -> bar interval its agent is evaluated on
+
+        Returns:
+            dict: Symbol -> (signal, seconds spent in the agent)
+        """
+        self._cycle += 1
+        deadline = time.monotonic() + self.timeout
+        leases = {}
+        for asset in assets:
+            interval = intervals.get(asset['symbol'], '')
+            lease = f"{self.name}:{self._cycle}:{asset['symbol']}:{interval}"
+            leases[lease] = {'asset': asset, 'interval': interval, 'attempt': 1, 'worker': None}
+            self._offer(lease, leases[lease], deadline)
+
+        results = {}
+        while leases:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            message = self.broker.pop(self.results, min(POLL_SECONDS, remaining))
+            if message is not None:
+                self._receive(json.loads(message), leases, results)
+            self._expire(leases, results, deadline)
+
+        for lease, state in leases.items():
+            logger.error(f"No worker answered lease {lease} within {self.timeout}s")
+            results[state['asset']['symbol']] = ("HOLD (Error: no cluster worker answered)", 0.0)
+        return results
+
+    def close(self):
+        """Stop serving the queues, if this coordinator serves them"""
+        if self.server is not None:
+            self.server.stop()
+            self.server = None
+        self.broker.close()
+
+    def _offer(self, lease, state, deadline, first=False):
+        state['expires'] = time.monotonic() + self.lease_seconds
+        task = {'lease': lease, 'asset': state['asset'], 'interval': state['interval'],
+                'attempt': state['attempt'], 'reply': self.results,
+                # Wall clock, for workers on other hosts to skip tasks of a cycle already over
+                'deadline': time.time() + deadline - time.monotonic()}
+        self.broker.push(self.tasks, json.dumps(task), first=first)
+
+    def _receive(self, message, leases, results):
+        state = leases.get(message.get('lease'))
+        if state is None:
+            if message.get('type') == 'result':
+                metrics.inc('cluster_duplicate_results_total')
+                logger.debug(f"Dropped duplicate result for lease {message.get('lease')} "
+                             f"from worker {message.get('worker')}")
+            return
+        if message['type'] in ('claim', 'renew'):
+            state['worker'] = message['worker']
+            state['expires'] = time.monotonic() + self.lease_seconds
+        elif message['type'] == 'result':
+            del leases[message['lease']]
+            results[state['asset']['symbol']] = (message['signal'], message['seconds'])
+
+    def _expire(self, leases, results, deadline):
+        now = time.monotonic()
+        waiting = None
+        for lease, state in list(leases.items()):
+            if state['expires'] > now:
+                continue
+            if state['worker'] is None:
+                # Unclaimed: it may still be queued behind other tasks
+                if waiting is None:
+                    waiting = self.broker.length(self.tasks)
+                if waiting:
+                    state['expires'] = now + self.lease_seconds
+                    continue
+            if state['attempt'] >= self.max_attempts:
+                logger.error(f"Lease {lease} expired {state['attempt']} times; giving up")
+                del leases[lease]
+                results[state['asset']['symbol']] = ("HOLD (Error: cluster lease expired)", 0.0)
+                continue
+            if state['worker'] is None:
+                logger.warning(f"Lease {lease} was taken but never claimed; reassigning it")
+            else:
+                logger.warning(f"Worker {state['worker']} stopped renewing lease {lease}; reassigning it")
+            metrics.inc('cluster_leases_reassigned_total')
+            state.update(attempt=state['attempt'] + 1, worker=None)
+            self._offer(lease, state, deadline, first=True)
+
+
+class ClusterWorker:
+    """
+    Runs the agents for leases taken from a coordinator's task queue.
+
+    A lease is claimed as soon as it is taken and renewed every
+    `heartbeat_seconds` from a background thread while its agent runs, so
+    the coordinator can tell a slow agent from a dead worker. Agents fetch
+    their own bars into this host's bar store and data cache, and keep their
+    indicator state here between cycles. Workers are interchangeable: start
+    as many as there are cores, on as many hosts as can reach the broker.
+    """
+
+    def __init__(self, broker, prefix='signalgen', heartbeat_seconds=5, name=None, evaluate=None):
+        self.broker = broker
+        self.heartbeat_seconds = heartbeat_seconds
+        self.name = name or f"{socket.gethostname()}-{os.getpid()}"
+        self.tasks = f"{prefix}:tasks"
+        self.evaluated = 0
+        self._evaluate = evaluate or _run_agent
+        self._lease = None
+        self._stop = threading.Event()
+
+    def run(self):
+        """Serve leases until stop() is called"""
+        logger.info(f"Cluster worker {self.name} taking leases from {self.tasks}")
+        heartbeat = threading.Thread(target=self._heartbeat, name='cluster-heartbeat', daemon=True)
+        heartbeat.start()
+        try:
+            while not self._stop.is_set():
+                try:
+                    task = self.broker.pop(self.tasks, POLL_SECONDS)
+                except ConnectionError as e:
+                    logger.error(f"Cluster broker unreachable: {str(e)}")
+                    self._stop.wait(self.heartbeat_seconds)
+                    continue
+                if task is not None:
+                    self._serve(json.loads(task))
+        finally:
+            self._stop.set()
+            heartbeat.join()
+
+    def stop(self):
+        self._stop.set()
+
+    def _serve(self, task):
+        if task['deadline'] < time.time():
+            logger.debug(f"Skipping lease {task['lease']} of a finished cycle")
+            return
+        self._lease = (task['reply'], task['lease'])
+        self._send(task['reply'], {'type': 'claim', 'lease': task['lease'], 'worker': self.name})
+        start = time.perf_counter()
+        try:
+            signal = self._evaluate(task['asset'])
+        except Exception as e:
+            signal = f"HOLD (Error: {str(e)})"
+        finally:
+            self._lease = None
+        self.evaluated += 1
+        self._send(task['reply'], {'type': 'result', 'lease': task['lease'], 'worker': self.name,
+                                   'signal': signal, 'seconds': time.perf_counter() - start})
+
+    def _heartbeat(self):
+        while not self._stop.wait(self.heartbeat_seconds):
+            lease = self._lease
+            if lease is not None:
+                self._send(lease[0], {'type': 'renew', 'lease': lease[1], 'worker': self.name})
+
+    def _send(self, queue, message):
+        try:
+            self.broker.push(queue, json.dumps(message))
+        except ConnectionError as e:
+            logger.error(f"Could not reach the cluster broker: {str(e)}")
+
+
+def _run_agent(asset):
+    from .signal_generator import agent_for
+
+    return agent_for(asset['type']).generate_signal(asset['symbol'])
+
+
+def open_coordinator(config):
+    """
+    Coordinator for the [Cluster] section
+
+    With transport = tcp the coordinator serves the queues itself at
+    host:port; with transport = redis they live on the Redis-compatible
+    broker there.
+
+    Args:
+        config: ConfigParser or dict with a [Cluster] section (transport, host,
+            port, prefix, lease_seconds, max_attempts, timeout)
+
+    Returns:
+        Coordinator: Ready to evaluate
+    """
+    settings = config['Cluster'] if 'Cluster' in config else {}
+    host = settings.get('host', '127.0.0.1')
+    port = int(settings.get('port', DEFAULT_PORT))
+    server = None
+    if settings.get('transport', 'tcp') == 'redis':
+        broker = RedisBroker(host, port)
+    else:
+        server = BrokerServer(host, port).start()
+        broker = server.broker
+    return Coordinator(broker, settings.get('prefix', 'signalgen'),
+                       lease_seconds=float(settings.get('lease_seconds', 30)),
+                       max_attempts=int(settings.get('max_attempts', 3)),
+                       timeout=float(settings.get('timeout', 300)), server=server)
+
+
+def open_worker(config):
+    """ClusterWorker taking leases from the queues at [Cluster] host:port"""
+    settings = config['Cluster'] if 'Cluster' in config else {}
+    broker = RedisBroker(settings.get('host', '127.0.0.1'), int(settings.get('port', DEFAULT_PORT)))
+    return ClusterWorker(broker, settings.get('prefix', 'signalgen'),
+                         heartbeat_seconds=float(settings.get('heartbeat_seconds', 5)))
@@ -4,7 +4,7 @@ import os
 class ConfigManager:
     @staticmethod
     def load_config():
-        config = configparser.ConfigParser()
+        config = configparser.ConfigParser(inline_comment_prefixes=('#',))
         if not os.path.exists('config/config.ini'):
             raise FileNotFoundError("config.ini not found. Create from template.")
         config.read('config/config.ini')
@@ -1,30 +1,96 @@
-import yfinance as yf
 import pandas as pd
-import numpy as np
 import time
 import os
+import shutil
 import json
-import requests
+import threading
+import configparser
 from datetime import datetime, timedelta
 from .config_manager import ConfigManager
+from .bar_store import INTERVAL_SECONDS, period_to_days, split_batch
+from .bar_cache import get_bar_cache, INDEX_FILE
+from .rate_limiter import rate_limiter
+from .indicator_engine import indicator_engine, SMA, RSI, MACD, BBANDS
+from .resampler import resample, session_for
+from .market_calendar import market_calendar
+from .lazy_module import LazyModule
+from .metrics import metrics
+from .single_flight import SingleFlight
+from .http_client import HttpClient
+from .lookback import lookback, bars_in
+from .provider_json import parse_alpha_vantage, parse_twelvedata
 import logging
 
-# Configure logging
-logging.basicConfig(
-    filename='logs/data_fetcher.log',
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
 logger = logging.getLogger(__name__)
 
+# Provider clients are imported on the first request, not when the module loads
+yf = LazyModule('yfinance')
+
+LOG_FILE = 'logs/data_fetcher.log'
+
+# Intervals no provider serves, built locally from a finer base series
+DERIVED_INTERVALS = {
+    '2h': '60m',
+    '4h': '60m'
+}
+
+# Provider endpoints; yfinance goes through the library unless a URL is set
+BASE_URLS = {
+    'yfinance': None,
+    'alpha_vantage': 'https://www.alphavantage.co',
+    'twelvedata': 'https://api.twelvedata.com'
+}
+
+# Column names of yfinance bars, as every provider's bars are cached
+YFINANCE_COLUMNS = {
+    'Open': 'open',
+    'High': 'high',
+    'Low': 'low',
+    'Close': 'close',
+    'Volume': 'volume'
+}
+
+# Concurrent requests each provider allows unless [Providers] <provider>_concurrency says otherwise
+PROVIDER_CONCURRENCY = {'yfinance': 4, 'alpha_vantage': 1, 'twelvedata': 2}
+
+# Indicators reported by get_technical_indicators
+TECHNICAL_INDICATORS = [RSI(14), MACD(12, 26, 9), BBANDS(20, 2.0), SMA(50), SMA(200)]
+
+# Bars an Alpha Vantage compact response must cover; it holds the latest 100
+COMPACT_BARS = 90
+
+# Most bars one Twelve Data time_series response holds
+TWELVEDATA_MAX_BARS = 5000
+
 class DataFetcher:
     def __init__(self):
-        self.config = ConfigManager.load_config()
+        try:
+            self.config = ConfigManager.load_config()
+        except FileNotFoundError as e:
+            # Every setting has a default; yfinance needs no API key
+            logger.warning(f"{str(e)} Using default settings")
+            self.config = configparser.ConfigParser()
         self.cache_dir = 'data_cache'
         self._create_cache_dir()
         self.api_keys = self._load_api_keys()
+        self.base_urls = self._load_base_urls()
+        self.cache = get_bar_cache(self.config.get('Cache', 'backend', fallback='columnar'), self.cache_dir)
+        self.incremental = self.config.getboolean('Cache', 'incremental', fallback=True)
+        self.provider_concurrency = {
+            provider: self.config.getint('Providers', f'{provider}_concurrency', fallback=default)
+            for provider, default in PROVIDER_CONCURRENCY.items()
+        }
+        self.provider_slots = self._load_provider_slots()
+        # Keep-alive connections to the REST providers, enough for every request slot
+        self.http = HttpClient.from_config(self.config, pool_size=max(self.provider_concurrency.values()))
+        rate_limiter.configure(self.config)
+        lookback.configure(self.config)
         self.request_count = 0
-        self.last_request_time = time.time()
+        # Unix time each cached series was last fetched or refreshed
+        self._fetched_at = {}
+        # Concurrent requests for the same series or price share one provider call
+        self._history_calls = SingleFlight('historical')
+        self._price_calls = SingleFlight('price')
         
     def _create_cache_dir(self):
         """Create cache directory if it doesn't exist"""
@@ -51,67 +117,97 @@ class DataFetcher:
             keys = {'alpha_vantage': 'demo', 'twelvedata': 'demo'}
         return keys
     
-    def _rate_limit(self):
-        """Enforce rate limiting to avoid API bans"""
-        current_time = time.time()
-        elapsed = current_time - self.last_request_time
+    def _load_base_urls(self):
+        """
+        Load provider endpoints, e.g. to point every provider at a replay server
         
-        # Free APIs typically allow 5 requests per minute
-        if elapsed < 12:  # 12 seconds between requests = 5 per minute
-            sleep_time = 12 - elapsed
-            time.sleep(sleep_time)
-            logger.debug(f"Rate limited: Slept for {sleep_time:.2f} seconds")
-            
-        self.last_request_time = time.time()
+        <PROVIDER>_URL environment variables are overridden by <provider>_url
+        options in [Providers].
+        """
+        urls = {}
+        for provider, default in BASE_URLS.items():
+            url = os.getenv(f'{provider.upper()}_URL', default)
+            url = self.config.get('Providers', f'{provider}_url', fallback=url)
+            urls[provider] = url.rstrip('/') if url else None
+            if url != default:
+                logger.info(f"Using {url} for {provider}")
+        return urls
+    
+    def _load_provider_slots(self):
+        """Create a semaphore capping concurrent requests to each provider"""
+        return {
+            provider: threading.BoundedSemaphore(concurrency)
+            for provider, concurrency in self.provider_concurrency.items()
+        }
+    
+    def _rate_limit(self, provider='yfinance'):
+        """Enforce the provider's rate limit to avoid API bans"""
+        rate_limiter.acquire(provider)
         self.request_count += 1
         
-    def get_historical_data(self, symbol, period='1d', interval='15m', source='auto'):
+    def get_historical_data(self, symbol, period='1d', interval='15m', source='auto', incremental=None):
         """
         Get historical price data for a symbol
         
         Args:
             symbol (str): Financial instrument symbol
             period (str): Time period (1d, 5d, 1mo, 3mo, 6mo, 1y, 2y, 5y, 10y, ytd, max)
-            interval (str): Data interval (1m, 2m, 5m, 15m, 30m, 60m, 90m, 1h, 1d, 5d, 1wk, 1mo, 3mo)
+            interval (str): Data interval (1m, 2m, 5m, 15m, 30m, 60m, 90m, 1h, 2h, 4h, 1d, 5d, 1wk, 1mo, 3mo);
+                2h and 4h are resampled from 60m bars
             source (str): Data source (yfinance, alpha_vantage, twelvedata, auto)
+            incremental (bool): Refresh stale cache with only the new bars
+                (defaults to the [Cache] incremental setting)
             
         Returns:
-            pd.DataFrame: Historical data with OHLCV columns
+            pd.DataFrame: Historical data with OHLCV columns. Callers asking for
+                the same series while it is being fetched wait for that request
+                and get the same frame, so it must not be modified.
         """
-        cache_key = f"{symbol}_{period}_{interval}.csv"
-        cache_path = os.path.join(self.cache_dir, cache_key)
+        return self._history_calls.do((symbol, period, interval, source, incremental),
+                                      self._get_historical_data, symbol, period, interval, source, incremental)
+    
+    async def get_historical_data_async(self, symbol, period='1d', interval='15m', source='auto', incremental=None):
+        """get_historical_data() for asyncio callers, sharing in-flight requests with threaded ones"""
+        return await self._history_calls.do_async((symbol, period, interval, source, incremental),
+                                                  self._get_historical_data, symbol, period, interval, source,
+                                                  incremental)
+    
+    def _get_historical_data(self, symbol, period, interval, source, incremental):
+        if interval in DERIVED_INTERVALS:
+            base = self.get_historical_data(symbol, period, DERIVED_INTERVALS[interval], source, incremental)
+            return resample(base, interval, session_for(self._add_exchange_suffix(symbol)))
         
-        # Check cache first
-        if os.path.exists(cache_path):
-            try:
-                data = pd.read_csv(cache_path, parse_dates=True, index_col='Date')
-                if not data.empty:
-                    logger.info(f"Loaded {symbol} data from cache: {cache_path}")
-                    return data
-            except Exception as e:
-                logger.warning(f"Error reading cache file {cache_path}: {str(e)}")
+        cache_key = f"{symbol}_{period}_{interval}"
+        cache_path = self.cache.path(cache_key)
+        if incremental is None:
+            incremental = self.incremental
         
         # Determine best source
         if source == 'auto':
             source = self._select_data_source(symbol, interval)
         
+        # Check cache first
+        cached = self._normalize_index(self.cache.load(cache_key))
+        if not cached.empty:
+            if not incremental or self._is_fresh(cached, interval):
+                metrics.inc('cache_requests_total', layer='data_fetcher', result='hit')
+                logger.info(f"Loaded {symbol} data from cache: {cache_path}")
+                return self._trim(cached, period)
+            if self._market_closed_since(symbol, cached, interval, cache_key):
+                metrics.inc('cache_requests_total', layer='data_fetcher', result='hit')
+                logger.info(f"Market closed since {symbol} was fetched, loaded from cache: {cache_path}")
+                return self._trim(cached, period)
+            metrics.inc('cache_requests_total', layer='data_fetcher', result='refresh')
+            return self._refresh_cache(symbol, period, interval, source, cached, cache_key)
+        
         # Fetch data
+        metrics.inc('cache_requests_total', layer='data_fetcher', result='miss')
         try:
-            self._rate_limit()
-            
-            if source == 'yfinance':
-                data = self._fetch_yfinance(symbol, period, interval)
-            elif source == 'alpha_vantage':
-                data = self._fetch_alpha_vantage(symbol, interval)
-            elif source == 'twelvedata':
-                data = self._fetch_twelvedata(symbol, period, interval)
-            else:
-                raise ValueError(f"Invalid data source: {source}")
+            data = self._normalize_index(self._fetch(symbol, period, interval, source))
             
             # Save to cache
             if not data.empty:
-                data.to_csv(cache_path)
-                logger.info(f"Cached {symbol} data: {cache_path}")
+                self._store(symbol, data, cache_key)
                 
             return data
         
@@ -119,6 +215,182 @@ class DataFetcher:
             logger.error(f"Error fetching data for {symbol}: {str(e)}")
             return pd.DataFrame()
     
+    def get_historical_batch(self, symbols, period='1d', interval='15m'):
+        """
+        get_historical_data() for many yfinance symbols, in as few requests as possible
+        
+        Series the cache can answer (fresh, or their market has stayed closed)
+        are loaded from it. Stale ones are refreshed with one request for the
+        bars since the oldest of their last bars, or fetched again whole when
+        [Cache] incremental is off; uncached ones are fetched with one more.
+        Symbols go to yfinance as given, without an exchange suffix; with a
+        yfinance URL set they are asked for one at a time.
+        
+        Args:
+            symbols (list): yfinance symbols
+            period (str): Time period (7d, 1mo, 1y, ...)
+            interval (str): Data interval yfinance serves (1m, 15m, 60m, 1d, ...)
+            
+        Returns:
+            dict: Symbol -> bars shaped like get_historical_data's, for the
+                symbols that have any
+        
+        Raises:
+            Exception: The request for the uncached series failed (a failed
+                refresh serves the stale cache instead)
+        """
+        frames = {}
+        stale = {}
+        missing = []
+        for symbol in symbols:
+            cache_key = f"{symbol}_{period}_{interval}"
+            cached = self._normalize_index(self.cache.load(cache_key))
+            if cached.empty:
+                metrics.inc('cache_requests_total', layer='data_fetcher', result='miss')
+                missing.append(symbol)
+            elif self._is_fresh(cached, interval) or \
+                    self._market_closed_since(symbol, cached, interval, cache_key, session_for(symbol)):
+                metrics.inc('cache_requests_total', layer='data_fetcher', result='hit')
+                frames[symbol] = self._trim(cached, period)
+            elif self.incremental:
+                metrics.inc('cache_requests_total', layer='data_fetcher', result='refresh')
+                stale[symbol] = cached
+            else:
+                metrics.inc('cache_requests_total', layer='data_fetcher', result='miss')
+                missing.append(symbol)
+        
+        if stale:
+            since = min(cached.index[-1] for cached in stale.values())
+            try:
+                deltas = self._fetch_batch(list(stale), period, interval, since=since)
+            except Exception as e:
+                logger.warning(f"Incremental fetch failed for {list(stale)}, serving stale cache: {str(e)}")
+                deltas = None
+            for symbol, cached in stale.items():
+                if deltas is None:
+                    frames[symbol] = self._trim(cached, period)
+                    continue
+                delta = deltas.get(symbol, pd.DataFrame())
+                if not delta.empty:
+                    delta = delta[delta.index >= cached.index[-1]]
+                frames[symbol] = self._append_delta(symbol, period, cached, delta, f"{symbol}_{period}_{interval}")
+        
+        if missing:
+            for symbol, data in self._fetch_batch(missing, period, interval).items():
+                self._store(symbol, data, f"{symbol}_{period}_{interval}")
+                frames[symbol] = data
+        return frames
+    
+    def _fetch_batch(self, symbols, period, interval, since=None):
+        """Fetch yfinance bars for several symbols with one request; symbol -> bars"""
+        with self.provider_slots['yfinance']:
+            self._rate_limit('yfinance')
+            try:
+                with metrics.timer('fetch_seconds', provider='yfinance'):
+                    if self.base_urls['yfinance']:
+                        # A chart endpoint serves one symbol per request
+                        frames = {}
+                        for i, symbol in enumerate(symbols):
+                            if i:
+                                self._rate_limit('yfinance')
+                            frames[symbol] = self._fetch_yahoo_chart(symbol, period, interval, since=since)
+                    else:
+                        logger.info(f"Fetching {len(symbols)} symbols from Yahoo Finance "
+                                    f"({since or period}, {interval})")
+                        window = {'period': period} if since is None else {'start': since}
+                        data = yf.download(symbols, interval=interval, group_by='ticker', progress=False, **window)
+                        frames = split_batch(data, symbols)
+            except Exception:
+                metrics.inc('fetch_errors_total', provider='yfinance')
+                raise
+        return {symbol: self._normalize_index(frame.rename(columns=YFINANCE_COLUMNS))
+                for symbol, frame in frames.items() if not frame.empty}
+    
+    def _store(self, symbol, data, cache_key):
+        """Replace a cached series with freshly fetched bars"""
+        self.cache.store(cache_key, data)
+        self._fetched_at[cache_key] = time.time()
+        logger.info(f"Cached {symbol} data: {self.cache.path(cache_key)}")
+    
+    def _fetch(self, symbol, period, interval, source, since=None):
+        """Fetch bars from one provider, optionally only those at or after `since`"""
+        if source not in self.provider_slots:
+            raise ValueError(f"Invalid data source: {source}")
+        
+        with self.provider_slots[source]:
+            self._rate_limit(source)
+            
+            try:
+                with metrics.timer('fetch_seconds', provider=source):
+                    if source == 'yfinance':
+                        return self._fetch_yfinance(symbol, period, interval, since=since)
+                    elif source == 'alpha_vantage':
+                        return self._fetch_alpha_vantage(symbol, period, interval, since=since)
+                    return self._fetch_twelvedata(symbol, period, interval, since=since)
+            except Exception:
+                metrics.inc('fetch_errors_total', provider=source)
+                raise
+    
+    def _is_fresh(self, data, interval):
+        """A series is fresh until a bar newer than its last one can exist"""
+        age = pd.Timestamp.now(tz='UTC') - data.index[-1]
+        return age < pd.Timedelta(seconds=INTERVAL_SECONDS.get(interval, 60))
+    
+    def _market_closed_since(self, symbol, cached, interval, cache_key, asset_type=None):
+        """
+        Whether the symbol's market has stayed closed since the series was
+        last fetched, so a provider cannot have any new bar for it
+        
+        The market is guessed from the symbol unless `asset_type` names it.
+        """
+        since = self._fetched_at.get(cache_key)
+        if since is None:
+            # Not fetched by this process: the last cached bar must have closed
+            since = cached.index[-1].timestamp() + INTERVAL_SECONDS.get(interval, 60)
+        asset_type = asset_type or session_for(self._add_exchange_suffix(symbol))
+        return not market_calendar.open_between(asset_type, since, time.time())
+    
+    def _refresh_cache(self, symbol, period, interval, source, cached, cache_key):
+        """Fetch the bars after the last cached one and append them to the cache"""
+        since = cached.index[-1]
+        
+        try:
+            delta = self._normalize_index(self._fetch(symbol, period, interval, source, since=since))
+        except Exception as e:
+            logger.warning(f"Incremental fetch failed for {symbol}, serving stale cache: {str(e)}")
+            return self._trim(cached, period)
+        return self._append_delta(symbol, period, cached, delta, cache_key)
+    
+    def _append_delta(self, symbol, period, cached, delta, cache_key):
+        """Merge freshly fetched bars into a cached series and append them to the cache"""
+        self._fetched_at[cache_key] = time.time()
+        if delta.empty:
+            return self._trim(cached, period)
+        delta = delta[cached.columns.intersection(delta.columns)]
+        data = self._merge_bars(cached, delta, period)
+        self.cache.append(cache_key, delta, max_rows=len(data))
+        logger.info(f"Appended {len(delta)} bars to {symbol} cache: {self.cache.path(cache_key)}")
+        return data
+    
+    def _merge_bars(self, cached, delta, period):
+        """Append new bars, replacing overlapping ones and trimming to the period"""
+        data = pd.concat([cached, delta])
+        data = data[~data.index.duplicated(keep='last')].sort_index()
+        return self._trim(data, period)
+    
+    def _trim(self, data, period):
+        """Slice a series down to the requested period without copying it"""
+        cutoff = data.index[-1] - pd.Timedelta(days=period_to_days(period))
+        return data.iloc[data.index.searchsorted(cutoff, side='right'):]
+    
+    def _normalize_index(self, data):
+        """Convert the index to UTC timestamps so cached and new bars compare cleanly"""
+        if data.empty or (isinstance(data.index, pd.DatetimeIndex) and str(data.index.tz) == 'UTC'):
+            return data
+        index = pd.to_datetime(data.index, utc=True)
+        index.name = 'Date'
+        return data.set_axis(index, axis=0)
+    
     def _select_data_source(self, symbol, interval):
         """Select the best available data source for the request"""
         # Use premium sources for crypto and intraday data
@@ -131,9 +403,9 @@ class DataFetcher:
         # For other cases, yfinance is reliable and free
         return 'yfinance'
     
-    def _fetch_yfinance(self, symbol, period, interval):
+    def _fetch_yfinance(self, symbol, period, interval, since=None):
         """Fetch data using Yahoo Finance"""
-        logger.info(f"Fetching {symbol} from Yahoo Finance ({period}, {interval})")
+        logger.info(f"Fetching {symbol} from Yahoo Finance ({since or period}, {interval})")
         
         # Handle different symbol formats
         if symbol.endswith('=X'):
@@ -144,27 +416,61 @@ class DataFetcher:
                 symbol = self._add_exchange_suffix(symbol)
             ticker = yf.Ticker(symbol)
         
-        data = ticker.history(period=period, interval=interval, actions=False)
+        if self.base_urls['yfinance']:
+            data = self._fetch_yahoo_chart(symbol, period, interval, since=since)
+        elif since is not None:
+            data = ticker.history(start=since, interval=interval, actions=False)
+        else:
+            data = ticker.history(period=period, interval=interval, actions=False)
         
         # Handle empty data
         if data.empty:
             # Try without suffix if we added one
             if symbol != self._add_exchange_suffix(symbol):
-                return self._fetch_yfinance(symbol.split('.')[0], period, interval)
+                return self._fetch_yfinance(symbol.split('.')[0], period, interval, since=since)
+            if since is not None:
+                return pd.DataFrame()
             raise ValueError("No data returned from Yahoo Finance")
         
         # Clean and format data
         data.index.name = 'Date'
-        data.rename(columns={
-            'Open': 'open',
-            'High': 'high',
-            'Low': 'low',
-            'Close': 'close',
-            'Volume': 'volume'
-        }, inplace=True)
+        data.rename(columns=YFINANCE_COLUMNS, inplace=True)
         
         return data
     
+    def _fetch_yahoo_chart(self, symbol, period, interval, since=None):
+        """Fetch bars from a Yahoo chart endpoint directly, shaped like Ticker.history"""
+        params = {'interval': interval}
+        if since is not None:
+            params['period1'] = int(pd.Timestamp(since).timestamp())
+            params['period2'] = int(time.time())
+        else:
+            params['range'] = period
+        
+        response = self.http.get(f"{self.base_urls['yfinance']}/v8/finance/chart/{symbol}", params=params,
+                                 before_retry=lambda: self._rate_limit('yfinance'))
+        response.raise_for_status()
+        chart = response.json()['chart']
+        if chart.get('error') or not chart.get('result'):
+            raise ValueError(f"Yahoo chart error: {(chart.get('error') or {}).get('description', 'no result')}")
+        
+        result = chart['result'][0]
+        if not result.get('timestamp'):
+            return pd.DataFrame()
+        quote = result['indicators']['quote'][0]
+        index = pd.to_datetime(result['timestamp'], unit='s', utc=True)
+        timezone = result.get('meta', {}).get('exchangeTimezoneName')
+        if timezone:
+            index = index.tz_convert(timezone)
+        
+        return pd.DataFrame({
+            'Open': quote['open'],
+            'High': quote['high'],
+            'Low': quote['low'],
+            'Close': quote['close'],
+            'Volume': quote['volume']
+        }, index=index, dtype=float).dropna(how='all')
+    
     def _add_exchange_suffix(self, symbol):
         """Add exchange suffix to symbol for better recognition"""
         # Map symbols to likely exchanges
@@ -178,9 +484,17 @@ class DataFetcher:
             return f"{symbol}.AX"  # Assume Australian exchange for short symbols
         return symbol
     
-    def _fetch_alpha_vantage(self, symbol, interval):
+    def _asset_type(self, symbol):
+        """Market calendar of a provider symbol (IBM, EUR/USD, BTC/USD, ...)"""
+        return session_for(self._add_exchange_suffix(symbol.replace('/', '')))
+    
+    def _period_bars(self, symbol, period, interval):
+        """Bars of `interval` the symbol's market trades in `period`"""
+        return bars_in(self._asset_type(symbol), interval, period_to_days(period))
+    
+    def _fetch_alpha_vantage(self, symbol, period, interval, since=None):
         """Fetch data using Alpha Vantage API"""
-        logger.info(f"Fetching {symbol} from Alpha Vantage ({interval})")
+        logger.info(f"Fetching {symbol} from Alpha Vantage ({since or period}, {interval})")
         
         # Map intervals to Alpha Vantage parameters
         interval_map = {
@@ -200,18 +514,28 @@ class DataFetcher:
         # API endpoint selection
         function = 'TIME_SERIES_INTRADAY' if 'min' in av_interval else 'TIME_SERIES_DAILY'
         
+        # The compact response holds the latest 100 bars, enough for a short gap or period
+        outputsize = 'full'
+        if since is not None:
+            gap = pd.Timestamp.now(tz='UTC') - pd.Timestamp(since)
+            if gap < pd.Timedelta(seconds=INTERVAL_SECONDS[interval] * COMPACT_BARS):
+                outputsize = 'compact'
+        elif period != 'max' and self._period_bars(symbol, period, interval) <= COMPACT_BARS:
+            outputsize = 'compact'
+        
         params = {
             'function': function,
             'symbol': symbol,
             'interval': av_interval if 'min' in av_interval else None,
-            'outputsize': 'full',
+            'outputsize': outputsize,
             'apikey': self.api_keys['alpha_vantage']
         }
         
         # Remove None values
         params = {k: v for k, v in params.items() if v is not None}
         
-        response = requests.get('https://www.alphavantage.co/query', params=params)
+        response = self.http.get(f"{self.base_urls['alpha_vantage']}/query", params=params,
+                                 before_retry=lambda: self._rate_limit('alpha_vantage'))
         response.raise_for_status()
         data = response.json()
         
@@ -225,41 +549,18 @@ class DataFetcher:
             logger.error(f"Alpha Vantage error: {data.get('Note', 'Unknown error')}")
             return pd.DataFrame()
         
-        df = pd.DataFrame.from_dict(data[time_key], orient='index')
-        df.index = pd.to_datetime(df.index)
-        df.index.name = 'Date'
-        
-        # Rename columns
-        df = df.rename(columns={
-            '1. open': 'open',
-            '2. high': 'high',
-            '3. low': 'low',
-            '4. close': 'close',
-            '5. volume': 'volume'
-        })
-        
-        # Convert to numeric
-        df = df.apply(pd.to_numeric)
-        
-        # Sort chronologically
-        return df.sort_index()
+        # Timestamps are local to the exchange named in the metadata
+        meta = data.get('Meta Data', {})
+        timezone = next((v for k, v in meta.items() if k.endswith('Time Zone')), None)
+        df = parse_alpha_vantage(data[time_key], timezone)
+        if since is not None:
+            df = df[self._normalize_index(df).index >= since]
+        return df
     
-    def _fetch_twelvedata(self, symbol, period, interval):
+    def _fetch_twelvedata(self, symbol, period, interval, since=None):
         """Fetch data using Twelve Data API"""
         logger.info(f"Fetching {symbol} from Twelve Data ({period}, {interval})")
         
-        # Map periods to Twelve Data format
-        period_map = {
-            '1d': '1',
-            '5d': '5',
-            '1mo': '30',
-            '3mo': '90',
-            '6mo': '180',
-            '1y': '365',
-            '2y': '730',
-            'max': 'max'
-        }
-        
         # Convert interval to Twelve Data format
         interval_map = {
             '1m': '1min',
@@ -277,16 +578,27 @@ class DataFetcher:
         if not td_interval:
             raise ValueError(f"Unsupported interval for Twelve Data: {interval}")
         
-        td_period = period_map.get(period, '365')  # Default to 1 year
+        # outputsize counts bars: as many as the market trades in the period
+        if period == 'max':
+            outputsize = TWELVEDATA_MAX_BARS
+        else:
+            outputsize = min(max(self._period_bars(symbol, period, interval), 1), TWELVEDATA_MAX_BARS)
         
         params = {
             'symbol': symbol,
             'interval': td_interval,
-            'outputsize': td_period,
+            'outputsize': str(outputsize),
+            'timezone': 'UTC',
             'apikey': self.api_keys['twelvedata']
         }
         
-        response = requests.get('https://api.twelvedata.com/time_series', params=params)
+        # Only ask for bars from the last cached one onwards
+        if since is not None:
+            params['start_date'] = pd.Timestamp(since).strftime('%Y-%m-%d %H:%M:%S')
+            params['outputsize'] = str(TWELVEDATA_MAX_BARS)
+        
+        response = self.http.get(f"{self.base_urls['twelvedata']}/time_series", params=params,
+                                 before_retry=lambda: self._rate_limit('twelvedata'))
         response.raise_for_status()
         data = response.json()
         
@@ -294,29 +606,18 @@ class DataFetcher:
             logger.error(f"Twelve Data error: {data.get('message', 'Unknown error')}")
             return pd.DataFrame()
         
-        # Create DataFrame
-        df = pd.DataFrame(data['values'])
-        df['datetime'] = pd.to_datetime(df['datetime'])
-        df.set_index('datetime', inplace=True)
-        df.index.name = 'Date'
-        
-        # Rename columns
-        df = df.rename(columns={
-            'open': 'open',
-            'high': 'high',
-            'low': 'low',
-            'close': 'close',
-            'volume': 'volume'
-        })
-        
-        # Convert to numeric
-        df = df.apply(pd.to_numeric)
-        
-        # Sort chronologically
-        return df.sort_index()
+        # Timestamps are in the UTC the request asked for, left naive
+        return parse_twelvedata(data['values'])
     
     def get_real_time_price(self, symbol):
-        """Get real-time price for a symbol"""
+        """Get real-time price for a symbol; concurrent calls for it share one request"""
+        return self._price_calls.do(symbol, self._get_real_time_price, symbol)
+    
+    async def get_real_time_price_async(self, symbol):
+        """get_real_time_price() for asyncio callers"""
+        return await self._price_calls.do_async(symbol, self._get_real_time_price, symbol)
+    
+    def _get_real_time_price(self, symbol):
         try:
             self._rate_limit()
             ticker = yf.Ticker(symbol)
@@ -328,11 +629,15 @@ class DataFetcher:
         return None
     
     def get_multiple_prices(self, symbols):
-        """Get real-time prices for multiple symbols efficiently"""
+        """Get real-time prices for multiple symbols with a single request"""
         try:
             self._rate_limit()
-            tickers = yf.Tickers(" ".join(symbols))
-            return tickers.download(period='1d', interval='1m', group_by='ticker')
+            data = yf.download(list(symbols), period='1d', interval='1m', group_by='ticker', progress=False)
+            return {
+                symbol: frame['Close'].dropna().iloc[-1]
+                for symbol, frame in split_batch(data, list(symbols)).items()
+                if not frame['Close'].dropna().empty
+            }
         except Exception as e:
             logger.error(f"Error getting multiple prices: {str(e)}")
             return {}
@@ -346,38 +651,22 @@ class DataFetcher:
         if data.empty:
             return {}
         
-        # Calculate indicators
-        indicators = {}
-        
-        # RSI (14 periods)
-        delta = data['close'].diff()
-        gain = (delta.where(delta > 0, 0)).rolling(window=14).mean()
-        loss = (-delta.where(delta < 0, 0)).rolling(window=14).mean()
-        rs = gain / loss
-        indicators['RSI'] = 100 - (100 / (1 + rs)).iloc[-1]
-        
-        # MACD (12, 26, 9)
-        exp12 = data['close'].ewm(span=12, adjust=False).mean()
-        exp26 = data['close'].ewm(span=26, adjust=False).mean()
-        macd = exp12 - exp26
-        signal = macd.ewm(span=9, adjust=False).mean()
-        indicators['MACD'] = macd.iloc[-1]
-        indicators['MACD_Signal'] = signal.iloc[-1]
-        indicators['MACD_Hist'] = (macd - signal).iloc[-1]
-        
-        # Bollinger Bands (20 periods)
-        sma20 = data['close'].rolling(window=20).mean()
-        std20 = data['close'].rolling(window=20).std()
-        indicators['BB_Upper'] = (sma20 + (std20 * 2)).iloc[-1]
-        indicators['BB_Middle'] = sma20.iloc[-1]
-        indicators['BB_Lower'] = (sma20 - (std20 * 2)).iloc[-1]
+        # Calculate indicators (incrementally, matching TA-Lib)
+        values = indicator_engine.update(symbol, interval, data, TECHNICAL_INDICATORS)
+        indicators = {
+            'RSI': values['RSI'][-1],
+            'MACD': values['MACD'][-1],
+            'MACD_Signal': values['MACD_signal'][-1],
+            'MACD_Hist': values['MACD_hist'][-1],
+            'BB_Upper': values['BB_upper'][-1],
+            'BB_Middle': values['BB_middle'][-1],
+            'BB_Lower': values['BB_lower'][-1],
+            'MA_50': values['SMA_50'][-1],
+            'MA_200': values['SMA_200'][-1]
+        }
         indicators['BB_Percent'] = ((data['close'].iloc[-1] - indicators['BB_Lower']) / 
                                    (indicators['BB_Upper'] - indicators['BB_Lower']))
         
-        # Moving Averages
-        indicators['MA_50'] = data['close'].rolling(window=50).mean().iloc[-1]
-        indicators['MA_200'] = data['close'].rolling(window=200).mean().iloc[-1]
-        
         # Volume analysis
         indicators['Volume_Avg'] = data['volume'].rolling(window=20).mean().iloc[-1]
         indicators['Volume_Ratio'] = data['volume'].iloc[-1] / indicators['Volume_Avg']
@@ -412,16 +701,56 @@ class DataFetcher:
                         deleted += 1
                     except Exception as e:
                         logger.error(f"Error deleting {file_path}: {str(e)}")
+            elif os.path.isdir(file_path):
+                # Columnar series are written in place, so check the index file
+                index_path = os.path.join(file_path, INDEX_FILE)
+                file_time = os.path.getmtime(index_path if os.path.exists(index_path) else file_path)
+                if file_time < cutoff:
+                    try:
+                        shutil.rmtree(file_path)
+                        deleted += 1
+                    except Exception as e:
+                        logger.error(f"Error deleting {file_path}: {str(e)}")
         
         logger.info(f"Cleared cache: Deleted {deleted} files older than {older_than_days} days")
         return deleted
 
-# Singleton instance for easy access
-data_fetcher = DataFetcher()
+# Shared instance, built on first use by get_data_fetcher()
+_data_fetcher = None
+_data_fetcher_lock = threading.Lock()
+
+
+def get_data_fetcher():
+    """
+    The shared DataFetcher, created (and file logging set up) on first call
+
+    Importing this module stays cheap and works without config/config.ini.
+    """
+    global _data_fetcher
+    if _data_fetcher is None:
+        with _data_fetcher_lock:
+            if _data_fetcher is None:
+                os.makedirs(os.path.dirname(LOG_FILE), exist_ok=True)
+                logging.basicConfig(
+                    filename=LOG_FILE,
+                    level=logging.INFO,
+                    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+                )
+                _data_fetcher = DataFetcher()
+    return _data_fetcher
+
+
+def __getattr__(name):
+    # `from core.data_fetcher import data_fetcher` keeps working, lazily
+    if name == 'data_fetcher':
+        return get_data_fetcher()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 if __name__ == "__main__":
     # Test the data fetcher
     print("Testing DataFetcher...")
+    data_fetcher = get_data_fetcher()
     
     # Test different asset types
     assets = [
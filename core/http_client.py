@@ -0,0 +1,106 @@
+import threading
+import time
+import logging
+from .lazy_module import LazyModule
+
+logger = logging.getLogger(__name__)
+
+requests = LazyModule('requests')
+
+# Responses worth retrying; quota answers (429) are left to the rate limiter
+RETRY_STATUSES = (500, 502, 503, 504)
+
+
+class HttpClient:
+    """
+    Pooled, keep-alive HTTP session for the REST providers.
+
+    One requests.Session keeps TCP/TLS connections to each provider open
+    between calls, up to `pool_size` per host, so only the first request
+    pays for the handshake. Every request asks for a gzip body, gets a
+    connect and a read timeout, and is retried on connection failures and
+    5xx responses with exponential backoff. Retries are made here rather
+    than by urllib3 so each one can take a rate-limiter token first, like
+    any other request to a quota-limited provider. The last failed
+    response is returned as-is for raise_for_status(). requests is imported
+    and the session built on the first request.
+    """
+
+    def __init__(self, pool_size=4, connect_timeout=5.0, read_timeout=30.0, retries=3, backoff=0.5):
+        self.pool_size = pool_size
+        self.timeout = (connect_timeout, read_timeout)
+        self.retries = retries
+        self.backoff = backoff
+        self._session = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config, pool_size=4):
+        """
+        Client for the [Providers] section
+
+        Args:
+            config: ConfigParser with an optional [Providers] section
+                (connect_timeout, read_timeout, http_retries, http_backoff)
+            pool_size (int): Connections kept open per host
+        """
+        return cls(pool_size,
+                   config.getfloat('Providers', 'connect_timeout', fallback=5.0),
+                   config.getfloat('Providers', 'read_timeout', fallback=30.0),
+                   config.getint('Providers', 'http_retries', fallback=3),
+                   config.getfloat('Providers', 'http_backoff', fallback=0.5))
+
+    @property
+    def session(self):
+        if self._session is None:
+            with self._lock:
+                if self._session is None:
+                    self._session = self._build_session()
+        return self._session
+
+    def get(self, url, params=None, before_retry=None):
+        """
+        GET `url` on a pooled connection, with the client's timeouts and retries
+
+        Args:
+            url (str): URL to fetch
+            params (dict): Query parameters
+            before_retry (callable): Called before every retry, after the
+                backoff (e.g. to wait for a rate-limiter token)
+
+        Returns:
+            requests.Response: The first answer that is not a 5xx, or the last one
+        """
+        for attempt in range(self.retries + 1):
+            if attempt:
+                time.sleep(self.backoff * 2 ** (attempt - 1))
+                if before_retry is not None:
+                    before_retry()
+            try:
+                response = self.session.get(url, params=params, timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if attempt == self.retries:
+                    raise
+                logger.debug(f"Retrying {url} after {type(e).__name__}")
+                continue
+            if response.status_code not in RETRY_STATUSES or attempt == self.retries:
+                return response
+            logger.debug(f"Retrying {url} after HTTP {response.status_code}")
+            response.close()
+
+    def close(self):
+        """Close the pooled connections"""
+        with self._lock:
+            if self._session is not None:
+                self._session.close()
+                self._session = None
+
+    def _build_session(self):
+        # No urllib3 retries: get() retries itself
+        adapter = requests.adapters.HTTPAdapter(pool_maxsize=self.pool_size, max_retries=0)
+        session = requests.Session()
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        session.headers.update({'Accept-Encoding': 'gzip, deflate', 'Connection': 'keep-alive'})
+        logger.debug(f"Built HTTP session: {self.pool_size} connections per host, timeouts {self.timeout}")
+        return session
@@ -0,0 +1,682 @@
+import copy
+import math
+import os
+import pickle
+import threading
+import logging
+from collections import deque
+from contextlib import ExitStack
+import numpy as np
+import pandas as pd
+from .metrics import metrics
+from .bar_buffer import BarBuffer
+
+logger = logging.getLogger(__name__)
+
+NAN = float('nan')
+
+# Default location of the engine checkpoint
+CHECKPOINT_PATH = 'data_cache/indicator_state.pkl'
+
+
+def _is_zero(value):
+    """TA-Lib's TA_IS_ZERO tolerance"""
+    return -1e-8 < value < 1e-8
+
+
+class Indicator:
+    """
+    Streaming indicator that consumes one bar at a time.
+
+    Subclasses follow TA-Lib's default (compatibility) algorithms so the value
+    after each bar equals the last element TA-Lib returns for the same history.
+    update() returns one value per entry in `names`, NaN during warm-up.
+    peek() returns what update() would for a bar without folding it in, for
+    a bar that is still forming. `lookback` is the number of bars warm-up
+    takes, TA-Lib's lookback: the first value comes with bar `lookback + 1`.
+    """
+
+    names = ()
+
+    @property
+    def key(self):
+        return (type(self).__name__,) + self.params
+
+    @property
+    def lookback(self):
+        raise NotImplementedError
+
+    def update(self, high, low, close):
+        raise NotImplementedError
+
+    def peek(self, high, low, close):
+        raise NotImplementedError
+
+
+class SMA(Indicator):
+    def __init__(self, period):
+        self.params = (period,)
+        self.names = (f'SMA_{period}',)
+        self.period = period
+        self.window = deque(maxlen=period)
+        self.total = 0.0
+        self.updates = 0
+
+    @property
+    def lookback(self):
+        return self.period - 1
+
+    def update(self, high, low, close):
+        if len(self.window) == self.period:
+            self.total -= self.window[0]
+        self.window.append(close)
+        self.total += close
+
+        # Re-sum once per window so rounding error cannot build up over months
+        self.updates += 1
+        if self.updates % self.period == 0:
+            self.total = math.fsum(self.window)
+
+        if len(self.window) < self.period:
+            return (NAN,)
+        return (self.total / self.period,)
+
+    def peek(self, high, low, close):
+        full = len(self.window) == self.period
+        if not full and len(self.window) + 1 < self.period:
+            return (NAN,)
+        if (self.updates + 1) % self.period == 0:
+            total = math.fsum(list(self.window)[int(full):] + [close])
+        else:
+            total = (self.total - self.window[0] if full else self.total) + close
+        return (total / self.period,)
+
+
+class EMA(Indicator):
+    def __init__(self, period):
+        self.params = (period,)
+        self.names = (f'EMA_{period}',)
+        self.period = period
+        self.k = 2.0 / (period + 1)
+        self.seed = []
+        self.value = None
+
+    @property
+    def lookback(self):
+        return self.period - 1
+
+    def update(self, high, low, close):
+        if self.value is None:
+            # Seeded with the simple average of the first `period` values
+            self.seed.append(close)
+            if len(self.seed) < self.period:
+                return (NAN,)
+            self.value = sum(self.seed) / self.period
+            self.seed = []
+        else:
+            self.value = (close - self.value) * self.k + self.value
+        return (self.value,)
+
+    def peek(self, high, low, close):
+        if self.value is None:
+            if len(self.seed) + 1 < self.period:
+                return (NAN,)
+            return (sum(self.seed + [close]) / self.period,)
+        return ((close - self.value) * self.k + self.value,)
+
+
+class RSI(Indicator):
+    """Wilder's RSI, seeded with the simple average of the first `period` changes"""
+
+    names = ('RSI',)
+
+    def __init__(self, period=14):
+        self.params = (period,)
+        self.period = period
+        self.prev_close = None
+        self.changes = 0
+        self.gain = 0.0
+        self.loss = 0.0
+
+    @property
+    def lookback(self):
+        return self.period
+
+    def update(self, high, low, close):
+        if self.prev_close is None:
+            self.prev_close = close
+            return (NAN,)
+
+        change = close - self.prev_close
+        self.prev_close = close
+        self.changes += 1
+
+        if self.changes <= self.period:
+            if change < 0:
+                self.loss -= change
+            else:
+                self.gain += change
+            if self.changes < self.period:
+                return (NAN,)
+            self.gain /= self.period
+            self.loss /= self.period
+        else:
+            self.gain *= self.period - 1
+            self.loss *= self.period - 1
+            if change < 0:
+                self.loss -= change
+            else:
+                self.gain += change
+            self.gain /= self.period
+            self.loss /= self.period
+
+        total = self.gain + self.loss
+        return (0.0 if _is_zero(total) else 100.0 * (self.gain / total),)
+
+    def peek(self, high, low, close):
+        if self.prev_close is None:
+            return (NAN,)
+
+        change = close - self.prev_close
+        changes = self.changes + 1
+        gain, loss = self.gain, self.loss
+        if changes <= self.period:
+            if changes < self.period:
+                return (NAN,)
+        else:
+            gain *= self.period - 1
+            loss *= self.period - 1
+        if change < 0:
+            loss -= change
+        else:
+            gain += change
+        gain /= self.period
+        loss /= self.period
+
+        total = gain + loss
+        return (0.0 if _is_zero(total) else 100.0 * (gain / total),)
+
+
+class MACD(Indicator):
+    """
+    MACD as TA-Lib computes it: both EMAs start at bar `slow - 1`, the slow one
+    seeded from all `slow` closes and the fast one from the last `fast` of them.
+    """
+
+    names = ('MACD', 'MACD_signal', 'MACD_hist')
+
+    def __init__(self, fast=12, slow=26, signal=9):
+        self.params = (fast, slow, signal)
+        self.fast = fast
+        self.slow = slow
+        self.k_fast = 2.0 / (fast + 1)
+        self.k_slow = 2.0 / (slow + 1)
+        self.window = deque(maxlen=slow)
+        self.fast_ema = None
+        self.slow_ema = None
+        self.signal = EMA(signal)
+
+    @property
+    def lookback(self):
+        return self.slow - 1 + self.signal.lookback
+
+    def update(self, high, low, close):
+        if self.slow_ema is None:
+            self.window.append(close)
+            if len(self.window) < self.slow:
+                return (NAN, NAN, NAN)
+            closes = list(self.window)
+            self.slow_ema = sum(closes) / self.slow
+            self.fast_ema = sum(closes[-self.fast:]) / self.fast
+            self.window = None
+        else:
+            self.fast_ema = (close - self.fast_ema) * self.k_fast + self.fast_ema
+            self.slow_ema = (close - self.slow_ema) * self.k_slow + self.slow_ema
+
+        macd = self.fast_ema - self.slow_ema
+        signal = self.signal.update(NAN, NAN, macd)[0]
+        if math.isnan(signal):
+            return (NAN, NAN, NAN)
+        return (macd, signal, macd - signal)
+
+    def peek(self, high, low, close):
+        if self.slow_ema is None:
+            if len(self.window) + 1 < self.slow:
+                return (NAN, NAN, NAN)
+            closes = list(self.window) + [close]
+            slow_ema = sum(closes) / self.slow
+            fast_ema = sum(closes[-self.fast:]) / self.fast
+        else:
+            fast_ema = (close - self.fast_ema) * self.k_fast + self.fast_ema
+            slow_ema = (close - self.slow_ema) * self.k_slow + self.slow_ema
+
+        macd = fast_ema - slow_ema
+        signal = self.signal.peek(NAN, NAN, macd)[0]
+        if math.isnan(signal):
+            return (NAN, NAN, NAN)
+        return (macd, signal, macd - signal)
+
+
+class BBANDS(Indicator):
+    """Bollinger Bands around a simple average, using the population deviation"""
+
+    names = ('BB_upper', 'BB_middle', 'BB_lower')
+
+    def __init__(self, period=20, deviations=2.0):
+        self.params = (period, deviations)
+        self.period = period
+        self.deviations = deviations
+        self.window = deque(maxlen=period)
+        self.total = 0.0
+        self.total_sq = 0.0
+        self.updates = 0
+
+    @property
+    def lookback(self):
+        return self.period - 1
+
+    def update(self, high, low, close):
+        if len(self.window) == self.period:
+            oldest = self.window[0]
+            self.total -= oldest
+            self.total_sq -= oldest * oldest
+        self.window.append(close)
+        self.total += close
+        self.total_sq += close * close
+
+        self.updates += 1
+        if self.updates % self.period == 0:
+            self.total = math.fsum(self.window)
+            self.total_sq = math.fsum(x * x for x in self.window)
+
+        if len(self.window) < self.period:
+            return (NAN, NAN, NAN)
+        return self._bands(self.total, self.total_sq)
+
+    def peek(self, high, low, close):
+        full = len(self.window) == self.period
+        if not full and len(self.window) + 1 < self.period:
+            return (NAN, NAN, NAN)
+        if (self.updates + 1) % self.period == 0:
+            window = list(self.window)[int(full):] + [close]
+            return self._bands(math.fsum(window), math.fsum(x * x for x in window))
+        total, total_sq = self.total, self.total_sq
+        if full:
+            oldest = self.window[0]
+            total -= oldest
+            total_sq -= oldest * oldest
+        return self._bands(total + close, total_sq + close * close)
+
+    def _bands(self, total, total_sq):
+        mean = total / self.period
+        variance = total_sq / self.period - mean * mean
+        band = self.deviations * math.sqrt(variance) if variance > 0 else 0.0
+        return (mean + band, mean, mean - band)
+
+
+class ATR(Indicator):
+    """Wilder's average true range, seeded with the mean of the first `period` ranges"""
+
+    names = ('ATR',)
+
+    def __init__(self, period=14):
+        self.params = (period,)
+        self.period = period
+        self.prev_close = None
+        self.ranges = 0
+        self.value = 0.0
+
+    @property
+    def lookback(self):
+        return self.period
+
+    def update(self, high, low, close):
+        if self.prev_close is None:
+            self.prev_close = close
+            return (NAN,)
+
+        true_range = max(high - low, abs(high - self.prev_close), abs(low - self.prev_close))
+        self.prev_close = close
+        self.ranges += 1
+
+        if self.ranges < self.period:
+            self.value += true_range
+            return (NAN,)
+        if self.ranges == self.period:
+            self.value = (self.value + true_range) / self.period
+        else:
+            self.value = (self.value * (self.period - 1) + true_range) / self.period
+        return (self.value,)
+
+    def peek(self, high, low, close):
+        if self.prev_close is None:
+            return (NAN,)
+
+        true_range = max(high - low, abs(high - self.prev_close), abs(low - self.prev_close))
+        ranges = self.ranges + 1
+        if ranges < self.period:
+            return (NAN,)
+        if ranges == self.period:
+            return ((self.value + true_range) / self.period,)
+        return ((self.value * (self.period - 1) + true_range) / self.period,)
+
+
+class ADX(Indicator):
+    """Wilder's average directional index (first value after 2 * period - 1 bars)"""
+
+    names = ('ADX',)
+
+    def __init__(self, period=14):
+        self.params = (period,)
+        self.period = period
+        self.prev = None
+        self.bars = 0
+        self.plus_dm = 0.0
+        self.minus_dm = 0.0
+        self.true_range = 0.0
+        self.sum_dx = 0.0
+        self.value = None
+
+    @property
+    def lookback(self):
+        return 2 * self.period - 1
+
+    def update(self, high, low, close):
+        if self.prev is None:
+            self.prev = (high, low, close)
+            self.bars = 1
+            return (NAN,)
+
+        prev_high, prev_low, prev_close = self.prev
+        diff_plus = high - prev_high
+        diff_minus = prev_low - low
+        true_range = max(high - low, abs(high - prev_close), abs(low - prev_close))
+        bar = self.bars
+        self.prev = (high, low, close)
+        self.bars += 1
+
+        if bar >= self.period:
+            self.minus_dm -= self.minus_dm / self.period
+            self.plus_dm -= self.plus_dm / self.period
+        if diff_minus > 0 and diff_plus < diff_minus:
+            self.minus_dm += diff_minus
+        elif diff_plus > 0 and diff_plus > diff_minus:
+            self.plus_dm += diff_plus
+
+        if bar < self.period:
+            self.true_range += true_range
+            return (NAN,)
+        self.true_range = self.true_range - self.true_range / self.period + true_range
+
+        dx = _dx(self.plus_dm, self.minus_dm, self.true_range)
+        if bar < 2 * self.period - 1:
+            if dx is not None:
+                self.sum_dx += dx
+            return (NAN,)
+        if bar == 2 * self.period - 1:
+            if dx is not None:
+                self.sum_dx += dx
+            self.value = self.sum_dx / self.period
+        elif dx is not None:
+            self.value = (self.value * (self.period - 1) + dx) / self.period
+        return (self.value,)
+
+    def peek(self, high, low, close):
+        if self.prev is None:
+            return (NAN,)
+
+        prev_high, prev_low, prev_close = self.prev
+        diff_plus = high - prev_high
+        diff_minus = prev_low - low
+        true_range = max(high - low, abs(high - prev_close), abs(low - prev_close))
+        bar = self.bars
+        plus_dm, minus_dm = self.plus_dm, self.minus_dm
+
+        if bar >= self.period:
+            minus_dm -= minus_dm / self.period
+            plus_dm -= plus_dm / self.period
+        if diff_minus > 0 and diff_plus < diff_minus:
+            minus_dm += diff_minus
+        elif diff_plus > 0 and diff_plus > diff_minus:
+            plus_dm += diff_plus
+
+        if bar < 2 * self.period - 1:
+            return (NAN,)
+        dx = _dx(plus_dm, minus_dm, self.true_range - self.true_range / self.period + true_range)
+        if bar == 2 * self.period - 1:
+            return ((self.sum_dx + dx if dx is not None else self.sum_dx) / self.period,)
+        if dx is not None:
+            return ((self.value * (self.period - 1) + dx) / self.period,)
+        return (self.value,)
+
+
+def _dx(plus_dm, minus_dm, true_range):
+    """Directional index from smoothed movements and true range, None where TA-Lib skips it"""
+    if _is_zero(true_range):
+        return None
+    minus_di = 100.0 * (minus_dm / true_range)
+    plus_di = 100.0 * (plus_dm / true_range)
+    total = minus_di + plus_di
+    if _is_zero(total):
+        return None
+    return 100.0 * (abs(minus_di - plus_di) / total)
+
+
+class STOCH(Indicator):
+    """Slow stochastic: %K over `fastk` bars, smoothed twice with simple averages"""
+
+    names = ('Stoch_%K', 'Stoch_%D')
+
+    def __init__(self, fastk=5, slowk=3, slowd=3):
+        self.params = (fastk, slowk, slowd)
+        self.highs = deque(maxlen=fastk)
+        self.lows = deque(maxlen=fastk)
+        self.slowk = SMA(slowk)
+        self.slowd = SMA(slowd)
+
+    @property
+    def lookback(self):
+        return self.params[0] - 1 + self.slowk.lookback + self.slowd.lookback
+
+    def update(self, high, low, close):
+        self.highs.append(high)
+        self.lows.append(low)
+        if len(self.highs) < self.highs.maxlen:
+            return (NAN, NAN)
+
+        lowest = min(self.lows)
+        diff = (max(self.highs) - lowest) / 100.0
+        fast_k = (close - lowest) / diff if diff != 0 else 0.0
+
+        slow_k = self.slowk.update(NAN, NAN, fast_k)[0]
+        if math.isnan(slow_k):
+            return (NAN, NAN)
+        slow_d = self.slowd.update(NAN, NAN, slow_k)[0]
+        if math.isnan(slow_d):
+            return (NAN, NAN)
+        return (slow_k, slow_d)
+
+    def peek(self, high, low, close):
+        full = len(self.highs) == self.highs.maxlen
+        if not full and len(self.highs) + 1 < self.highs.maxlen:
+            return (NAN, NAN)
+        highs = list(self.highs)[int(full):] + [high]
+        lows = list(self.lows)[int(full):] + [low]
+
+        lowest = min(lows)
+        diff = (max(highs) - lowest) / 100.0
+        fast_k = (close - lowest) / diff if diff != 0 else 0.0
+
+        slow_k = self.slowk.peek(NAN, NAN, fast_k)[0]
+        if math.isnan(slow_k):
+            return (NAN, NAN)
+        slow_d = self.slowd.peek(NAN, NAN, slow_k)[0]
+        if math.isnan(slow_d):
+            return (NAN, NAN)
+        return (slow_k, slow_d)
+
+
+class _IndicatorState:
+    """Committed state of one indicator on one (symbol, interval) series"""
+
+    def __init__(self, indicator, history):
+        self.indicator = indicator
+        self.last_timestamp = None
+        self.history = {name: deque(maxlen=history) for name in indicator.names}
+
+    def commit(self, high, low, close):
+        for name, value in zip(self.indicator.names, self.indicator.update(high, low, close)):
+            self.history[name].append(value)
+
+    def snapshot(self, high, low, close):
+        """Recent values with the still-forming bar peeked at, not committed"""
+        provisional = self.indicator.peek(high, low, close)
+        values = {}
+        for name, value in zip(self.indicator.names, provisional):
+            committed = self.history[name]
+            values[name] = (list(committed) + [value])[-committed.maxlen:]
+        return values
+
+
+class IndicatorEngine:
+    """
+    Keeps per-(symbol, interval) indicator state and advances it bar by bar.
+
+    Every bar of a frame except the last is treated as closed and folded into
+    the state once; later calls only process bars newer than the last one
+    committed, so each cycle costs O(1) per new bar instead of a pass over the
+    whole history. The last bar may still be forming and is only peeked at,
+    never committed. State survives restarts through save() and load().
+
+    Each (symbol, interval) series has its own lock, so agents working on
+    different series never wait for each other; save() waits for all of them.
+    """
+
+    def __init__(self, history=5):
+        self.history = history
+        self._states = {}
+        # (symbol, interval) -> lock held while that series' state advances
+        self._series_locks = {}
+        # Guards the two dicts themselves, never held while indicators run
+        self._lock = threading.Lock()
+
+    def update(self, symbol, interval, bars, indicators):
+        """
+        Bring indicator state up to date with `bars` and return recent values
+
+        Args:
+            symbol (str): Instrument symbol
+            interval (str): Bar interval of `bars`
+            bars (BarBuffer or pd.DataFrame): OHLC bars, oldest first (frames
+                with High/Low/Close or high/low/close columns)
+            indicators (list): Indicator instances to evaluate; they act as
+                templates and are never modified
+
+        Returns:
+            dict: Output name (RSI, MACD_signal, ...) -> list of the last
+                `history` values, oldest first, ending with the latest bar
+        """
+        if bars.empty:
+            return {}
+        index, high, low, close = _arrays(bars)
+
+        values = {}
+        with metrics.timer('indicator_seconds', interval=interval), self._series_lock(symbol, interval):
+            for template in indicators:
+                state = self._advance((symbol, interval, template.key), template, index, high, low, close)
+                values.update(state.snapshot(float(high[-1]), float(low[-1]), float(close[-1])))
+        return values
+
+    def _advance(self, key, template, index, high, low, close):
+        closed = len(index) - 1
+        state = self._states.get(key)
+        start = 0
+
+        if state is not None and state.last_timestamp is not None:
+            position = int(np.searchsorted(index, state.last_timestamp))
+            if position < closed and index[position] == state.last_timestamp:
+                start = position + 1
+            else:
+                # The frame does not continue from the committed bar: warm up again
+                state = None
+
+        if state is None:
+            state = _IndicatorState(copy.deepcopy(template), self.history)
+            with self._lock:
+                self._states[key] = state
+
+        for i in range(start, closed):
+            # float32 buffer values would keep the indicator arithmetic in float32
+            state.commit(float(high[i]), float(low[i]), float(close[i]))
+        if closed > 0:
+            state.last_timestamp = int(index[closed - 1])
+        return state
+
+    def _series_lock(self, symbol, interval):
+        with self._lock:
+            lock = self._series_locks.get((symbol, interval))
+            if lock is None:
+                lock = self._series_locks[(symbol, interval)] = threading.Lock()
+            return lock
+
+    def reset(self):
+        """Drop all indicator state"""
+        with self._lock:
+            self._states.clear()
+
+    def save(self, path=CHECKPOINT_PATH):
+        """Write a checkpoint of all indicator state"""
+        with self._lock:
+            locks = list(self._series_locks.values())
+        # No series may be half-way through a bar while it is pickled
+        with ExitStack() as stack:
+            for lock in locks:
+                stack.enter_context(lock)
+            with self._lock:
+                payload = pickle.dumps(self._states)
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temp_path = path + '.tmp'
+        with open(temp_path, 'wb') as f:
+            f.write(payload)
+        os.replace(temp_path, path)
+
+    def load(self, path=CHECKPOINT_PATH):
+        """
+        Restore a checkpoint written by save()
+
+        Returns:
+            bool: Whether a checkpoint was loaded
+        """
+        if not os.path.exists(path):
+            return False
+        try:
+            with open(path, 'rb') as f:
+                states = pickle.load(f)
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable indicator checkpoint {path}: {str(e)}")
+            return False
+        with self._lock:
+            self._states = states
+        logger.info(f"Restored indicator state for {len(states)} series from {path}")
+        return True
+
+
+def _arrays(bars):
+    """Opening times (int64 nanoseconds) and high, low and close of a BarBuffer or frame"""
+    if isinstance(bars, BarBuffer):
+        return bars.time, bars.high, bars.low, bars.close
+    index = bars.index
+    times = index.as_unit('ns').asi8 if isinstance(index, pd.DatetimeIndex) else np.asarray(index)
+    return times, _column(bars, 'High'), _column(bars, 'Low'), _column(bars, 'Close')
+
+
+def _column(bars, name):
+    """Float column from either the yfinance (Close) or DataFetcher (close) naming"""
+    column = name if name in bars.columns else name.lower()
+    return bars[column].to_numpy(dtype=float)
+
+
+# Shared engine used by every agent
+indicator_engine = IndicatorEngine()
@@ -0,0 +1,28 @@
+import importlib
+import threading
+import types
+
+# Serializes the first import of every lazy module
+_import_lock = threading.Lock()
+
+
+class LazyModule(types.ModuleType):
+    """
+    Stand-in for a module that is only imported when first used.
+
+    `yf = LazyModule('yfinance')` costs nothing at import time; the first
+    attribute read (yf.download) imports yfinance, later reads find it in
+    sys.modules. Attributes set on the stand-in (as unittest.mock.patch does)
+    shadow the module's until they are deleted again.
+    """
+
+    def __getattr__(self, attribute):
+        # Only called for attributes not found on the stand-in itself
+        if attribute.startswith('__'):
+            raise AttributeError(attribute)
+        with _import_lock:
+            module = importlib.import_module(self.__name__)
+        return getattr(module, attribute)
+
+    def __repr__(self):
+        return f"<lazy module '{self.__name__}'>"
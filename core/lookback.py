@@ -0,0 +1,151 @@
+import math
+import time
+import logging
+import numpy as np
+from .bar_store import INTERVAL_SECONDS
+from .market_calendar import market_calendar
+
+logger = logging.getLogger(__name__)
+
+# Extra bars fetched on top of what the indicators need, as a fraction of it,
+# unless [Providers] lookback_margin says otherwise
+DEFAULT_MARGIN = 0.25
+
+# Latest values read per indicator output (IndicatorEngine's default history)
+VALUES = 5
+
+# Years of sessions counted back from now before extrapolating
+HISTORY_YEARS = 2
+
+# Seconds a computed period is reused; periods only change from day to day
+PERIOD_SECONDS = 60
+
+
+def bars_needed(indicators, minimum=0, values=VALUES):
+    """
+    Bars a timeframe must hold for its indicators' latest values
+
+    Args:
+        indicators (list): Indicator instances read on the timeframe
+        minimum (int): Bars the agent checks for regardless of its indicators
+        values (int): Latest values read per indicator output
+
+    Returns:
+        int: The longest warm-up plus `values`, or `minimum` if that is more
+    """
+    return max([minimum] + [indicator.lookback + values for indicator in indicators])
+
+
+def _sessions(asset_type, now):
+    """Opens and closes (clipped to `now`) of the sessions opened by `now`, newest first"""
+    # Extend the calendar's tables far enough back before reading them
+    market_calendar.sessions(asset_type, now - HISTORY_YEARS * 365 * 86400)
+    opens, closes = market_calendar.sessions(asset_type, now)
+    end = int(np.searchsorted(opens, now, side='right'))
+    return opens[:end][::-1], np.minimum(closes[:end], now)[::-1]
+
+
+def history_days(asset_type, interval, bars, now=None):
+    """
+    Calendar days back from `now` holding `bars` bars of `interval`
+
+    Each session holds one bar per started `interval` (a 6.5 hour stock
+    session makes 7 hourly bars, 2 4h bars and 1 daily bar); nights,
+    weekends and holidays hold none. Markets that never close hold one bar
+    per interval.
+
+    Args:
+        asset_type (str): forex, crypto, stock, commodity or index
+        interval (str): Bar interval (60m, 4h, 1d, ...)
+        bars (int): Bars wanted, the newest ending at `now`
+        now (float): Unix time (default now)
+
+    Returns:
+        float: Days, not rounded
+    """
+    seconds = INTERVAL_SECONDS[interval]
+    now = time.time() if now is None else now
+    opens, closes = _sessions(asset_type, now)
+    if len(opens) and np.isinf(opens[0]):
+        return bars * seconds / 86400
+
+    total = np.cumsum(np.ceil((closes - opens) / seconds))
+    position = int(np.searchsorted(total, bars))
+    if position < len(total):
+        # Only as far into the oldest session as its remaining bars reach
+        remaining = bars - (total[position - 1] if position else 0)
+        return (now - max(opens[position], closes[position] - remaining * seconds)) / 86400
+    # Further back than the session tables: extrapolate at their average rate
+    return (now - opens[-1]) / 86400 * bars / total[-1]
+
+
+def bars_in(asset_type, interval, days, now=None):
+    """
+    Bars of `interval` the sessions of the last `days` calendar days hold
+
+    The inverse of history_days, for providers that take a bar count.
+    """
+    seconds = INTERVAL_SECONDS[interval]
+    now = time.time() if now is None else now
+    start = now - days * 86400
+    opens, closes = _sessions(asset_type, now)
+    if len(opens) and np.isinf(opens[0]):
+        return math.ceil(days * 86400 / seconds)
+
+    opens = np.maximum(opens, start)
+    return int(np.ceil((closes - opens)[closes > opens] / seconds).sum())
+
+
+class Lookback:
+    """
+    Sizes downloads to what the agents' indicators need.
+
+    Each agent declares how many bars it needs on every timeframe it reads
+    (see bars_needed). period() turns that into the shortest yfinance period
+    that holds those bars plus a safety margin, counting only the sessions
+    the market calendar has, instead of a flat month or year per agent. The
+    margin leaves room for bars a provider is missing. It also lets
+    recursive indicators (EMA, RSI, ADX) run past their first value, so
+    they settle closer to the values a longer history would give.
+    Periods are kept for a minute, as agents ask for theirs on every call.
+    """
+
+    def __init__(self, margin=DEFAULT_MARGIN):
+        self.margin = margin
+        self._periods = {}
+
+    def configure(self, config):
+        """Read [Providers] lookback_margin"""
+        providers = config['Providers'] if 'Providers' in config else {}
+        self.margin = max(0.0, float(providers.get('lookback_margin', DEFAULT_MARGIN)))
+
+    def period(self, asset_type, requirements, now=None):
+        """
+        Period to download so every timeframe built from it has its bars
+
+        Args:
+            asset_type (str): Market calendar the series trades on
+            requirements (dict): Timeframe (60m, 4h, 1d, ...) -> bars needed
+                on it, every timeframe built from the one downloaded series
+            now (float): Unix time the download ends at (default now)
+
+        Returns:
+            str: Period in whole days, e.g. '45d'
+        """
+        now = time.time() if now is None else now
+        key = (asset_type, tuple(requirements.items()))
+        stamp = (now // PERIOD_SECONDS, self.margin)
+        cached = self._periods.get(key)
+        if cached is not None and cached[0] == stamp:
+            return cached[1]
+
+        days = max(history_days(asset_type, interval, math.ceil(bars * (1 + self.margin)), now)
+                   for interval, bars in requirements.items())
+        # yfinance counts the current, partial day as one of them
+        period = f"{math.ceil(days) + 1}d"
+        self._periods[key] = (stamp, period)
+        return period
+
+
+# Shared sizer used by the agents, SignalGenerator and DataFetcher
+lookback = Lookback()
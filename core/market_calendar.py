@@ -0,0 +1,195 @@
+import threading
+import logging
+from datetime import date, datetime, time as dt_time, timedelta
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Weekly hours per asset type, in New York time: (trading day open, close);
+# an open later than the close starts on the previous calendar day
+TRADING_HOURS = {
+    'forex': (dt_time(17, 0), dt_time(17, 0)),       # Sunday 17:00 to Friday 17:00
+    'commodity': (dt_time(18, 0), dt_time(17, 0)),   # CME Globex, with a daily 17:00-18:00 break
+    'stock': (dt_time(9, 30), dt_time(16, 0)),       # NYSE cash session
+    'index': (dt_time(9, 30), dt_time(16, 0))
+}
+
+# NYSE half days close at 13:00
+EARLY_CLOSE = dt_time(13, 0)
+
+TIMEZONE = 'America/New_York'
+
+# Session tables cover this many years either side of the ones asked about
+YEARS_MARGIN = 1
+
+
+def easter(year):
+    """Gregorian Easter Sunday"""
+    a = year % 19
+    b, c = divmod(year, 100)
+    d, e = divmod(b, 4)
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    month, day = divmod(h + l - 7 * m + 114, 31)
+    return date(year, month, day + 1)
+
+
+def _nth_weekday(year, month, weekday, n):
+    """n-th (1-based; -1 = last) `weekday` of a month"""
+    if n > 0:
+        first = date(year, month, 1)
+        return first + timedelta(days=(weekday - first.weekday()) % 7 + 7 * (n - 1))
+    last = date(year + (month == 12), month % 12 + 1, 1) - timedelta(days=1)
+    return last - timedelta(days=(last.weekday() - weekday) % 7)
+
+
+def _observed(day):
+    """Saturday holidays move to Friday, Sunday holidays to Monday"""
+    if day.weekday() == 5:
+        return day - timedelta(days=1)
+    if day.weekday() == 6:
+        return day + timedelta(days=1)
+    return day
+
+
+def nyse_holidays(year):
+    """Full-day NYSE closures in a year"""
+    days = {
+        _nth_weekday(year, 1, 0, 3),             # Martin Luther King Jr. Day
+        _nth_weekday(year, 2, 0, 3),             # Washington's Birthday
+        easter(year) - timedelta(days=2),        # Good Friday
+        _nth_weekday(year, 5, 0, -1),            # Memorial Day
+        _observed(date(year, 7, 4)),             # Independence Day
+        _nth_weekday(year, 9, 0, 1),             # Labor Day
+        _nth_weekday(year, 11, 3, 4),            # Thanksgiving
+        _observed(date(year, 12, 25))            # Christmas
+    }
+    # New Year's Day on a Saturday is not observed on the Friday before
+    if date(year, 1, 1).weekday() != 5:
+        days.add(_observed(date(year, 1, 1)))
+    if year >= 2022:
+        days.add(_observed(date(year, 6, 19)))   # Juneteenth
+    return days
+
+
+def nyse_early_closes(year):
+    """NYSE half days: the day before Independence Day, the day after Thanksgiving, Christmas Eve"""
+    holidays = nyse_holidays(year)
+    days = {
+        date(year, 7, 3),
+        _nth_weekday(year, 11, 3, 4) + timedelta(days=1),
+        date(year, 12, 24)
+    }
+    return {day for day in days if day.weekday() < 5 and day not in holidays}
+
+
+def closed_days(asset_type, year):
+    """Weekday trading days on which a market does not open"""
+    if asset_type in ('stock', 'index'):
+        return nyse_holidays(year)
+    days = {date(year, 1, 1), date(year, 12, 25)}
+    if asset_type == 'commodity':
+        days.add(easter(year) - timedelta(days=2))
+    return days
+
+
+class MarketCalendar:
+    """
+    When each asset type's market is open.
+
+    Sessions are precomputed per asset type into sorted arrays of open and
+    close times (Unix seconds), so every query is a binary search. Tables are
+    rebuilt to cover new years on first use. Crypto never closes.
+    """
+
+    def __init__(self):
+        self._tables = {}
+        self._years = None
+        self._lock = threading.Lock()
+
+    def sessions(self, asset_type, at=None):
+        """
+        Session table of an asset type
+
+        Args:
+            asset_type (str): forex, crypto, stock, commodity or index
+            at (float): Unix time the table must cover (default now)
+
+        Returns:
+            tuple: (opens, closes) arrays of Unix seconds, sorted, non-overlapping
+        """
+        year = pd.Timestamp(pd.Timestamp.now(tz='UTC').timestamp() if at is None else at,
+                            unit='s', tz='UTC').year
+        with self._lock:
+            if self._years is None or not self._years[0] < year < self._years[1]:
+                first = min(year, self._years[0] + 1 if self._years else year) - YEARS_MARGIN
+                last = max(year, self._years[1] - 1 if self._years else year) + YEARS_MARGIN
+                self._tables = {name: self._build(name, first, last) for name in TRADING_HOURS}
+                self._years = (first, last)
+            return self._tables.get(asset_type) or (np.array([-np.inf]), np.array([np.inf]))
+
+    def is_open(self, asset_type, at):
+        """Whether the market is open at Unix time `at`"""
+        opens, closes = self.sessions(asset_type, at)
+        position = np.searchsorted(opens, at, side='right') - 1
+        return bool(position >= 0 and at < closes[position])
+
+    def open_between(self, asset_type, start, end):
+        """Whether the market was open at any moment in (start, end]"""
+        opens, closes = self.sessions(asset_type, end)
+        # First session ending after start; it overlaps if it opened by end
+        position = np.searchsorted(closes, start, side='right')
+        return bool(position < len(opens) and opens[position] <= end and closes[position] > start)
+
+    def next_open(self, asset_type, at):
+        """Next time the market opens strictly after `at` (`at` itself if open then)"""
+        if self.is_open(asset_type, at):
+            return at
+        opens, _ = self.sessions(asset_type, at)
+        position = np.searchsorted(opens, at, side='right')
+        if position == len(opens):
+            opens, _ = self.sessions(asset_type, at + 86400 * 366)
+            position = np.searchsorted(opens, at, side='right')
+        return float(opens[position])
+
+    def _build(self, asset_type, first_year, last_year):
+        open_time, close_time = TRADING_HOURS[asset_type]
+        overnight = open_time >= close_time
+        closed = set()
+        early = set()
+        for year in range(first_year, last_year + 1):
+            closed |= closed_days(asset_type, year)
+            if asset_type in ('stock', 'index'):
+                early |= nyse_early_closes(year)
+
+        days = pd.date_range(date(first_year, 1, 1), date(last_year, 12, 31), freq='B')
+        opens, closes = [], []
+        for day in days.date:
+            if day in closed:
+                continue
+            start_day = day - timedelta(days=1) if overnight else day
+            # After a closed day a weekly market reopens at the same hour
+            opens.append(datetime.combine(start_day, open_time))
+            closes.append(datetime.combine(day, EARLY_CLOSE if day in early else close_time))
+
+        opens = pd.DatetimeIndex(opens).tz_localize(TIMEZONE, ambiguous=True, nonexistent='shift_forward')
+        closes = pd.DatetimeIndex(closes).tz_localize(TIMEZONE, ambiguous=True, nonexistent='shift_forward')
+        opens = opens.as_unit('ns').asi8 / 1e9
+        closes = closes.as_unit('ns').asi8 / 1e9
+
+        # Back-to-back trading days (forex) form one continuous session
+        keep = np.ones(len(opens), dtype=bool)
+        keep[1:] = opens[1:] > closes[:-1]
+        starts = np.flatnonzero(keep)
+        ends = np.append(starts[1:] - 1, len(opens) - 1)
+        logger.debug(f"Built {len(starts)} {asset_type} sessions for {first_year}-{last_year}")
+        return opens[starts], closes[ends]
+
+
+# Shared calendar used by the scheduler, SignalGenerator and DataFetcher
+market_calendar = MarketCalendar()
@@ -0,0 +1,243 @@
+import bisect
+import threading
+import time
+import logging
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+logger = logging.getLogger(__name__)
+
+# Prefix of every exported metric name
+NAMESPACE = 'signalgen'
+
+# Histogram bucket bounds in seconds, from a cached lookup to a slow provider call
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+class Metrics:
+    """
+    Counters and timing histograms shared by the whole app.
+
+    Every series is a name plus labels (provider, agent, result, ...).
+    Counter names end in _total and timing names in _seconds, as Prometheus
+    expects. Recording takes one lock and a dict lookup, cheap enough for
+    every fetch and agent run.
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._counters = {}
+        self._timings = {}
+        self._lock = threading.Lock()
+
+    def inc(self, name, value=1, **labels):
+        """Add `value` to a counter"""
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, seconds, **labels):
+        """Record one duration in a timing histogram"""
+        key = (name, tuple(sorted(labels.items())))
+        position = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            timing = self._timings.get(key)
+            if timing is None:
+                timing = self._timings[key] = [0, 0.0, [0] * len(self.buckets)]
+            timing[0] += 1
+            timing[1] += seconds
+            if position < len(self.buckets):
+                timing[2][position] += 1
+
+    @contextmanager
+    def timer(self, name, **labels):
+        """Time the body of a with block into a histogram, whether or not it raises"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def snapshot(self):
+        """
+        Current totals
+
+        Returns:
+            dict: 'counters' maps (name, labels) to a value; 'timings' maps
+                (name, labels) to (count, total seconds)
+        """
+        with self._lock:
+            return {
+                'counters': dict(self._counters),
+                'timings': {key: (timing[0], timing[1]) for key, timing in self._timings.items()}
+            }
+
+    def reset(self):
+        """Drop every series"""
+        with self._lock:
+            self._counters.clear()
+            self._timings.clear()
+
+    def render(self):
+        """All series in the Prometheus text exposition format"""
+        with self._lock:
+            counters = sorted(self._counters.items())
+            timings = sorted((key, (timing[0], timing[1], list(timing[2]))) for key, timing in self._timings.items())
+
+        lines = []
+        declared = set()
+        for (name, labels), value in counters:
+            metric = f"{NAMESPACE}_{name}"
+            if metric not in declared:
+                declared.add(metric)
+                lines.append(f"# TYPE {metric} counter")
+            lines.append(f"{metric}{_format_labels(labels)} {_format_value(value)}")
+
+        for (name, labels), (count, total, bucket_counts) in timings:
+            metric = f"{NAMESPACE}_{name}"
+            if metric not in declared:
+                declared.add(metric)
+                lines.append(f"# TYPE {metric} histogram")
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, bucket_counts):
+                cumulative += bucket_count
+                lines.append(f"{metric}_bucket{_format_labels(labels + (('le', _format_value(bound)),))} {cumulative}")
+            lines.append(f"{metric}_bucket{_format_labels(labels + (('le', '+Inf'),))} {count}")
+            lines.append(f"{metric}_sum{_format_labels(labels)} {_format_value(total)}")
+            lines.append(f"{metric}_count{_format_labels(labels)} {count}")
+        return "\n".join(lines) + "\n"
+
+    def summary(self, since):
+        """
+        One-line digest of what happened after an earlier snapshot
+
+        Args:
+            since (dict): Result of snapshot() taken at the start of the period
+
+        Returns:
+            str: e.g. "fetch yfinance 2/0.81s | cache hit 8 miss 2 | indicators 14/0.03s |
+                agents 5/0.12s | rate wait 0.00s | telegram 1/0.30s | errors 0"
+        """
+        now = self.snapshot()
+        counters = _delta(now['counters'], since['counters'])
+        timings = {
+            key: (count - since['timings'].get(key, (0, 0.0))[0], total - since['timings'].get(key, (0, 0.0))[1])
+            for key, (count, total) in now['timings'].items()
+        }
+
+        def timing(name, **match):
+            count, total = 0, 0.0
+            for (key_name, labels), (key_count, key_total) in timings.items():
+                if key_name == name and all(dict(labels).get(k) == v for k, v in match.items()):
+                    count += key_count
+                    total += key_total
+            return count, total
+
+        def counter(name, **match):
+            return sum(value for (key_name, labels), value in counters.items()
+                       if key_name == name and all(dict(labels).get(k) == v for k, v in match.items()))
+
+        def calls(name, **match):
+            count, total = timing(name, **match)
+            return f"{count}/{total:.2f}s"
+
+        providers = sorted({dict(labels).get('provider') for name, labels in timings if name == 'fetch_seconds'})
+        fetches = [f"{provider} {calls('fetch_seconds', provider=provider)}"
+                   for provider in providers if timing('fetch_seconds', provider=provider)[0]]
+        misses = counter('cache_requests_total', result='miss') + counter('cache_requests_total', result='refresh')
+        errors = counter('agent_errors_total') + counter('fetch_errors_total') + counter('telegram_errors_total')
+        return " | ".join([
+            f"fetch {', '.join(fetches) or 'none'}",
+            f"cache hit {counter('cache_requests_total', result='hit')} miss {misses}",
+            f"indicators {calls('indicator_seconds')}",
+            f"agents {calls('agent_seconds')}",
+            f"rate wait {timing('rate_limit_wait_seconds')[1]:.2f}s",
+            f"telegram {calls('telegram_send_seconds')}",
+            f"errors {errors}"
+        ])
+
+
+def _delta(now, since):
+    return {key: value - since.get(key, 0) for key, value in now.items() if value != since.get(key, 0)}
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels) + '}'
+
+
+def _format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class MetricsServer(ThreadingHTTPServer):
+    """Serves the registry at /metrics for a Prometheus scraper"""
+
+    daemon_threads = True
+
+    def __init__(self, registry, host='127.0.0.1', port=9108):
+        super().__init__((host, port), _MetricsHandler)
+        self.registry = registry
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/metrics"
+
+    def start(self):
+        """Serve from a daemon thread"""
+        self.thread = threading.Thread(target=self.serve_forever, name='metrics-server', daemon=True)
+        self.thread.start()
+        logger.info(f"Serving metrics at {self.url}")
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?')[0] != '/metrics':
+            self.send_error(404)
+            return
+        body = self.server.registry.render().encode()
+        self.send_response(200)
+        self.send_header('Content-Type', CONTENT_TYPE)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logger.debug(f"Metrics request: {format % args}")
+
+
+def start_metrics_server(config, registry=None):
+    """
+    Start the /metrics endpoint if [Metrics] port is set
+
+    Args:
+        config: ConfigParser or dict with an optional [Metrics] section (port,
+            host; port 0 or missing = disabled)
+        registry (Metrics): Registry to serve (default the shared one)
+
+    Returns:
+        MetricsServer: The running server, or None when disabled
+    """
+    settings = config['Metrics'] if 'Metrics' in config else {}
+    port = int(settings.get('port', 0))
+    if not port:
+        return None
+    return MetricsServer(registry or metrics, settings.get('host', '127.0.0.1'), port).start()
+
+
+# Shared registry every component reports to
+metrics = Metrics()
@@ -0,0 +1,218 @@
+import cProfile
+import io
+import os
+import pstats
+import re
+import threading
+import time
+import tracemalloc
+import logging
+from contextlib import contextmanager, nullcontext
+
+logger = logging.getLogger(__name__)
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Cycle outputs are named cycle-<number>-<tag>.<ext>
+FILE_PATTERN = re.compile(r'^cycle-(\d+)-')
+
+
+def _tag(text):
+    """File-name-safe form of an asset symbol or job list"""
+    return re.sub(r'[^A-Za-z0-9_.-]+', '_', text).strip('_') or 'cycle'
+
+
+class CycleProfiler:
+    """
+    Opt-in cProfile and tracemalloc capture for sampled signal cycles.
+
+    Every `every`-th cycle (the first one included) runs under cProfile and
+    tracemalloc. Output goes to `directory`, tagged with the cycle number:
+
+        cycle-000101-<jobs>.pstats        main-thread profile (load with pstats/snakeviz)
+        cycle-000101-<jobs>.txt           top functions by cumulative time
+        cycle-000101-<type>-<symbol>.*    the same for each agent call
+        cycle-000101-memory.txt           top allocation sites still held when the
+                                          cycle ended, traced memory peak and RSS
+
+    Agents run on worker threads, which the cycle's profiler does not see, so
+    each agent call gets a profiler of its own; an agent run on the cycle's
+    own thread pauses the cycle profiler meanwhile. Unsampled cycles cost a
+    counter increment. Settings come from [Profiling]: enabled, every, cpu,
+    memory, top, keep (sampled cycles whose files are kept) and directory.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.every = 100
+        self.cpu = True
+        self.memory = True
+        self.top = 25
+        self.keep = 20
+        self.directory = os.path.join('logs', 'profiles')
+        self.cycle_count = 0
+        self._active = None
+        self._cycle_thread = None
+        self._cycle_profile = None
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def configure(self, config):
+        """Read the [Profiling] section"""
+        settings = config['Profiling'] if 'Profiling' in config else {}
+
+        def flag(name, default):
+            return str(settings.get(name, default)).lower() in ('1', 'true', 'yes', 'on')
+
+        self.enabled = flag('enabled', False)
+        self.every = max(1, int(settings.get('every', self.every)))
+        self.cpu = flag('cpu', self.cpu)
+        self.memory = flag('memory', self.memory)
+        self.top = int(settings.get('top', self.top))
+        self.keep = int(settings.get('keep', self.keep))
+        self.directory = settings.get('directory', self.directory)
+        if self.enabled:
+            logger.info(f"Profiling every {self.every} cycle(s) into {self.directory}")
+
+    def cycle(self, label='cycle'):
+        """
+        Context manager around one signal cycle
+
+        Nested calls (main.py's loop around generate_signals) count as the
+        same cycle; only the outermost one profiles.
+        """
+        if not self.enabled or getattr(self._local, 'in_cycle', False):
+            return nullcontext()
+        return self._cycle(label)
+
+    def agent(self, asset_type, symbol):
+        """Context manager around one agent call; profiles it if its cycle is sampled"""
+        number = self._active
+        if number is None or not self.cpu:
+            return nullcontext()
+        name = f"cycle-{number:06d}-{_tag(asset_type)}-{_tag(symbol)}"
+        if threading.get_ident() == self._cycle_thread and self._cycle_profile is not None:
+            return self._profile_paused(self._cycle_profile, name)
+        return self._profile_cpu(name)
+
+    @contextmanager
+    def _cycle(self, label):
+        self._local.in_cycle = True
+        try:
+            with self._lock:
+                self.cycle_count += 1
+                number = self.cycle_count
+                sampled = (number - 1) % self.every == 0 and self._active is None
+                if sampled:
+                    self._active = number
+            with self._profile_cycle(number, _tag(label)) if sampled else nullcontext():
+                yield
+        finally:
+            self._local.in_cycle = False
+
+    @contextmanager
+    def _profile_cycle(self, number, tag):
+        os.makedirs(self.directory, exist_ok=True)
+        tracing = self.memory and not tracemalloc.is_tracing()
+        if tracing:
+            tracemalloc.start()
+        start = time.perf_counter()
+        self._cycle_thread = threading.get_ident()
+        try:
+            with self._profile_cpu(f"cycle-{number:06d}-{tag}", cycle=True) if self.cpu else nullcontext():
+                yield
+        finally:
+            elapsed = time.perf_counter() - start
+            try:
+                if tracing:
+                    self._write_memory(f"cycle-{number:06d}-memory", elapsed)
+                    tracemalloc.stop()
+                self._prune()
+            except OSError as e:
+                logger.error(f"Could not write profile of cycle {number}: {str(e)}")
+            finally:
+                with self._lock:
+                    self._active = None
+                    self._cycle_thread = None
+            logger.info(f"Profiled cycle {number} ({elapsed:.2f}s) into {self.directory}")
+
+    @contextmanager
+    def _profile_cpu(self, name, cycle=False):
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError as e:
+            # Python 3.12+ allows one active profiler per process
+            logger.debug(f"Skipping profile {name}: {str(e)}")
+            yield
+            return
+        if cycle:
+            self._cycle_profile = profile
+        try:
+            yield
+        finally:
+            profile.disable()
+            if cycle:
+                self._cycle_profile = None
+            try:
+                self._write_cpu(profile, name)
+            except OSError as e:
+                logger.error(f"Could not write profile {name}: {str(e)}")
+
+    @contextmanager
+    def _profile_paused(self, cycle_profile, name):
+        """Profile an agent call on the cycle's thread, which holds one profiler at a time"""
+        cycle_profile.disable()
+        try:
+            with self._profile_cpu(name):
+                yield
+        finally:
+            cycle_profile.enable()
+
+    def _write_cpu(self, profile, name):
+        path = os.path.join(self.directory, name)
+        profile.dump_stats(f"{path}.pstats")
+        report = io.StringIO()
+        pstats.Stats(profile, stream=report).sort_stats('cumulative').print_stats(self.top)
+        with open(f"{path}.txt", 'w') as f:
+            f.write(report.getvalue())
+
+    def _write_memory(self, name, elapsed):
+        snapshot = tracemalloc.take_snapshot().filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap*>')
+        ])
+        current, peak = tracemalloc.get_traced_memory()
+        lines = [
+            f"cycle time: {elapsed:.3f}s",
+            f"traced now: {current / 1024:.1f} KiB, peak: {peak / 1024:.1f} KiB",
+        ]
+        if resource is not None:
+            # ru_maxrss is KiB on Linux
+            lines.append(f"max RSS: {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.1f} MiB")
+        lines.append(f"top {self.top} allocation sites still held at the end of the cycle:")
+        for stat in snapshot.statistics('lineno')[:self.top]:
+            frame = stat.traceback[0]
+            lines.append(f"{stat.size / 1024:10.1f} KiB {stat.count:8d} blocks  {frame.filename}:{frame.lineno}")
+        with open(os.path.join(self.directory, f"{name}.txt"), 'w') as f:
+            f.write("\n".join(lines) + "\n")
+
+    def _prune(self):
+        """Delete the files of all but the newest `keep` sampled cycles"""
+        if self.keep <= 0:
+            return
+        files = {}
+        for name in os.listdir(self.directory):
+            match = FILE_PATTERN.match(name)
+            if match:
+                files.setdefault(int(match.group(1)), []).append(name)
+        for number in sorted(files)[:-self.keep]:
+            for name in files[number]:
+                os.remove(os.path.join(self.directory, name))
+
+
+# Shared profiler configured by main.py
+profiler = CycleProfiler()
@@ -0,0 +1,66 @@
+from operator import itemgetter
+import numpy as np
+import pandas as pd
+
+# Column names DataFetcher returns provider bars under
+COLUMNS = ('open', 'high', 'low', 'close', 'volume')
+
+# Alpha Vantage field names of each column
+ALPHA_VANTAGE_FIELDS = ('1. open', '2. high', '3. low', '4. close', '5. volume')
+
+
+def parse_alpha_vantage(series, timezone=None):
+    """
+    OHLCV frame from an Alpha Vantage "Time Series (...)" object
+
+    The decoded JSON goes straight into one float64 array per column; no
+    intermediate frame of strings is built.
+
+    Args:
+        series (dict): Timestamp -> {'1. open': '...', ...}, newest first
+        timezone (str): Exchange timezone the timestamps are local to
+
+    Returns:
+        pd.DataFrame: open/high/low/close/volume on a 'Date' index, oldest first
+    """
+    fields = ALPHA_VANTAGE_FIELDS if all('5. volume' in bar for bar in series.values()) \
+        else ALPHA_VANTAGE_FIELDS[:4]
+    bars = series.values()
+    columns = zip(*map(itemgetter(*fields), bars)) if bars else [()] * len(fields)
+    return _frame(list(series), columns, timezone)
+
+
+def parse_twelvedata(values):
+    """
+    OHLCV frame from the "values" list of a Twelve Data time_series response
+
+    Args:
+        values (list): {'datetime': '...', 'open': '...', ...} dicts, newest
+            first; volume is absent for currency pairs
+
+    Returns:
+        pd.DataFrame: open/high/low/close(/volume) on a naive 'Date' index in
+            the timezone the request asked for, oldest first
+    """
+    fields = ('datetime',) + COLUMNS if all('volume' in bar for bar in values) \
+        else ('datetime',) + COLUMNS[:4]
+    times, *columns = zip(*map(itemgetter(*fields), values)) if values else [()] * len(fields)
+    return _frame(times, columns, None)
+
+
+def _frame(times, columns, timezone):
+    times = np.array(times, dtype='datetime64[ns]')
+    columns = [np.array(column, dtype=np.float64) for column in columns]
+    # Providers send the newest bar first
+    order = slice(None, None, -1) if len(times) > 1 and times[0] > times[-1] else slice(None)
+    times = times[order]
+    columns = [column[order] for column in columns]
+    if len(times) > 1 and not (times[1:] >= times[:-1]).all():
+        order = np.argsort(times, kind='stable')
+        times = times[order]
+        columns = [column[order] for column in columns]
+
+    index = pd.DatetimeIndex(times, name='Date')
+    if timezone:
+        index = index.tz_localize(timezone)
+    return pd.DataFrame(dict(zip(COLUMNS, columns)), index=index)
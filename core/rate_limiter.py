@@ -0,0 +1,159 @@
+import threading
+import time
+import logging
+from datetime import datetime, timezone
+from .metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Free-tier limits per provider: (requests per minute, burst size, daily quota; 0 = none)
+DEFAULT_LIMITS = {
+    'yfinance': (60, 10, 0),
+    'alpha_vantage': (5, 1, 25),
+    'twelvedata': (8, 8, 800)
+}
+
+
+class RateLimitExceeded(Exception):
+    """Raised when a request would exceed a provider's quota or wait timeout"""
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket for one provider.
+
+    Tokens refill continuously at `per_minute / 60` per second up to `burst`.
+    A caller that finds the bucket empty reserves the next token and sleeps
+    until it is due, so concurrent callers are served in arrival order instead
+    of racing each other. A `per_minute` of 0 (or less) means no rate limit,
+    only the daily quota.
+    """
+
+    def __init__(self, name, per_minute, burst, daily_quota=0, clock=time.monotonic, sleep=time.sleep):
+        self.name = name
+        self.rate = max(0.0, per_minute / 60.0)
+        self.burst = max(1, burst)
+        self.daily_quota = daily_quota
+        self._clock = clock
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self._tokens = float(self.burst)
+        self._last_refill = clock()
+        self._quota_day = self._today()
+        self._used_today = 0
+
+        self.granted_count = 0
+        self.wait_count = 0
+        self.wait_seconds = 0.0
+        self.rejected_count = 0
+
+    def acquire(self, timeout=None):
+        """
+        Take one token, sleeping until it is available
+
+        Args:
+            timeout (float): Longest acceptable wait in seconds (None = no limit)
+
+        Returns:
+            float: Seconds spent waiting
+
+        Raises:
+            RateLimitExceeded: Daily quota used up, or the wait would exceed timeout
+        """
+        with self._lock:
+            today = self._today()
+            if today != self._quota_day:
+                self._quota_day = today
+                self._used_today = 0
+
+            if self.daily_quota and self._used_today >= self.daily_quota:
+                self.rejected_count += 1
+                raise RateLimitExceeded(f"{self.name}: daily quota of {self.daily_quota} requests used")
+
+            self._refill()
+            wait = max(0.0, (1 - self._tokens) / self.rate) if self.rate else 0.0
+            if timeout is not None and wait > timeout:
+                self.rejected_count += 1
+                raise RateLimitExceeded(f"{self.name}: next request allowed in {wait:.1f}s")
+
+            # Reserve the token now; the bucket goes negative while callers wait
+            if self.rate:
+                self._tokens -= 1
+            self._used_today += 1
+            self.granted_count += 1
+            if wait > 0:
+                self.wait_count += 1
+                self.wait_seconds += wait
+
+        metrics.observe('rate_limit_wait_seconds', wait, provider=self.name)
+        if wait > 0:
+            logger.debug(f"Rate limited {self.name}: waiting {wait:.2f} seconds")
+            self._sleep(wait)
+        return wait
+
+    def stats(self):
+        """Counters for monitoring"""
+        with self._lock:
+            return {
+                'granted': self.granted_count,
+                'waited': self.wait_count,
+                'wait_seconds': self.wait_seconds,
+                'rejected': self.rejected_count,
+                'used_today': self._used_today
+            }
+
+    def _refill(self):
+        now = self._clock()
+        self._tokens = min(self.burst, self._tokens + (now - self._last_refill) * self.rate)
+        self._last_refill = now
+
+    def _today(self):
+        return datetime.now(timezone.utc).date()
+
+
+class RateLimiter:
+    """One token bucket per data provider"""
+
+    def __init__(self, limits=None):
+        self.buckets = {}
+        self._lock = threading.Lock()
+        for provider, (per_minute, burst, daily_quota) in (limits or DEFAULT_LIMITS).items():
+            self.buckets[provider] = TokenBucket(provider, per_minute, burst, daily_quota)
+
+    def configure(self, config):
+        """
+        Rebuild the buckets from the [Providers] section
+
+        Recognised options per provider: <provider>_per_minute, <provider>_burst
+        and <provider>_daily_quota. Buckets whose settings are unchanged keep
+        their state and counters.
+        """
+        providers = config['Providers'] if 'Providers' in config else {}
+        with self._lock:
+            for provider, (per_minute, burst, daily_quota) in DEFAULT_LIMITS.items():
+                per_minute = float(providers.get(f'{provider}_per_minute', per_minute))
+                burst = int(providers.get(f'{provider}_burst', burst))
+                daily_quota = int(providers.get(f'{provider}_daily_quota', daily_quota))
+
+                bucket = self.buckets.get(provider)
+                if bucket and (bucket.rate * 60, bucket.burst, bucket.daily_quota) == (per_minute, burst, daily_quota):
+                    continue
+                self.buckets[provider] = TokenBucket(provider, per_minute, burst, daily_quota)
+
+    def acquire(self, provider, timeout=None):
+        """Take one request token for a provider; see TokenBucket.acquire"""
+        with self._lock:
+            bucket = self.buckets.get(provider)
+        if bucket is None:
+            raise ValueError(f"No rate limit configured for provider: {provider}")
+        return bucket.acquire(timeout)
+
+    def stats(self):
+        """Counters for every provider"""
+        with self._lock:
+            buckets = dict(self.buckets)
+        return {provider: bucket.stats() for provider, bucket in buckets.items()}
+
+
+# Shared limiter so every caller of a provider draws from the same bucket
+rate_limiter = RateLimiter()
@@ -0,0 +1,171 @@
+import logging
+import numpy as np
+import pandas as pd
+from .bar_store import INTERVAL_SECONDS
+from .bar_buffer import BarBuffer
+
+logger = logging.getLogger(__name__)
+
+# Where each market's trading day starts: (timezone, local day start)
+SESSIONS = {
+    'forex': ('America/New_York', '17:00'),      # FX value date rolls at 5pm New York
+    'crypto': ('UTC', '00:00'),
+    'stock': ('America/New_York', '09:30'),      # US cash session open
+    'index': ('America/New_York', '09:30'),
+    'commodity': ('America/New_York', '18:00')   # CME Globex reopens at 6pm New York
+}
+
+# How each OHLCV column is aggregated into a longer bar
+AGGREGATIONS = {
+    'Open': 'first',
+    'High': 'max',
+    'Low': 'min',
+    'Close': 'last',
+    'Adj Close': 'last',
+    'Volume': 'sum'
+}
+
+
+def session_for(symbol):
+    """Guess a yfinance symbol's session from its form (EURUSD=X, GC=F, ^GSPC, BTC-USD)"""
+    if symbol.endswith('-USD'):
+        return 'crypto'
+    if symbol.endswith('=X') or (len(symbol) == 6 and symbol.isalpha() and symbol.isupper()):
+        return 'forex'
+    if symbol.endswith('=F'):
+        return 'commodity'
+    if symbol.startswith('^'):
+        return 'index'
+    return 'stock'
+
+
+def resample(bars, interval, session='crypto'):
+    """
+    Aggregate OHLCV bars into a higher timeframe
+
+    Bins are anchored to the session's day start in its local timezone, so
+    4h forex bars open at 17:00, 21:00, 01:00, ... New York time and a daily
+    stock bar covers one cash session, on either side of a DST change. Bins
+    without any base bar (weekends, holidays, overnight) are not emitted. The
+    last bar is partial while its bin is still open.
+
+    Args:
+        bars (pd.DataFrame): Base bars, oldest first; a naive index is taken as UTC
+        interval (str): Target interval ('2h', '4h', '1d', ...), at most one day
+            and a whole fraction of it
+        session (str): Key into SESSIONS
+
+    Returns:
+        pd.DataFrame: Aggregated bars indexed by their UTC opening time
+    """
+    seconds = _bin_seconds(interval, session)
+    if bars.empty:
+        return bars.copy()
+
+    timezone = SESSIONS[session][0]
+    index = pd.DatetimeIndex(bars.index)
+    if index.tz is None:
+        index = index.tz_localize('UTC')
+    labels = _labels(index, seconds, session)
+
+    columns = {column: AGGREGATIONS.get(column, AGGREGATIONS.get(column.title(), 'last'))
+               for column in bars.columns}
+    result = bars.groupby(labels.values, sort=True).agg(columns)
+
+    opens = pd.DatetimeIndex(result.index).tz_localize(timezone, ambiguous='NaT', nonexistent='shift_forward')
+    opens = opens.tz_convert('UTC')
+    if opens.hasnans:
+        # A bin opening in the repeated hour of a DST change is labelled by its first bar
+        first = pd.Series(index.tz_convert('UTC')).groupby(labels.values, sort=True).min()
+        opens = opens.where(opens.notna(), pd.DatetimeIndex(first.array))
+    result.index = opens
+    return result
+
+
+def resample_buffer(bars, interval, session='crypto'):
+    """
+    resample() for a BarBuffer, without building a DataFrame
+
+    Args:
+        bars (BarBuffer): Base bars; wall-clock times (no timezone) are taken as UTC
+        interval (str): Target interval, as for resample()
+        session (str): Key into SESSIONS
+
+    Returns:
+        BarBuffer: Aggregated bars, exactly as many as there are bins, in UTC
+    """
+    seconds = _bin_seconds(interval, session)
+    if bars.empty:
+        return BarBuffer(0, bars.dtype, 'UTC')
+
+    times = bars.time
+    labels = _labels(pd.DatetimeIndex(times.astype('datetime64[ns]')).tz_localize('UTC'), seconds, session)
+    codes = labels.as_unit('ns').asi8
+    order = None
+    if len(codes) > 1 and (codes[1:] < codes[:-1]).any():
+        # Only a sub-hour bin across a DST fall-back revisits an earlier label
+        order = np.argsort(codes, kind='stable')
+        codes = codes[order]
+    starts = np.flatnonzero(np.concatenate(([True], codes[1:] != codes[:-1])))
+    ends = np.append(starts[1:], len(codes)) - 1
+
+    def ordered(values):
+        return values if order is None else values[order]
+
+    opens = pd.DatetimeIndex(codes[starts].astype('datetime64[ns]'))
+    opens = opens.tz_localize(SESSIONS[session][0], ambiguous='NaT', nonexistent='shift_forward').tz_convert('UTC')
+    opens = opens.as_unit('ns').asi8.copy()
+    # A bin opening in the repeated hour of a DST change is labelled by its first bar
+    missing = opens == np.iinfo(np.int64).min
+    opens[missing] = ordered(times)[starts][missing]
+
+    result = BarBuffer(len(starts), bars.dtype, 'UTC')
+    result.extend(opens,
+                  ordered(bars.open)[starts],
+                  np.fmax.reduceat(ordered(bars.high), starts),
+                  np.fmin.reduceat(ordered(bars.low), starts),
+                  ordered(bars.close)[ends],
+                  np.add.reduceat(ordered(bars.volume), starts))
+    return result
+
+
+def _bin_seconds(interval, session):
+    seconds = INTERVAL_SECONDS.get(interval)
+    if seconds is None or seconds > 86400 or 86400 % seconds:
+        raise ValueError(f"Cannot resample to interval: {interval}")
+    if session not in SESSIONS:
+        raise ValueError(f"Unknown session: {session}")
+    return seconds
+
+
+def _labels(index, seconds, session):
+    """Bin of each UTC opening time, as the bin's local wall-clock opening time"""
+    timezone, day_start = SESSIONS[session]
+    # Bin on local wall-clock time, shifted so the session opens at midnight
+    offset = pd.Timedelta(f'{day_start}:00')
+    local = index.tz_convert(timezone).tz_localize(None)
+    return (local - offset).floor(f'{seconds}s') + offset
+
+
+def align(frame, interval, index, base_interval):
+    """
+    Values of higher-timeframe bars as known at the close of each base bar
+
+    Each base bar gets the row of the last `interval` bar that had closed by
+    the time the base bar closed, so backtests never see a bar early.
+
+    Args:
+        frame (pd.DataFrame): Rows indexed by the opening time of `interval` bars
+        interval (str): Interval of `frame`
+        index (pd.DatetimeIndex): Opening times of the base bars
+        base_interval (str): Interval of the base bars
+
+    Returns:
+        pd.DataFrame: `frame` columns on `index`, NaN before the first closed bar
+    """
+    closes = frame.index + pd.Timedelta(seconds=INTERVAL_SECONDS[interval])
+    position = closes.searchsorted(index + pd.Timedelta(seconds=INTERVAL_SECONDS[base_interval]), side='right') - 1
+    values = frame.to_numpy(dtype=float)[np.maximum(position, 0)] if len(frame) else \
+        np.full((len(index), frame.shape[1]), np.nan)
+    values[position < 0] = np.nan
+    return pd.DataFrame(values, index=index, columns=frame.columns)
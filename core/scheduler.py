@@ -0,0 +1,150 @@
+import time
+import logging
+import pandas as pd
+from .bar_store import INTERVAL_SECONDS
+from .resampler import SESSIONS
+
+logger = logging.getLogger(__name__)
+
+
+def next_bar_close(interval, session, after):
+    """
+    First bar close strictly after a moment
+
+    Bars are laid out from the session's day start in its local timezone, the
+    same way resample() bins them, so 60m stock bars close at :30 New York
+    time and 60m forex bars on the hour, on either side of a DST change.
+
+    Args:
+        interval (str): Bar interval, at most one day and a whole fraction of it
+        session (str): Key into SESSIONS
+        after (float): Unix time
+
+    Returns:
+        float: Unix time of the close
+    """
+    seconds = INTERVAL_SECONDS.get(interval)
+    if seconds is None or seconds > 86400 or 86400 % seconds:
+        raise ValueError(f"Cannot schedule interval: {interval}")
+    timezone, day_start = SESSIONS[session]
+    offset = pd.Timedelta(f'{day_start}:00')
+    step = pd.Timedelta(seconds=seconds)
+
+    local = pd.Timestamp(after, unit='s', tz='UTC').tz_convert(timezone).tz_localize(None)
+    start = (local - offset).floor(step) + offset
+    # A wall-clock boundary in the hour clocks go back happens twice
+    moments = [
+        (start + k * step).tz_localize(timezone, ambiguous=dst, nonexistent='shift_forward').timestamp()
+        for k in range(3) for dst in (True, False)
+    ]
+    return min(moment for moment in moments if moment > after)
+
+
+class BarCloseScheduler:
+    """
+    Fires jobs just after the bars they read close.
+
+    Each job (an asset type) has its own bar interval. Fire times are computed
+    from absolute bar boundaries, never from how long the last run took, so
+    the schedule does not drift. Jobs due at the same moment run in one
+    callback. When a run overruns past a job's next fire time, the ticks it
+    missed are skipped and counted rather than run back to back.
+
+    Given a market calendar, a job does not tick through its market's closed
+    hours: after the last bar of a session it next fires once at the open, to
+    catch up on the gap, and then after each bar close again.
+    """
+
+    def __init__(self, cadences, delay=5, clock=time.time, sleep=time.sleep, calendar=None):
+        """
+        Args:
+            cadences (dict): Job name (asset type) -> bar interval; the name also
+                selects the session whose bars are followed (crypto if unknown)
+            delay (float): Seconds after a close before firing, so providers
+                have published the bar
+            clock: Returns the current Unix time
+            sleep: Sleeps for a number of seconds
+            calendar (MarketCalendar): Market hours per job name (None = always open)
+        """
+        self.cadences = dict(cadences)
+        self.delay = delay
+        self._clock = clock
+        self._sleep = sleep
+        self.calendar = calendar
+        self._next = {}
+        self.tick_count = 0
+        self.skipped = {name: 0 for name in self.cadences}
+        self.max_lateness = 0.0
+
+    def next_fire(self, name, after):
+        """First fire time of a job strictly after `after`"""
+        session = name if name in SESSIONS else 'crypto'
+        close = next_bar_close(self.cadences[name], session, after - self.delay)
+        if self.calendar is not None:
+            # A bar with no trading in it is not worth waking for
+            seconds = INTERVAL_SECONDS[self.cadences[name]]
+            if not self.calendar.open_between(name, close - seconds, close):
+                return self.calendar.next_open(name, close) + self.delay
+        return close + self.delay
+
+    def run(self, callback, immediate=True, ticks=None):
+        """
+        Call `callback(names)` with the jobs due, just after each of their bar closes
+
+        Args:
+            callback: Receives the list of due job names; exceptions are logged
+            immediate (bool): Run every job once at start instead of waiting for
+                the first close
+            ticks (int): Stop after this many callbacks (None = run forever)
+        """
+        now = self._clock()
+        self._next = {name: self.next_fire(name, now) for name in self.cadences}
+        if immediate:
+            self._fire(callback, list(self.cadences), now)
+
+        while ticks is None or self.tick_count < ticks:
+            wake = min(self._next.values())
+            now = self._clock()
+            if wake > now:
+                self._sleep(wake - now)
+                now = self._clock()
+
+            due = [name for name, at in self._next.items() if at <= now]
+            if not due:
+                continue
+            self.max_lateness = max(self.max_lateness, now - min(self._next[name] for name in due))
+            self._fire(callback, due, now)
+            self._advance(due)
+
+    def _fire(self, callback, names, now):
+        self.tick_count += 1
+        logger.info(f"Bar close tick for {', '.join(names)}")
+        try:
+            callback(names)
+        except Exception as e:
+            logger.error(f"Scheduled run for {', '.join(names)} failed: {str(e)}")
+        elapsed = self._clock() - now
+        logger.debug(f"Tick took {elapsed:.2f}s")
+
+    def _advance(self, names):
+        """Move each job to its next fire time, skipping the ones already past"""
+        now = self._clock()
+        for name in names:
+            following = self.next_fire(name, self._next[name])
+            missed = 0
+            while following <= now:
+                missed += 1
+                following = self.next_fire(name, following)
+            if missed:
+                self.skipped[name] += missed
+                logger.warning(f"Run overran {missed} {self.cadences[name]} tick(s) of {name}; skipping them")
+            self._next[name] = following
+
+    def stats(self):
+        """Ticks run, ticks skipped per job and the worst delay past a fire time"""
+        return {
+            'ticks': self.tick_count,
+            'skipped': dict(self.skipped),
+            'max_lateness': self.max_lateness,
+            'next': {name: pd.Timestamp(at, unit='s', tz='UTC').isoformat() for name, at in self._next.items()}
+        }
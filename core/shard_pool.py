@@ -0,0 +1,231 @@
+import logging
+import multiprocessing
+import time
+import zlib
+from multiprocessing import shared_memory
+import numpy as np
+from .bar_buffer import BarBuffer
+from .bar_store import bar_store
+from .indicator_engine import indicator_engine
+from .lookback import lookback, DEFAULT_MARGIN
+
+logger = logging.getLogger(__name__)
+
+# Byte alignment of every array in a published block
+ALIGNMENT = 64
+
+# Seconds a worker gets to finish its shard after close() before it is terminated
+STOP_TIMEOUT = 10
+
+
+def shard_for(symbol, shards):
+    """Stable shard of a symbol, so each worker keeps the indicator state of the same assets"""
+    return zlib.crc32(symbol.encode()) % shards
+
+
+def _aligned(size):
+    return -(-size // ALIGNMENT) * ALIGNMENT
+
+
+def publish(series):
+    """
+    Copy bar buffers into one shared memory block
+
+    Args:
+        series (dict): (symbol, interval) -> (BarBuffer, days, fetched_at), as
+            returned by BarStore.export
+
+    Returns:
+        tuple: (SharedMemory, layout); layout maps (symbol, interval) to
+            (offset, bars, dtype, tz, days, fetched_at). The caller closes and
+            unlinks the block once the workers are done with it.
+    """
+    layout = {}
+    offset = 0
+    for key, (bars, days, fetched_at) in series.items():
+        layout[key] = (offset, len(bars), bars.dtype.str, bars.tz, days, fetched_at)
+        offset += _aligned(len(bars) * 8) + 5 * _aligned(len(bars) * bars.dtype.itemsize)
+
+    block = shared_memory.SharedMemory(create=True, size=max(offset, 1))
+    for key, (bars, _, _) in series.items():
+        columns = (bars.time, bars.open, bars.high, bars.low, bars.close, bars.volume)
+        for target, values in zip(_arrays(block.buf, layout[key]), columns):
+            target[:] = values
+    return block, layout
+
+
+def attach(buffer, entry):
+    """Read-only BarBuffer over one series of a published block"""
+    arrays = _arrays(buffer, entry)
+    for array in arrays:
+        array.flags.writeable = False
+    return BarBuffer.wrap(*arrays, tz=entry[3])
+
+
+def _arrays(buffer, entry):
+    """time, open, high, low, close and volume arrays of a series in a block"""
+    offset, count, dtype = entry[:3]
+    dtype = np.dtype(dtype)
+    arrays = [np.ndarray(count, dtype=np.int64, buffer=buffer, offset=offset)]
+    offset += _aligned(count * 8)
+    for _ in range(5):
+        arrays.append(np.ndarray(count, dtype=dtype, buffer=buffer, offset=offset))
+        offset += _aligned(count * dtype.itemsize)
+    return arrays
+
+
+class ShardPool:
+    """
+    Worker processes that run the agents on shards of the asset list.
+
+    Assets are assigned to workers by a hash of their symbol, so a worker
+    sees the same assets every cycle and its indicator engine stays warm.
+    The coordinator downloads the bars as usual and publishes the series a
+    cycle needs once into a shared memory block; workers read them in place
+    through their own bar store and send back (symbol, signal, seconds)
+    records. Series missing from the block are downloaded by the worker.
+
+    Workers are spawned on first use; a worker that dies is reported as
+    HOLD (Error) for its shard and replaced on the next cycle. Workers size
+    their series with the coordinator's lookback margin, so they ask for no
+    more days than the coordinator published.
+    """
+
+    def __init__(self, processes, dtype='float32', margin=DEFAULT_MARGIN):
+        self.processes = processes
+        self.dtype = str(np.dtype(dtype))
+        self.margin = margin
+        self._context = multiprocessing.get_context('spawn')
+        self._workers = [None] * processes
+
+    def evaluate(self, assets, series):
+        """
+        Run each asset's agent in its shard's worker
+
+        Args:
+            assets (list): Asset dicts (name, symbol, type)
+            series (dict): Symbol -> (provider symbol, interval) pairs its agent reads
+
+        Returns:
+            dict: Symbol -> (signal, seconds spent in the agent)
+        """
+        shards = {}
+        for asset in assets:
+            shards.setdefault(shard_for(asset['symbol'], self.processes), []).append(asset)
+
+        block, layout = publish(bar_store.export({key for keys in series.values() for key in keys}))
+        try:
+            results = {}
+            sent = []
+            for index, shard in shards.items():
+                keys = {key for asset in shard for key in series.get(asset['symbol'], ())}
+                try:
+                    self._worker(index).send(('evaluate', block.name,
+                                              {key: layout[key] for key in keys if key in layout}, shard))
+                    sent.append((index, shard))
+                except OSError as e:
+                    self._failed(index, shard, e, results)
+
+            for index, shard in sent:
+                try:
+                    for symbol, signal, seconds in self._workers[index][1].recv():
+                        results[symbol] = (signal, seconds)
+                except (EOFError, OSError) as e:
+                    self._failed(index, shard, e, results)
+            return results
+        finally:
+            block.close()
+            block.unlink()
+
+    def reset(self):
+        """Drop the indicator state of every running worker"""
+        for worker in self._workers:
+            if worker is not None:
+                worker[1].send(('reset',))
+                worker[1].recv()
+
+    def close(self):
+        """Stop the workers"""
+        for index, worker in enumerate(self._workers):
+            if worker is None:
+                continue
+            process, connection = worker
+            try:
+                connection.send(None)
+            except OSError:
+                pass
+            process.join(STOP_TIMEOUT)
+            if process.is_alive():
+                process.terminate()
+                process.join()
+            connection.close()
+            self._workers[index] = None
+
+    def _worker(self, index):
+        worker = self._workers[index]
+        if worker is None or not worker[0].is_alive():
+            connection, child = self._context.Pipe()
+            process = self._context.Process(target=_serve,
+                                            args=(child, self.dtype, self.margin, logging.getLogger().level),
+                                            name=f'shard-{index}', daemon=True)
+            process.start()
+            child.close()
+            worker = self._workers[index] = (process, connection)
+            logger.info(f"Started shard worker {index} of {self.processes} (pid {process.pid})")
+        return worker[1]
+
+    def _failed(self, index, shard, error, results):
+        logger.error(f"Shard worker {index} failed: {type(error).__name__}: {str(error)}")
+        process, connection = self._workers[index]
+        if process.is_alive():
+            process.terminate()
+        connection.close()
+        self._workers[index] = None
+        for asset in shard:
+            results[asset['symbol']] = ("HOLD (Error: shard worker exited)", 0.0)
+
+
+def _serve(connection, dtype, margin, log_level):
+    """Worker process loop: evaluate shards until told to stop"""
+    logging.basicConfig(level=log_level, format='%(asctime)s - %(processName)s - %(levelname)s - %(message)s')
+    bar_store.use_dtype(dtype)
+    lookback.margin = margin
+    while True:
+        try:
+            message = connection.recv()
+        except EOFError:
+            return
+        if message is None:
+            return
+        if message[0] == 'reset':
+            indicator_engine.reset()
+            connection.send(True)
+            continue
+        _, name, layout, assets = message
+        connection.send(_evaluate_shard(name, layout, assets))
+
+
+def _evaluate_shard(name, layout, assets):
+    from .signal_generator import agent_for
+
+    # Spawned workers report to the coordinator's resource tracker; only the coordinator unlinks
+    block = shared_memory.SharedMemory(name=name)
+    try:
+        for (symbol, interval), entry in layout.items():
+            bar_store.install(symbol, interval, attach(block.buf, entry), entry[4], entry[5])
+        records = []
+        for asset in assets:
+            start = time.perf_counter()
+            try:
+                signal = agent_for(asset['type']).generate_signal(asset['symbol'])
+            except Exception as e:
+                signal = f"HOLD (Error: {str(e)})"
+            records.append((asset['symbol'], signal, time.perf_counter() - start))
+        return records
+    finally:
+        # The bars point into the block, which must not be closed while they exist
+        bar_store.clear()
+        try:
+            block.close()
+        except BufferError:
+            logger.warning(f"Shared bars {name} still referenced; leaving them mapped")
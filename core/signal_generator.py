@@ -1,41 +1,255 @@
+import math
 import random
+import importlib
 import json
 import os
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from ai_agents import forex_agent, crypto_agent, stock_agent, commodity_agent, index_agent
+from core.bar_store import bar_store, INTERVAL_SECONDS
+from core.market_calendar import market_calendar
+from core.lookback import lookback
+from core.rate_limiter import rate_limiter
+from core.metrics import metrics
+from core.profiler import profiler
+
+logger = logging.getLogger(__name__)
+
+# Agent module responsible for each asset type; names are replaced by the
+# imported module the first time agent_for() is asked for the type
+AGENTS = {
+    'forex': 'ai_agents.forex_agent',
+    'crypto': 'ai_agents.crypto_agent',
+    'stock': 'ai_agents.stock_agent',
+    'commodity': 'ai_agents.commodity_agent',
+    'index': 'ai_agents.index_agent'
+}
+
+# Bars signal entries and exits are priced from; expiries are whole
+# minutes, shorter than the 15m/60m bars the agents read
+EXIT_INTERVAL = '1m'
+
+# Days of 1m bars yfinance serves
+EXIT_MAX_DAYS = 7
+
+
+def agent_for(asset_type):
+    """Agent module of an asset type, imported when the type is first evaluated"""
+    agent = AGENTS[asset_type]
+    if isinstance(agent, str):
+        agent = AGENTS[asset_type] = importlib.import_module(agent)
+    return agent
 
 class SignalGenerator:
     def __init__(self, config):
         self.config = config
-        with open('config/assets_list.json') as f:
+        with open('config/asset_list.json') as f:
             self.assets = json.load(f)
-        
-    def generate_signals(self):
-        signals = []
-        selected_assets = random.sample(self.assets, min(5, len(self.assets)))
-        
-        for asset in selected_assets:
-            asset_type = asset['type']
-            
-            if asset_type == 'forex':
-                signal = forex_agent.generate_signal(asset['symbol'])
-            elif asset_type == 'crypto':
-                signal = crypto_agent.generate_signal(asset['symbol'])
-            elif asset_type == 'stock':
-                signal = stock_agent.generate_signal(asset['symbol'])
-            elif asset_type == 'commodity':
-                signal = commodity_agent.generate_signal(asset['symbol'])
-            elif asset_type == 'index':
-                signal = index_agent.generate_signal(asset['symbol'])
+        self.asset_types = {asset['symbol']: asset['type'] for asset in self.assets}
+
+        settings = config['Settings'] if 'Settings' in config else {}
+        self.workers = max(1, int(settings.get('workers', 4)))
+        self.processes = max(1, int(settings.get('processes', 1)))
+        self._shards = None
+        cluster = config['Cluster'] if 'Cluster' in config else {}
+        self.role = cluster.get('role', 'off')
+        self._coordinator = None
+        self.assets_per_cycle = max(1, int(settings.get('assets_per_cycle', 5)))
+        schedule = config['Schedule'] if 'Schedule' in config else {}
+        self.market_hours = str(schedule.get('market_hours', 'true')).lower() in ('1', 'true', 'yes', 'on')
+
+        cache = config['Cache'] if 'Cache' in config else {}
+        bar_store.use_dtype(cache.get('bar_dtype', 'float32'))
+        rate_limiter.configure(config)
+        lookback.configure(config)
+
+    def generate_signals(self, asset_types=None):
+        """
+        Evaluate a random sample of the asset list
+
+        Assets whose market has had no trading during their last bar are left
+        out (see open_types), so closed markets cost no fetches or agent runs.
+        With [Cluster] role = coordinator the agents run on cluster workers
+        (see Coordinator), which download their own bars; with [Settings]
+        processes above 1 in that many worker processes (see ShardPool);
+        otherwise on `workers` threads.
+
+        Args:
+            asset_types (list): Only sample assets of these types (default: all)
+
+        Returns:
+            list: One signal dict per evaluated asset
+        """
+        candidates = [
+            asset for asset in self.assets
+            if asset['type'] in AGENTS and (asset_types is None or asset['type'] in asset_types)
+        ]
+        if self.market_hours:
+            open_types = self.open_types()
+            closed = {asset['type'] for asset in candidates} - open_types
+            if closed:
+                logger.info(f"Skipping closed markets: {', '.join(sorted(closed))}")
+            candidates = [asset for asset in candidates if asset['type'] in open_types]
+        selected_assets = random.sample(candidates, min(self.assets_per_cycle, len(candidates)))
+        start = time.time()
+        before = metrics.snapshot()
+
+        # Profiled when [Profiling] samples this cycle (main.py's loop may already have)
+        with profiler.cycle('-'.join(sorted(asset_types or ['all']))):
+            if self.role == 'coordinator':
+                signals = self._evaluate_remote(selected_assets)
+            elif self.processes > 1 and len(selected_assets) > 1:
+                # Download here, run the agents in the shard workers on shared bars
+                with ThreadPoolExecutor(max_workers=self.workers) as pool:
+                    self._prefetch(selected_assets, pool)
+                signals = self._evaluate_sharded(selected_assets)
+            elif self.workers > 1 and len(selected_assets) > 1:
+                # Download every series the cycle needs first, then run the agents
+                # against the warm bar store so each one only does indicator work
+                with ThreadPoolExecutor(max_workers=self.workers) as pool:
+                    self._prefetch(selected_assets, pool)
+                    signals = list(pool.map(self._evaluate, selected_assets))
             else:
-                continue
-                
-            signals.append({
-                'asset': asset['name'],
-                'symbol': asset['symbol'],
-                'signal': signal,
-                'confidence': random.randint(70, 95),
-                'timestamp': datetime.now().isoformat()
-            })
-        
+                self._prefetch(selected_assets)
+                signals = [self._evaluate(asset) for asset in selected_assets]
+
+        elapsed = time.time() - start
+        metrics.observe('cycle_seconds', elapsed)
+        logger.info(f"Evaluated {len(signals)} assets in {elapsed:.2f}s with {self.workers} workers | "
+                    f"{metrics.summary(before)}")
         return signals
+
+    def cadences(self):
+        """
+        Bar interval each listed asset type is evaluated on
+
+        [Schedule] <type> overrides the interval the type's agent reads, so by
+        default each type runs just after its own bars close. Only types
+        without an override need their agent imported.
+        """
+        schedule = self.config['Schedule'] if 'Schedule' in self.config else {}
+        cadences = {}
+        for asset in self.assets:
+            asset_type = asset['type']
+            if asset_type in AGENTS and asset_type not in cadences:
+                if asset_type in schedule:
+                    cadences[asset_type] = schedule[asset_type]
+                else:
+                    cadences[asset_type] = agent_for(asset_type).required_series(asset['symbol'])[0][1]
+        return cadences
+
+    def open_types(self, now=None):
+        """
+        Asset types whose market traded at some point during their last bar
+
+        Looking back one bar rather than at this instant keeps the run just
+        after the closing bell, which evaluates the session's final bar.
+
+        Args:
+            now (float): Unix time (default now)
+
+        Returns:
+            set: Asset type names
+        """
+        now = time.time() if now is None else now
+        return {
+            asset_type for asset_type, interval in self.cadences().items()
+            if market_calendar.open_between(asset_type, now - INTERVAL_SECONDS.get(interval, 3600), now)
+        }
+
+    def price_at(self, symbol, asset_type, at):
+        """
+        Price of an asset at Unix time `at`
+
+        Read from 1m bars, downloaded as far back as `at` (at most a week),
+        so a signal and each of its expiries are priced at their own minute
+        rather than at the close of one of the agent's 15m/60m bars. This
+        host downloads them itself, also as a [Cluster] coordinator.
+
+        Returns:
+            float: The price, or None when it is not known (yet)
+        """
+        series = agent_for(asset_type).required_series(symbol)
+        if not series:
+            return None
+        provider_symbol = series[0][0]
+        days = min(EXIT_MAX_DAYS, math.ceil(max(0.0, time.time() - at) / 86400) + 1)
+        try:
+            bar_store.get_buffer(provider_symbol, interval=EXIT_INTERVAL, period=f"{days}d")
+        except Exception as e:
+            logger.warning(f"Could not fetch {EXIT_INTERVAL} bars of {provider_symbol}: {str(e)}")
+            return None
+        # The close of the last bar that ended by `at`
+        return bar_store.close_at(provider_symbol, EXIT_INTERVAL, at - INTERVAL_SECONDS[EXIT_INTERVAL])
+
+    def _prefetch(self, assets, pool=None):
+        """Batch-download every series the selected agents need, one request per (interval, period)"""
+        series = [
+            required
+            for asset in assets
+            for required in agent_for(asset['type']).required_series(asset['symbol'])
+        ]
+        requests = bar_store.prefetch(series, executor=pool)
+        logger.info(f"Prefetched {len(series)} series with {requests} requests")
+
+    def _evaluate(self, asset):
+        start = time.perf_counter()
+        with profiler.agent(asset['type'], asset['symbol']):
+            signal = agent_for(asset['type']).generate_signal(asset['symbol'])
+        return self._signal(asset, signal, time.perf_counter() - start)
+
+    def _evaluate_sharded(self, assets):
+        if self._shards is None:
+            # Only sharded runs pay for importing multiprocessing
+            from core.shard_pool import ShardPool
+            self._shards = ShardPool(self.processes, bar_store.dtype, lookback.margin)
+        series = {
+            asset['symbol']: [(symbol, interval) for symbol, interval, _ in
+                              agent_for(asset['type']).required_series(asset['symbol'])]
+            for asset in assets
+        }
+        results = self._shards.evaluate(assets, series)
+        return [self._signal(asset, *results.get(asset['symbol'], ("HOLD (Error: no result)", 0.0)))
+                for asset in assets]
+
+    def _evaluate_remote(self, assets):
+        if self._coordinator is None:
+            from core.cluster import open_coordinator
+            self._coordinator = open_coordinator(self.config)
+        intervals = {asset['symbol']: agent_for(asset['type']).required_series(asset['symbol'])[0][1]
+                     for asset in assets}
+        results = self._coordinator.evaluate(assets, intervals)
+        return [self._signal(asset, *results[asset['symbol']]) for asset in assets]
+
+    def serve(self):
+        """Run the agents for the leases of a [Cluster] coordinator until interrupted (role = worker)"""
+        from core.cluster import open_worker
+        worker = open_worker(self.config)
+        try:
+            worker.run()
+        finally:
+            worker.broker.close()
+
+    def close(self):
+        """Stop the shard workers and the cluster queues, if either was started"""
+        if self._shards is not None:
+            self._shards.close()
+            self._shards = None
+        if self._coordinator is not None:
+            self._coordinator.close()
+            self._coordinator = None
+
+    def _signal(self, asset, signal, seconds):
+        """Signal dict of one agent run"""
+        metrics.observe('agent_seconds', seconds, agent=asset['type'])
+        # Agents report failures as a HOLD carrying the error
+        if signal.startswith('HOLD (Error'):
+            metrics.inc('agent_errors_total', agent=asset['type'], symbol=asset['symbol'])
+        return {
+            'asset': asset['name'],
+            'symbol': asset['symbol'],
+            'signal': signal,
+            'confidence': random.randint(70, 95),
+            'timestamp': datetime.now().isoformat()
+        }
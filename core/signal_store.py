@@ -0,0 +1,371 @@
+import os
+import queue
+import sqlite3
+import threading
+import time
+import logging
+from contextlib import closing
+from datetime import datetime
+from .metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Default location of the signal history database
+DATABASE_PATH = 'data_cache/signals.db'
+
+# Expiries in minutes each BUY/SELL signal is settled at (see backtester.EXPIRIES)
+DEFAULT_EXPIRIES = (5, 15, 60)
+
+# Signal labels, longest first so STRONG BUY is not read as BUY
+LABELS = ('STRONG BUY', 'STRONG SELL', 'BUY', 'SELL', 'HOLD')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS signals (
+    id INTEGER PRIMARY KEY,
+    timestamp REAL NOT NULL,
+    symbol TEXT NOT NULL,
+    asset TEXT,
+    agent TEXT NOT NULL,
+    signal TEXT NOT NULL,
+    detail TEXT,
+    confidence INTEGER,
+    price REAL
+);
+CREATE INDEX IF NOT EXISTS signals_symbol_time ON signals (symbol, timestamp);
+CREATE INDEX IF NOT EXISTS signals_agent_signal ON signals (agent, signal);
+CREATE INDEX IF NOT EXISTS signals_time ON signals (timestamp);
+CREATE TABLE IF NOT EXISTS outcomes (
+    signal_id INTEGER NOT NULL REFERENCES signals (id),
+    expiry INTEGER NOT NULL,
+    exit_price REAL NOT NULL,
+    outcome INTEGER NOT NULL,
+    settled_at REAL NOT NULL,
+    PRIMARY KEY (signal_id, expiry)
+) WITHOUT ROWID;
+"""
+
+
+def signal_label(text):
+    """Leading STRONG BUY/BUY/HOLD/SELL/STRONG SELL of an agent's signal text"""
+    for label in LABELS:
+        if text.startswith(label):
+            return label
+    return 'HOLD'
+
+
+def _direction(label):
+    return 1 if 'BUY' in label else -1 if 'SELL' in label else 0
+
+
+def _unix_time(timestamp):
+    """Unix seconds from a signal's ISO timestamp (local time when naive) or a number"""
+    if isinstance(timestamp, (int, float)):
+        return float(timestamp)
+    return datetime.fromisoformat(timestamp).timestamp()
+
+
+class SignalStore:
+    """
+    SQLite history of every signal and how it turned out.
+
+    The database runs in WAL mode, so queries never wait for the writer.
+    record() and settle() only enqueue; a background thread writes whatever
+    has queued up in one transaction, so a cycle's signals cost one commit
+    and a slow disk never stalls the signal loop. When the queue is full the
+    oldest batch is dropped.
+
+    Each BUY/SELL signal is settled once per expiry (minutes): its entry
+    price (the price at the signal) against the price that far after it.
+    Both are looked up on the background thread, so downloading the bars
+    they come from never delays a cycle either. Outcome 1 is a win, -1 a
+    loss and 0 a tie, as in the backtester. Times are Unix seconds; (symbol, timestamp) and
+    (agent, signal) are indexed for per-asset range queries and statistics.
+    """
+
+    def __init__(self, path=DATABASE_PATH, expiries=DEFAULT_EXPIRIES, queue_size=100):
+        self.path = path
+        self.expiries = tuple(int(expiry) for expiry in expiries)
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._thread = None
+        self._lock = threading.Lock()
+        self.written_count = 0
+        self.dropped_count = 0
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with closing(self._connect()) as db:
+            db.execute('PRAGMA journal_mode=WAL')
+            db.executescript(SCHEMA)
+
+    def start(self):
+        """Start the writer thread"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='signal-store', daemon=True)
+            self._thread.start()
+        return self
+
+    def record(self, signals, asset_types=None):
+        """
+        Queue one cycle's signals for writing, without their entry price (see settle())
+
+        Args:
+            signals (list): Signal dicts from SignalGenerator.generate_signals
+            asset_types (dict): Symbol -> asset type (agent) of each signal
+
+        Returns:
+            bool: False if the queue was full and the oldest batch was dropped
+        """
+        asset_types = asset_types or {}
+        rows = []
+        for s in signals:
+            agent = asset_types.get(s['symbol'], '')
+            rows.append((
+                _unix_time(s['timestamp']),
+                s['symbol'],
+                s.get('asset'),
+                agent,
+                signal_label(s['signal']),
+                s['signal'],
+                s.get('confidence'),
+                None
+            ))
+        return self._put(('signals', rows)) if rows else True
+
+    def settle(self, price_at, now=None):
+        """
+        Queue settling the signals whose expiry has passed
+
+        The background thread prices each signal at its own timestamp (once,
+        kept as its entry price) and at each expiry that has passed, and
+        writes the outcomes it could price.
+
+        Args:
+            price_at (callable): (symbol, agent, unix time) -> price at that time,
+                or None while it is not known yet (the signal is retried later)
+            now (float): Unix time (default: when the thread gets to it)
+
+        Returns:
+            bool: False if the queue was full and the oldest batch was dropped
+        """
+        return self._put(('settle', (price_at, now)))
+
+    def unsettled(self, now=None, lookback_days=7):
+        """
+        BUY/SELL signals with an expiry that has passed but no outcome for it
+
+        Signals older than `lookback_days` whose price never became known
+        are left unsettled for good.
+
+        Returns:
+            list: (id, symbol, agent, signal, timestamp, price, expiry) tuples;
+                price is None until the entry price is known
+        """
+        if not self.expiries:
+            return []
+        now = time.time() if now is None else now
+        query = f"""
+            WITH expiries (expiry) AS (VALUES {', '.join('(?)' for _ in self.expiries)})
+            SELECT s.id, s.symbol, s.agent, s.signal, s.timestamp, s.price, e.expiry
+            FROM signals s CROSS JOIN expiries e
+            WHERE s.timestamp > ? AND s.timestamp + e.expiry * 60 <= ?
+              AND s.signal != 'HOLD' AND s.agent != ''
+              AND NOT EXISTS (SELECT 1 FROM outcomes o WHERE o.signal_id = s.id AND o.expiry = e.expiry)
+            ORDER BY s.timestamp
+        """
+        with closing(self._connect()) as db:
+            return db.execute(query, (*self.expiries, now - lookback_days * 86400, now)).fetchall()
+
+    def recent(self, symbol, limit=20, start=None, end=None):
+        """
+        Newest signals of one asset, with their outcomes
+
+        Args:
+            symbol (str): Asset list symbol (EURUSD, BTC-USD, ...)
+            limit (int): Most rows returned
+            start, end (float): Optional Unix time range (start inclusive, end exclusive)
+
+        Returns:
+            list: Signal dicts, newest first; 'outcomes' maps expiry to outcome
+        """
+        query = "SELECT * FROM signals WHERE symbol = ? AND timestamp >= ? AND timestamp < ? " \
+                "ORDER BY timestamp DESC LIMIT ?"
+        arguments = (symbol, float('-inf') if start is None else start,
+                     float('inf') if end is None else end, limit)
+        with closing(self._connect()) as db:
+            db.row_factory = sqlite3.Row
+            rows = [dict(row) for row in db.execute(query, arguments)]
+            ids = [row['id'] for row in rows]
+            outcomes = db.execute(
+                f"SELECT signal_id, expiry, outcome FROM outcomes WHERE signal_id IN ({', '.join('?' * len(ids))})",
+                ids
+            ).fetchall() if ids else []
+        by_id = {}
+        for signal_id, expiry, outcome in outcomes:
+            by_id.setdefault(signal_id, {})[expiry] = outcome
+        for row in rows:
+            row['outcomes'] = by_id.get(row['id'], {})
+        return rows
+
+    def stats(self, start=None, end=None, agent=None):
+        """
+        Signal counts and win rates per agent, signal and expiry
+
+        Args:
+            start, end (float): Optional Unix time range of the signals
+            agent (str): Only this asset type
+
+        Returns:
+            list: Dicts with agent, signal, expiry (None for signals without
+                an outcome yet), signals, wins, losses, ties and win_rate
+                (over wins and losses; None without any)
+        """
+        conditions = ["s.timestamp >= ?", "s.timestamp < ?"]
+        arguments = [float('-inf') if start is None else start, float('inf') if end is None else end]
+        if agent is not None:
+            conditions.append("s.agent = ?")
+            arguments.append(agent)
+        query = f"""
+            SELECT s.agent, s.signal, o.expiry, COUNT(*),
+                   COALESCE(SUM(o.outcome > 0), 0), COALESCE(SUM(o.outcome < 0), 0), COALESCE(SUM(o.outcome = 0), 0)
+            FROM signals s LEFT JOIN outcomes o ON o.signal_id = s.id
+            WHERE {' AND '.join(conditions)}
+            GROUP BY s.agent, s.signal, o.expiry
+            ORDER BY s.agent, s.signal, o.expiry
+        """
+        with closing(self._connect()) as db:
+            rows = db.execute(query, arguments).fetchall()
+        return [{
+            'agent': row_agent,
+            'signal': label,
+            'expiry': expiry,
+            'signals': count,
+            'wins': wins,
+            'losses': losses,
+            'ties': ties,
+            'win_rate': wins / (wins + losses) if wins + losses else None
+        } for row_agent, label, expiry, count, wins, losses, ties in rows]
+
+    def flush(self, timeout=None):
+        """Wait until everything queued has been written; False on timeout"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._queue.all_tasks_done:
+            while self._queue.unfinished_tasks:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._queue.all_tasks_done.wait(remaining)
+        return True
+
+    def close(self, timeout=10):
+        """Write what is queued (up to `timeout` seconds) and stop the thread"""
+        if self._thread is None:
+            return
+        self.flush(timeout)
+        self._queue.put(None)
+        self._thread.join(timeout)
+        self._thread = None
+
+    def _connect(self):
+        db = sqlite3.connect(self.path, timeout=30)
+        # Safe in WAL mode: a crash loses at most the last transactions, never the database
+        db.execute('PRAGMA synchronous=NORMAL')
+        return db
+
+    def _put(self, item):
+        try:
+            self._queue.put_nowait(item)
+            return True
+        except queue.Full:
+            try:
+                self._queue.get_nowait()
+                self._queue.task_done()
+            except queue.Empty:
+                pass
+            with self._lock:
+                self.dropped_count += 1
+            metrics.inc('history_dropped_total')
+            logger.warning("Signal history queue full, dropped the oldest batch")
+            self._queue.put_nowait(item)
+            return False
+
+    def _run(self):
+        with closing(self._connect()) as db:
+            while True:
+                item = self._queue.get()
+                batch = [item]
+                # Everything queued meanwhile goes into the same transaction
+                while item is not None:
+                    try:
+                        item = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    batch.append(item)
+                entries = [entry for entry in batch if entry is not None]
+                try:
+                    self._write(db, [entry for entry in entries if entry[0] != 'settle'])
+                    # Settled after the writes, so this cycle's signals are already in
+                    for _, (price_at, now) in [entry for entry in entries if entry[0] == 'settle']:
+                        self._write(db, self._settle(price_at, now))
+                except sqlite3.Error as e:
+                    logger.error(f"Could not write signal history: {str(e)}")
+                finally:
+                    for _ in batch:
+                        self._queue.task_done()
+                if batch[-1] is None:
+                    return
+
+    def _settle(self, price_at, now):
+        now = time.time() if now is None else now
+        entries = {}
+        rows = []
+        for signal_id, symbol, agent, label, timestamp, price, expiry in self.unsettled(now):
+            try:
+                if price is None:
+                    if signal_id not in entries:
+                        entries[signal_id] = price_at(symbol, agent, timestamp)
+                    price = entries[signal_id]
+                exit_price = price_at(symbol, agent, timestamp + expiry * 60) if price is not None else None
+            except Exception as e:
+                logger.warning(f"Could not price {symbol}: {str(e)}")
+                continue
+            if exit_price is None:
+                continue
+            outcome = (exit_price > price) - (exit_price < price)
+            rows.append((signal_id, expiry, exit_price, outcome * _direction(label), now))
+        prices = [(price, signal_id) for signal_id, price in entries.items() if price is not None]
+        return [('prices', prices), ('outcomes', rows)]
+
+    def _write(self, db, batch):
+        if not batch:
+            return
+        with metrics.timer('history_write_seconds'), db:
+            for table, rows in batch:
+                if table == 'signals':
+                    db.executemany("INSERT INTO signals (timestamp, symbol, asset, agent, signal, detail, "
+                                   "confidence, price) VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+                elif table == 'prices':
+                    db.executemany("UPDATE signals SET price = ? WHERE id = ?", rows)
+                else:
+                    db.executemany("INSERT OR REPLACE INTO outcomes (signal_id, expiry, exit_price, outcome, "
+                                   "settled_at) VALUES (?, ?, ?, ?, ?)", rows)
+        with self._lock:
+            self.written_count += sum(len(rows) for _, rows in batch)
+
+
+def open_signal_store(config):
+    """
+    Start the signal history if [History] enabled is on (the default)
+
+    Args:
+        config: ConfigParser or dict with an optional [History] section
+            (enabled, path, expiries as comma-separated minutes, queue_size)
+
+    Returns:
+        SignalStore: The started store, or None when disabled
+    """
+    settings = config['History'] if 'History' in config else {}
+    if str(settings.get('enabled', 'true')).lower() not in ('1', 'true', 'yes', 'on'):
+        return None
+    expiries = [int(expiry) for expiry in str(settings.get('expiries', '5,15,60')).split(',') if expiry.strip()]
+    return SignalStore(settings.get('path', DATABASE_PATH), expiries,
+                       int(settings.get('queue_size', 100))).start()
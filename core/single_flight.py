@@ -0,0 +1,80 @@
+import asyncio
+import threading
+from concurrent.futures import Future
+from .metrics import metrics
+
+
+class SingleFlight:
+    """
+    Runs at most one call per key at a time.
+
+    A caller asking for a key that is already being fetched waits for that
+    call and gets its result, or its exception, instead of making a second
+    request and spending a second slot of the provider's rate limit. Once
+    the call returns the key is free again; nothing is cached here. Threads
+    and asyncio tasks share the same in-flight calls. Every caller that
+    joined an existing call counts in fetch_coalesced_total{call=<name>}.
+
+    Joined callers receive the very object the first caller got, so results
+    must be treated as read-only.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.coalesced = 0
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, function, *args, **kwargs):
+        """
+        Call `function(*args, **kwargs)` unless a call for `key` is in flight
+
+        Returns:
+            The result of the call made for `key`, by this caller or another
+        """
+        call, leader = self._join(key)
+        if not leader:
+            return call.result()
+        return self._lead(key, call, function, args, kwargs)
+
+    async def do_async(self, key, function, *args, **kwargs):
+        """
+        do() for asyncio callers: the blocking `function` runs in the loop's
+        default executor and waiting never blocks the loop
+        """
+        call, leader = self._join(key)
+        if not leader:
+            return await asyncio.wrap_future(call)
+        return await asyncio.get_running_loop().run_in_executor(
+            None, self._lead, key, call, function, args, kwargs)
+
+    def in_flight(self):
+        """Number of keys being fetched right now"""
+        with self._lock:
+            return len(self._calls)
+
+    def _join(self, key):
+        with self._lock:
+            call = self._calls.get(key)
+            if call is None:
+                call = self._calls[key] = Future()
+                return call, True
+            self.coalesced += 1
+        metrics.inc('fetch_coalesced_total', call=self.name)
+        return call, False
+
+    def _lead(self, key, call, function, args, kwargs):
+        try:
+            result = function(*args, **kwargs)
+        except BaseException as e:
+            self._finish(key)
+            call.set_exception(e)
+            raise
+        self._finish(key)
+        call.set_result(result)
+        return result
+
+    def _finish(self, key):
+        # Later callers start a fresh call rather than reading a finished one
+        with self._lock:
+            del self._calls[key]
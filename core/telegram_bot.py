@@ -1,19 +1,309 @@
 import telegram
+import asyncio
+import inspect
 import logging
+import queue
+import threading
+import time
+from collections import deque
+from .rate_limiter import TokenBucket
+from .metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Longest text Telegram accepts in one message
+MAX_MESSAGE_LENGTH = 4096
+
+TRUNCATION_SUFFIX = "... [truncated]"
+
+# Seconds to wait before retrying a timed-out send
+RETRY_DELAY = 5
 
 class TelegramBot:
     def __init__(self, token):
         self.bot = telegram.Bot(token=token)
         logging.basicConfig(format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-        
+        # python-telegram-bot 20+ is async; its calls run on one private loop
+        self._loop = None
+        self._loop_lock = threading.Lock()
+
     def send_message(self, chat_id, text):
+        """Send one message now, truncated to Telegram's limit; retried once if it times out"""
+        if len(text) > MAX_MESSAGE_LENGTH:
+            text = text[:MAX_MESSAGE_LENGTH - len(TRUNCATION_SUFFIX)] + TRUNCATION_SUFFIX
+        for attempt in range(2):
+            try:
+                self.deliver(chat_id, text)
+                return True
+            except telegram.error.TimedOut as e:
+                if attempt == 0:
+                    logger.warning(f"Telegram send timed out, retrying in {RETRY_DELAY}s: {str(e)}")
+                    time.sleep(RETRY_DELAY)
+                    continue
+                logger.error(f"Telegram error: {type(e).__name__}: {str(e)}")
+            except Exception as e:
+                logger.error(f"Telegram error: {type(e).__name__}: {str(e)}")
+                return False
+        return False
+
+    def deliver(self, chat_id, text):
+        """
+        Send one message, raising the Telegram error on failure
+
+        Markdown Telegram cannot parse (an entity left open, e.g. by
+        split_message or truncation) is sent again as plain text rather
+        than lost to the 400.
+        """
         try:
-            self.bot.send_message(
-                chat_id=chat_id,
-                text=text,
-                parse_mode='Markdown'
-            )
-            return True
+            return self._send(chat_id, text, 'Markdown')
+        except telegram.error.BadRequest as e:
+            if "can't parse" not in str(e).lower():
+                raise
+            logger.warning(f"Telegram could not parse the Markdown, sending as plain text: {str(e)}")
+            return self._send(chat_id, text, None)
+
+    def _send(self, chat_id, text, parse_mode):
+        try:
+            with metrics.timer('telegram_send_seconds'):
+                result = self.bot.send_message(
+                    chat_id=chat_id,
+                    text=text,
+                    parse_mode=parse_mode
+                )
+                if inspect.isawaitable(result):
+                    with self._loop_lock:
+                        if self._loop is None:
+                            self._loop = asyncio.new_event_loop()
+                        result = self._loop.run_until_complete(result)
         except Exception as e:
-            print(f"Telegram error: {str(e)}")
+            metrics.inc('telegram_errors_total', error=type(e).__name__)
+            raise
+        metrics.inc('telegram_messages_total')
+        return result
+
+
+def split_message(text, limit=MAX_MESSAGE_LENGTH):
+    """Split text into chunks of at most `limit` characters, on line breaks where possible"""
+    chunks = []
+    current = ''
+    for line in text.split('\n'):
+        while len(line) > limit:
+            if current:
+                chunks.append(current)
+                current = ''
+            chunks.append(line[:limit])
+            line = line[limit:]
+        candidate = f"{current}\n{line}" if current else line
+        if len(candidate) > limit:
+            chunks.append(current)
+            candidate = line
+        current = candidate
+    if current or not chunks:
+        chunks.append(current)
+    return chunks
+
+
+class DeliveryQueue:
+    """
+    Sends Telegram messages from a background thread.
+
+    send() only enqueues, so a slow or failing Telegram API never delays the
+    signal loop. The worker coalesces the messages queued within
+    `coalesce_seconds` into one per chat, keeping each chat's messages in the
+    order they were sent, splits anything over Telegram's length limit,
+    paces sends with a global and a per-chat token bucket and retries
+    rate-limited (429) and network/server (5xx) failures with exponential
+    backoff. When the queue is full the oldest message is dropped.
+
+    Settings come from the [Telegram] section: queue_size, messages_per_second,
+    chat_messages_per_minute, max_retries, backoff_seconds, max_backoff_seconds
+    and coalesce_seconds.
+    """
+
+    def __init__(self, bot, config=None, sleep=time.sleep):
+        settings = config['Telegram'] if config is not None and 'Telegram' in config else {}
+        self.bot = bot
+        self.max_retries = int(settings.get('max_retries', 5))
+        self.backoff_seconds = float(settings.get('backoff_seconds', 1))
+        self.max_backoff_seconds = float(settings.get('max_backoff_seconds', 60))
+        self.coalesce_seconds = float(settings.get('coalesce_seconds', 1))
+        self.chat_per_minute = float(settings.get('chat_messages_per_minute', 20))
+        self._sleep = sleep
+        self._queue = queue.Queue(maxsize=int(settings.get('queue_size', 100)))
+        # Telegram allows about 30 messages a second overall and 20 a minute per group
+        per_second = float(settings.get('messages_per_second', 30))
+        self._global_bucket = TokenBucket('telegram', per_second * 60, int(per_second), sleep=sleep)
+        self._chat_buckets = {}
+        self._pending = {}
+        self._thread = None
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=1000)
+        self.sent_count = 0
+        self.failed_count = 0
+        self.dropped_count = 0
+        self.retry_count = 0
+        self.coalesced_count = 0
+
+    def start(self):
+        """Start the delivery thread"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='telegram-delivery', daemon=True)
+            self._thread.start()
+        return self
+
+    def send(self, chat_id, text):
+        """
+        Queue a message without blocking
+
+        Returns:
+            bool: False if the queue was full and the oldest message was dropped
+        """
+        item = (chat_id, text, time.monotonic())
+        try:
+            self._queue.put_nowait(item)
+            return True
+        except queue.Full:
+            try:
+                self._queue.get_nowait()
+                self._queue.task_done()
+            except queue.Empty:
+                pass
+            with self._lock:
+                self.dropped_count += 1
+            logger.warning("Telegram queue full, dropped the oldest message")
+            self._queue.put_nowait(item)
             return False
+
+    def flush(self, timeout=None):
+        """Wait until every queued message has been handled; False on timeout"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._queue.all_tasks_done:
+            while self._queue.unfinished_tasks:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._queue.all_tasks_done.wait(remaining)
+        return True
+
+    def close(self, timeout=10):
+        """Deliver what is queued (up to `timeout` seconds) and stop the thread"""
+        if self._thread is None:
+            return
+        self.flush(timeout)
+        self._queue.put(None)
+        self._thread.join(timeout)
+        self._thread = None
+
+    def stats(self):
+        """Queue depth, counters and delivery latency (seconds from send() to delivered)"""
+        with self._lock:
+            latencies = sorted(self._latencies)
+            stats = {
+                'queued': self._queue.qsize(),
+                'sent': self.sent_count,
+                'failed': self.failed_count,
+                'dropped': self.dropped_count,
+                'retries': self.retry_count,
+                'coalesced': self.coalesced_count
+            }
+        if latencies:
+            stats['latency_p50'] = latencies[len(latencies) // 2]
+            stats['latency_p95'] = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+            stats['latency_max'] = latencies[-1]
+        return stats
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                self._queue.task_done()
+                return
+            batches = {item[0]: [item]}
+            stopped = self._collect(batches)
+            # Chats go out in the order their first message was queued
+            for batch in batches.values():
+                try:
+                    self._deliver(batch)
+                except Exception as e:
+                    logger.error(f"Telegram delivery failed: {type(e).__name__}: {str(e)}")
+                finally:
+                    for _ in batch:
+                        self._queue.task_done()
+            if stopped:
+                self._queue.task_done()
+                return
+
+    def _collect(self, batches):
+        """
+        Add the messages that arrive within the coalescing window to their chat's batch
+
+        Returns:
+            bool: Whether the stop marker was taken
+        """
+        deadline = time.monotonic() + self.coalesce_seconds
+        while True:
+            remaining = deadline - time.monotonic()
+            try:
+                item = self._queue.get(timeout=max(remaining, 0)) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                return False
+            if item is None:
+                return True
+            batches.setdefault(item[0], []).append(item)
+
+    def _deliver(self, batch):
+        chat_id = batch[0][0]
+        text = "\n\n".join(text for _, text, _ in batch)
+        with self._lock:
+            self.coalesced_count += len(batch) - 1
+
+        for chunk in split_message(text):
+            if not self._send_with_retries(chat_id, chunk):
+                with self._lock:
+                    self.failed_count += len(batch)
+                return
+
+        delivered = time.monotonic()
+        with self._lock:
+            self.sent_count += len(batch)
+            self._latencies.extend(delivered - enqueued for _, _, enqueued in batch)
+
+    def _send_with_retries(self, chat_id, text):
+        for attempt in range(self.max_retries + 1):
+            self._global_bucket.acquire()
+            self._chat_bucket(chat_id).acquire()
+            try:
+                self.bot.deliver(chat_id, text)
+                return True
+            except telegram.error.RetryAfter as e:
+                # 429: Telegram says how long to wait
+                retry_after = e.retry_after
+                delay = retry_after.total_seconds() if hasattr(retry_after, 'total_seconds') else float(retry_after)
+            except (telegram.error.BadRequest, telegram.error.Forbidden, telegram.error.InvalidToken) as e:
+                # 400/401/403 will fail the same way again (BadRequest is a NetworkError)
+                logger.error(f"Telegram rejected message: {type(e).__name__}: {str(e)}")
+                return False
+            except telegram.error.NetworkError as e:
+                # Timeouts, connection errors and 5xx responses
+                delay = min(self.backoff_seconds * 2 ** attempt, self.max_backoff_seconds)
+                logger.warning(f"Telegram send failed ({type(e).__name__}: {str(e)})")
+            except telegram.error.TelegramError as e:
+                logger.error(f"Telegram rejected message: {type(e).__name__}: {str(e)}")
+                return False
+
+            if attempt == self.max_retries:
+                break
+            with self._lock:
+                self.retry_count += 1
+            logger.info(f"Retrying Telegram send in {delay:.1f}s")
+            self._sleep(delay)
+
+        logger.error(f"Giving up on Telegram message after {self.max_retries + 1} attempts")
+        return False
+
+    def _chat_bucket(self, chat_id):
+        bucket = self._chat_buckets.get(chat_id)
+        if bucket is None:
+            bucket = TokenBucket(f'telegram:{chat_id}', self.chat_per_minute, 1, sleep=self._sleep)
+            self._chat_buckets[chat_id] = bucket
+        return bucket
@@ -1,27 +1,80 @@
 from core.signal_generator import SignalGenerator
-from core.telegram_bot import TelegramBot
+from core.telegram_bot import TelegramBot, DeliveryQueue
 from core.config_manager import ConfigManager
-import time
+from core.indicator_engine import indicator_engine
+from core.scheduler import BarCloseScheduler
+from core.market_calendar import market_calendar
+from core.metrics import start_metrics_server
+from core.profiler import profiler
+from core.signal_store import open_signal_store
 
 def main():
     config = ConfigManager.load_config()
-    bot = TelegramBot(config['Telegram']['bot_token'])
-    
+    # Prometheus text at http://127.0.0.1:<port>/metrics when [Metrics] port is set
+    metrics_server = start_metrics_server(config)
+    profiler.configure(config)
     generator = SignalGenerator(config)
-    
-    while True:
+    # Resume indicator state from the last run instead of warming up from scratch
+    indicator_engine.load()
+
+    if generator.role == 'worker':
+        # Evaluate the leases a [Cluster] coordinator hands out; only it talks to Telegram
         try:
-            signals = generator.generate_signals()
-            if signals:
-                message = "🚀 PocketOption Signals 🚀\n\n" + "\n".join(
-                    [f"{s['asset']}: {s['signal']} (Confidence: {s['confidence']}%)" 
-                     for s in signals]
-                )
-                bot.send_message(config['Telegram']['chat_id'], message)
-        except Exception as e:
-            print(f"Error: {str(e)}")
+            generator.serve()
+        finally:
+            indicator_engine.save()
+            if metrics_server:
+                metrics_server.stop()
+        return
+
+    bot = TelegramBot(config['Telegram']['bot_token'])
+    # Messages go out from a background thread so Telegram never stalls a cycle
+    delivery = DeliveryQueue(bot, config).start()
+    # Signals and their outcomes are written to SQLite from a background thread
+    history = open_signal_store(config)
+    
+    def run_cycle(asset_types):
+        # Sampled cycles run under cProfile/tracemalloc when [Profiling] is enabled
+        with profiler.cycle('-'.join(sorted(asset_types))):
+            signals = []
+            try:
+                signals = generator.generate_signals(asset_types)
+                if signals:
+                    message = "🚀 PocketOption Signals 🚀\n\n" + "\n".join(
+                        [f"{s['asset']}: {s['signal']} (Confidence: {s['confidence']}%)" 
+                         for s in signals]
+                    )
+                    delivery.send(config['Telegram']['chat_id'], message)
+            except Exception as e:
+                print(f"Error: {str(e)}")
         
-        time.sleep(int(config['Settings']['interval']))
+            if history:
+                try:
+                    history.record(signals, generator.asset_types)
+                    # Signals whose expiry has passed are priced from 1m bars on the store's thread
+                    history.settle(generator.price_at)
+                except Exception as e:
+                    print(f"Error recording signal history: {str(e)}")
+
+            try:
+                indicator_engine.save()
+            except Exception as e:
+                print(f"Error saving indicator state: {str(e)}")
+    
+    # Each asset type is evaluated just after its own bars close, and not
+    # while its market is shut unless [Schedule] market_hours is off
+    scheduler = BarCloseScheduler(generator.cadences(),
+                                  delay=config.getfloat('Schedule', 'delay', fallback=5),
+                                  calendar=market_calendar if generator.market_hours else None)
+    try:
+        scheduler.run(run_cycle)
+    finally:
+        generator.close()
+        delivery.close()
+        if history:
+            history.close()
+        if metrics_server:
+            metrics_server.stop()
 
 if __name__ == "__main__":
     main()
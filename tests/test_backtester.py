@@ -0,0 +1,100 @@
+import unittest
+from unittest.mock import patch
+import numpy as np
+import pandas as pd
+from core.backtester import backtest, infer_interval
+from core.bar_buffer import BarBuffer
+from core.indicator_engine import IndicatorEngine
+from core.resampler import align
+from ai_agents import crypto_agent, commodity_agent
+
+class TestBacktester(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(3)
+        count = 3000
+        close = 100 * np.exp(np.cumsum(rng.normal(0, 0.002, count)))
+        self.bars = pd.DataFrame({
+            'Open': close,
+            'High': close * 1.001,
+            'Low': close * 0.999,
+            'Close': close,
+            'Volume': 1000.0
+        }, index=pd.date_range('2023-01-02', periods=count, freq='15min', tz='UTC'))
+
+    def _direction(self, signal):
+        return 1 if 'BUY' in signal else -1 if 'SELL' in signal else 0
+
+    def test_trades_settle_at_expiry(self):
+        """Test each trade is scored against the close one expiry after entry"""
+        result = backtest(self.bars, 'crypto', 'BTC-USD', expiries=(15, 60))
+        close = self.bars['Close']
+
+        self.assertEqual(result.interval, '15m')
+        for expiry, offset in ((15, 1), (60, 4)):
+            trades = result.trades[expiry]
+            self.assertGreater(len(trades), 0)
+            entry = self.bars.index.get_indexer(trades.index)
+            np.testing.assert_array_equal(trades['exit_price'], close.to_numpy()[entry + offset])
+            expected = np.sign((trades['exit_price'] - trades['entry_price']) * trades['direction'])
+            np.testing.assert_array_equal(trades['outcome'], expected)
+            # Trades whose expiry is past the end of the data are left out
+            self.assertLessEqual(entry.max() + offset, len(self.bars) - 1)
+
+    def test_short_expiries_and_cadence(self):
+        """Test expiries shorter than a bar are skipped and `every` thins the entries"""
+        result = backtest(self.bars, 'crypto', 'BTC-USD', expiries=(1, 15), every=60)
+
+        self.assertEqual(list(result.trades), [15])
+        closes = result.trades[15].index + pd.Timedelta(minutes=15)
+        self.assertTrue((closes.minute == 0).all())
+
+    def test_summary_and_rule_contributions(self):
+        """Test the summary counts add up and every rule is reported per expiry"""
+        result = backtest(self.bars, 'crypto', 'BTC-USD', expiries=(15, 60))
+        summary = result.summary(payout=0.8)
+        rules = result.rule_contributions()
+
+        self.assertEqual(list(summary['expiry']), [15, 60])
+        row = summary.iloc[0]
+        self.assertEqual(row['buys'] + row['sells'], row['signals'])
+        self.assertEqual(row['wins'] + row['losses'] + row['ties'], row['signals'])
+        self.assertAlmostEqual(row['expectancy'], row['win_rate'] * 0.8 - (1 - row['win_rate']))
+        self.assertEqual(sorted(set(rules['rule'])), ['adx_trend', 'macd_cross', 'rsi'])
+        self.assertEqual(len(rules), 6)
+
+    def test_infer_interval(self):
+        """Test the interval is read off the most common bar spacing"""
+        self.assertEqual(infer_interval(self.bars.index), '15m')
+        self.assertEqual(infer_interval(self.bars.index.delete(5)), '15m')
+        with self.assertRaises(ValueError):
+            infer_interval(self.bars.index[:1])
+
+    def test_series_matches_live_signal(self):
+        """Test the vectorized rules agree with generate_signal on each bar"""
+        hourly = self.bars.set_axis(pd.date_range('2023-01-02', periods=len(self.bars), freq='h', tz='UTC'))
+        # HG=F has no seasonal months, so the live month does not matter
+        for agent, symbol, bars, interval in ((crypto_agent, 'BTC-USD', self.bars, '15m'),
+                                              (commodity_agent, 'HG=F', hourly, '60m')):
+            series = agent.signal_series(bars, interval, symbol)
+            for end in range(len(bars) - 40, len(bars)):
+                history = bars.iloc[:end]
+                with patch.object(agent, 'indicator_engine', IndicatorEngine()), \
+                        patch.object(agent.bar_store, 'get_buffer', return_value=BarBuffer.from_frame(history)):
+                    signal = agent.generate_signal(symbol)
+                self.assertEqual(self._direction(signal), series['direction'].iloc[end - 1],
+                                 f"{symbol} at bar {end - 1}: {signal}")
+
+class TestAlign(unittest.TestCase):
+    def test_higher_bars_only_after_close(self):
+        """Test a 1h value reaches base bars only once that hour has closed"""
+        index = pd.date_range('2023-01-02', periods=8, freq='15min', tz='UTC')
+        hourly = pd.DataFrame({'value': [1.0, 2.0]},
+                              index=pd.date_range('2023-01-02', periods=2, freq='h', tz='UTC'))
+        aligned = align(hourly, '60m', index, '15m')
+
+        # The first hour closes with the fourth 15m bar, the second with the eighth
+        np.testing.assert_array_equal(aligned['value'].to_numpy(),
+                                      [np.nan, np.nan, np.nan, 1.0, 1.0, 1.0, 1.0, 2.0])
+
+if __name__ == '__main__':
+    unittest.main()
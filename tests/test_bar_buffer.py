@@ -0,0 +1,66 @@
+import unittest
+import numpy as np
+import pandas as pd
+from core.bar_buffer import BarBuffer
+
+class TestBarBuffer(unittest.TestCase):
+    def setUp(self):
+        index = pd.date_range(start='2023-01-02', periods=100, freq='h', tz='UTC')
+        close = np.arange(100, dtype=float) + 1000.25
+        self.bars = pd.DataFrame({
+            'Open': close - 0.25, 'High': close + 1, 'Low': close - 1, 'Close': close, 'Volume': 500.0
+        }, index=index)
+
+    def test_frame_round_trip(self):
+        """Test bars come back as the same float64 frame, in the original timezone"""
+        bars = self.bars.tz_convert('America/New_York')
+        frame = BarBuffer.from_frame(bars).to_frame()
+
+        pd.testing.assert_frame_equal(frame, bars, check_freq=False, check_index_type=False)
+        self.assertEqual(len(BarBuffer.from_frame(bars).to_frame(days=1)), 24)
+
+    def test_views_are_read_only_and_compact(self):
+        """Test columns are float32 views that cannot be written through"""
+        buffer = BarBuffer.from_frame(self.bars)
+
+        self.assertEqual(buffer.close.dtype, np.float32)
+        self.assertEqual(buffer.time.dtype, np.int64)
+        self.assertEqual(buffer.nbytes, 100 * (8 + 5 * 4))
+        with self.assertRaises(ValueError):
+            buffer.close[0] = 0.0
+
+    def test_full_buffer_drops_oldest_bars(self):
+        """Test appending to a full buffer keeps the newest bars without growing"""
+        buffer = BarBuffer.from_frame(self.bars.iloc[:60], capacity=60)
+        close = buffer.close
+
+        self.assertEqual(buffer.extend_frame(self.bars.iloc[50:]), 40)
+        self.assertEqual(len(buffer), 60)
+        self.assertEqual(buffer.nbytes, 60 * (8 + 5 * 4))
+        # Same memory, shifted in place
+        self.assertTrue(np.shares_memory(close, buffer.close))
+        np.testing.assert_array_equal(buffer.close, self.bars['Close'].to_numpy()[40:].astype(np.float32))
+        np.testing.assert_array_equal(buffer.time, self.bars.index.as_unit('ns').asi8[40:])
+
+    def test_forming_bar_is_replaced(self):
+        """Test a bar with the newest stored time replaces it and older bars are skipped"""
+        buffer = BarBuffer.from_frame(self.bars.iloc[:10], capacity=20)
+        revised = self.bars.iloc[5:12].copy()
+        revised['Close'] += 0.5
+
+        self.assertEqual(buffer.extend_frame(revised), 2)
+        self.assertEqual(len(buffer), 12)
+        self.assertEqual(buffer.close[8], self.bars['Close'].iloc[8])
+        self.assertEqual(buffer.close[9], self.bars['Close'].iloc[9] + 0.5)
+
+    def test_more_bars_than_capacity(self):
+        """Test a batch longer than the buffer keeps its newest bars"""
+        buffer = BarBuffer(10)
+        buffer.extend_frame(self.bars)
+
+        self.assertEqual(len(buffer), 10)
+        np.testing.assert_array_equal(buffer.close, self.bars['Close'].to_numpy()[-10:].astype(np.float32))
+        self.assertTrue(BarBuffer(0).to_frame().empty)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,115 @@
+import unittest
+import mmap
+import tempfile
+import shutil
+import os
+import numpy as np
+import pandas as pd
+from core.bar_cache import ColumnarBarCache, CsvBarCache, migrate_csv_cache
+
+class TestColumnarBarCache(unittest.TestCase):
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.cache = ColumnarBarCache(self.cache_dir)
+        self.history = self._bars('2023-01-02 00:00', 100)
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir)
+
+    def _bars(self, start, periods, close=100.0):
+        index = pd.date_range(start=start, periods=periods, freq='1min', tz='UTC', name='Date')
+        return pd.DataFrame({
+            'open': close,
+            'high': close + 1,
+            'low': close - 1,
+            'close': np.arange(periods) + close,
+            'volume': 1000.0
+        }, index=index)
+
+    def test_round_trip(self):
+        """Test stored bars load back unchanged"""
+        self.cache.store('AAPL_1d_1m', self.history)
+        data = self.cache.load('AAPL_1d_1m')
+        pd.testing.assert_frame_equal(data, self.history, check_like=True, check_freq=False,
+                                      check_index_type=False)
+
+    def test_load_is_memory_mapped(self):
+        """Test loaded columns share memory with the cache files"""
+        self.cache.store('AAPL_1d_1m', self.history)
+        columns = self.cache.load_columns('AAPL_1d_1m')
+        data = self.cache.load('AAPL_1d_1m')
+
+        self.assertIsInstance(columns['close'], np.memmap)
+
+        # The frame's values must be a view onto the file mapping, not a copy
+        base = data['close'].to_numpy()
+        while base is not None and not isinstance(base, mmap.mmap):
+            base = base.base
+        self.assertIsInstance(base, mmap.mmap)
+
+    def test_append_writes_in_place(self):
+        """Test bars after the stored ones are appended without rewriting the series"""
+        self.cache.store('AAPL_1d_1m', self.history)
+        index_path = os.path.join(self.cache.path('AAPL_1d_1m'), 'Date.i8')
+        inode = os.stat(index_path).st_ino
+
+        self.cache.append('AAPL_1d_1m', self._bars('2023-01-02 01:40', 2, close=500.0))
+        data = self.cache.load('AAPL_1d_1m')
+
+        self.assertEqual(os.stat(index_path).st_ino, inode)
+        self.assertEqual(len(data), 102)
+        self.assertEqual(data['close'].iloc[-2], 500.0)
+
+    def test_append_keeps_loaded_frames(self):
+        """Test replacing stored bars leaves frames loaded before unchanged"""
+        self.cache.store('AAPL_1d_1m', self.history)
+        before = self.cache.load('AAPL_1d_1m')
+
+        delta = self._bars('2023-01-02 01:39', 3, close=500.0)
+        self.cache.append('AAPL_1d_1m', delta)
+        data = self.cache.load('AAPL_1d_1m')
+
+        self.assertEqual(before['close'].iloc[-1], 199.0)
+        self.assertEqual(len(before), 100)
+        self.assertEqual(len(data), 102)
+        self.assertEqual(data['close'].iloc[-3], 500.0)
+        self.assertTrue(data.index.is_monotonic_increasing)
+        self.assertEqual(sorted(os.listdir(self.cache.path('AAPL_1d_1m'))),
+                         ['Date.i8', 'close.f8', 'high.f8', 'low.f8', 'open.f8', 'volume.f8'])
+
+    def test_append_compacts_past_retention(self):
+        """Test a series is rewritten once it exceeds twice its retained size"""
+        self.cache.store('AAPL_1d_1m', self.history)
+        self.cache.append('AAPL_1d_1m', self._bars('2023-01-02 01:40', 50), max_rows=60)
+        self.assertEqual(len(self.cache.load('AAPL_1d_1m')), 60)
+
+    def test_interrupted_write_is_ignored(self):
+        """Test bars without a timestamp are not exposed after a partial write"""
+        self.cache.store('AAPL_1d_1m', self.history)
+        with open(os.path.join(self.cache.path('AAPL_1d_1m'), 'close.f8'), 'ab') as f:
+            f.write(np.zeros(5).tobytes())
+        self.assertEqual(len(self.cache.load('AAPL_1d_1m')), 100)
+
+    def test_missing_series(self):
+        """Test an uncached key loads as an empty frame"""
+        self.assertTrue(self.cache.load('MISSING_1d_1m').empty)
+
+    def test_csv_migration(self):
+        """Test legacy CSV files are converted and removed"""
+        CsvBarCache(self.cache_dir).store('AAPL_1d_1m', self.history)
+        CsvBarCache(self.cache_dir).store('TSLA_1d_1m', self.history)
+
+        self.assertEqual(migrate_csv_cache(self.cache_dir), 2)
+        self.assertFalse(os.path.exists(os.path.join(self.cache_dir, 'AAPL_1d_1m.csv')))
+        self.assertEqual(len(self.cache.load('TSLA_1d_1m')), 100)
+
+    def test_lazy_migration_on_load(self):
+        """Test a CSV file is migrated the first time its series is loaded"""
+        CsvBarCache(self.cache_dir).store('AAPL_1d_1m', self.history)
+        data = self.cache.load('AAPL_1d_1m')
+
+        self.assertEqual(len(data), 100)
+        self.assertTrue(os.path.isdir(self.cache.path('AAPL_1d_1m')))
+
+if __name__ == '__main__':
+    unittest.main()
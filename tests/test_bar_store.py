@@ -0,0 +1,224 @@
+import unittest
+from unittest.mock import patch, MagicMock
+import configparser
+import tempfile
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from core.bar_store import BarStore, period_to_days, split_batch
+from core.bar_cache import get_bar_cache
+from core.data_fetcher import DataFetcher
+import pandas as pd
+
+class TestBarStore(unittest.TestCase):
+    def setUp(self):
+        # 30 days of hourly bars
+        index = pd.date_range(start='2023-01-01', periods=30 * 24, freq='h', tz='UTC')
+        self.sample_data = pd.DataFrame({
+            'Open': range(len(index)),
+            'High': range(1, len(index) + 1),
+            'Low': range(len(index)),
+            'Close': range(len(index)),
+            'Volume': [1000] * len(index)
+        }, index=index, dtype=float)
+
+        self.yfinance_patcher = patch('yfinance.download')
+        self.mock_yfinance = self.yfinance_patcher.start()
+        self.mock_yfinance.return_value = self.sample_data
+        self.rate_limit_patcher = patch.object(DataFetcher, '_rate_limit')
+        self.rate_limit_patcher.start()
+        # Markets count as open, so stale series are always refreshed
+        self.calendar = MagicMock()
+        self.calendar.open_between.return_value = True
+        self.calendar_patcher = patch('core.data_fetcher.market_calendar', self.calendar)
+        self.calendar_patcher.start()
+
+        self.cache_dir = tempfile.mkdtemp()
+        with patch('core.config_manager.ConfigManager.load_config', return_value=configparser.ConfigParser()):
+            self.fetcher = DataFetcher()
+        self.fetcher.cache = get_bar_cache('columnar', self.cache_dir)
+        self.store = BarStore(fetcher=self.fetcher)
+
+    def tearDown(self):
+        self.yfinance_patcher.stop()
+        self.rate_limit_patcher.stop()
+        self.calendar_patcher.stop()
+        shutil.rmtree(self.cache_dir)
+
+    def test_period_to_days(self):
+        """Test period strings are converted to calendar days"""
+        self.assertEqual(period_to_days('7d'), 7)
+        self.assertEqual(period_to_days('3mo'), 90)
+        self.assertEqual(period_to_days('1y'), 365)
+        with self.assertRaises(ValueError):
+            period_to_days('soon')
+
+    def test_single_fetch_per_series(self):
+        """Test repeated requests for one series hit the network once"""
+        first = self.store.get_bars('EURUSD=X', interval='60m', period='30d')
+        second = self.store.get_bars('EURUSD=X', interval='60m', period='30d')
+
+        self.assertEqual(self.mock_yfinance.call_count, 1)
+        self.assertEqual(self.store.hit_count, 1)
+        self.assertEqual(len(first), len(second))
+
+    def test_shorter_period_served_from_cache(self):
+        """Test a shorter period is sliced from the stored series"""
+        self.store.get_bars('EURUSD=X', interval='60m', period='30d')
+        week = self.store.get_bars('EURUSD=X', interval='60m', period='7d')
+
+        self.assertEqual(self.mock_yfinance.call_count, 1)
+        self.assertEqual(len(week), 7 * 24)
+        self.assertEqual(week.index[-1], self.sample_data.index[-1])
+
+    def test_longer_period_refetches(self):
+        """Test a longer period than stored triggers a new download"""
+        self.store.get_bars('EURUSD=X', interval='60m', period='7d')
+        self.store.get_bars('EURUSD=X', interval='60m', period='30d')
+        self.assertEqual(self.mock_yfinance.call_count, 2)
+
+    def test_ttl_expiry(self):
+        """Test series expire after one bar interval"""
+        with patch('core.bar_store.time.time', return_value=1000.0):
+            self.store.get_bars('BTCUSD', interval='15m', period='30d')
+        with patch('core.bar_store.time.time', return_value=1000.0 + 899):
+            self.store.get_bars('BTCUSD', interval='15m', period='30d')
+        self.assertEqual(self.mock_yfinance.call_count, 1)
+
+        with patch('core.bar_store.time.time', return_value=1000.0 + 901):
+            self.store.get_bars('BTCUSD', interval='15m', period='30d')
+        self.assertEqual(self.mock_yfinance.call_count, 2)
+
+    def test_misses_go_through_the_fetcher_cache(self):
+        """Test a series the store lost is reloaded from disk, and only new bars are downloaded"""
+        self.store.get_bars('AAPL', interval='60m', period='30d')
+        self.calendar.open_between.return_value = False
+        BarStore(fetcher=self.fetcher).get_bars('AAPL', interval='60m', period='30d')
+        self.assertEqual(self.mock_yfinance.call_count, 1)
+
+        self.calendar.open_between.return_value = True
+        bars = BarStore(fetcher=self.fetcher).get_bars('AAPL', interval='60m', period='30d')
+        self.assertEqual(self.mock_yfinance.call_count, 2)
+        self.assertEqual(self.mock_yfinance.call_args.kwargs['start'], self.sample_data.index[-1])
+        self.assertNotIn('period', self.mock_yfinance.call_args.kwargs)
+        self.assertEqual(len(bars), len(self.sample_data))
+
+    def test_concurrent_misses_share_one_download(self):
+        """Test two threads missing the same series wait for a single download"""
+        release = threading.Event()
+
+        def slow_download(*args, **kwargs):
+            release.wait(5)
+            return self.sample_data
+        self.mock_yfinance.side_effect = slow_download
+
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            futures = [pool.submit(self.store.get_buffer, 'AAPL', '60m', '30d') for _ in range(2)]
+            while self.store._misses.coalesced < 1:
+                threading.Event().wait(0.01)
+            release.set()
+            buffers = [future.result() for future in futures]
+
+        self.assertEqual(self.mock_yfinance.call_count, 1)
+        self.assertIs(buffers[0], buffers[1])
+        self.assertEqual(len(buffers[0]), len(self.sample_data))
+
+    def test_returned_frames_are_private(self):
+        """Test agents adding columns do not modify the stored series"""
+        data = self.store.get_bars('AAPL', interval='60m', period='30d')
+        data['EMA_20'] = 0.0
+
+        again = self.store.get_bars('AAPL', interval='60m', period='30d')
+        self.assertNotIn('EMA_20', again.columns)
+
+    def test_refresh_merges_into_buffer(self):
+        """Test a refresh reuses the series' buffer, which keeps its size"""
+        with patch('core.bar_store.time.time', return_value=1000.0):
+            bars = self.store.get_buffer('AAPL', interval='60m', period='30d')
+        self.mock_yfinance.return_value = self.sample_data.shift(24, freq='h')
+        with patch('core.bar_store.time.time', return_value=1000.0 + 3600):
+            refreshed = self.store.get_buffer('AAPL', interval='60m', period='30d')
+
+        self.assertIs(refreshed, bars)
+        self.assertEqual(len(refreshed), len(self.sample_data))
+        self.assertEqual(refreshed.to_frame().index[-1], self.sample_data.index[-1] + pd.Timedelta(hours=24))
+        self.assertEqual(self.mock_yfinance.call_count, 2)
+
+    def test_close_at(self):
+        """Test prices are looked up by time only once their bar has closed"""
+        index = pd.date_range(start='2023-01-01', periods=3, freq='h', tz='UTC')
+        start = index[0].timestamp()
+        self.store.put('AAPL', '60m', self.sample_data.iloc[:3].set_axis(index), 30)
+        self.store._series[('AAPL', '60m')]['fetched_at'] = start + 2.5 * 3600
+
+        self.assertEqual(self.store.close_at('AAPL', '60m', start + 1800), 0.0)
+        self.assertEqual(self.store.close_at('AAPL', '60m', start + 3600), 1.0)
+        self.assertIsNone(self.store.close_at('AAPL', '60m', start + 2 * 3600))
+        self.assertIsNone(self.store.close_at('AAPL', '60m', start - 1))
+        self.assertEqual(self.store.close_at('AAPL', '60m'), 2.0)
+        self.assertIsNone(self.store.close_at('MSFT', '60m'))
+
+    def test_empty_data_not_cached(self):
+        """Test failed downloads are retried on the next request"""
+        self.mock_yfinance.return_value = pd.DataFrame()
+        self.store.get_bars('AAPL', interval='1d', period='365d')
+        self.store.get_bars('AAPL', interval='1d', period='365d')
+        self.assertEqual(self.mock_yfinance.call_count, 2)
+
+    def test_multiindex_columns_flattened(self):
+        """Test (field, ticker) columns are flattened for a single ticker"""
+        data = self.sample_data.copy()
+        data.columns = pd.MultiIndex.from_product([data.columns, ['AAPL']])
+        self.mock_yfinance.return_value = data
+
+        bars = self.store.get_bars('AAPL', interval='60m', period='30d')
+        self.assertIn('Close', bars.columns)
+
+    def _batch(self, symbols):
+        frames = {symbol: self.sample_data * (i + 1) for i, symbol in enumerate(symbols)}
+        return pd.concat(frames, axis=1)
+
+    def test_split_batch(self):
+        """Test a multi-ticker frame is split into per-symbol frames"""
+        batch = self._batch(['AAPL', '^GSPC'])
+        batch.loc[batch.index[:10], 'AAPL'] = float('nan')
+
+        frames = split_batch(batch, ['AAPL', '^GSPC', 'MISSING'])
+        self.assertEqual(sorted(frames), ['AAPL', '^GSPC'])
+        self.assertEqual(len(frames['AAPL']), len(self.sample_data) - 10)
+        self.assertEqual(frames['^GSPC']['Close'].iloc[-1], self.sample_data['Close'].iloc[-1] * 2)
+
+    def test_prefetch_groups_by_interval_and_period(self):
+        """Test one request is made per (interval, period) group"""
+        self.mock_yfinance.side_effect = lambda symbols, **kwargs: self._batch(symbols)
+        requests = self.store.prefetch([
+            ('AAPL', '1d', '365d'), ('AAPL', '60m', '60d'),
+            ('^GSPC', '1d', '365d'), ('^GSPC', '60m', '60d'),
+            ('^GSPC', '60m', '7d')
+        ])
+
+        self.assertEqual(requests, 2)
+        self.assertEqual(self.mock_yfinance.call_count, 2)
+        self.assertEqual(sorted(self.mock_yfinance.call_args_list[0][0][0]), ['AAPL', '^GSPC'])
+
+        # Agents are now served from the store
+        self.store.get_bars('^GSPC', interval='60m', period='60d')
+        self.store.get_bars('AAPL', interval='1d', period='365d')
+        self.assertEqual(self.mock_yfinance.call_count, 2)
+
+    def test_prefetch_skips_fresh_series(self):
+        """Test series already in the store are not requested again"""
+        self.store.get_bars('AAPL', interval='60m', period='30d')
+        self.mock_yfinance.side_effect = lambda symbols, **kwargs: self._batch(symbols)
+        self.store.prefetch([('AAPL', '60m', '30d'), ('TSLA', '60m', '30d')])
+
+        self.assertEqual(self.mock_yfinance.call_args[0][0], ['TSLA'])
+
+    def test_prefetch_failure_is_not_raised(self):
+        """Test a failed batch leaves agents to fetch their own series"""
+        self.mock_yfinance.side_effect = Exception("API error")
+        self.store.prefetch([('AAPL', '60m', '30d')])
+        self.assertFalse(self.store.is_fresh('AAPL', '60m', 30))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,157 @@
+import unittest
+import json
+import multiprocessing
+import threading
+import time
+from core.cluster import BrokerServer, ClusterWorker, Coordinator, MemoryBroker, RedisBroker
+from core.metrics import metrics
+
+ASSETS = [{'name': f"Asset {i}", 'symbol': f"SYM{i}", 'type': 'stock'} for i in range(12)]
+INTERVALS = {asset['symbol']: '60m' for asset in ASSETS}
+
+
+def signal_of(asset):
+    return f"BUY ({asset['symbol']})"
+
+
+def hang(asset):
+    time.sleep(60)
+
+
+def run_hanging_worker(port):
+    ClusterWorker(RedisBroker('127.0.0.1', port), heartbeat_seconds=0.1, name='victim', evaluate=hang).run()
+
+
+class TestBroker(unittest.TestCase):
+    def setUp(self):
+        self.server = BrokerServer('127.0.0.1', 0).start()
+        self.client = RedisBroker(*self.server.address, timeout=2)
+
+    def tearDown(self):
+        self.client.close()
+        self.server.stop()
+
+    def test_queue_over_tcp(self):
+        """Test messages come out oldest first, urgent ones before the rest"""
+        for message in ('one', 'two', 'ünïcode'):
+            self.client.push('q', message)
+        self.client.push('q', 'urgent', first=True)
+        self.assertEqual(self.client.length('q'), 4)
+        self.assertEqual([self.client.pop('q', 0.1) for _ in range(4)], ['urgent', 'one', 'two', 'ünïcode'])
+        self.assertIsNone(self.client.pop('q'))
+
+        start = time.monotonic()
+        self.assertIsNone(self.client.pop('q', 0.2))
+        self.assertGreaterEqual(time.monotonic() - start, 0.15)
+
+    def test_blocking_pop_wakes_on_push(self):
+        """Test a waiting pop returns as soon as another client pushes"""
+        threading.Timer(0.1, self.server.broker.push, ('q', 'late')).start()
+        self.assertEqual(self.client.pop('q', 5), 'late')
+
+class TestCluster(unittest.TestCase):
+    def setUp(self):
+        metrics.reset()
+        self.server = BrokerServer('127.0.0.1', 0).start()
+        self.port = self.server.address[1]
+        self.coordinator = Coordinator(self.server.broker, lease_seconds=0.5, timeout=10)
+        self.workers = []
+
+    def tearDown(self):
+        for worker, thread in self.workers:
+            worker.stop()
+            thread.join()
+            worker.broker.close()
+        self.coordinator.close()
+        self.server.stop()
+
+    def start_worker(self, name, evaluate=signal_of):
+        worker = ClusterWorker(RedisBroker('127.0.0.1', self.port), heartbeat_seconds=0.1,
+                               name=name, evaluate=evaluate)
+        thread = threading.Thread(target=worker.run)
+        thread.start()
+        self.workers.append((worker, thread))
+        return worker
+
+    def test_workers_share_a_cycle(self):
+        """Test every asset is answered once, by whichever worker took it"""
+        workers = [self.start_worker(f"worker-{i}") for i in range(3)]
+        results = self.coordinator.evaluate(ASSETS, INTERVALS)
+        again = self.coordinator.evaluate(ASSETS, INTERVALS)
+
+        expected = {asset['symbol']: signal_of(asset) for asset in ASSETS}
+        self.assertEqual({symbol: signal for symbol, (signal, _) in results.items()}, expected)
+        self.assertEqual({symbol: signal for symbol, (signal, _) in again.items()}, expected)
+        self.assertEqual(sum(worker.evaluated for worker in workers), 2 * len(ASSETS))
+
+    def test_dead_worker_lease_is_reassigned(self):
+        """Test the lease of a worker process killed mid-agent goes to another worker"""
+        victim = multiprocessing.get_context('fork').Process(target=run_hanging_worker, args=(self.port,))
+        victim.start()
+        results = {}
+        cycle = threading.Thread(target=lambda: results.update(self.coordinator.evaluate(ASSETS[:1], INTERVALS)))
+        cycle.start()
+        try:
+            # Wait for the victim to take the only task, then kill it
+            deadline = time.monotonic() + 10
+            while self.server.broker.length(self.coordinator.tasks) and time.monotonic() < deadline:
+                time.sleep(0.05)
+            time.sleep(0.3)
+        finally:
+            victim.kill()
+            victim.join()
+        self.start_worker('survivor')
+        cycle.join()
+
+        self.assertEqual(results, {'SYM0': (signal_of(ASSETS[0]), results['SYM0'][1])})
+        self.assertEqual(metrics.snapshot()['counters'][('cluster_leases_reassigned_total', ())], 1)
+
+    def test_unclaimed_lease_is_reassigned(self):
+        """Test a lease popped by a worker that died before claiming it goes to another worker"""
+        results = {}
+        cycle = threading.Thread(target=lambda: results.update(self.coordinator.evaluate(ASSETS[:1], INTERVALS)))
+        cycle.start()
+        # Taken off the queue and never claimed, as by a worker killed right after the pop
+        self.assertIsNotNone(self.server.broker.pop(self.coordinator.tasks, 5))
+        self.start_worker('survivor')
+        cycle.join()
+
+        self.assertEqual(results, {'SYM0': (signal_of(ASSETS[0]), results['SYM0'][1])})
+        self.assertEqual(metrics.snapshot()['counters'][('cluster_leases_reassigned_total', ())], 1)
+
+    def test_duplicate_results_are_dropped(self):
+        """Test a second and a late answer to a lease never become a second signal"""
+        broker = self.server.broker
+        answered = []
+
+        def echo():
+            # Answers every lease twice, then once more after the cycle is over
+            for _ in ASSETS[:3]:
+                task = json.loads(broker.pop(self.coordinator.tasks, 5))
+                result = {'type': 'result', 'lease': task['lease'], 'worker': 'echo',
+                          'signal': signal_of(task['asset']), 'seconds': 0.0}
+                broker.push(task['reply'], json.dumps(result))
+                broker.push(task['reply'], json.dumps(result))
+                answered.append(result)
+
+        thread = threading.Thread(target=echo)
+        thread.start()
+        results = self.coordinator.evaluate(ASSETS[:3], INTERVALS)
+        thread.join()
+        broker.push(self.coordinator.results, json.dumps(answered[0]))
+        self.start_worker('worker')
+        later = self.coordinator.evaluate(ASSETS[3:4], INTERVALS)
+
+        self.assertEqual(sorted(results), ['SYM0', 'SYM1', 'SYM2'])
+        self.assertEqual(later, {'SYM3': (signal_of(ASSETS[3]), later['SYM3'][1])})
+        self.assertEqual(metrics.snapshot()['counters'][('cluster_duplicate_results_total', ())], 4)
+
+    def test_unanswered_leases_are_reported(self):
+        """Test a cycle with no workers ends at its timeout with an error per asset"""
+        coordinator = Coordinator(MemoryBroker(), timeout=0.2)
+        results = coordinator.evaluate(ASSETS[:2], INTERVALS)
+        self.assertEqual(results, {'SYM0': ("HOLD (Error: no cluster worker answered)", 0.0),
+                                   'SYM1': ("HOLD (Error: no cluster worker answered)", 0.0)})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,211 @@
+import unittest
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch, MagicMock
+import configparser
+import tempfile
+import shutil
+import pandas as pd
+
+from core.data_fetcher import DataFetcher
+from core.bar_cache import get_bar_cache
+
+class TestIncrementalFetching(unittest.TestCase):
+    backend = 'columnar'
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        with patch('core.config_manager.ConfigManager.load_config', return_value=configparser.ConfigParser()):
+            self.fetcher = DataFetcher()
+        self.fetcher.cache_dir = self.cache_dir
+        self.fetcher.cache = get_bar_cache(self.backend, self.cache_dir)
+
+        self.rate_limit_patcher = patch.object(DataFetcher, '_rate_limit')
+        self.rate_limit_patcher.start()
+        self.fetch_patcher = patch.object(DataFetcher, '_fetch_yfinance')
+        self.mock_fetch = self.fetch_patcher.start()
+        # Markets count as open unless a test says otherwise
+        self.calendar = MagicMock()
+        self.calendar.open_between.return_value = True
+        self.calendar_patcher = patch('core.data_fetcher.market_calendar', self.calendar)
+        self.calendar_patcher.start()
+
+        # Two days of 15m bars ending well in the past
+        self.history = self._bars('2023-01-02 00:00', 192)
+
+    def tearDown(self):
+        self.rate_limit_patcher.stop()
+        self.fetch_patcher.stop()
+        self.calendar_patcher.stop()
+        shutil.rmtree(self.cache_dir)
+
+    def _bars(self, start, periods, close=100.0):
+        index = pd.date_range(start=start, periods=periods, freq='15min', tz='UTC', name='Date')
+        return pd.DataFrame({
+            'open': close,
+            'high': close + 1,
+            'low': close - 1,
+            'close': close,
+            'volume': 1000.0
+        }, index=index)
+
+    def test_miss_fetches_full_period(self):
+        """Test an empty cache downloads the whole period"""
+        self.mock_fetch.return_value = self.history
+        data = self.fetcher.get_historical_data('AAPL', period='5d', interval='15m', source='yfinance')
+
+        self.assertEqual(len(data), 192)
+        self.assertIsNone(self.mock_fetch.call_args[1]['since'])
+
+    def test_stale_cache_fetches_only_new_bars(self):
+        """Test a stale cache asks the provider for bars after its last timestamp"""
+        self.mock_fetch.return_value = self.history
+        self.fetcher.get_historical_data('AAPL', period='5d', interval='15m', source='yfinance')
+
+        # Overlap the last cached bar with a revised value, then four new bars
+        delta = self._bars('2023-01-03 23:45', 5, close=200.0)
+        self.mock_fetch.return_value = delta
+        data = self.fetcher.get_historical_data('AAPL', period='5d', interval='15m', source='yfinance')
+
+        self.assertEqual(self.mock_fetch.call_args[1]['since'], self.history.index[-1])
+        self.assertEqual(len(data), 196)
+        self.assertFalse(data.index.duplicated().any())
+        self.assertEqual(data['close'].loc[self.history.index[-1]], 200.0)
+        self.assertTrue(data.index.is_monotonic_increasing)
+
+    def test_merge_trims_to_period(self):
+        """Test appended bars push the oldest ones out of the cached window"""
+        self.mock_fetch.return_value = self.history
+        self.fetcher.get_historical_data('AAPL', period='1d', interval='15m', source='yfinance')
+
+        self.mock_fetch.return_value = self._bars('2023-01-04 00:00', 4)
+        data = self.fetcher.get_historical_data('AAPL', period='1d', interval='15m', source='yfinance')
+
+        self.assertLessEqual(data.index[-1] - data.index[0], pd.Timedelta(days=1))
+
+    def test_fresh_cache_skips_provider(self):
+        """Test a cache whose last bar is still open is served without a request"""
+        now = pd.Timestamp.now(tz='UTC').floor('15min')
+        self.mock_fetch.return_value = self._bars(now - pd.Timedelta(minutes=15 * 9), 10)
+        self.fetcher.get_historical_data('AAPL', period='5d', interval='15m', source='yfinance')
+        self.fetcher.get_historical_data('AAPL', period='5d', interval='15m', source='yfinance')
+
+        self.assertEqual(self.mock_fetch.call_count, 1)
+
+    def test_closed_market_skips_provider(self):
+        """Test a stale cache is served without a request while the market stays closed"""
+        self.mock_fetch.return_value = self.history
+        self.fetcher.get_historical_data('AAPL', period='5d', interval='15m', source='yfinance')
+
+        self.calendar.open_between.return_value = False
+        data = self.fetcher.get_historical_data('AAPL', period='5d', interval='15m', source='yfinance')
+
+        self.assertEqual(self.mock_fetch.call_count, 1)
+        self.assertEqual(len(data), 192)
+        asset_type, since, _ = self.calendar.open_between.call_args[0]
+        self.assertEqual(asset_type, 'stock')
+        # Checked from when the series was fetched, not from its last bar
+        self.assertGreater(since, self.history.index[-1].timestamp())
+
+    def test_closed_market_checked_from_last_bar_after_restart(self):
+        """Test a series cached by an earlier run is trusted only once its last bar has closed"""
+        self.mock_fetch.return_value = self.history
+        self.fetcher.get_historical_data('BTCUSD', period='5d', interval='15m', source='yfinance')
+        self.fetcher._fetched_at.clear()
+
+        self.calendar.open_between.return_value = False
+        self.fetcher.get_historical_data('BTCUSD', period='5d', interval='15m', source='yfinance')
+
+        self.assertEqual(self.mock_fetch.call_count, 1)
+        self.assertEqual(self.calendar.open_between.call_args[0][:2],
+                         ('crypto', self.history.index[-1].timestamp() + 900))
+
+    def test_non_incremental_returns_cache(self):
+        """Test incremental=False keeps the original cache-forever behaviour"""
+        self.mock_fetch.return_value = self.history
+        self.fetcher.get_historical_data('AAPL', period='5d', interval='15m', source='yfinance')
+        data = self.fetcher.get_historical_data('AAPL', period='5d', interval='15m', source='yfinance',
+                                                incremental=False)
+
+        self.assertEqual(self.mock_fetch.call_count, 1)
+        self.assertEqual(len(data), 192)
+
+    def test_failed_delta_serves_stale_cache(self):
+        """Test provider errors during a refresh fall back to the cached bars"""
+        self.mock_fetch.return_value = self.history
+        self.fetcher.get_historical_data('AAPL', period='5d', interval='15m', source='yfinance')
+
+        self.mock_fetch.side_effect = Exception("API error")
+        data = self.fetcher.get_historical_data('AAPL', period='5d', interval='15m', source='yfinance')
+        self.assertEqual(len(data), 192)
+
+    def test_batch_shares_requests(self):
+        """Test a batch fetches its uncached series together and refreshes the stale ones together"""
+        delta = self._bars('2023-01-03 23:45', 5, close=200.0)
+        with patch('yfinance.download') as download:
+            download.return_value = pd.concat({'AAPL': self.history, 'MSFT': self.history}, axis=1)
+            self.fetcher.get_historical_batch(['AAPL', 'MSFT'], period='5d', interval='15m')
+            self.assertEqual(download.call_args.kwargs['period'], '5d')
+
+            download.return_value = pd.concat({'AAPL': delta, 'MSFT': delta}, axis=1)
+            frames = self.fetcher.get_historical_batch(['AAPL', 'MSFT'], period='5d', interval='15m')
+
+        self.assertEqual(download.call_count, 2)
+        self.assertEqual(download.call_args.kwargs['start'], self.history.index[-1])
+        self.assertEqual(len(frames['MSFT']), 196)
+        self.assertEqual(len(self.fetcher.cache.load('AAPL_5d_15m')), 196)
+        self.assertEqual(frames['AAPL']['close'].iloc[-1], 200.0)
+
+    def test_clear_cache(self):
+        """Test cached series of either backend are removed"""
+        self.mock_fetch.return_value = self.history
+        self.fetcher.get_historical_data('AAPL', period='5d', interval='15m', source='yfinance')
+        self.assertEqual(self.fetcher.clear_cache(older_than_days=-1), 1)
+
+    def test_derived_interval_resampled_from_base(self):
+        """Test 4h bars are built from cached 60m bars on FX session boundaries"""
+        self.mock_fetch.return_value = self.history
+        data = self.fetcher.get_historical_data('EURUSD', period='5d', interval='4h', source='yfinance')
+
+        self.assertEqual(self.mock_fetch.call_args[0][2], '60m')
+        # Bins open at 17:00 New York (22:00 UTC in winter)
+        self.assertEqual(data.index[0], pd.Timestamp('2023-01-01 22:00', tz='UTC'))
+        self.assertEqual(len(data), 13)
+        self.assertEqual(data['volume'].iloc[0], 8 * 1000.0)
+        self.assertEqual(data['volume'].iloc[1], 16 * 1000.0)
+
+    def test_concurrent_misses_share_one_fetch(self):
+        """Test threads and asyncio tasks missing the same series wait on one provider call"""
+        release = threading.Event()
+
+        def slow_fetch(*args, **kwargs):
+            release.wait(5)
+            return self.history
+
+        self.mock_fetch.side_effect = slow_fetch
+        calls = self.fetcher._history_calls
+
+        async def ask_async():
+            return await self.fetcher.get_historical_data_async('AAPL', period='5d', interval='15m',
+                                                                source='yfinance')
+
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            futures = [pool.submit(self.fetcher.get_historical_data, 'AAPL', period='5d', interval='15m',
+                                   source='yfinance') for _ in range(3)]
+            futures.append(pool.submit(asyncio.run, ask_async()))
+            while calls.coalesced < 3:
+                time.sleep(0.01)
+            release.set()
+            frames = [future.result() for future in futures]
+
+        self.assertEqual(self.mock_fetch.call_count, 1)
+        self.assertTrue(all(frame is frames[0] for frame in frames))
+        self.assertEqual(len(frames[0]), 192)
+
+class TestIncrementalFetchingCsv(TestIncrementalFetching):
+    backend = 'csv'
+
+if __name__ == '__main__':
+    unittest.main()
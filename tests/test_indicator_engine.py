@@ -0,0 +1,159 @@
+import unittest
+import copy
+import os
+import tempfile
+import threading
+import numpy as np
+import pandas as pd
+import talib
+from talib import abstract
+from core.bar_buffer import BarBuffer
+from core.indicator_engine import (
+    IndicatorEngine, SMA, EMA, RSI, MACD, BBANDS, ATR, ADX, STOCH
+)
+
+class TestIndicators(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(7)
+        self.close = 100 + np.cumsum(rng.normal(0, 1, 400))
+        self.high = self.close + rng.uniform(0, 1, 400)
+        self.low = self.close - rng.uniform(0, 1, 400)
+
+    def _stream(self, indicator):
+        outputs = [indicator.update(h, l, c) for h, l, c in zip(self.high, self.low, self.close)]
+        return [np.array(column) for column in zip(*outputs)]
+
+    def assertMatchesTalib(self, streamed, expected):
+        for actual, reference in zip(streamed, expected):
+            np.testing.assert_array_equal(np.isnan(actual), np.isnan(reference))
+            np.testing.assert_allclose(actual[~np.isnan(actual)], reference[~np.isnan(reference)], rtol=1e-9)
+
+    def test_moving_averages(self):
+        """Test SMA and EMA match TA-Lib bar for bar"""
+        self.assertMatchesTalib(self._stream(SMA(50)), [talib.SMA(self.close, timeperiod=50)])
+        self.assertMatchesTalib(self._stream(EMA(20)), [talib.EMA(self.close, timeperiod=20)])
+
+    def test_oscillators(self):
+        """Test RSI, MACD and Stochastic match TA-Lib bar for bar"""
+        self.assertMatchesTalib(self._stream(RSI(14)), [talib.RSI(self.close, timeperiod=14)])
+        self.assertMatchesTalib(self._stream(MACD(12, 26, 9)),
+                                talib.MACD(self.close, fastperiod=12, slowperiod=26, signalperiod=9))
+        self.assertMatchesTalib(self._stream(STOCH(5, 3, 3)), talib.STOCH(self.high, self.low, self.close))
+
+    def test_volatility_and_trend(self):
+        """Test Bollinger Bands, ATR and ADX match TA-Lib bar for bar"""
+        self.assertMatchesTalib(self._stream(BBANDS(20, 2.0)), talib.BBANDS(self.close, timeperiod=20))
+        self.assertMatchesTalib(self._stream(ATR(14)),
+                                [talib.ATR(self.high, self.low, self.close, timeperiod=14)])
+        self.assertMatchesTalib(self._stream(ADX(14)),
+                                [talib.ADX(self.high, self.low, self.close, timeperiod=14)])
+
+    def test_peek_matches_update(self):
+        """Test peek() gives update()'s values on every bar without changing the state"""
+        for indicator in (SMA(5), EMA(5), RSI(5), MACD(3, 6, 4), BBANDS(5), ATR(5), ADX(5), STOCH(5, 3, 3)):
+            for h, l, c in zip(self.high[:60], self.low[:60], self.close[:60]):
+                expected = copy.deepcopy(indicator).update(h, l, c)
+                np.testing.assert_array_equal(indicator.peek(h, l, c), expected, type(indicator).__name__)
+                np.testing.assert_array_equal(indicator.update(h, l, c), expected, type(indicator).__name__)
+
+    def test_lookback(self):
+        """Test each indicator's lookback is TA-Lib's and its first value comes right after it"""
+        cases = [(SMA(50), 'SMA', {'timeperiod': 50}), (EMA(20), 'EMA', {'timeperiod': 20}),
+                 (RSI(14), 'RSI', {'timeperiod': 14}),
+                 (MACD(12, 26, 9), 'MACD', {'fastperiod': 12, 'slowperiod': 26, 'signalperiod': 9}),
+                 (BBANDS(20, 2.0), 'BBANDS', {'timeperiod': 20}), (ATR(14), 'ATR', {'timeperiod': 14}),
+                 (ADX(14), 'ADX', {'timeperiod': 14}),
+                 (STOCH(5, 3, 3), 'STOCH', {'fastk_period': 5, 'slowk_period': 3, 'slowd_period': 3})]
+        for indicator, name, parameters in cases:
+            self.assertEqual(indicator.lookback, abstract.Function(name, **parameters).lookback, name)
+            first = np.flatnonzero(~np.isnan(self._stream(indicator)[0]))[0]
+            self.assertEqual(first, indicator.lookback, name)
+
+class TestIndicatorEngine(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(11)
+        close = 100 + np.cumsum(rng.normal(0, 1, 300))
+        self.bars = pd.DataFrame({
+            'High': close + 0.5,
+            'Low': close - 0.5,
+            'Close': close
+        }, index=pd.date_range(start='2023-01-01', periods=300, freq='h', tz='UTC'))
+        self.indicators = [RSI(14), MACD(12, 26, 9)]
+        self.engine = IndicatorEngine(history=3)
+
+    def test_latest_values_match_full_recompute(self):
+        """Test values returned for the latest bars equal TA-Lib on the whole frame"""
+        values = self.engine.update('EURUSD', '60m', self.bars, self.indicators)
+
+        rsi = talib.RSI(self.bars['Close'].to_numpy(), timeperiod=14)
+        macd, signal, _ = talib.MACD(self.bars['Close'].to_numpy())
+        np.testing.assert_allclose(values['RSI'], rsi[-3:], rtol=1e-9)
+        np.testing.assert_allclose(values['MACD_signal'], signal[-3:], rtol=1e-9)
+
+    def test_incremental_update_matches_full_recompute(self):
+        """Test a growing frame gives the same values as starting from scratch"""
+        self.engine.update('EURUSD', '60m', self.bars.iloc[:200], self.indicators)
+        incremental = self.engine.update('EURUSD', '60m', self.bars.iloc[50:], self.indicators)
+        full = IndicatorEngine(history=3).update('EURUSD', '60m', self.bars, self.indicators)
+
+        for name in full:
+            np.testing.assert_allclose(incremental[name], full[name], rtol=1e-12)
+
+    def test_buffer_matches_frame(self):
+        """Test a float64 BarBuffer gives the same values as the frame, also across calls"""
+        buffer = BarBuffer.from_frame(self.bars.iloc[:200], capacity=250, dtype=np.float64)
+        self.engine.update('EURUSD', '60m', buffer, self.indicators)
+        buffer.extend_frame(self.bars.iloc[190:])
+        values = self.engine.update('EURUSD', '60m', buffer, self.indicators)
+
+        expected = IndicatorEngine(history=3).update('EURUSD', '60m', self.bars, self.indicators)
+        self.assertEqual(values, expected)
+
+    def test_forming_bar_is_not_committed(self):
+        """Test a revised last bar replaces the provisional value"""
+        forming = self.bars.copy()
+        forming.iloc[-1, forming.columns.get_loc('Close')] += 5
+        self.engine.update('EURUSD', '60m', forming, self.indicators)
+
+        values = self.engine.update('EURUSD', '60m', self.bars, self.indicators)
+        expected = IndicatorEngine(history=3).update('EURUSD', '60m', self.bars, self.indicators)
+        self.assertEqual(values['RSI'], expected['RSI'])
+
+    def test_gap_triggers_warm_up(self):
+        """Test a frame that skips past the committed bar is recomputed from scratch"""
+        self.engine.update('EURUSD', '60m', self.bars.iloc[:100], self.indicators)
+        values = self.engine.update('EURUSD', '60m', self.bars.iloc[150:], self.indicators)
+        expected = IndicatorEngine(history=3).update('EURUSD', '60m', self.bars.iloc[150:], self.indicators)
+        self.assertEqual(values['RSI'], expected['RSI'])
+
+    def test_series_are_locked_separately(self):
+        """Test a series being updated only holds up updates of that same series"""
+        with self.engine._series_lock('EURUSD', '60m'):
+            other = threading.Thread(target=self.engine.update, args=('GBPUSD', '60m', self.bars, self.indicators))
+            same = threading.Thread(target=self.engine.update, args=('EURUSD', '60m', self.bars, self.indicators))
+            other.start()
+            same.start()
+            other.join(5)
+            same.join(0.2)
+            self.assertFalse(other.is_alive())
+            self.assertTrue(same.is_alive())
+        same.join(5)
+        self.assertFalse(same.is_alive())
+
+    def test_checkpoint_round_trip(self):
+        """Test restored state continues exactly where the saved engine stopped"""
+        self.engine.update('EURUSD', '60m', self.bars.iloc[:200], self.indicators)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'state.pkl')
+            self.engine.save(path)
+
+            restored = IndicatorEngine(history=3)
+            self.assertTrue(restored.load(path))
+            self.assertFalse(restored.load(os.path.join(directory, 'missing.pkl')))
+
+        values = restored.update('EURUSD', '60m', self.bars.iloc[190:], self.indicators)
+        expected = self.engine.update('EURUSD', '60m', self.bars, self.indicators)
+        self.assertEqual(values, expected)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+import unittest
+import pandas as pd
+from core.indicator_engine import SMA, EMA, RSI, MACD, STOCH
+from core.lookback import Lookback, bars_needed, history_days, bars_in
+
+def at(moment):
+    return pd.Timestamp(moment).timestamp()
+
+# Friday 2024-03-08, after the NYSE close
+FRIDAY_CLOSE = at('2024-03-08 21:00Z')
+
+class TestLookback(unittest.TestCase):
+    def test_bars_needed(self):
+        """Test the longest warm-up plus the values read, unless the agent's minimum is more"""
+        self.assertEqual(bars_needed([EMA(20), EMA(50), RSI(14)]), 49 + 5)
+        self.assertEqual(bars_needed([MACD(12, 26, 9), STOCH(5, 3, 3)], minimum=24), 33 + 5)
+        self.assertEqual(bars_needed([SMA(100), SMA(200)], minimum=200, values=2), 201)
+        self.assertEqual(bars_needed([RSI(14)], minimum=100), 100)
+
+    def test_history_days_counts_sessions(self):
+        """Test only trading sessions hold bars: one daily and seven hourly bars per stock session"""
+        # Monday to Friday: five sessions back to Monday's open
+        self.assertAlmostEqual(history_days('stock', '1d', 5, FRIDAY_CLOSE),
+                               (FRIDAY_CLOSE - at('2024-03-04 14:30Z')) / 86400)
+        self.assertEqual(history_days('stock', '60m', 35, FRIDAY_CLOSE),
+                         history_days('stock', '1d', 5, FRIDAY_CLOSE))
+        # Presidents' Day: Tuesday's second bar is Friday's
+        tuesday = at('2024-02-20 21:00Z')
+        self.assertAlmostEqual(history_days('stock', '1d', 2, tuesday),
+                               (tuesday - at('2024-02-16 14:30Z')) / 86400)
+
+    def test_history_days_forex_and_crypto(self):
+        """Test the forex week holds 30 4h bars and crypto one bar per interval"""
+        self.assertAlmostEqual(history_days('forex', '4h', 30, FRIDAY_CLOSE),
+                               (FRIDAY_CLOSE - at('2024-03-03 22:00Z')) / 86400)
+        # The 31st is the last bar of the week before, not the whole week
+        self.assertAlmostEqual(history_days('forex', '4h', 31, FRIDAY_CLOSE),
+                               (FRIDAY_CLOSE - at('2024-03-01 18:00Z')) / 86400)
+        self.assertEqual(history_days('crypto', '15m', 96, FRIDAY_CLOSE), 1.0)
+
+    def test_bars_in_is_the_inverse(self):
+        """Test the days history_days returns hold at least the bars asked for"""
+        for asset_type, interval, bars in (('stock', '60m', 200), ('forex', '4h', 68), ('commodity', '60m', 125),
+                                           ('index', '1d', 255), ('crypto', '15m', 63)):
+            days = history_days(asset_type, interval, bars, FRIDAY_CLOSE)
+            self.assertGreaterEqual(bars_in(asset_type, interval, days, FRIDAY_CLOSE), bars)
+            self.assertLess(bars_in(asset_type, interval, days - 1, FRIDAY_CLOSE), bars)
+
+    def test_period_adds_margin(self):
+        """Test the period covers the most demanding timeframe plus the margin, in whole days"""
+        requirements = {'1d': 100, '60m': 100}
+        sizer = Lookback(margin=0)
+        self.assertEqual(sizer.period('stock', requirements, FRIDAY_CLOSE),
+                         f"{int(history_days('stock', '1d', 100, FRIDAY_CLOSE)) + 2}d")
+
+        sizer.configure({'Providers': {'lookback_margin': '0.5'}})
+        self.assertEqual(sizer.margin, 0.5)
+        self.assertEqual(sizer.period('stock', requirements, FRIDAY_CLOSE),
+                         f"{int(history_days('stock', '1d', 150, FRIDAY_CLOSE)) + 2}d")
+        self.assertEqual(sizer.period('crypto', {'15m': 64}, FRIDAY_CLOSE), '2d')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+import unittest
+from datetime import date
+import pandas as pd
+from core.market_calendar import MarketCalendar, easter, nyse_holidays, nyse_early_closes
+
+def at(moment):
+    return pd.Timestamp(moment).timestamp()
+
+class TestHolidayRules(unittest.TestCase):
+    def test_easter(self):
+        """Test Easter Sunday for known years"""
+        self.assertEqual(easter(2024), date(2024, 3, 31))
+        self.assertEqual(easter(2025), date(2025, 4, 20))
+        self.assertEqual(easter(2038), date(2038, 4, 25))
+
+    def test_nyse_holidays(self):
+        """Test the published 2024 NYSE holiday list"""
+        self.assertEqual(sorted(nyse_holidays(2024)), [
+            date(2024, 1, 1), date(2024, 1, 15), date(2024, 2, 19), date(2024, 3, 29),
+            date(2024, 5, 27), date(2024, 6, 19), date(2024, 7, 4), date(2024, 9, 2),
+            date(2024, 11, 28), date(2024, 12, 25)
+        ])
+
+    def test_observed_holidays(self):
+        """Test weekend holidays move to a weekday, except a Saturday New Year's Day"""
+        holidays = nyse_holidays(2022)
+        self.assertIn(date(2022, 6, 20), holidays)
+        self.assertIn(date(2022, 12, 26), holidays)
+        self.assertNotIn(date(2021, 12, 31), nyse_holidays(2021))
+
+    def test_early_closes(self):
+        """Test the NYSE half days"""
+        self.assertEqual(sorted(nyse_early_closes(2024)),
+                         [date(2024, 7, 3), date(2024, 11, 29), date(2024, 12, 24)])
+
+class TestMarketCalendar(unittest.TestCase):
+    def setUp(self):
+        self.calendar = MarketCalendar()
+
+    def test_stock_hours(self):
+        """Test the NYSE session, half days and holidays"""
+        self.assertTrue(self.calendar.is_open('stock', at('2024-03-08 14:30Z')))
+        self.assertFalse(self.calendar.is_open('stock', at('2024-03-08 14:29Z')))
+        self.assertFalse(self.calendar.is_open('stock', at('2024-03-08 21:00Z')))
+        self.assertFalse(self.calendar.is_open('index', at('2024-07-03 17:30Z')))
+        self.assertFalse(self.calendar.is_open('stock', at('2024-07-04 15:00Z')))
+
+    def test_forex_week(self):
+        """Test forex trades continuously from Sunday to Friday 17:00 New York"""
+        self.assertTrue(self.calendar.is_open('forex', at('2024-03-06 05:00Z')))
+        self.assertFalse(self.calendar.is_open('forex', at('2024-03-09 12:00Z')))
+        self.assertEqual(self.calendar.next_open('forex', at('2024-03-09 12:00Z')), at('2024-03-10 21:00Z'))
+
+    def test_commodity_daily_break(self):
+        """Test CME futures pause from 17:00 to 18:00 New York"""
+        self.assertFalse(self.calendar.is_open('commodity', at('2024-03-06 22:30Z')))
+        self.assertTrue(self.calendar.is_open('commodity', at('2024-03-06 23:00Z')))
+
+    def test_crypto_never_closes(self):
+        """Test crypto is always open"""
+        self.assertTrue(self.calendar.is_open('crypto', at('2024-03-09 12:00Z')))
+        self.assertTrue(self.calendar.open_between('crypto', 0, 1))
+
+    def test_open_between(self):
+        """Test a window counts as open if it overlaps any session"""
+        self.assertTrue(self.calendar.open_between('stock', at('2024-03-08 20:30Z'), at('2024-03-08 21:30Z')))
+        self.assertFalse(self.calendar.open_between('stock', at('2024-03-08 21:00Z'), at('2024-03-11 13:29Z')))
+
+    def test_next_open_after_holiday(self):
+        """Test the next open skips holidays and weekends"""
+        self.assertEqual(self.calendar.next_open('stock', at('2024-07-03 18:00Z')), at('2024-07-05 13:30Z'))
+        self.assertEqual(self.calendar.next_open('stock', at('2024-03-08 15:00Z')), at('2024-03-08 15:00Z'))
+
+    def test_tables_extend_to_new_years(self):
+        """Test queries far from the first one rebuild the tables to cover them"""
+        self.assertTrue(self.calendar.is_open('stock', at('2024-03-08 15:00Z')))
+        self.assertTrue(self.calendar.is_open('stock', at('2031-03-07 15:00Z')))
+        self.assertFalse(self.calendar.is_open('stock', at('2031-12-25 15:00Z')))
+        self.assertTrue(self.calendar.is_open('stock', at('2024-03-08 15:00Z')))
+
+if __name__ == '__main__':
+    unittest.main()
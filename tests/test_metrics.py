@@ -0,0 +1,104 @@
+import unittest
+from unittest.mock import patch, MagicMock
+import requests
+from core.metrics import Metrics, MetricsServer, metrics, start_metrics_server
+from core.signal_generator import SignalGenerator
+
+class TestMetrics(unittest.TestCase):
+    def setUp(self):
+        self.metrics = Metrics(buckets=(0.1, 1.0))
+
+    def test_counters_rendered(self):
+        """Test counters are exported with sorted, escaped labels"""
+        self.metrics.inc('cache_requests_total', layer='bar_store', result='hit')
+        self.metrics.inc('cache_requests_total', 2, result='hit', layer='bar_store')
+        self.metrics.inc('agent_errors_total', agent='forex', symbol='EUR"USD')
+
+        lines = self.metrics.render().splitlines()
+        self.assertIn('# TYPE signalgen_cache_requests_total counter', lines)
+        self.assertIn('signalgen_cache_requests_total{layer="bar_store",result="hit"} 3', lines)
+        self.assertIn('signalgen_agent_errors_total{agent="forex",symbol="EUR\\"USD"} 1', lines)
+
+    def test_histogram_rendered(self):
+        """Test timings become cumulative Prometheus histograms"""
+        for seconds in (0.05, 0.5, 5.0):
+            self.metrics.observe('fetch_seconds', seconds, provider='yfinance')
+
+        lines = self.metrics.render().splitlines()
+        self.assertEqual(lines, [
+            '# TYPE signalgen_fetch_seconds histogram',
+            'signalgen_fetch_seconds_bucket{provider="yfinance",le="0.1"} 1',
+            'signalgen_fetch_seconds_bucket{provider="yfinance",le="1.0"} 2',
+            'signalgen_fetch_seconds_bucket{provider="yfinance",le="+Inf"} 3',
+            'signalgen_fetch_seconds_sum{provider="yfinance"} 5.55',
+            'signalgen_fetch_seconds_count{provider="yfinance"} 3'
+        ])
+
+    def test_timer_records_on_error(self):
+        """Test the timer context manager records a failing block too"""
+        with self.assertRaises(ValueError):
+            with self.metrics.timer('agent_seconds', agent='crypto'):
+                raise ValueError("boom")
+        self.assertEqual(self.metrics.snapshot()['timings'][('agent_seconds', (('agent', 'crypto'),))][0], 1)
+
+    def test_summary_covers_only_the_period(self):
+        """Test the cycle summary only counts what happened after the snapshot"""
+        self.metrics.observe('fetch_seconds', 1.0, provider='yfinance')
+        before = self.metrics.snapshot()
+        self.metrics.observe('fetch_seconds', 0.25, provider='yfinance')
+        self.metrics.observe('fetch_seconds', 0.5, provider='twelvedata')
+        self.metrics.inc('cache_requests_total', 3, layer='bar_store', result='hit')
+        self.metrics.inc('cache_requests_total', layer='data_fetcher', result='miss')
+        self.metrics.observe('agent_seconds', 0.1, agent='forex')
+        self.metrics.inc('agent_errors_total', agent='forex', symbol='EURUSD')
+
+        self.assertEqual(self.metrics.summary(before),
+                         "fetch twelvedata 1/0.50s, yfinance 1/0.25s | cache hit 3 miss 1 | "
+                         "indicators 0/0.00s | agents 1/0.10s | rate wait 0.00s | telegram 0/0.00s | errors 1")
+
+    def test_endpoint_serves_prometheus_text(self):
+        """Test /metrics returns the registry and other paths 404"""
+        self.metrics.inc('telegram_messages_total')
+        server = MetricsServer(self.metrics, port=0).start()
+        try:
+            response = requests.get(server.url)
+            self.assertEqual(response.status_code, 200)
+            self.assertTrue(response.headers['Content-Type'].startswith('text/plain; version=0.0.4'))
+            self.assertIn('signalgen_telegram_messages_total 1', response.text)
+            self.assertEqual(requests.get(server.url.replace('/metrics', '/')).status_code, 404)
+        finally:
+            server.stop()
+
+    def test_endpoint_disabled_by_default(self):
+        """Test no server starts without [Metrics] port"""
+        self.assertIsNone(start_metrics_server({}))
+        self.assertIsNone(start_metrics_server({'Metrics': {'port': '0'}}))
+
+class TestCycleInstrumentation(unittest.TestCase):
+    def test_agents_report_timings_and_errors(self):
+        """Test a cycle records agent time per type and errors per agent and symbol"""
+        generator = SignalGenerator({'Settings': {'workers': '1'}, 'Schedule': {'market_hours': 'false'}})
+        generator.assets = [
+            {"name": "EUR/USD", "symbol": "EURUSD", "type": "forex"},
+            {"name": "Bitcoin", "symbol": "BTCUSD", "type": "crypto"}
+        ]
+        agents = {
+            'forex': MagicMock(generate_signal=lambda s: "BUY", required_series=lambda s: []),
+            'crypto': MagicMock(generate_signal=lambda s: "HOLD (Error: API error)", required_series=lambda s: [])
+        }
+        before = metrics.snapshot()
+        with patch.dict('core.signal_generator.AGENTS', agents), patch('core.signal_generator.bar_store'):
+            generator.generate_signals()
+        after = metrics.snapshot()
+
+        def timing_count(key):
+            return after['timings'].get(key, (0, 0))[0] - before['timings'].get(key, (0, 0))[0]
+
+        self.assertEqual(timing_count(('agent_seconds', (('agent', 'forex'),))), 1)
+        self.assertEqual(timing_count(('agent_seconds', (('agent', 'crypto'),))), 1)
+        errors = ('agent_errors_total', (('agent', 'crypto'), ('symbol', 'BTCUSD')))
+        self.assertEqual(after['counters'].get(errors, 0) - before['counters'].get(errors, 0), 1)
+        self.assertIn('errors 1', metrics.summary(before))
+
+if __name__ == '__main__':
+    unittest.main()
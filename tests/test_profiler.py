@@ -0,0 +1,92 @@
+import unittest
+import os
+import pstats
+import shutil
+import tempfile
+import threading
+from core.profiler import CycleProfiler
+
+def busy(n=2000):
+    return sum(i * i for i in range(n))
+
+class TestCycleProfiler(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.profiler = CycleProfiler()
+        self.profiler.configure({'Profiling': {'enabled': 'true', 'every': '2', 'directory': self.directory}})
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def _files(self):
+        return sorted(os.listdir(self.directory))
+
+    def test_disabled_by_default(self):
+        """Test nothing is profiled without [Profiling] enabled"""
+        profiler = CycleProfiler()
+        profiler.configure({})
+        with profiler.cycle('forex'):
+            busy()
+        self.assertEqual(profiler.cycle_count, 0)
+
+    def test_every_nth_cycle_sampled(self):
+        """Test cycles 1 and 3 are profiled with every = 2, tagged with their number"""
+        for _ in range(3):
+            with self.profiler.cycle('crypto-forex'):
+                busy()
+        self.assertEqual(self._files(), [
+            'cycle-000001-crypto-forex.pstats', 'cycle-000001-crypto-forex.txt', 'cycle-000001-memory.txt',
+            'cycle-000003-crypto-forex.pstats', 'cycle-000003-crypto-forex.txt', 'cycle-000003-memory.txt'
+        ])
+        stats = pstats.Stats(os.path.join(self.directory, 'cycle-000001-crypto-forex.pstats'))
+        self.assertTrue(any(function == 'busy' for _, _, function in stats.stats))
+        with open(os.path.join(self.directory, 'cycle-000001-memory.txt')) as f:
+            self.assertIn('allocation sites', f.read())
+
+    def test_nested_cycle_counts_once(self):
+        """Test generate_signals inside main.py's cycle is not a cycle of its own"""
+        for _ in range(2):
+            with self.profiler.cycle('outer'):
+                with self.profiler.cycle('inner'):
+                    busy()
+        self.assertEqual(self.profiler.cycle_count, 2)
+        self.assertFalse(any('inner' in name for name in self._files()))
+
+    def test_agent_calls_profiled_per_asset(self):
+        """Test agent calls get their own profile on worker threads and on the cycle's thread"""
+        with self.profiler.cycle('all'):
+            worker = threading.Thread(target=lambda: self._agent('crypto', 'BTC/USD'))
+            worker.start()
+            worker.join()
+            self._agent('forex', 'EURUSD=X')
+            busy()
+
+        files = self._files()
+        self.assertIn('cycle-000001-crypto-BTC_USD.pstats', files)
+        self.assertIn('cycle-000001-forex-EURUSD_X.pstats', files)
+        # The cycle profile carries on after an agent call on its own thread
+        stats = pstats.Stats(os.path.join(self.directory, 'cycle-000001-all.pstats'))
+        self.assertTrue(any(function == 'busy' for _, _, function in stats.stats))
+
+    def test_agent_outside_sampled_cycle(self):
+        """Test agent calls in unsampled cycles are not profiled"""
+        with self.profiler.cycle('all'):
+            pass
+        with self.profiler.cycle('all'):
+            self._agent('forex', 'EURUSD')
+        self.assertFalse(any('EURUSD' in name for name in self._files()))
+
+    def test_old_cycles_pruned(self):
+        """Test only the newest `keep` sampled cycles keep their files"""
+        self.profiler.keep = 1
+        for _ in range(3):
+            with self.profiler.cycle('all'):
+                pass
+        self.assertTrue(all(name.startswith('cycle-000003-') for name in self._files()))
+
+    def _agent(self, asset_type, symbol):
+        with self.profiler.agent(asset_type, symbol):
+            busy()
+
+if __name__ == '__main__':
+    unittest.main()
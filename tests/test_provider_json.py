@@ -0,0 +1,46 @@
+import unittest
+import numpy as np
+import pandas as pd
+from core.provider_json import parse_alpha_vantage, parse_twelvedata
+from benchmarks.replay_server import ReplayData, alpha_vantage_response, twelvedata_response
+
+class TestProviderJson(unittest.TestCase):
+    def setUp(self):
+        self.bars = ReplayData().bars('IBM', '15m').iloc[-300:]
+
+    def test_alpha_vantage_matches_pandas_parse(self):
+        """Test the NumPy parse gives the frame the pandas parse did, oldest first"""
+        payload = alpha_vantage_response(self.bars, {'function': 'TIME_SERIES_INTRADAY', 'interval': '15min',
+                                                     'outputsize': 'full'})
+        series = payload['Time Series (15min)']
+        data = parse_alpha_vantage(series, 'US/Eastern')
+
+        expected = pd.DataFrame.from_dict(series, orient='index').apply(pd.to_numeric).sort_index()
+        expected.index = pd.to_datetime(expected.index).tz_localize('US/Eastern')
+        self.assertEqual(list(data.columns), ['open', 'high', 'low', 'close', 'volume'])
+        self.assertEqual(data.index.name, 'Date')
+        np.testing.assert_array_equal(data.index.asi8, expected.index.as_unit('ns').asi8)
+        np.testing.assert_array_equal(data.to_numpy(), expected.to_numpy(dtype=float))
+        np.testing.assert_allclose(data['close'], self.bars['Close'], rtol=1e-4)
+
+    def test_twelvedata_without_volume_and_out_of_order(self):
+        """Test currency pairs come back without volume and shuffled bars are sorted"""
+        values = twelvedata_response(self.bars, {'outputsize': '5000'}, '15m')['values']
+        for bar in values:
+            del bar['volume']
+        values = values[100:] + values[:100]
+        data = parse_twelvedata(values)
+
+        self.assertEqual(list(data.columns), ['open', 'high', 'low', 'close'])
+        self.assertIsNone(data.index.tz)
+        self.assertTrue(data.index.is_monotonic_increasing)
+        np.testing.assert_array_equal(data.index.asi8, self.bars.index.tz_localize(None).as_unit('ns').asi8)
+        np.testing.assert_allclose(data['close'], self.bars['Close'], rtol=1e-4)
+
+    def test_empty(self):
+        """Test an empty series parses to an empty frame"""
+        self.assertTrue(parse_alpha_vantage({}).empty)
+        self.assertTrue(parse_twelvedata([]).empty)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,130 @@
+import unittest
+import threading
+import configparser
+from core.rate_limiter import TokenBucket, RateLimiter, RateLimitExceeded
+
+class FakeClock:
+    """Monotonic clock that only advances when the bucket sleeps"""
+    def __init__(self):
+        self.now = 0.0
+        self.lock = threading.Lock()
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        with self.lock:
+            self.now += seconds
+
+class TestTokenBucket(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+
+    def _bucket(self, per_minute=60, burst=2, daily_quota=0):
+        return TokenBucket('test', per_minute, burst, daily_quota, clock=self.clock, sleep=self.clock.sleep)
+
+    def test_burst_served_without_waiting(self):
+        """Test requests up to the burst size go through immediately"""
+        bucket = self._bucket(burst=3)
+        self.assertEqual([bucket.acquire() for _ in range(3)], [0.0, 0.0, 0.0])
+        self.assertEqual(bucket.wait_count, 0)
+
+    def test_waits_for_refill(self):
+        """Test an empty bucket waits one refill interval per request"""
+        bucket = self._bucket(per_minute=60, burst=1)
+        bucket.acquire()
+        self.assertAlmostEqual(bucket.acquire(), 1.0)
+        self.assertAlmostEqual(bucket.acquire(), 1.0)
+        self.assertEqual(bucket.wait_count, 2)
+        self.assertAlmostEqual(bucket.wait_seconds, 2.0)
+
+    def test_tokens_refill_over_time(self):
+        """Test idle time restores tokens up to the burst size"""
+        bucket = self._bucket(per_minute=60, burst=2)
+        bucket.acquire()
+        bucket.acquire()
+        self.clock.now += 10
+        self.assertEqual(bucket.acquire(), 0.0)
+        self.assertEqual(bucket.acquire(), 0.0)
+        self.assertGreater(bucket.acquire(), 0.0)
+
+    def test_timeout_rejects(self):
+        """Test a wait longer than the timeout is rejected and counted"""
+        bucket = self._bucket(per_minute=6, burst=1)
+        bucket.acquire()
+        with self.assertRaises(RateLimitExceeded):
+            bucket.acquire(timeout=1)
+        self.assertEqual(bucket.rejected_count, 1)
+
+    def test_daily_quota(self):
+        """Test requests beyond the daily quota are rejected"""
+        bucket = self._bucket(burst=5, daily_quota=2)
+        bucket.acquire()
+        bucket.acquire()
+        with self.assertRaises(RateLimitExceeded):
+            bucket.acquire()
+        self.assertEqual(bucket.stats()['rejected'], 1)
+
+    def test_zero_rate_is_unlimited(self):
+        """Test a per-minute limit of 0 never waits, leaving only the daily quota"""
+        bucket = self._bucket(per_minute=0, burst=1, daily_quota=3)
+        self.assertEqual([bucket.acquire(timeout=0) for _ in range(3)], [0.0, 0.0, 0.0])
+        with self.assertRaises(RateLimitExceeded):
+            bucket.acquire()
+
+        limiter = RateLimiter()
+        config = configparser.ConfigParser()
+        config['Providers'] = {'yfinance_per_minute': '0'}
+        limiter.configure(config)
+        self.assertEqual(limiter.acquire('yfinance'), 0.0)
+
+    def test_concurrent_callers_reserve_distinct_slots(self):
+        """Test concurrent callers each wait for their own token"""
+        bucket = self._bucket(per_minute=60, burst=1)
+        waits = []
+        threads = [threading.Thread(target=lambda: waits.append(bucket.acquire())) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(sorted(round(w) for w in waits), [0, 1, 1, 1, 1])
+        self.assertEqual(bucket.granted_count, 5)
+
+class TestRateLimiter(unittest.TestCase):
+    def test_providers_are_independent(self):
+        """Test exhausting one provider does not slow the others"""
+        limiter = RateLimiter({'alpha_vantage': (5, 1, 0), 'yfinance': (60, 10, 0)})
+        limiter.acquire('alpha_vantage')
+        with self.assertRaises(RateLimitExceeded):
+            limiter.acquire('alpha_vantage', timeout=0)
+        for _ in range(10):
+            self.assertEqual(limiter.acquire('yfinance', timeout=0), 0.0)
+
+    def test_unknown_provider(self):
+        """Test unknown providers are reported as errors"""
+        with self.assertRaises(ValueError):
+            RateLimiter().acquire('bloomberg')
+
+    def test_configure_from_config(self):
+        """Test limits are read from the [Providers] section"""
+        config = configparser.ConfigParser()
+        config['Providers'] = {'twelvedata_per_minute': '30', 'twelvedata_burst': '3',
+                               'twelvedata_daily_quota': '100'}
+        limiter = RateLimiter()
+        limiter.configure(config)
+
+        bucket = limiter.buckets['twelvedata']
+        self.assertAlmostEqual(bucket.rate, 0.5)
+        self.assertEqual(bucket.burst, 3)
+        self.assertEqual(bucket.daily_quota, 100)
+
+    def test_configure_keeps_unchanged_buckets(self):
+        """Test reconfiguring with the same limits keeps counters"""
+        limiter = RateLimiter()
+        limiter.acquire('yfinance')
+        limiter.configure({})
+        self.assertEqual(limiter.stats()['yfinance']['granted'], 1)
+
+if __name__ == '__main__':
+    unittest.main()
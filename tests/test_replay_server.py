@@ -0,0 +1,122 @@
+import unittest
+from unittest.mock import patch
+import configparser
+import tempfile
+import shutil
+import numpy as np
+import pandas as pd
+import requests
+
+from core.data_fetcher import DataFetcher
+from core.bar_cache import get_bar_cache
+from core.lookback import bars_in
+from benchmarks.replay_server import ReplayData, Faults, start_server
+
+class TestReplayServer(unittest.TestCase):
+    def setUp(self):
+        self.data = ReplayData()
+        self.faults = Faults()
+        self.server = start_server(self.data, self.faults)
+
+        config = configparser.ConfigParser()
+        config['Providers'] = {f'{provider}_url': self.server.url
+                               for provider in ('yfinance', 'alpha_vantage', 'twelvedata')}
+        self.cache_dir = tempfile.mkdtemp()
+        with patch('core.config_manager.ConfigManager.load_config', return_value=config):
+            self.fetcher = DataFetcher()
+        self.fetcher.cache_dir = self.cache_dir
+        self.fetcher.cache = get_bar_cache('columnar', self.cache_dir)
+
+        self.rate_limit_patcher = patch.object(DataFetcher, '_rate_limit')
+        self.rate_limit = self.rate_limit_patcher.start()
+
+    def tearDown(self):
+        self.rate_limit_patcher.stop()
+        self.server.shutdown()
+        self.server.server_close()
+        shutil.rmtree(self.cache_dir)
+
+    def assertMatchesReplay(self, data, symbol, interval, count=None):
+        expected = self.data.bars(symbol, interval)
+        if count:
+            expected = expected.iloc[-count:]
+        self.assertFalse(data.empty)
+        np.testing.assert_array_equal(data.index.as_unit('ns').asi8,
+                                      expected.index[-len(data):].as_unit('ns').asi8)
+        np.testing.assert_allclose(data['close'], expected['Close'].iloc[-len(data):], rtol=1e-4)
+
+    def test_each_provider_through_data_fetcher(self):
+        """Test bars fetched from every provider endpoint are the replayed bars"""
+        yahoo = self.fetcher.get_historical_data('BTC-USD', period='5d', interval='15m', source='yfinance')
+        alpha = self.fetcher.get_historical_data('IBM', period='5d', interval='15m', source='alpha_vantage')
+        twelve = self.fetcher.get_historical_data('EUR/USD', period='1mo', interval='60m', source='twelvedata')
+
+        self.assertMatchesReplay(yahoo, 'BTC-USD', '15m')
+        self.assertLessEqual(yahoo.index[-1] - yahoo.index[0], pd.Timedelta(days=5))
+        self.assertMatchesReplay(alpha, 'IBM', '15m')
+        # Twelve Data is asked for the bars a month of the forex week holds
+        self.assertMatchesReplay(twelve, 'EUR/USD', '60m')
+        self.assertAlmostEqual(len(twelve), bars_in('forex', '60m', 30), delta=1)
+        self.assertEqual(self.server.snapshot(), {
+            'yfinance': {'ok': 1}, 'alpha_vantage': {'ok': 1}, 'twelvedata': {'ok': 1}})
+
+    def test_alpha_vantage_compact_for_short_periods(self):
+        """Test a period of under 90 bars gets the compact response, a longer one the full history"""
+        short = self.fetcher.get_historical_data('IBM', period='5d', interval='60m', source='alpha_vantage')
+        long = self.fetcher.get_historical_data('IBM', period='1mo', interval='60m', source='alpha_vantage')
+
+        self.assertEqual(len(short), 100)
+        self.assertEqual(len(long), len(self.data.bars('IBM', '60m')))
+
+    def test_chart_since_returns_only_newer_bars(self):
+        """Test an incremental Yahoo chart request starts at the given bar"""
+        since = self.data.bars('AAPL', '60m').index[-5]
+        data = self.fetcher._fetch_yahoo_chart('AAPL', '1mo', '60m', since=since)
+
+        self.assertEqual(len(data), 5)
+        self.assertEqual(data.index[0], since)
+
+    def test_quota_errors(self):
+        """Test each provider's quota response is handled as a failed fetch"""
+        self.faults.quota_rate = 1.0
+        for symbol, source in (('BTC-USD', 'yfinance'), ('IBM', 'alpha_vantage'), ('EUR/USD', 'twelvedata')):
+            data = self.fetcher.get_historical_data(symbol, period='5d', interval='15m', source=source)
+            self.assertTrue(data.empty, source)
+        self.assertEqual(self.server.snapshot()['alpha_vantage'], {'quota': 1})
+
+    def test_per_minute_quota_and_errors(self):
+        """Test the per-minute quota trips after the allowed requests and errors return 500"""
+        self.faults.per_minute = 2
+        url = f"{self.server.url}/v8/finance/chart/AAPL?interval=60m&range=5d"
+        statuses = [requests.get(url).status_code for _ in range(3)]
+        self.assertEqual(statuses, [200, 200, 429])
+
+        self.faults.per_minute, self.faults.error_rate = 0, 1.0
+        self.assertEqual(requests.get(url).status_code, 500)
+
+    def test_connections_kept_alive(self):
+        """Test provider requests reuse one pooled connection"""
+        for _ in range(3):
+            self.fetcher._fetch_twelvedata('EUR/USD', '1mo', '60m')
+        pools = self.fetcher.http.session.get_adapter(self.server.url).poolmanager.pools
+        counts = [(pools[key].num_connections, pools[key].num_requests) for key in pools.keys()]
+        self.assertEqual(counts, [(1, 3)])
+
+    def test_server_errors_retried(self):
+        """Test 5xx answers are retried before the fetch fails, each attempt taking a rate-limit token"""
+        self.fetcher.http.backoff = 0
+        self.faults.error_rate = 1.0
+        data = self.fetcher.get_historical_data('IBM', period='5d', interval='15m', source='alpha_vantage')
+        self.assertTrue(data.empty)
+        self.assertEqual(self.server.snapshot(), {'alpha_vantage': {'error': 1 + self.fetcher.http.retries}})
+        self.assertEqual(self.rate_limit.call_count, 1 + self.fetcher.http.retries)
+
+    def test_base_url_defaults(self):
+        """Test providers keep their public endpoints and yfinance its library when nothing is set"""
+        with patch('core.config_manager.ConfigManager.load_config', return_value=configparser.ConfigParser()):
+            fetcher = DataFetcher()
+        self.assertIsNone(fetcher.base_urls['yfinance'])
+        self.assertEqual(fetcher.base_urls['alpha_vantage'], 'https://www.alphavantage.co')
+
+if __name__ == '__main__':
+    unittest.main()
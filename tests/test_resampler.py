@@ -0,0 +1,91 @@
+import unittest
+import numpy as np
+import pandas as pd
+from core.bar_buffer import BarBuffer
+from core.resampler import resample, resample_buffer, session_for
+
+class TestResampler(unittest.TestCase):
+    def _bars(self, index):
+        count = len(index)
+        return pd.DataFrame({
+            'Open': np.arange(count, dtype=float),
+            'High': np.arange(count, dtype=float) + 1,
+            'Low': np.arange(count, dtype=float) - 1,
+            'Close': np.arange(count, dtype=float) + 0.5,
+            'Volume': 100.0
+        }, index=pd.DatetimeIndex(index))
+
+    def _stock_hours(self, start, end):
+        days = pd.bdate_range(start, end)
+        return [pd.Timestamp(f'{day.date()} {hour}:30', tz='America/New_York')
+                for day in days for hour in range(9, 16)]
+
+    def test_ohlcv_aggregation(self):
+        """Test open/high/low/close/volume are aggregated per bin"""
+        bars = self._bars(self._stock_hours('2023-01-03', '2023-01-03'))
+        daily = resample(bars, '1d', session='stock')
+
+        self.assertEqual(len(daily), 1)
+        row = daily.iloc[0]
+        self.assertEqual((row['Open'], row['High'], row['Low'], row['Close'], row['Volume']),
+                         (0.0, 7.0, -1.0, 6.5, 700.0))
+
+    def test_stock_sessions_across_dst(self):
+        """Test daily and 4h stock bars start at the 09:30 New York open on both sides of DST"""
+        bars = self._bars(self._stock_hours('2023-03-10', '2023-03-13'))
+        daily = resample(bars, '1d', session='stock')
+        four_hour = resample(bars, '4h', session='stock')
+
+        self.assertEqual(list(daily.index), [pd.Timestamp('2023-03-10 14:30', tz='UTC'),
+                                             pd.Timestamp('2023-03-13 13:30', tz='UTC')])
+        # 09:30-13:30 and 13:30-16:00 each session
+        self.assertEqual(list(four_hour['Volume']), [400.0, 300.0, 400.0, 300.0])
+
+    def test_forex_four_hour_bins(self):
+        """Test FX 4h bars open at 17:00 New York and skip the weekend"""
+        index = pd.date_range('2023-01-06 12:00', '2023-01-09 06:00', freq='h', tz='UTC')
+        weekend = (index > pd.Timestamp('2023-01-06 21:00', tz='UTC')) & \
+                  (index < pd.Timestamp('2023-01-08 22:00', tz='UTC'))
+        four_hour = resample(self._bars(index[~weekend]), '4h', session='forex')
+
+        self.assertEqual(list(four_hour.index.tz_convert('America/New_York').hour), [5, 9, 13, 17, 21, 1])
+        self.assertEqual(four_hour.index[3], pd.Timestamp('2023-01-08 22:00', tz='UTC'))
+
+    def test_naive_index_is_utc(self):
+        """Test a naive index is treated as UTC and crypto days start at midnight"""
+        bars = self._bars(pd.date_range('2023-01-01 00:00', periods=48, freq='h'))
+        daily = resample(bars, '1d', session='crypto')
+        self.assertEqual(list(daily.index), list(pd.date_range('2023-01-01', periods=2, freq='D', tz='UTC')))
+        self.assertEqual(list(daily['Volume']), [2400.0, 2400.0])
+
+    def test_buffer_matches_frame(self):
+        """Test resampling a BarBuffer gives the same bars as resampling the frame"""
+        stock = self._bars(self._stock_hours('2023-03-01', '2023-03-31'))
+        forex = self._bars(pd.date_range('2023-10-27', '2023-11-08', freq='h', tz='UTC'))
+        for bars, interval, session in ((stock, '1d', 'stock'), (stock, '4h', 'stock'),
+                                        (forex, '4h', 'forex'), (forex, '1d', 'forex')):
+            expected = resample(bars, interval, session=session)
+            actual = resample_buffer(BarBuffer.from_frame(bars, dtype=np.float64), interval, session=session)
+            pd.testing.assert_frame_equal(actual.to_frame(), expected, check_freq=False, check_index_type=False)
+        self.assertTrue(resample_buffer(BarBuffer(0), '4h').empty)
+
+    def test_invalid_arguments(self):
+        """Test unsupported intervals and sessions are rejected"""
+        bars = self._bars(pd.date_range('2023-01-01', periods=4, freq='h'))
+        with self.assertRaises(ValueError):
+            resample(bars, '1wk')
+        with self.assertRaises(ValueError):
+            resample(bars, '4h', session='moon')
+        self.assertTrue(resample(bars.iloc[:0], '4h').empty)
+
+    def test_session_for(self):
+        """Test sessions are inferred from symbol forms"""
+        self.assertEqual(session_for('EURUSD=X'), 'forex')
+        self.assertEqual(session_for('EURUSD'), 'forex')
+        self.assertEqual(session_for('BTC-USD'), 'crypto')
+        self.assertEqual(session_for('GC=F'), 'commodity')
+        self.assertEqual(session_for('^GSPC'), 'index')
+        self.assertEqual(session_for('AAPL'), 'stock')
+
+if __name__ == '__main__':
+    unittest.main()
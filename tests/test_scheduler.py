@@ -0,0 +1,120 @@
+import unittest
+import pandas as pd
+from core.scheduler import BarCloseScheduler, next_bar_close
+from core.market_calendar import MarketCalendar
+
+def at(moment):
+    return pd.Timestamp(moment).timestamp()
+
+class FakeClock:
+    def __init__(self, start):
+        self.now = start
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+class TestNextBarClose(unittest.TestCase):
+    def test_session_aligned_closes(self):
+        """Test closes follow each session's bar layout"""
+        self.assertEqual(next_bar_close('15m', 'crypto', at('2024-03-08 15:10Z')), at('2024-03-08 15:15Z'))
+        self.assertEqual(next_bar_close('60m', 'forex', at('2024-03-08 15:10Z')), at('2024-03-08 16:00Z'))
+        # US stock hours start at 09:30 New York
+        self.assertEqual(next_bar_close('60m', 'stock', at('2024-03-08 15:10Z')), at('2024-03-08 15:30Z'))
+        self.assertEqual(next_bar_close('60m', 'stock', at('2024-03-15 15:10Z')), at('2024-03-15 14:30Z') + 3600)
+
+    def test_close_is_strictly_after(self):
+        """Test a moment exactly on a close gives the following one"""
+        self.assertEqual(next_bar_close('15m', 'crypto', at('2024-03-08 15:15Z')), at('2024-03-08 15:30Z'))
+
+    def test_repeated_hour_is_not_skipped(self):
+        """Test hourly closes continue through the hour New York repeats in November"""
+        moment, closes = at('2024-11-03 04:10Z'), []
+        for _ in range(4):
+            moment = next_bar_close('60m', 'forex', moment)
+            closes.append(moment)
+        self.assertEqual(closes, [at(f'2024-11-03 0{hour}:00Z') for hour in range(5, 9)])
+
+    def test_unsupported_interval(self):
+        """Test intervals that do not divide a day are rejected"""
+        with self.assertRaises(ValueError):
+            next_bar_close('1wk', 'crypto', at('2024-03-08 15:10Z'))
+
+class TestBarCloseScheduler(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock(at('2024-03-08 15:07Z'))
+        self.scheduler = BarCloseScheduler({'crypto': '15m', 'forex': '60m'}, delay=5,
+                                           clock=self.clock.time, sleep=self.clock.sleep)
+        self.ticks = []
+
+    def _record(self, duration=0):
+        def callback(names):
+            self.ticks.append((pd.Timestamp(self.clock.now, unit='s', tz='UTC'), sorted(names)))
+            self.clock.now += duration
+        return callback
+
+    def test_fires_after_each_close_without_drift(self):
+        """Test ticks land `delay` after every close however long the runs take"""
+        self.scheduler.run(self._record(duration=40), immediate=False, ticks=8)
+
+        times = [tick for tick, _ in self.ticks]
+        expected = pd.date_range('2024-03-08 15:15:05', periods=8, freq='15min', tz='UTC')
+        self.assertEqual(times, list(expected))
+        # Jobs due together share one callback
+        self.assertEqual(self.ticks[3][1], ['crypto', 'forex'])
+        self.assertEqual(self.ticks[0][1], ['crypto'])
+
+    def test_immediate_run(self):
+        """Test every job runs once at start when asked"""
+        self.scheduler.run(self._record(), immediate=True, ticks=1)
+        self.assertEqual(self.ticks, [(pd.Timestamp('2024-03-08 15:07Z'), ['crypto', 'forex'])])
+
+    def test_overrun_skips_missed_ticks(self):
+        """Test a run longer than the cadence skips the ticks it overran"""
+        durations = iter([50 * 60, 0, 0])
+
+        def callback(names):
+            self._record(next(durations))(names)
+
+        self.scheduler.run(callback, immediate=False, ticks=3)
+
+        # The 15:15 run lasted until 16:05, so the 15:30, 15:45 and 16:00 crypto ticks are skipped
+        self.assertEqual([tick for tick, _ in self.ticks], [
+            pd.Timestamp('2024-03-08 15:15:05Z'),
+            pd.Timestamp('2024-03-08 16:05:05Z'),
+            pd.Timestamp('2024-03-08 16:15:05Z')
+        ])
+        self.assertEqual(self.ticks[1][1], ['forex'])
+        self.assertEqual(self.scheduler.stats()['skipped'], {'crypto': 3, 'forex': 0})
+
+    def test_callback_errors_do_not_stop_the_loop(self):
+        """Test a failing run is logged and the next tick still fires"""
+        def callback(names):
+            self.ticks.append(names)
+            raise RuntimeError("boom")
+
+        self.scheduler.run(callback, immediate=False, ticks=2)
+        self.assertEqual(len(self.ticks), 2)
+
+    def test_closed_market_waits_for_open(self):
+        """Test a job does not tick over the weekend and catches up at the open"""
+        clock = FakeClock(at('2024-03-08 19:50Z'))
+        scheduler = BarCloseScheduler({'stock': '60m'}, delay=5, clock=clock.time, sleep=clock.sleep,
+                                      calendar=MarketCalendar())
+        ticks = []
+        scheduler.run(lambda names: ticks.append(pd.Timestamp(clock.now, unit='s', tz='UTC')),
+                      immediate=False, ticks=4)
+
+        self.assertEqual(ticks, [
+            pd.Timestamp('2024-03-08 20:30:05Z'),
+            # The last bar (20:30-21:00 trading) closes at 21:30 on the session grid
+            pd.Timestamp('2024-03-08 21:30:05Z'),
+            # Monday's open, one hour earlier in UTC after the DST change
+            pd.Timestamp('2024-03-11 13:30:05Z'),
+            pd.Timestamp('2024-03-11 14:30:05Z')
+        ])
+
+if __name__ == '__main__':
+    unittest.main()
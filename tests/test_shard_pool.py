@@ -0,0 +1,104 @@
+import unittest
+import numpy as np
+import pandas as pd
+from unittest.mock import patch
+from core.bar_buffer import BarBuffer
+from core.bar_store import BarStore
+from core.indicator_engine import IndicatorEngine
+from core.shard_pool import ShardPool, publish, attach, shard_for
+from core.signal_generator import agent_for
+from benchmarks.bench_signals import synthetic_bars
+
+ASSETS = [
+    {'name': 'Bitcoin', 'symbol': 'BTC-USD', 'type': 'crypto'},
+    {'name': 'Gold', 'symbol': 'GC=F', 'type': 'commodity'},
+    {'name': 'EUR/USD', 'symbol': 'EURUSD', 'type': 'forex'}
+]
+
+class TestPublish(unittest.TestCase):
+    def test_round_trip(self):
+        """Test published series read back unchanged and cannot be written to"""
+        index = pd.date_range('2023-01-02', periods=50, freq='h', tz='America/New_York')
+        close = np.arange(50, dtype=float)
+        frame = pd.DataFrame({'Open': close, 'High': close + 1, 'Low': close - 1, 'Close': close,
+                              'Volume': 10.0}, index=index)
+        series = {('AAPL', '60m'): (BarBuffer.from_frame(frame), 30, 123.0),
+                  ('EURUSD=X', '60m'): (BarBuffer.from_frame(frame.iloc[:7], dtype=np.float64), 7, 456.0)}
+
+        block, layout = publish(series)
+        try:
+            for key, (bars, days, fetched_at) in series.items():
+                shared = attach(block.buf, layout[key])
+                pd.testing.assert_frame_equal(shared.to_frame(), bars.to_frame())
+                self.assertEqual(layout[key][4:], (days, fetched_at))
+                self.assertFalse(shared.writeable)
+                with self.assertRaises(ValueError):
+                    shared.close[0] = 1.0
+                del shared
+        finally:
+            block.close()
+            block.unlink()
+
+    def test_shard_for(self):
+        """Test assets always land on the same shard"""
+        shards = [shard_for(f"SYM{i}", 4) for i in range(100)]
+        self.assertEqual(shards, [shard_for(f"SYM{i}", 4) for i in range(100)])
+        self.assertEqual(set(shards), {0, 1, 2, 3})
+
+class TestShardPool(unittest.TestCase):
+    def setUp(self):
+        self.store = BarStore()
+        self.series = {}
+        for asset in ASSETS:
+            required = agent_for(asset['type']).required_series(asset['symbol'])
+            self.series[asset['symbol']] = [(symbol, interval) for symbol, interval, _ in required]
+            for symbol, interval, period in required:
+                bars = synthetic_bars(asset['type'], interval, period, seed=len(symbol))
+                self.store.put(symbol, interval, bars, int(period[:-1]))
+        self.pool = ShardPool(2)
+
+    def tearDown(self):
+        self.pool.close()
+
+    def _local_signals(self):
+        signals = {}
+        for asset in ASSETS:
+            agent = agent_for(asset['type'])
+            with patch.object(agent, 'bar_store', self.store), \
+                    patch.object(agent, 'indicator_engine', IndicatorEngine()):
+                signals[asset['symbol']] = agent.generate_signal(asset['symbol'])
+        return signals
+
+    def test_workers_match_in_process_agents(self):
+        """Test sharded evaluation on shared bars gives the in-process signals"""
+        with patch('core.shard_pool.bar_store', self.store):
+            results = self.pool.evaluate(ASSETS, self.series)
+            again = self.pool.evaluate(ASSETS, self.series)
+
+        expected = self._local_signals()
+        self.assertEqual({symbol: signal for symbol, (signal, _) in results.items()}, expected)
+        self.assertEqual({symbol: signal for symbol, (signal, _) in again.items()}, expected)
+
+    def test_dead_worker_is_replaced(self):
+        """Test a worker dying mid-cycle is reported for its shard and replaced next cycle"""
+        victim = shard_for('BTC-USD', 2)
+        with patch('core.shard_pool.bar_store', self.store):
+            self.pool.evaluate(ASSETS, self.series)
+            process, connection = self.pool._workers[victim]
+            send = connection.send
+
+            def die_then_send(message):
+                process.kill()
+                process.join()
+                send(message)
+
+            connection.send = die_then_send
+            failed = self.pool.evaluate(ASSETS, self.series)
+            recovered = self.pool.evaluate(ASSETS, self.series)
+
+        self.assertEqual(failed['BTC-USD'][0], "HOLD (Error: shard worker exited)")
+        self.assertFalse(recovered['BTC-USD'][0].startswith('HOLD (Error'))
+        self.assertNotEqual(self.pool._workers[victim][0].pid, process.pid)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -3,6 +3,7 @@ from unittest.mock import patch, MagicMock
 from ai_agents import forex_agent, crypto_agent, stock_agent, commodity_agent, index_agent
 from core.signal_generator import SignalGenerator
 import pandas as pd
+import time
 from datetime import datetime
 
 class TestSignalGeneration(unittest.TestCase):
@@ -167,5 +168,141 @@ class TestSignalGeneration(unittest.TestCase):
         self.mock_yfinance.return_value = pd.DataFrame()
         self.assertEqual(forex_agent.generate_signal('EURUSD'), "HOLD (Insufficient Data)")
 
+class TestConcurrentSignalGeneration(unittest.TestCase):
+    def setUp(self):
+        self.assets = [
+            {"name": "EUR/USD", "symbol": "EURUSD", "type": "forex"},
+            {"name": "Bitcoin", "symbol": "BTCUSD", "type": "crypto"},
+            {"name": "Apple", "symbol": "AAPL", "type": "stock"},
+            {"name": "Gold", "symbol": "XAUUSD", "type": "commodity"},
+            {"name": "S&P 500", "symbol": "US500", "type": "index"}
+        ]
+        self.bar_store_patcher = patch('core.signal_generator.bar_store')
+        self.mock_bar_store = self.bar_store_patcher.start()
+
+    def tearDown(self):
+        self.bar_store_patcher.stop()
+
+    def _generator(self, workers):
+        # Cycles here must not depend on which markets are open right now
+        generator = SignalGenerator({'Settings': {'workers': str(workers)}, 'Schedule': {'market_hours': 'false'}})
+        generator.assets = self.assets
+        return generator
+
+    def _slow_signal(self, symbol):
+        time.sleep(0.2)
+        return f"HOLD ({symbol})"
+
+    def test_workers_setting(self):
+        """Test the worker count comes from [Settings] workers"""
+        self.assertEqual(self._generator(3).workers, 3)
+        self.assertEqual(self._generator(0).workers, 1)
+
+    def test_cycle_time_tracks_slowest_asset(self):
+        """Test assets are evaluated in parallel"""
+        generator = self._generator(5)
+        agents = {name: MagicMock(generate_signal=self._slow_signal, required_series=lambda s: [])
+                  for name in ['forex', 'crypto', 'stock', 'commodity', 'index']}
+
+        with patch.dict('core.signal_generator.AGENTS', agents):
+            start = time.time()
+            signals = generator.generate_signals()
+            elapsed = time.time() - start
+
+        self.assertEqual(len(signals), 5)
+        self.assertLess(elapsed, 0.6)
+
+    def test_signal_shape_preserved(self):
+        """Test concurrent results keep the sequential dict shape"""
+        agents = {name: MagicMock(generate_signal=lambda s: f"BUY ({s})", required_series=lambda s: [])
+                  for name in ['forex', 'crypto', 'stock', 'commodity', 'index']}
+
+        with patch.dict('core.signal_generator.AGENTS', agents):
+            for workers in (1, 5):
+                signals = self._generator(workers).generate_signals()
+                self.assertEqual(len(signals), 5)
+                for signal in signals:
+                    self.assertEqual(set(signal), {'asset', 'symbol', 'signal', 'confidence', 'timestamp'})
+                    self.assertEqual(signal['signal'], f"BUY ({signal['symbol']})")
+
+    def test_sharded_cycle_uses_shard_pool(self):
+        """Test processes > 1 hands the sampled assets and their series to the shard workers"""
+        agents = {name: MagicMock(required_series=lambda s: [(f"{s}=X", '60m', '30d')])
+                  for name in ['forex', 'crypto', 'stock', 'commodity', 'index']}
+        generator = SignalGenerator({'Settings': {'processes': '2'}, 'Schedule': {'market_hours': 'false'}})
+        generator.assets = self.assets
+
+        with patch.dict('core.signal_generator.AGENTS', agents), patch('core.shard_pool.ShardPool') as pool:
+            pool.return_value.evaluate.side_effect = lambda assets, series: {
+                asset['symbol']: (f"SELL ({asset['symbol']})", 0.01) for asset in assets}
+            signals = generator.generate_signals()
+            generator.close()
+
+        series = pool.return_value.evaluate.call_args[0][1]
+        self.assertEqual(series['AAPL'], [('AAPL=X', '60m')])
+        self.assertEqual(sorted(signal['signal'] for signal in signals),
+                         sorted(f"SELL ({asset['symbol']})" for asset in self.assets))
+        self.assertEqual(set(signals[0]), {'asset', 'symbol', 'signal', 'confidence', 'timestamp'})
+        pool.return_value.close.assert_called_once()
+
+    def test_cycle_limited_to_asset_types(self):
+        """Test a scheduled tick only evaluates the asset types whose bars closed"""
+        agents = {name: MagicMock(generate_signal=lambda s: "HOLD", required_series=lambda s: [])
+                  for name in ['forex', 'crypto', 'stock', 'commodity', 'index']}
+
+        with patch.dict('core.signal_generator.AGENTS', agents):
+            signals = self._generator(1).generate_signals(['crypto', 'forex'])
+        self.assertEqual(sorted(signal['symbol'] for signal in signals), ['BTCUSD', 'EURUSD'])
+
+    def test_cadences_follow_agent_intervals(self):
+        """Test each asset type runs on the interval its agent reads unless [Schedule] overrides it"""
+        generator = SignalGenerator({'Settings': {}, 'Schedule': {'stock': '15m'}})
+        generator.assets = self.assets
+        self.assertEqual(generator.cadences(), {
+            'forex': '60m', 'crypto': '15m', 'stock': '15m', 'commodity': '60m', 'index': '60m'
+        })
+
+    def test_closed_markets_skipped(self):
+        """Test asset types with a closed market are neither fetched nor evaluated"""
+        generator = SignalGenerator({'Settings': {'workers': '1'}})
+        generator.assets = self.assets
+        calendar = MagicMock()
+        calendar.open_between.side_effect = lambda asset_type, start, end: asset_type in ('crypto', 'forex')
+
+        with patch('core.signal_generator.market_calendar', calendar), \
+                patch.object(SignalGenerator, '_evaluate', side_effect=lambda asset: {'symbol': asset['symbol']}):
+            signals = generator.generate_signals()
+
+        self.assertEqual(sorted(signal['symbol'] for signal in signals), ['BTCUSD', 'EURUSD'])
+        series = self.mock_bar_store.prefetch.call_args[0][0]
+        self.assertEqual(sorted(symbol for symbol, _, _ in series), ['BTCUSD', 'EURUSD=X'])
+
+    def test_final_bar_of_session_evaluated(self):
+        """Test the run just after the closing bell still evaluates stocks"""
+        generator = SignalGenerator({'Settings': {}})
+        generator.assets = self.assets
+        # Friday 2024-03-08: NYSE closed at 21:00 UTC, FX at 22:00 UTC
+        after_bell = pd.Timestamp('2024-03-08 21:30Z').timestamp()
+        self.assertEqual(generator.open_types(after_bell), {'forex', 'crypto', 'stock', 'commodity', 'index'})
+        saturday = pd.Timestamp('2024-03-09 12:00Z').timestamp()
+        self.assertEqual(generator.open_types(saturday), {'crypto'})
+
+    def test_prefetch_collects_agent_requirements(self):
+        """Test the series of every selected agent are batch-fetched before evaluation"""
+        generator = self._generator(4)
+        assets = [
+            {"name": "EUR/USD", "symbol": "EURUSD", "type": "forex"},
+            {"name": "Apple", "symbol": "AAPL", "type": "stock"}
+        ]
+        # Periods are sized to the agents' indicators as of a Friday afternoon
+        with patch('core.lookback.time.time', return_value=pd.Timestamp('2024-03-08 15:00Z').timestamp()):
+            generator._prefetch(assets)
+
+        series = self.mock_bar_store.prefetch.call_args[0][0]
+        self.assertEqual(sorted(series), [
+            ('AAPL', '60m', '370d'),
+            ('EURUSD=X', '60m', '17d')
+        ])
+
 if __name__ == '__main__':
     unittest.main()
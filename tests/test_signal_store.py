@@ -0,0 +1,130 @@
+import unittest
+import os
+import sqlite3
+import tempfile
+import time
+import threading
+import configparser
+import pandas as pd
+from unittest.mock import patch, MagicMock
+from core.bar_cache import get_bar_cache
+from core.bar_store import BarStore
+from core.data_fetcher import DataFetcher
+from core.signal_generator import SignalGenerator
+from core.signal_store import SignalStore, open_signal_store, signal_label
+
+class TestSignalStore(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'signals.db')
+        self.store = SignalStore(self.path, expiries=(5, 15)).start()
+
+    def tearDown(self):
+        self.store.close()
+        self.directory.cleanup()
+
+    def _signal(self, symbol, signal, timestamp):
+        return {'asset': symbol, 'symbol': symbol, 'signal': signal, 'confidence': 80, 'timestamp': timestamp}
+
+    def _record(self, store, signals):
+        return store.record(signals, {signal['symbol']: 'crypto' for signal in signals})
+
+    def test_cycle_written_in_one_batch(self):
+        """Test a cycle's signals are written together and read back newest first"""
+        self._record(self.store, [self._signal('BTC-USD', 'BUY (RSI)', 1000.0), self._signal('ETH-USD', 'HOLD', 1000.0)])
+        self._record(self.store, [self._signal('BTC-USD', 'STRONG SELL', '2023-01-02T10:00:00')])
+        self.assertTrue(self.store.flush(5))
+
+        rows = self.store.recent('BTC-USD')
+        self.assertEqual([row['signal'] for row in rows], ['STRONG SELL', 'BUY'])
+        self.assertEqual(rows[1]['detail'], 'BUY (RSI)')
+        self.assertEqual(self.store.written_count, 3)
+        self.assertEqual([row['signal'] for row in self.store.recent('BTC-USD', start=0, end=2000)], ['BUY'])
+
+    def test_wal_mode_and_indexes(self):
+        """Test the database is in WAL mode with the query indexes in place"""
+        with sqlite3.connect(self.path) as db:
+            self.assertEqual(db.execute('PRAGMA journal_mode').fetchone()[0], 'wal')
+            indexes = {row[1] for row in db.execute("SELECT * FROM sqlite_master WHERE type = 'index'")}
+            plan = db.execute("EXPLAIN QUERY PLAN SELECT * FROM signals WHERE symbol = 'X' "
+                              "AND timestamp BETWEEN 0 AND 1").fetchall()
+        self.assertTrue({'signals_symbol_time', 'signals_agent_signal'} <= indexes)
+        self.assertIn('signals_symbol_time', str(plan))
+
+    def test_settle_and_stats(self):
+        """Test signals are settled per expiry once their price is known and summed up"""
+        self._record(self.store, [
+            self._signal('BTC-USD', 'BUY', 0.0),
+            self._signal('ETH-USD', 'SELL', 0.0),
+            self._signal('SOL-USD', 'HOLD', 0.0)
+        ])
+        self.store.flush(5)
+        prices = {('BTC-USD', 0.0): 100.0, ('ETH-USD', 0.0): 100.0,
+                  ('BTC-USD', 300.0): 101.0, ('ETH-USD', 300.0): 101.0, ('BTC-USD', 900.0): 99.0}
+        threads = set()
+
+        def price_at(symbol, agent, at):
+            threads.add(threading.current_thread().name)
+            return prices.get((symbol, at))
+
+        self.assertTrue(self.store.settle(price_at, now=1000.0))
+        self.store.flush(5)
+
+        # ETH's 15m price is not known yet, HOLD is never settled
+        self.assertEqual(threads, {'signal-store'})
+        with sqlite3.connect(self.path) as db:
+            self.assertEqual(db.execute('SELECT COUNT(*) FROM outcomes').fetchone()[0], 3)
+        self.assertEqual(self.store.unsettled(now=1000.0)[0][1:3], ('ETH-USD', 'crypto'))
+        self.assertEqual(self.store.recent('BTC-USD')[0]['price'], 100.0)
+        self.assertEqual(self.store.recent('BTC-USD')[0]['outcomes'], {5: 1, 15: -1})
+        stats = {(row['signal'], row['expiry']): row for row in self.store.stats(agent='crypto')}
+        self.assertEqual(stats[('BUY', 5)]['win_rate'], 1.0)
+        self.assertEqual(stats[('SELL', 5)]['losses'], 1)
+        self.assertIsNone(stats[('HOLD', None)]['win_rate'])
+
+    def test_expiries_settle_at_their_own_minute(self):
+        """Test the entry and each expiry are priced from the 1m bar ending at them, not from the agent's 15m bar"""
+        start = (int(time.time()) // 3600 - 2) * 3600
+        index = pd.date_range(start=pd.Timestamp(start - 600, unit='s', tz='UTC'), periods=60, freq='min')
+        minutes = pd.DataFrame({'Open': 100.0, 'High': 200.0, 'Low': 100.0, 'Close': [100.0 + i for i in range(60)],
+                                'Volume': 1000.0}, index=index)
+        agent = MagicMock(required_series=lambda symbol: [(symbol, '15m', '2d')])
+        with patch('core.config_manager.ConfigManager.load_config', return_value=configparser.ConfigParser()):
+            fetcher = DataFetcher()
+        fetcher.cache = get_bar_cache('columnar', self.directory.name)
+
+        with patch('yfinance.download', return_value=minutes) as download, \
+                patch.object(DataFetcher, '_rate_limit'), \
+                patch('core.signal_generator.bar_store', BarStore(fetcher=fetcher)), \
+                patch.dict('core.signal_generator.AGENTS', {'crypto': agent}):
+            generator = SignalGenerator({'Schedule': {'market_hours': 'false'}})
+            self._record(self.store, [self._signal('BTC-USD', 'BUY', float(start))])
+            self.store.flush(5)
+            self.store.settle(generator.price_at)
+            self.store.flush(5)
+
+        self.assertEqual(download.call_args.kwargs['interval'], '1m')
+        with sqlite3.connect(self.path) as db:
+            exits = dict(db.execute('SELECT expiry, exit_price FROM outcomes'))
+        self.assertEqual(self.store.recent('BTC-USD')[0]['price'], 109.0)
+        self.assertEqual(exits, {5: 114.0, 15: 124.0})
+
+    def test_full_queue_drops_oldest_batch(self):
+        """Test recording never blocks when the writer falls behind"""
+        store = SignalStore(os.path.join(self.directory.name, 'slow.db'), queue_size=1)
+        self.assertTrue(self._record(store, [self._signal('BTC-USD', 'BUY', 1.0)]))
+        self.assertFalse(self._record(store, [self._signal('BTC-USD', 'SELL', 2.0)]))
+        store.start()
+        store.close()
+
+        self.assertEqual(store.dropped_count, 1)
+        self.assertEqual([row['signal'] for row in store.recent('BTC-USD')], ['SELL'])
+
+    def test_signal_label_and_config(self):
+        """Test labels are read off the agent text and [History] can turn the store off"""
+        self.assertEqual(signal_label('STRONG BUY (Golden Cross)'), 'STRONG BUY')
+        self.assertEqual(signal_label('HOLD (Error: API error)'), 'HOLD')
+        self.assertIsNone(open_signal_store({'History': {'enabled': 'false'}}))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+import unittest
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from core.metrics import metrics
+from core.single_flight import SingleFlight
+
+class TestSingleFlight(unittest.TestCase):
+    def setUp(self):
+        metrics.reset()
+        self.flights = SingleFlight('test')
+        self.release = threading.Event()
+        self.calls = []
+
+    def slow(self, key):
+        self.calls.append(key)
+        self.release.wait(5)
+        if key == 'bad':
+            raise ValueError("provider down")
+        return {'key': key}
+
+    def wait_for_waiters(self, count):
+        while self.flights.coalesced < count:
+            threading.Event().wait(0.01)
+
+    def test_threads_share_one_call(self):
+        """Test concurrent threads asking for one key make one call and get the same result"""
+        with ThreadPoolExecutor(max_workers=6) as pool:
+            futures = [pool.submit(self.flights.do, 'AAPL', self.slow, 'AAPL') for _ in range(5)]
+            other = pool.submit(self.flights.do, 'MSFT', self.slow, 'MSFT')
+            self.wait_for_waiters(4)
+            self.release.set()
+            results = [future.result() for future in futures]
+
+        self.assertEqual(sorted(self.calls), ['AAPL', 'MSFT'])
+        self.assertEqual(other.result(), {'key': 'MSFT'})
+        self.assertTrue(all(result is results[0] for result in results))
+        self.assertEqual(metrics.snapshot()['counters'][('fetch_coalesced_total', (('call', 'test'),))], 4)
+        self.assertEqual(self.flights.in_flight(), 0)
+
+    def test_error_is_shared_and_not_kept(self):
+        """Test waiters get the first caller's error and the next call tries again"""
+        with ThreadPoolExecutor(max_workers=3) as pool:
+            futures = [pool.submit(self.flights.do, 'bad', self.slow, 'bad') for _ in range(3)]
+            self.wait_for_waiters(2)
+            self.release.set()
+            for future in futures:
+                with self.assertRaises(ValueError):
+                    future.result()
+
+        with self.assertRaises(ValueError):
+            self.flights.do('bad', self.slow, 'bad')
+        self.assertEqual(self.calls, ['bad', 'bad'])
+
+    def test_asyncio_and_threads_share_one_call(self):
+        """Test asyncio tasks join a call a thread started, and each other's"""
+        async def main():
+            thread = threading.Thread(target=self.flights.do, args=('AAPL', self.slow, 'AAPL'))
+            thread.start()
+            while not self.calls:
+                await asyncio.sleep(0.01)
+            tasks = [asyncio.ensure_future(self.flights.do_async('AAPL', self.slow, 'AAPL')) for _ in range(3)]
+            tasks += [asyncio.ensure_future(self.flights.do_async('MSFT', self.slow, 'MSFT')) for _ in range(2)]
+            while self.flights.coalesced < 4:
+                await asyncio.sleep(0.01)
+            self.release.set()
+            results = await asyncio.gather(*tasks)
+            thread.join()
+            return results
+
+        results = asyncio.run(main())
+        self.assertEqual(results, [{'key': 'AAPL'}] * 3 + [{'key': 'MSFT'}] * 2)
+        self.assertEqual(sorted(self.calls), ['AAPL', 'MSFT'])
+
+if __name__ == '__main__':
+    unittest.main()
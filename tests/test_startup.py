@@ -0,0 +1,56 @@
+import unittest
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def run_isolated(code, cwd):
+    """Run `code` in a fresh interpreter and return what it prints as JSON"""
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    output = subprocess.run([sys.executable, '-c', code], cwd=cwd, env=env,
+                            capture_output=True, text=True, check=True).stdout
+    return json.loads(output.splitlines()[-1])
+
+class TestLazyStartup(unittest.TestCase):
+    def setUp(self):
+        self.cwd = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.cwd.cleanup()
+
+    def test_data_fetcher_import_is_cheap(self):
+        """Test importing the data fetcher builds nothing and needs no config.ini"""
+        result = run_isolated(
+            "import sys, os, json\n"
+            "import core.data_fetcher\n"
+            "print(json.dumps({'yfinance': 'yfinance' in sys.modules, 'dirs': sorted(os.listdir('.'))}))",
+            self.cwd.name)
+        self.assertEqual(result, {'yfinance': False, 'dirs': []})
+
+    def test_singleton_built_on_first_use(self):
+        """Test the shared fetcher is created on first access, without a config file"""
+        result = run_isolated(
+            "import json\n"
+            "from core.data_fetcher import data_fetcher, get_data_fetcher\n"
+            "print(json.dumps({'same': data_fetcher is get_data_fetcher(), 'keys': data_fetcher.api_keys}))",
+            self.cwd.name)
+        self.assertTrue(result['same'])
+        self.assertEqual(result['keys']['alpha_vantage'], os.getenv('ALPHA_VANTAGE_API_KEY', 'demo'))
+
+    def test_agents_loaded_when_first_evaluated(self):
+        """Test agents, TA-Lib and yfinance stay unloaded until needed"""
+        result = run_isolated(
+            "import sys, json\n"
+            "from core.signal_generator import agent_for\n"
+            "before = sorted(m for m in ('yfinance', 'talib', 'ai_agents.forex_agent', 'ai_agents.crypto_agent') if m in sys.modules)\n"
+            "agent_for('crypto')\n"
+            "after = sorted(m for m in ('yfinance', 'talib', 'ai_agents.forex_agent', 'ai_agents.crypto_agent') if m in sys.modules)\n"
+            "print(json.dumps({'before': before, 'after': after}))",
+            ROOT)
+        self.assertEqual(result, {'before': [], 'after': ['ai_agents.crypto_agent']})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,6 +1,9 @@
 import unittest
 from unittest.mock import patch, MagicMock
-from core.telegram_bot import TelegramBot
+from core.telegram_bot import TelegramBot, DeliveryQueue, split_message
+import configparser
+import threading
+import time
 import telegram
 
 class TestTelegramIntegration(unittest.TestCase):
@@ -136,6 +139,22 @@ class TestTelegramIntegration(unittest.TestCase):
             mock_sleep.assert_called_once_with(5)  # Wait before retry
             self.assertTrue(result)
             
+    def test_unparsable_markdown_sent_as_plain_text(self):
+        """Test a message Telegram cannot parse as Markdown is sent again without formatting"""
+        self.mock_bot.send_message.side_effect = [
+            telegram.error.BadRequest("Can't parse entities: can't find end of the entity starting at byte offset 5"),
+            None
+        ]
+
+        bot = TelegramBot(self.config['Telegram']['bot_token'])
+        self.assertTrue(bot.send_message('test_chat_id', 'EUR/_USD: BUY'))
+        self.mock_bot.send_message.assert_called_with(chat_id='test_chat_id', text='EUR/_USD: BUY', parse_mode=None)
+
+        self.mock_bot.send_message.side_effect = telegram.error.BadRequest("Chat not found")
+        with self.assertRaises(telegram.error.BadRequest):
+            bot.deliver('test_chat_id', 'Test message')
+        self.assertEqual(self.mock_bot.send_message.call_count, 3)
+
     def test_network_failure_handling(self):
         """Test handling of network issues"""
         # Configure persistent failure
@@ -150,5 +169,107 @@ class TestTelegramIntegration(unittest.TestCase):
             mock_logger.assert_called()
             self.assertIn("NetworkError", mock_logger.call_args[0][0])
 
+class TestDeliveryQueue(unittest.TestCase):
+    def setUp(self):
+        self.bot = MagicMock()
+        self.sleeps = []
+        config = configparser.ConfigParser()
+        config['Telegram'] = {'coalesce_seconds': '0.05', 'queue_size': '3', 'max_retries': '3',
+                              'backoff_seconds': '1', 'max_backoff_seconds': '3',
+                              'chat_messages_per_minute': '6000'}
+        self.delivery = DeliveryQueue(self.bot, config, sleep=self.sleeps.append)
+
+    def tearDown(self):
+        self.delivery.close()
+
+    def _sent(self):
+        return [call[0][1] for call in self.bot.deliver.call_args_list]
+
+    def test_burst_is_coalesced(self):
+        """Test messages queued together for one chat go out as one message"""
+        self.delivery.send('chat', 'first')
+        self.delivery.send('chat', 'second')
+        self.delivery.start()
+        self.assertTrue(self.delivery.flush(timeout=5))
+
+        self.assertEqual(self._sent(), ['first\n\nsecond'])
+        stats = self.delivery.stats()
+        self.assertEqual((stats['sent'], stats['coalesced'], stats['queued']), (2, 1, 0))
+        self.assertIn('latency_p95', stats)
+
+    def test_chats_are_coalesced_separately_in_order(self):
+        """Test interleaved chats each get one message with their own texts in the order sent"""
+        for chat_id, text in (('a', 'a1'), ('b', 'b1'), ('a', 'a2')):
+            self.delivery.send(chat_id, text)
+        self.delivery.start()
+        self.assertTrue(self.delivery.flush(timeout=5))
+
+        self.assertEqual([call[0] for call in self.bot.deliver.call_args_list], [('a', 'a1\n\na2'), ('b', 'b1')])
+        self.assertEqual(self.delivery.stats()['dropped'], 0)
+
+    def test_long_messages_are_split(self):
+        """Test text over 4096 characters is sent in chunks split on line breaks"""
+        text = '\n'.join(['x' * 100] * 100)
+        self.delivery.start().send('chat', text)
+        self.delivery.flush(timeout=5)
+
+        chunks = self._sent()
+        self.assertGreater(len(chunks), 1)
+        self.assertTrue(all(len(chunk) <= 4096 for chunk in chunks))
+        self.assertEqual('\n'.join(chunks), text)
+        self.assertEqual(split_message('A' * 5000), ['A' * 4096, 'A' * 904])
+
+    def test_backoff_on_rate_limit_and_server_errors(self):
+        """Test 429 waits as told and network/5xx errors back off exponentially"""
+        self.bot.deliver.side_effect = [
+            telegram.error.RetryAfter(7),
+            telegram.error.NetworkError("Bad Gateway"),
+            telegram.error.NetworkError("Bad Gateway"),
+            None
+        ]
+        self.delivery.start().send('chat', 'signal')
+        self.delivery.flush(timeout=5)
+
+        # Pacing waits are short; the retry delays are 7s as told, then 2s and 3s (capped)
+        self.assertEqual([delay for delay in self.sleeps if delay >= 1], [7, 2, 3])
+        self.assertEqual(self.delivery.stats()['retries'], 3)
+        self.assertEqual(self.delivery.stats()['sent'], 1)
+
+    def test_gives_up_after_max_retries(self):
+        """Test a persistently failing send is dropped and counted as failed"""
+        self.bot.deliver.side_effect = telegram.error.TimedOut("Timeout")
+        self.delivery.start().send('chat', 'signal')
+        self.delivery.flush(timeout=5)
+
+        self.assertEqual(self.bot.deliver.call_count, 4)
+        self.assertEqual(self.delivery.stats()['failed'], 1)
+
+    def test_rejected_message_is_not_retried(self):
+        """Test a 400 (e.g. an unknown chat) is sent once and dropped without backing off"""
+        self.bot.deliver.side_effect = telegram.error.BadRequest("Chat not found")
+        self.delivery.start().send('chat', 'signal')
+        self.delivery.flush(timeout=5)
+
+        self.assertEqual(self.bot.deliver.call_count, 1)
+        self.assertEqual([delay for delay in self.sleeps if delay >= 1], [])
+        self.assertEqual((self.delivery.stats()['failed'], self.delivery.stats()['retries']), (1, 0))
+
+    def test_send_never_blocks(self):
+        """Test a slow Telegram API does not delay send() and a full queue drops the oldest"""
+        release = threading.Event()
+        self.bot.deliver.side_effect = lambda chat_id, text: release.wait(5)
+        self.delivery.start().send('other', 'in flight')
+        time.sleep(0.1)
+
+        start = time.monotonic()
+        accepted = [self.delivery.send('chat', f'message {i}') for i in range(5)]
+        self.assertLess(time.monotonic() - start, 0.1)
+        self.assertEqual(accepted, [True, True, True, False, False])
+        self.assertEqual(self.delivery.stats()['dropped'], 2)
+
+        release.set()
+        self.delivery.flush(timeout=5)
+        self.assertIn('message 2\n\nmessage 3\n\nmessage 4', self._sent())
+
 if __name__ == '__main__':
     unittest.main()
@@ -151,7 +151,7 @@ echo Installation complete!
 echo.
 echo Next steps:
 echo 1. Edit config\config.ini with your Telegram credentials
-echo 2. Customize assets in config\assets_list.json
+echo 2. Customize assets in config\asset_list.json
 echo 3. Double-click the desktop shortcut to start
 echo 4. For automated signals, create a scheduled task to run windows\start.bat
 echo.